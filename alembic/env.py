@@ -4,8 +4,11 @@ from sqlalchemy import engine_from_config
 from sqlalchemy import pool
 
 from alembic import context
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
 
 from app.core.config import settings
+from app.db.migrations import offline_revisions
 from app.models import Base
 
 # this is the Alembic Config object, which provides
@@ -79,6 +82,23 @@ def include_object(object, name, type_, reflected, compare_to):
     return True
 
 
+def check_online_revisions(connection) -> None:
+    """
+    `alembic -x online=true upgrade ...` 只允許執行標記 `online = True` 的 revision，
+    其餘需要維護時段的 revision 直接中止。
+    """
+    if context.get_x_argument(as_dictionary=True).get("online") != "true":
+        return
+    script = ScriptDirectory.from_config(config)
+    current = MigrationContext.configure(connection).get_current_heads()
+    pending = script.iterate_revisions("heads", current or "base")
+    blocking = offline_revisions(pending)
+    if blocking:
+        raise RuntimeError(
+            f"Revisions not marked online need a maintenance window: {blocking}"
+        )
+
+
 def run_migrations_offline() -> None:
     """Run migrations in 'offline' mode.
 
@@ -118,10 +138,14 @@ def run_migrations_online() -> None:
     )
 
     with connectable.connect() as connection:
+        check_online_revisions(connection)
         context.configure(
             connection=connection,
             target_metadata=target_metadata,
             include_object=include_object,  # 忽略指定的表格
+            # 每個 revision 各自 commit，online_step 的 autocommit 區塊
+            # 只會提交目前 revision 已做的變更
+            transaction_per_migration=True,
         )
 
         with context.begin_transaction():
@@ -18,6 +18,9 @@ down_revision: Union[str, Sequence[str], None] = ${repr(down_revision)}
 branch_labels: Union[str, Sequence[str], None] = ${repr(branch_labels)}
 depends_on: Union[str, Sequence[str], None] = ${repr(depends_on)}
 
+# 只使用 app.db.migrations 的 online helpers、可在服務運作中執行時改為 True
+online = False
+
 
 def upgrade() -> None:
     """Upgrade schema."""
@@ -0,0 +1,62 @@
+"""add acoustic_index_minute table
+
+Revision ID: add_acoustic_index_minute
+Revises: add_audio_analysis_run
+Create Date: 2026-03-16
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "add_acoustic_index_minute"
+down_revision: Union[str, Sequence[str], None] = "add_audio_analysis_run"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "acoustic_index_minute",
+        sa.Column("id", sa.BigInteger(), nullable=False),
+        sa.Column("deployment_id", sa.Integer(), nullable=False),
+        sa.Column("audio_id", sa.Integer(), nullable=False),
+        sa.Column("minute_time", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("duration", sa.REAL(), nullable=False),
+        sa.Column("aci", sa.REAL(), nullable=True),
+        sa.Column("adi", sa.REAL(), nullable=True),
+        sa.Column("h", sa.REAL(), nullable=True),
+        sa.Column("ndsi", sa.REAL(), nullable=True),
+        sa.Column("spl", sa.REAL(), nullable=True),
+        sa.ForeignKeyConstraint(
+            ["deployment_id"], ["deployment_info.id"], ondelete="CASCADE"
+        ),
+        sa.ForeignKeyConstraint(["audio_id"], ["audio_info.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        op.f("ix_acoustic_index_minute_audio_id"),
+        "acoustic_index_minute",
+        ["audio_id"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_acoustic_index_deployment_time",
+        "acoustic_index_minute",
+        ["deployment_id", "minute_time"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "ix_acoustic_index_deployment_time", table_name="acoustic_index_minute"
+    )
+    op.drop_index(
+        op.f("ix_acoustic_index_minute_audio_id"), table_name="acoustic_index_minute"
+    )
+    op.drop_table("acoustic_index_minute")
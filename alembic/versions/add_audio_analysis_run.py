@@ -0,0 +1,49 @@
+"""add audio_analysis_run table
+
+Revision ID: add_audio_analysis_run
+Revises: add_detection_info
+Create Date: 2026-03-09
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "add_audio_analysis_run"
+down_revision: Union[str, Sequence[str], None] = "add_detection_info"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "audio_analysis_run",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("audio_id", sa.Integer(), nullable=False),
+        sa.Column("analysis", sa.String(length=50), nullable=False),
+        sa.Column("params_hash", sa.String(length=64), nullable=False),
+        sa.Column("result_count", sa.Integer(), nullable=False),
+        sa.Column(
+            "processed_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=True,
+        ),
+        sa.ForeignKeyConstraint(["audio_id"], ["audio_info.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "uq_audio_analysis_run",
+        "audio_analysis_run",
+        ["audio_id", "analysis", "params_hash"],
+        unique=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("uq_audio_analysis_run", table_name="audio_analysis_run")
+    op.drop_table("audio_analysis_run")
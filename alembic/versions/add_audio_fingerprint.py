@@ -0,0 +1,67 @@
+"""add audio fingerprint and duplicate link
+
+Revision ID: add_audio_fingerprint
+Revises: add_acoustic_index_minute
+Create Date: 2026-03-18
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "add_audio_fingerprint"
+down_revision: Union[str, Sequence[str], None] = "add_acoustic_index_minute"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "audio_info", sa.Column("fingerprint", sa.String(length=64), nullable=True)
+    )
+    op.add_column(
+        "audio_info", sa.Column("duplicate_of_id", sa.Integer(), nullable=True)
+    )
+    op.create_foreign_key(
+        "fk_audio_info_duplicate_of_id",
+        "audio_info",
+        "audio_info",
+        ["duplicate_of_id"],
+        ["id"],
+        ondelete="SET NULL",
+    )
+    op.create_index(
+        op.f("ix_audio_info_duplicate_of_id"),
+        "audio_info",
+        ["duplicate_of_id"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_audio_checksum_active",
+        "audio_info",
+        ["checksum"],
+        unique=False,
+        postgresql_where=sa.text("is_deleted = false AND checksum IS NOT NULL"),
+    )
+    op.create_index(
+        "ix_audio_fingerprint_active",
+        "audio_info",
+        ["fingerprint"],
+        unique=False,
+        postgresql_where=sa.text("is_deleted = false AND fingerprint IS NOT NULL"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_audio_fingerprint_active", table_name="audio_info")
+    op.drop_index("ix_audio_checksum_active", table_name="audio_info")
+    op.drop_index(op.f("ix_audio_info_duplicate_of_id"), table_name="audio_info")
+    op.drop_constraint(
+        "fk_audio_info_duplicate_of_id", "audio_info", type_="foreignkey"
+    )
+    op.drop_column("audio_info", "duplicate_of_id")
+    op.drop_column("audio_info", "fingerprint")
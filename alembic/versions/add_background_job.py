@@ -0,0 +1,102 @@
+"""add background_job table
+
+Revision ID: add_background_job
+Revises: add_audio_fingerprint
+Create Date: 2026-03-20
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "add_background_job"
+down_revision: Union[str, Sequence[str], None] = "add_audio_fingerprint"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "background_job",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("job_type", sa.String(length=50), nullable=False),
+        sa.Column("payload", sa.JSON(), nullable=False),
+        sa.Column(
+            "status", sa.String(length=20), server_default="queued", nullable=False
+        ),
+        sa.Column("priority", sa.Integer(), server_default=sa.text("0"), nullable=False),
+        sa.Column("dedup_key", sa.String(length=255), nullable=True),
+        sa.Column("attempts", sa.Integer(), server_default=sa.text("0"), nullable=False),
+        sa.Column(
+            "max_attempts", sa.Integer(), server_default=sa.text("3"), nullable=False
+        ),
+        sa.Column(
+            "run_after",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=True,
+        ),
+        sa.Column("progress_current", sa.BigInteger(), nullable=True),
+        sa.Column("progress_total", sa.BigInteger(), nullable=True),
+        sa.Column(
+            "cancel_requested",
+            sa.Boolean(),
+            server_default=sa.text("false"),
+            nullable=False,
+        ),
+        sa.Column("result", sa.JSON(), nullable=True),
+        sa.Column("last_error", sa.Text(), nullable=True),
+        sa.Column("locked_by", sa.String(length=100), nullable=True),
+        sa.Column("heartbeat_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("created_by", sa.Integer(), nullable=True),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=True,
+        ),
+        sa.Column("started_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("finished_at", sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_background_job_ready",
+        "background_job",
+        ["priority", "run_after", "id"],
+        unique=False,
+        postgresql_where=sa.text("status = 'queued'"),
+    )
+    op.create_index(
+        "ix_background_job_running",
+        "background_job",
+        ["job_type", "heartbeat_at"],
+        unique=False,
+        postgresql_where=sa.text("status = 'running'"),
+    )
+    op.create_index(
+        "uq_background_job_dedup",
+        "background_job",
+        ["job_type", "dedup_key"],
+        unique=True,
+        postgresql_where=sa.text(
+            "dedup_key IS NOT NULL AND status IN ('queued', 'running')"
+        ),
+    )
+    op.create_index(
+        "ix_background_job_created_by",
+        "background_job",
+        ["created_by"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_background_job_created_by", table_name="background_job")
+    op.drop_index("uq_background_job_dedup", table_name="background_job")
+    op.drop_index("ix_background_job_running", table_name="background_job")
+    op.drop_index("ix_background_job_ready", table_name="background_job")
+    op.drop_table("background_job")
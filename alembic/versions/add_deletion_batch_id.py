@@ -0,0 +1,52 @@
+"""add deletion_batch_id to soft-deletable tree tables
+
+Revision ID: add_deletion_batch_id
+Revises: add_background_job
+Create Date: 2026-03-27
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "add_deletion_batch_id"
+down_revision: Union[str, Sequence[str], None] = "add_background_job"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = ("project_info", "point_info", "deployment_info", "audio_info")
+
+
+def upgrade() -> None:
+    for table in TABLES:
+        op.add_column(
+            table,
+            sa.Column("deletion_batch_id", sa.String(length=32), nullable=True),
+        )
+        # 既有的級聯刪除在同一次操作中寫入完全相同的 deleted_at，
+        # 以其雜湊值作為 batch id 即可讓舊資料也能精確還原
+        op.execute(
+            f"UPDATE {table} SET deletion_batch_id = md5(deleted_at::text) "
+            "WHERE is_deleted AND deleted_at IS NOT NULL"
+        )
+        op.create_index(
+            f"ix_{table}_deletion_batch_id",
+            table,
+            ["deletion_batch_id"],
+            unique=False,
+            postgresql_where=sa.text("deletion_batch_id IS NOT NULL"),
+        )
+
+
+def downgrade() -> None:
+    for table in reversed(TABLES):
+        op.drop_index(
+            f"ix_{table}_deletion_batch_id",
+            table_name=table,
+            postgresql_where=sa.text("deletion_batch_id IS NOT NULL"),
+        )
+        op.drop_column(table, "deletion_batch_id")
@@ -0,0 +1,72 @@
+"""add detection_info table
+
+Revision ID: add_detection_info
+Revises: add_oauth_fields
+Create Date: 2026-03-02
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "add_detection_info"
+down_revision: Union[str, Sequence[str], None] = "add_oauth_fields"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "detection_info",
+        sa.Column("id", sa.BigInteger(), nullable=False),
+        sa.Column("deployment_id", sa.Integer(), nullable=False),
+        sa.Column("audio_id", sa.Integer(), nullable=True),
+        sa.Column("start_time", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("end_time", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("freq_min", sa.Float(), nullable=True),
+        sa.Column("freq_max", sa.Float(), nullable=True),
+        sa.Column("method", sa.String(length=50), nullable=False),
+        sa.Column("species", sa.Integer(), server_default=sa.text("0"), nullable=False),
+        sa.Column(
+            "call_type", sa.Integer(), server_default=sa.text("0"), nullable=False
+        ),
+        sa.Column("confidence", sa.Float(), nullable=True),
+        sa.Column("created_by", sa.Integer(), nullable=True),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=True,
+        ),
+        sa.ForeignKeyConstraint(
+            ["deployment_id"], ["deployment_info.id"], ondelete="CASCADE"
+        ),
+        sa.ForeignKeyConstraint(["audio_id"], ["audio_info.id"], ondelete="SET NULL"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        op.f("ix_detection_info_audio_id"), "detection_info", ["audio_id"], unique=False
+    )
+    op.create_index(
+        "ix_detection_deployment_time",
+        "detection_info",
+        ["deployment_id", "start_time"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_detection_deployment_species_time",
+        "detection_info",
+        ["deployment_id", "species", "call_type", "start_time"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_detection_deployment_species_time", table_name="detection_info")
+    op.drop_index("ix_detection_deployment_time", table_name="detection_info")
+    op.drop_index(op.f("ix_detection_info_audio_id"), table_name="detection_info")
+    op.drop_table("detection_info")
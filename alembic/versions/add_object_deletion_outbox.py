@@ -0,0 +1,65 @@
+"""add object_deletion_outbox table
+
+Revision ID: add_object_deletion_outbox
+Revises: add_deletion_batch_id
+Create Date: 2026-04-02
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "add_object_deletion_outbox"
+down_revision: Union[str, Sequence[str], None] = "add_deletion_batch_id"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "object_deletion_outbox",
+        sa.Column("id", sa.BigInteger(), nullable=False),
+        sa.Column("bucket", sa.String(length=255), nullable=False),
+        sa.Column("object_key", sa.String(length=1024), nullable=True),
+        sa.Column("attempts", sa.Integer(), server_default="0", nullable=False),
+        sa.Column(
+            "next_attempt_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.Column("last_error", sa.Text(), nullable=True),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=True,
+        ),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_object_deletion_outbox_ready",
+        "object_deletion_outbox",
+        ["next_attempt_at", "id"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_object_deletion_outbox_bucket",
+        "object_deletion_outbox",
+        ["bucket"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "ix_object_deletion_outbox_bucket", table_name="object_deletion_outbox"
+    )
+    op.drop_index(
+        "ix_object_deletion_outbox_ready", table_name="object_deletion_outbox"
+    )
+    op.drop_table("object_deletion_outbox")
@@ -0,0 +1,41 @@
+"""add partial deleted_at indexes for the retention purge
+
+Revision ID: add_soft_delete_purge_index
+Revises: add_object_deletion_outbox
+Create Date: 2026-04-10
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "add_soft_delete_purge_index"
+down_revision: Union[str, Sequence[str], None] = "add_object_deletion_outbox"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = ("project_info", "point_info", "deployment_info", "audio_info")
+
+
+def upgrade() -> None:
+    for table in TABLES:
+        op.create_index(
+            f"ix_{table}_purge",
+            table,
+            ["deleted_at"],
+            unique=False,
+            postgresql_where=sa.text("is_deleted"),
+        )
+
+
+def downgrade() -> None:
+    for table in reversed(TABLES):
+        op.drop_index(
+            f"ix_{table}_purge",
+            table_name=table,
+            postgresql_where=sa.text("is_deleted"),
+        )
@@ -0,0 +1,282 @@
+"""partition audio_info by record_time
+
+Revision ID: partition_audio_info
+Revises: add_soft_delete_purge_index
+Create Date: 2026-04-24
+
+Rebuilds ``audio_info`` as a table partitioned by range on ``record_time``
+(monthly or yearly, ``AUDIO_PARTITION_INTERVAL``), copies the rows across and
+drops the old table. Run it in a maintenance window: the copy holds an
+exclusive lock on ``audio_info`` until it commits.
+
+PostgreSQL requires the partition key in every unique index and primary key
+of a partitioned table, and foreign keys can only reference a unique key, so:
+
+- ``id`` keeps its sequence and a plain index; it is no longer a constraint.
+- The partial unique index on active ``object_key`` values moves to the
+  ``audio_object_key_active`` table, kept in sync by a trigger. Its primary
+  key keeps the name ``ix_audio_object_key_active``, so duplicates still fail
+  with the same unique violation.
+- Foreign keys to ``audio_info.id`` are replaced by triggers that check the
+  referenced audio exists and apply the old ``ON DELETE`` actions.
+
+Requires PostgreSQL 13 or later.
+"""
+
+from datetime import UTC, datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.core.config import settings
+from app.db.partitions import (
+    DEFAULT_PARTITION,
+    create_partition_sql,
+    next_period,
+    partition_ranges,
+    period_start,
+)
+
+
+# revision identifiers, used by Alembic.
+revision: str = "partition_audio_info"
+down_revision: Union[str, Sequence[str], None] = "add_soft_delete_purge_index"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (table, column, 原本的 FK 名稱, ON DELETE)
+REFERENCES = (
+    ("detection_info", "audio_id", "detection_info_audio_id_fkey", "SET NULL"),
+    (
+        "acoustic_index_minute",
+        "audio_id",
+        "acoustic_index_minute_audio_id_fkey",
+        "CASCADE",
+    ),
+    ("audio_analysis_run", "audio_id", "audio_analysis_run_audio_id_fkey", "CASCADE"),
+    ("audio_info", "duplicate_of_id", "fk_audio_info_duplicate_of_id", "SET NULL"),
+)
+
+# (name, columns, unique, where)
+INDEXES = (
+    ("ix_audio_info_deployment_id", ["deployment_id"], False, None),
+    ("ix_audio_info_record_time", ["record_time"], False, None),
+    ("ix_audio_info_duplicate_of_id", ["duplicate_of_id"], False, None),
+    (
+        "ix_audio_info_deletion_batch_id",
+        ["deletion_batch_id"],
+        False,
+        "deletion_batch_id IS NOT NULL",
+    ),
+    ("ix_audio_info_purge", ["deleted_at"], False, "is_deleted"),
+    (
+        "ix_audio_checksum_active",
+        ["checksum"],
+        False,
+        "is_deleted = false AND checksum IS NOT NULL",
+    ),
+    (
+        "ix_audio_fingerprint_active",
+        ["fingerprint"],
+        False,
+        "is_deleted = false AND fingerprint IS NOT NULL",
+    ),
+)
+
+SYNC_OBJECT_KEY_SQL = """
+CREATE FUNCTION audio_info_sync_object_key() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') AND NOT OLD.is_deleted THEN
+        DELETE FROM audio_object_key_active
+        WHERE object_key = OLD.object_key AND audio_id = OLD.id;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NOT NEW.is_deleted THEN
+        -- 同一筆音檔重新寫入 (在分區之間搬移) 時沿用原本的保留
+        INSERT INTO audio_object_key_active AS k (object_key, audio_id)
+        VALUES (NEW.object_key, NEW.id)
+        ON CONFLICT (object_key) DO UPDATE SET audio_id = k.audio_id
+        WHERE k.audio_id = NEW.id;
+        IF NOT FOUND THEN
+            RAISE unique_violation USING
+                MESSAGE = 'duplicate key value violates unique constraint '
+                          '"ix_audio_object_key_active"',
+                DETAIL = format(
+                    'Key (object_key)=(%s) already exists.', NEW.object_key
+                ),
+                CONSTRAINT = 'ix_audio_object_key_active';
+        END IF;
+    END IF;
+    RETURN NULL;
+END $$
+"""
+
+CHECK_REFERENCE_SQL = """
+CREATE FUNCTION audio_info_check_reference() RETURNS trigger
+LANGUAGE plpgsql AS $$
+DECLARE
+    ref_id integer := (to_jsonb(NEW) ->> TG_ARGV[0])::integer;
+BEGIN
+    IF ref_id IS NOT NULL THEN
+        PERFORM 1 FROM audio_info WHERE id = ref_id FOR KEY SHARE;
+        IF NOT FOUND THEN
+            RAISE foreign_key_violation USING
+                MESSAGE = format(
+                    'insert or update on table "%s" violates foreign key '
+                    'constraint "%s_%s_fkey"', TG_TABLE_NAME, TG_TABLE_NAME, TG_ARGV[0]
+                ),
+                DETAIL = format(
+                    'Key (%s)=(%s) is not present in table "audio_info".',
+                    TG_ARGV[0], ref_id
+                );
+        END IF;
+    END IF;
+    RETURN NEW;
+END $$
+"""
+
+DELETE_REFERENCES_SQL = """
+CREATE FUNCTION audio_info_delete_references() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    DELETE FROM acoustic_index_minute
+    WHERE audio_id IN (SELECT id FROM deleted_audio);
+    DELETE FROM audio_analysis_run
+    WHERE audio_id IN (SELECT id FROM deleted_audio);
+    UPDATE detection_info SET audio_id = NULL
+    WHERE audio_id IN (SELECT id FROM deleted_audio);
+    UPDATE audio_info SET duplicate_of_id = NULL
+    WHERE duplicate_of_id IN (SELECT id FROM deleted_audio);
+    RETURN NULL;
+END $$
+"""
+
+
+def _create_indexes(indexes) -> None:
+    for name, columns, unique, where in indexes:
+        op.create_index(
+            name,
+            "audio_info",
+            columns,
+            unique=unique,
+            postgresql_where=sa.text(where) if where else None,
+        )
+
+
+def _copy_table(partitioned: bool) -> None:
+    """把 audio_info 改名為 audio_info_old，建立新表並複製資料。"""
+    op.execute("ALTER TABLE audio_info RENAME TO audio_info_old")
+    op.execute("ALTER SEQUENCE audio_info_id_seq OWNED BY NONE")
+    op.execute(
+        "CREATE TABLE audio_info (LIKE audio_info_old INCLUDING DEFAULTS "
+        "INCLUDING STORAGE)"
+        + (" PARTITION BY RANGE (record_time)" if partitioned else "")
+    )
+    if partitioned:
+        _create_partitions()
+    op.execute("INSERT INTO audio_info SELECT * FROM audio_info_old")
+    op.execute("DROP TABLE audio_info_old")
+    op.execute("ALTER SEQUENCE audio_info_id_seq OWNED BY audio_info.id")
+
+
+def _create_partitions() -> None:
+    interval = settings.audio_partition_interval
+    first = op.get_bind().execute(
+        sa.text("SELECT min(record_time) FROM audio_info_old")
+    )
+    now = datetime.now(UTC)
+    last = period_start(now, interval)
+    for _ in range(settings.audio_partition_premake):
+        last = next_period(last, interval)
+    for name, start, end in partition_ranges(first.scalar() or now, last, interval):
+        op.execute(create_partition_sql(name, start, end))
+    op.execute(f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF audio_info DEFAULT")
+
+
+def upgrade() -> None:
+    for table, _, constraint, _ in REFERENCES:
+        op.drop_constraint(constraint, table, type_="foreignkey")
+
+    _copy_table(partitioned=True)
+    op.create_index("ix_audio_info_id", "audio_info", ["id"], unique=False)
+    op.create_index(
+        "ix_audio_info_object_key_active",
+        "audio_info",
+        ["object_key"],
+        unique=False,
+        postgresql_where=sa.text("is_deleted = false"),
+    )
+    _create_indexes(INDEXES)
+    op.create_foreign_key(
+        "audio_info_deployment_id_fkey",
+        "audio_info",
+        "deployment_info",
+        ["deployment_id"],
+        ["id"],
+    )
+
+    op.create_table(
+        "audio_object_key_active",
+        sa.Column("object_key", sa.String(length=1024), nullable=False),
+        sa.Column("audio_id", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("object_key", name="ix_audio_object_key_active"),
+    )
+    op.execute(
+        "INSERT INTO audio_object_key_active (object_key, audio_id) "
+        "SELECT object_key, id FROM audio_info WHERE is_deleted = false"
+    )
+
+    op.execute(SYNC_OBJECT_KEY_SQL)
+    op.execute(
+        "CREATE TRIGGER audio_info_sync_object_key "
+        "AFTER INSERT OR UPDATE OF object_key, is_deleted OR DELETE ON audio_info "
+        "FOR EACH ROW EXECUTE FUNCTION audio_info_sync_object_key()"
+    )
+    op.execute(CHECK_REFERENCE_SQL)
+    for table, column, _, _ in REFERENCES:
+        op.execute(
+            f"CREATE TRIGGER {table}_{column}_check "
+            f"BEFORE INSERT OR UPDATE OF {column} ON {table} "
+            f"FOR EACH ROW EXECUTE FUNCTION audio_info_check_reference('{column}')"
+        )
+    # statement 層級的 trigger 一次處理整批刪除；跨分區 UPDATE 不會觸發
+    op.execute(DELETE_REFERENCES_SQL)
+    op.execute(
+        "CREATE TRIGGER audio_info_delete_references AFTER DELETE ON audio_info "
+        "REFERENCING OLD TABLE AS deleted_audio "
+        "FOR EACH STATEMENT EXECUTE FUNCTION audio_info_delete_references()"
+    )
+
+
+def downgrade() -> None:
+    for table, column, _, _ in REFERENCES:
+        op.execute(f"DROP TRIGGER {table}_{column}_check ON {table}")
+    op.drop_table("audio_object_key_active")
+
+    # 已 detach 封存的分區不會複製回來
+    _copy_table(partitioned=False)
+    op.create_primary_key("audio_info_pkey", "audio_info", ["id"])
+    op.create_index(
+        "ix_audio_object_key_active",
+        "audio_info",
+        ["object_key"],
+        unique=True,
+        postgresql_where=sa.text("is_deleted = false"),
+    )
+    _create_indexes(INDEXES)
+    op.create_foreign_key(
+        "audio_info_deployment_id_fkey",
+        "audio_info",
+        "deployment_info",
+        ["deployment_id"],
+        ["id"],
+    )
+    for table, column, constraint, on_delete in REFERENCES:
+        op.create_foreign_key(
+            constraint, table, "audio_info", [column], ["id"], ondelete=on_delete
+        )
+
+    op.execute("DROP FUNCTION audio_info_sync_object_key()")
+    op.execute("DROP FUNCTION audio_info_check_reference()")
+    op.execute("DROP FUNCTION audio_info_delete_references()")
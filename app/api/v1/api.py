@@ -3,11 +3,17 @@ from fastapi import APIRouter
 from app.api.v1.endpoints import (
     api_audio,
     api_auth,
+    api_cold_storage,
     api_deployments,
+    api_detections,
+    api_jobs,
+    api_metrics,
     api_oauth,
+    api_partitions,
     api_points,
     api_projects,
     api_recorders,
+    api_retention,
     api_users,
 )
 
@@ -18,5 +24,11 @@ api_router.include_router(api_projects.router)
 api_router.include_router(api_points.router)
 api_router.include_router(api_deployments.router)
 api_router.include_router(api_audio.router)
+api_router.include_router(api_detections.router)
+api_router.include_router(api_cold_storage.router)
+api_router.include_router(api_retention.router)
+api_router.include_router(api_partitions.router)
+api_router.include_router(api_jobs.router)
+api_router.include_router(api_metrics.router)
 api_router.include_router(api_oauth.router)
 api_router.include_router(api_auth.router)
@@ -1,9 +1,22 @@
-from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status
+from datetime import datetime
+from typing import List, Literal, Optional
+
+import numpy as np
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    Query,
+    Request,
+    status,
+)
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.core.auth import get_current_user
-from app.db.session import get_db
+from app.db.session import get_async_read_db, get_db, get_read_db
 from app.core.minio import get_s3_client
 from app.models.audio import AudioInfo
 from app.models.user import UserRole
@@ -18,7 +31,25 @@ from app.schemas.audio import (
     PresignedUrlBatchRequest,
     PresignedUrlBatchResponse,
 )
+from app.schemas.duplicate import (
+    DuplicateKey,
+    DuplicatePolicy,
+    DuplicateReport,
+    DuplicateScanResponse,
+)
+from app.schemas.peaks import PeaksBuildResponse, PeaksResponse
 from app.services.audio_service import AudioService
+from app.services.clip_service import ClipService
+from app.services.duplicate_service import DuplicateAudioService
+from app.services.job_handlers import (
+    JOB_DUPLICATE_SCAN,
+    JOB_PEAKS_BUILD,
+    schedule_object_deletions,
+)
+from app.services.job_service import JobService
+from app.services.object_deletion_service import keys_pending_deletion
+from app.services.peaks_service import PeaksService
+from app.services.spectrogram_service import SpectrogramService
 from app.services.project_service import ProjectService
 from app.services.point_service import PointService
 
@@ -26,43 +57,228 @@ router = APIRouter(prefix="/audio", tags=["audio"])
 
 
 @router.get("/", response_model=List[AudioResponse])
-def get_audios(
+async def get_audios(
     deployment_id: Optional[int] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
     skip: int = 0,
     limit: int = 100,
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user=Depends(get_current_user),
+):
+    """
+    音檔列表，可依錄音時間 (record_time 落在 [start, end)) 篩選。
+
+    指定時間範圍時只會掃描相符的分區。
+    """
+    return await AudioService(db).get_audios_async(
+        deployment_id=deployment_id, skip=skip, limit=limit, start=start, end=end
+    )
+
+
+@router.get("/duplicates", response_model=DuplicateReport)
+def get_duplicate_report(
+    by: DuplicateKey = "checksum",
+    limit: int = Query(100, ge=1, le=10000),
+    db: Session = Depends(get_read_db),
+    current_user=Depends(get_current_user),
+):
+    """
+    全庫重複音檔群組報表。
+
+    ``by=checksum`` 找出位元組完全相同的檔案；``by=fingerprint`` 依開頭
+    數十秒的頻譜指紋找出內容相同、但檔頭或格式不同的重新上傳。
+    """
+    return DuplicateAudioService(db).report(by=by, limit=limit)
+
+
+@router.post(
+    "/duplicates/scan",
+    response_model=DuplicateScanResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+def scan_duplicates(
     db: Session = Depends(get_db),
     current_user=Depends(get_current_user),
 ):
-    return AudioService(db).get_audios(
-        deployment_id=deployment_id, skip=skip, limit=limit
+    """排程補算缺少的指紋並標記重複音檔 (``duplicate_of_id``)。需要 Admin 權限。"""
+    if current_user.role != UserRole.ADMIN.value:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin permission required for duplicate scan",
+        )
+    job = JobService(db).enqueue(
+        JOB_DUPLICATE_SCAN, user_id=current_user.id, dedup_key="all"
     )
+    return DuplicateScanResponse(message="Duplicate scan scheduled", job_id=job.id)
 
 
 @router.get("/{audio_id}", response_model=AudioResponse)
-def get_audio(
+async def get_audio(
     audio_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_read_db),
     current_user=Depends(get_current_user),
 ):
-    return AudioService(db).get_audio(audio_id)
+    return await AudioService(db).get_audio_async(audio_id)
 
 
 @router.get("/{audio_id}/details", response_model=AudioWithDetailsResponse)
-def get_audio_details(
+async def get_audio_details(
+    audio_id: int,
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user=Depends(get_current_user),
+):
+    return await AudioService(db).get_audio_details_async(audio_id)
+
+
+@router.get("/{audio_id}/duplicates", response_model=List[AudioResponse])
+def get_audio_duplicates(
+    audio_id: int,
+    db: Session = Depends(get_read_db),
+    current_user=Depends(get_current_user),
+):
+    """與此音檔 checksum 或指紋相同的其他音檔。"""
+    return DuplicateAudioService(db).get_duplicates(audio_id)
+
+
+@router.get(
+    "/{audio_id}/spectrogram",
+    response_class=Response,
+    responses={200: {"content": {"image/png": {}, "application/octet-stream": {}}}},
+)
+def get_audio_spectrogram(
     audio_id: int,
+    request: Request,
+    start: float = Query(0.0, ge=0, description="Seconds from file start"),
+    end: float = Query(10.0, gt=0, description="Seconds from file start"),
+    fmin: Optional[float] = Query(None, ge=0),
+    fmax: Optional[float] = Query(None, gt=0),
+    nfft: int = Query(1024, ge=64, le=16384),
+    format: Literal["png", "f16"] = "png",
+    db_min: float = -140.0,
+    db_max: float = -40.0,
     db: Session = Depends(get_db),
     current_user=Depends(get_current_user),
 ):
-    return AudioService(db).get_audio_details(audio_id)
+    """
+    取得音檔片段的頻譜圖 tile (PNG 或 little-endian float16)。
+
+    只讀取所需的 byte 範圍；相同參數的 tile 會被快取 (記憶體 + MinIO)，
+    並以內容雜湊作為 ETag。
+    """
+    tile = SpectrogramService(db).get_tile(
+        audio_id,
+        start,
+        end,
+        fmin=fmin,
+        fmax=fmax,
+        nfft=nfft,
+        fmt=format,
+        db_min=db_min,
+        db_max=db_max,
+    )
+    headers = tile.headers()
+    if request.headers.get("if-none-match") == headers["ETag"]:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=tile.content, media_type=tile.media_type, headers=headers)
+
+
+@router.get("/{audio_id}/clip")
+def get_audio_clip(
+    audio_id: int,
+    offset: float = Query(..., ge=0, description="Seconds from file start"),
+    duration: float = Query(..., gt=0, description="Clip length in seconds"),
+    channel: Optional[List[int]] = Query(None, description="0-based channels"),
+    decimate: int = Query(1, ge=1),
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user),
+):
+    """
+    下載音檔片段 (WAV)。
+
+    只讀取片段所需的 byte 範圍並重寫 WAV 檔頭，延遲與片段長度成正比；
+    可用 ``channel`` 挑選聲道、``decimate`` 整數倍降頻。
+    """
+    clip = ClipService(db).get_clip(
+        audio_id, offset, duration, channels=channel, decimate=decimate
+    )
+    return StreamingResponse(clip.body, media_type="audio/wav", headers=clip.headers())
+
+
+@router.post(
+    "/{audio_id}/peaks",
+    response_model=PeaksBuildResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+def build_audio_peaks(
+    audio_id: int,
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user),
+):
+    """排程建立音檔的波形 peak 金字塔 (min / max / RMS sidecar)。"""
+    AudioService(db).get_audio(audio_id)
+    job = JobService(db).enqueue(
+        JOB_PEAKS_BUILD,
+        {"audio_id": audio_id},
+        user_id=current_user.id,
+        dedup_key=str(audio_id),
+    )
+    return PeaksBuildResponse(
+        message="Peak build scheduled", audio_id=audio_id, job_id=job.id
+    )
+
+
+@router.get("/{audio_id}/peaks", response_model=PeaksResponse)
+def get_audio_peaks(
+    audio_id: int,
+    start: float = Query(0.0, ge=0, description="Seconds from file start"),
+    end: Optional[float] = Query(None, gt=0, description="Seconds from file start"),
+    level: Optional[int] = Query(None, ge=0),
+    max_points: int = Query(2000, ge=1, le=20000),
+    format: Literal["json", "i16"] = "json",
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user),
+):
+    """
+    取得波形 peak 資料。
+
+    只讀取 sidecar 中指定層級與範圍的 block。``format=i16`` 回傳
+    int16[n_blocks, channels, 3] (min, max, rms，滿刻度 32767) 二進位資料。
+    """
+    peaks = PeaksService(db).get_peaks(
+        audio_id, start=start, end=end, level=level, max_points=max_points
+    )
+    values = peaks.pop("values")
+    if format == "i16":
+        headers = {f"X-Peaks-{k.replace('_', '-')}": str(v) for k, v in peaks.items()}
+        return Response(
+            content=values.tobytes(),
+            media_type="application/octet-stream",
+            headers=headers,
+        )
+
+    scaled = np.round(values / 32767, 5)
+    peaks["min"] = scaled[:, :, 0].tolist()
+    peaks["max"] = scaled[:, :, 1].tolist()
+    peaks["rms"] = scaled[:, :, 2].tolist()
+    return JSONResponse(content=jsonable_encoder(peaks))
 
 
 @router.post("/", response_model=AudioResponse)
 def create_audio(
     audio: AudioCreate,
+    on_duplicate: Optional[DuplicatePolicy] = None,
     db: Session = Depends(get_db),
     current_user=Depends(get_current_user),
 ):
-    return AudioService(db).create_audio(audio)
+    """
+    登錄音檔。
+
+    帶有 ``checksum`` / ``fingerprint`` 且與既有音檔相同時，依
+    ``on_duplicate`` (預設為設定值) 拒絕 (400) 或以 ``duplicate_of_id``
+    連結到原始音檔。
+    """
+    return AudioService(db).create_audio(audio, on_duplicate)
 
 
 @router.put("/{audio_id}", response_model=AudioResponse)
@@ -116,9 +332,9 @@ def hard_delete_audio(
     """
     永久刪除單一 Audio。
 
-    - 刪除 MinIO 物件
+    - 由背景工作 (回傳的 ``job_id``) 刪除 MinIO 物件
     - 刪除資料庫記錄
-    - 釋放 object_key，可重新使用
+    - outbox 清空後釋放 object_key，可重新使用
 
     需要 Admin 權限。
     """
@@ -127,12 +343,25 @@ def hard_delete_audio(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Admin permission required for permanent deletion",
         )
-    return AudioService(db).hard_delete_audio(audio_id)
+    result = AudioService(db).hard_delete_audio(audio_id)
+    result["job_id"] = schedule_object_deletions(db, current_user.id).id
+    return result
+
+
+def _ensure_keys_released(db: Session, bucket: str, keys: list[str]):
+    """永久刪除後仍在 outbox 等待清除的 key 不可重新上傳，否則會被一併刪除。"""
+    pending = keys_pending_deletion(db, bucket, keys)
+    if pending:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Object keys still being deleted, retry later: {sorted(pending)}",
+        )
 
 
 @router.post("/upload/presigned-url", response_model=PresignedUrlResponse)
 def generate_presigned_url(
     request: PresignedUrlRequest,
+    db: Session = Depends(get_db),
     current_user=Depends(get_current_user),
 ):
     """
@@ -141,6 +370,7 @@ def generate_presigned_url(
     s3_client = get_s3_client()
     bucket_name = request.project_name
     object_name = parse_filename_and_generate_key(request.point_name, request.filename)
+    _ensure_keys_released(db, bucket_name, [object_name])
 
     try:
         url = s3_client.generate_presigned_url(
@@ -159,6 +389,7 @@ def generate_presigned_url(
 @router.post("/upload/presigned-urls", response_model=List[PresignedUrlBatchResponse])
 def generate_presigned_urls(
     request: PresignedUrlBatchRequest,
+    db: Session = Depends(get_db),
     current_user=Depends(get_current_user),
 ):
     """
@@ -166,6 +397,14 @@ def generate_presigned_urls(
     """
     s3_client = get_s3_client()
     bucket_name = request.project_name
+    _ensure_keys_released(
+        db,
+        bucket_name,
+        [
+            parse_filename_and_generate_key(request.point_name, filename)
+            for filename in request.filenames
+        ],
+    )
     responses = []
 
     for filename in request.filenames:
@@ -0,0 +1,129 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+
+from app.core.auth import get_current_user
+from app.db.session import get_db
+from app.models.user import UserRole
+from app.schemas.cold_storage import (
+    ColdRestoreQueueStatus,
+    ColdRestoreRequest,
+    ColdRestoreResponse,
+    ColdStoragePolicy,
+    ColdStoragePreview,
+    ColdStorageRunResponse,
+)
+from app.services.cold_storage_service import (
+    RESTORE_PRIORITY_BATCH,
+    RESTORE_PRIORITY_ON_DEMAND,
+    ColdStorageService,
+)
+from app.services.job_handlers import (
+    JOB_COLD_STORAGE_ARCHIVE,
+    cold_restore_status,
+    schedule_cold_restores,
+)
+from app.services.job_service import JobService
+
+router = APIRouter(prefix="/cold-storage", tags=["cold-storage"])
+
+
+def _require_admin(current_user):
+    if current_user.role != UserRole.ADMIN.value:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin permission required for cold storage tiering",
+        )
+
+
+@router.post("/preview", response_model=ColdStoragePreview)
+def preview_archive(
+    policy: ColdStoragePolicy,
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user),
+):
+    """Dry run：列出符合政策、將被轉存的音檔數量與佔用空間。"""
+    _require_admin(current_user)
+    return ColdStorageService(db).preview(policy)
+
+
+@router.post(
+    "/archive",
+    response_model=ColdStorageRunResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+def archive(
+    policy: ColdStoragePolicy,
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user),
+):
+    """
+    排程依政策把音檔轉存到冷儲存 (Admin)。
+
+    WAV 轉為無損 FLAC 並驗證可還原成相同檔案後才移出熱儲存。
+    """
+    _require_admin(current_user)
+    preview = ColdStorageService(db).preview(policy)
+    job = JobService(db).enqueue(
+        JOB_COLD_STORAGE_ARCHIVE,
+        {"policy": policy.model_dump()},
+        user_id=current_user.id,
+    )
+    return ColdStorageRunResponse(
+        message="Cold storage archive scheduled", job_id=job.id, **preview
+    )
+
+
+@router.post(
+    "/restore",
+    response_model=ColdRestoreResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+def restore_batch(
+    request: ColdRestoreRequest,
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user),
+):
+    """批次還原冷儲存音檔；由 worker 依序限速處理，不在冷儲存的 id 會被略過。"""
+    audio_ids = ColdStorageService(db).cold_audio_ids(request.audio_ids)
+    queued = schedule_cold_restores(
+        db, audio_ids, RESTORE_PRIORITY_BATCH, user_id=current_user.id
+    )
+    return ColdRestoreResponse(
+        message="Restore queued",
+        queued=queued,
+        pending=cold_restore_status(db)["pending"],
+    )
+
+
+@router.post(
+    "/restore/{audio_id}",
+    response_model=ColdRestoreResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+def restore_audio(
+    audio_id: int,
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user),
+):
+    """隨選還原單一音檔，排在所有批次還原之前 (已排隊的批次還原會提前)。"""
+    if not ColdStorageService(db).cold_audio_ids([audio_id]):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Audio not found in cold storage",
+        )
+    queued = schedule_cold_restores(
+        db, [audio_id], RESTORE_PRIORITY_ON_DEMAND, user_id=current_user.id
+    )
+    return ColdRestoreResponse(
+        message="Restore queued",
+        queued=queued,
+        pending=cold_restore_status(db)["pending"],
+    )
+
+
+@router.get("/restore", response_model=ColdRestoreQueueStatus)
+def get_restore_queue(
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user),
+):
+    return ColdRestoreQueueStatus(**cold_restore_status(db))
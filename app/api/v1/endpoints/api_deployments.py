@@ -1,49 +1,80 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+from datetime import datetime
+from typing import List, Literal, Optional
+
+import numpy as np
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import JSONResponse, Response
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.core.auth import get_current_user
-from app.db.session import get_db
+from app.db.session import get_async_read_db, get_db, get_read_db
 from app.models.deployment import DeploymentInfo
 from app.models.user import UserRole
+from app.schemas.acoustic_index import (
+    AcousticIndexParams,
+    AcousticIndexRunResponse,
+    AcousticIndexSeries,
+)
 from app.schemas.deployment import (
     DeploymentCreate,
     DeploymentResponse,
     DeploymentUpdate,
     DeploymentWithDetailsResponse,
 )
+from app.schemas.detector import EnergyDetectorParams, EnergyDetectorRunResponse
+from app.schemas.ltsa import LtsaBuildResponse, LtsaManifest, LtsaWindowResponse
+from app.services.acoustic_index_service import (
+    ACOUSTIC_INDICES,
+    AcousticIndexService,
+)
+from app.services.analysis_run_service import params_hash
 from app.services.deployment_service import DeploymentService
+from app.services.energy_detector_service import ENERGY_DETECTOR
+from app.services.job_handlers import (
+    JOB_ACOUSTIC_INDICES,
+    JOB_DEPLOYMENT_DELETE_AUDIOS,
+    JOB_DEPLOYMENT_RESTORE,
+    JOB_ENERGY_DETECTOR,
+    JOB_LTSA_BUILD,
+    schedule_object_deletions,
+)
+from app.services.job_service import JobService
+from app.services.ltsa_service import LtsaService
 
 router = APIRouter(prefix="/deployments", tags=["deployments"])
 
 
 @router.get("/", response_model=List[DeploymentResponse])
-def get_deployments(
+async def get_deployments(
     point_id: int,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_read_db),
     current_user=Depends(get_current_user),
 ):
-    return DeploymentService(db).get_deployments(point_id, skip=skip, limit=limit)
+    return await DeploymentService(db).get_deployments_async(
+        point_id, skip=skip, limit=limit
+    )
 
 
 @router.get("/{deployment_id}", response_model=DeploymentResponse)
-def get_deployment(
+async def get_deployment(
     deployment_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_read_db),
     current_user=Depends(get_current_user),
 ):
-    return DeploymentService(db).get_deployment(deployment_id)
+    return await DeploymentService(db).get_deployment_async(deployment_id)
 
 
 @router.get("/{deployment_id}/details", response_model=DeploymentWithDetailsResponse)
-def get_deployment_details(
+async def get_deployment_details(
     deployment_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_read_db),
     current_user=Depends(get_current_user),
 ):
-    return DeploymentService(db).get_deployment_details(deployment_id)
+    return await DeploymentService(db).get_deployment_details_async(deployment_id)
 
 
 @router.post("/", response_model=DeploymentResponse)
@@ -68,15 +99,38 @@ def update_deployment(
 @router.delete("/{deployment_id}", response_model=DeploymentResponse)
 def delete_deployment(
     deployment_id: int,
+    response: Response,
     db: Session = Depends(get_db),
     current_user=Depends(get_current_user),
 ):
-    return DeploymentService(db).delete_deployment(deployment_id, current_user.id)
+    """
+    軟刪除 Deployment。
+
+    底下的 Audio 由背景工作分批標記刪除，進度可由 ``X-Job-Id`` 標頭所指的
+    ``/jobs/{id}`` 查詢。
+    """
+    deployment = DeploymentService(db).delete_deployment(deployment_id, current_user.id)
+    job = JobService(db).enqueue(
+        JOB_DEPLOYMENT_DELETE_AUDIOS,
+        {
+            "deployment_id": deployment_id,
+            "user_id": current_user.id,
+            "deleted_at": deployment.deleted_at.isoformat(),
+            "deletion_batch_id": deployment.deletion_batch_id,
+        },
+        user_id=current_user.id,
+        commit=False,
+    )
+    # 軟刪除與 cascade 工作一起提交，中途當機不會留下沒有工作接手的刪除
+    db.commit()
+    response.headers["X-Job-Id"] = str(job.id)
+    return deployment
 
 
 @router.post("/{deployment_id}/restore", response_model=DeploymentResponse)
 def restore_deployment(
     deployment_id: int,
+    response: Response,
     db: Session = Depends(get_db),
     current_user=Depends(get_current_user),
 ):
@@ -96,7 +150,21 @@ def restore_deployment(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Only the deleter or admin can restore this resource",
         )
-    return DeploymentService(db).restore_deployment(deployment_id)
+    deployment = DeploymentService(db).validate_restore(deployment_id)
+    if not deployment.is_deleted:
+        return deployment
+    # 底下的資料由背景工作分批還原，最後才還原本身；進度見 X-Job-Id 所指的工作
+    job = JobService(db).enqueue(
+        JOB_DEPLOYMENT_RESTORE,
+        {
+            "deployment_id": deployment_id,
+            "deletion_batch_id": deployment.deletion_batch_id,
+        },
+        user_id=current_user.id,
+        dedup_key=str(deployment_id),
+    )
+    response.headers["X-Job-Id"] = str(job.id)
+    return deployment
 
 
 @router.delete("/{deployment_id}/permanent", response_model=dict)
@@ -108,7 +176,7 @@ def hard_delete_deployment(
     """
     永久刪除 Deployment 及所有相關資料。
 
-    - 刪除 MinIO 中該 Deployment 下的所有物件
+    - 由背景工作 (回傳的 ``job_id``) 刪除 MinIO 中該 Deployment 下的所有物件
     - 刪除資料庫中的所有相關記錄
     - 釋放 phase，可重新使用
 
@@ -119,4 +187,166 @@ def hard_delete_deployment(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Admin permission required for permanent deletion",
         )
-    return DeploymentService(db).hard_delete_deployment(deployment_id)
+    result = DeploymentService(db).hard_delete_deployment(deployment_id)
+    result["job_id"] = schedule_object_deletions(db, current_user.id).id
+    return result
+
+
+@router.post(
+    "/{deployment_id}/ltsa",
+    response_model=LtsaBuildResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+def build_ltsa(
+    deployment_id: int,
+    bin_seconds: float = Query(60.0, gt=0, le=3600),
+    nfft: int = Query(2048, ge=64, le=65536),
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user),
+):
+    """
+    排程重新計算 Deployment 的 LTSA (Long-term spectral average)。
+
+    依 record_time 順序串流讀取所有音檔一次，完成後覆寫舊的 LTSA。
+    """
+    DeploymentService(db).get_deployment(deployment_id)
+    job = JobService(db).enqueue(
+        JOB_LTSA_BUILD,
+        {"deployment_id": deployment_id, "bin_seconds": bin_seconds, "nfft": nfft},
+        user_id=current_user.id,
+        dedup_key=f"{deployment_id}:{bin_seconds}:{nfft}",
+    )
+    return LtsaBuildResponse(
+        message="LTSA build scheduled", deployment_id=deployment_id, job_id=job.id
+    )
+
+
+@router.post(
+    "/{deployment_id}/energy-detector",
+    response_model=EnergyDetectorRunResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+def run_energy_detector(
+    deployment_id: int,
+    params: EnergyDetectorParams,
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user),
+):
+    """
+    排程對 Deployment 內所有音檔執行頻帶能量偵測。
+
+    結果寫入偵測紀錄 (method = model-detect)；相同參數重跑時會跳過已處理的檔案。
+    """
+    DeploymentService(db).get_deployment(deployment_id)
+    digest = params_hash(ENERGY_DETECTOR, params.model_dump())
+    job = JobService(db).enqueue(
+        JOB_ENERGY_DETECTOR,
+        {"deployment_id": deployment_id, "params": params.model_dump()},
+        user_id=current_user.id,
+        dedup_key=f"{deployment_id}:{digest}",
+    )
+    return EnergyDetectorRunResponse(
+        message="Energy detector scheduled",
+        deployment_id=deployment_id,
+        params_hash=digest,
+        job_id=job.id,
+    )
+
+
+@router.post(
+    "/{deployment_id}/acoustic-indices",
+    response_model=AcousticIndexRunResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+def run_acoustic_indices(
+    deployment_id: int,
+    params: AcousticIndexParams = AcousticIndexParams(),
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user),
+):
+    """
+    排程計算 Deployment 內所有音檔每分鐘的聲景指數 (ACI / ADI / H / NDSI / SPL)。
+
+    相同參數重跑時會跳過已處理的檔案；SPL 以 Deployment 的 sensitivity / gain 校正。
+    """
+    DeploymentService(db).get_deployment(deployment_id)
+    job = JobService(db).enqueue(
+        JOB_ACOUSTIC_INDICES,
+        {"deployment_id": deployment_id, "params": params.model_dump()},
+        user_id=current_user.id,
+        dedup_key=(
+            f"{deployment_id}:{params_hash(ACOUSTIC_INDICES, params.model_dump())}"
+        ),
+    )
+    return AcousticIndexRunResponse(
+        message="Acoustic index computation scheduled",
+        deployment_id=deployment_id,
+        job_id=job.id,
+    )
+
+
+@router.get("/{deployment_id}/acoustic-indices", response_model=AcousticIndexSeries)
+def get_acoustic_indices(
+    deployment_id: int,
+    start: datetime,
+    end: datetime,
+    db: Session = Depends(get_read_db),
+    current_user=Depends(get_current_user),
+):
+    return AcousticIndexService(db).get_indices(deployment_id, start, end)
+
+
+@router.get("/{deployment_id}/ltsa/manifest", response_model=LtsaManifest)
+def get_ltsa_manifest(
+    deployment_id: int,
+    db: Session = Depends(get_read_db),
+    current_user=Depends(get_current_user),
+):
+    return LtsaService(db).get_manifest(deployment_id)
+
+
+@router.get("/{deployment_id}/ltsa", response_model=LtsaWindowResponse)
+def get_ltsa_window(
+    deployment_id: int,
+    start: datetime,
+    end: datetime,
+    fmin: Optional[float] = Query(None, ge=0),
+    fmax: Optional[float] = Query(None, gt=0),
+    level: Optional[int] = Query(None, ge=0),
+    max_bins: int = Query(1024, ge=1, le=4096),
+    format: Literal["json", "f16"] = "json",
+    db: Session = Depends(get_read_db),
+    current_user=Depends(get_current_user),
+):
+    """
+    取得 LTSA 的時間 / 頻率視窗。
+
+    未指定 level 時自動選擇不超過 max_bins 的最細層級。
+    前端檢視器建議使用 ``format=f16`` 取得二進位資料。
+    """
+    window = LtsaService(db).get_window(
+        deployment_id,
+        start,
+        end,
+        fmin=fmin,
+        fmax=fmax,
+        level=level,
+        max_bins=max_bins,
+    )
+    data = window.pop("data")
+    if format == "f16":
+        headers = {
+            f"X-LTSA-{k.replace('_', '-')}": str(v)
+            for k, v in jsonable_encoder(window).items()
+            if v is not None
+        }
+        return Response(
+            content=data.astype("<f2").tobytes(),
+            media_type="application/octet-stream",
+            headers=headers,
+        )
+
+    values = np.round(data.astype(np.float64), 2).astype(object)
+    values[np.isnan(data)] = None
+    window["data"] = values.tolist()
+    return JSONResponse(content=jsonable_encoder(window))
@@ -0,0 +1,160 @@
+import io
+from datetime import date, datetime
+from typing import List, Literal, Optional
+
+from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile, status
+from sqlalchemy.orm import Session
+
+from app.core.auth import get_current_user
+from app.db.session import get_db, get_read_db
+from app.enums.enums import CetaceanCallType, CetaceanSpecies, DetectionMethod
+from app.models.user import UserRole
+from app.schemas.detection import (
+    DetectionBulkResponse,
+    DetectionCountResponse,
+    DetectionCreate,
+    DetectionHeatmapResponse,
+    DetectionResponse,
+)
+from app.services.detection_service import DetectionService
+from app.utils.time_utils import as_aware
+
+router = APIRouter(prefix="/detections", tags=["detections"])
+
+
+@router.get("/", response_model=List[DetectionResponse])
+def get_detections(
+    deployment_id: int,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    species: Optional[CetaceanSpecies] = None,
+    call_type: Optional[CetaceanCallType] = None,
+    method: Optional[DetectionMethod] = None,
+    skip: int = 0,
+    limit: int = Query(100, le=10000),
+    db: Session = Depends(get_read_db),
+    current_user=Depends(get_current_user),
+):
+    """依 deployment、時間範圍 (起始時間落在 [start, end))、物種與叫聲類型查詢。"""
+    return DetectionService(db).get_detections(
+        deployment_id,
+        start=as_aware(start),
+        end=as_aware(end),
+        species=species,
+        call_type=call_type,
+        method=method,
+        skip=skip,
+        limit=limit,
+    )
+
+
+@router.get("/counts", response_model=DetectionCountResponse)
+def count_detections(
+    deployment_id: int,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    interval: Literal["hour", "day"] = "hour",
+    species: Optional[CetaceanSpecies] = None,
+    call_type: Optional[CetaceanCallType] = None,
+    group_by: Optional[Literal["species", "call_type"]] = None,
+    db: Session = Depends(get_read_db),
+    current_user=Depends(get_current_user),
+):
+    """每小時 / 每日偵測數量 (由資料庫分組統計，時間以 UTC+8 分桶)。"""
+    counts = DetectionService(db).count_detections(
+        deployment_id,
+        start=as_aware(start),
+        end=as_aware(end),
+        interval=interval,
+        species=species,
+        call_type=call_type,
+        group_by=group_by,
+    )
+    return DetectionCountResponse(
+        deployment_id=deployment_id, interval=interval, counts=counts
+    )
+
+
+@router.get("/heatmap", response_model=DetectionHeatmapResponse)
+def get_detection_heatmap(
+    point_id: int,
+    start_date: date,
+    end_date: date,
+    species: Optional[CetaceanSpecies] = None,
+    call_type: Optional[CetaceanCallType] = None,
+    method: Optional[DetectionMethod] = None,
+    db: Session = Depends(get_read_db),
+    current_user=Depends(get_current_user),
+):
+    """
+    Point 的偵測熱圖 (日期 x 小時)，依實際錄音涵蓋時間正規化。
+
+    日期區間含頭尾，以 UTC+8 分日；結果依查詢參數快取，偵測或音檔異動時失效。
+    """
+    return DetectionService(db).get_heatmap(
+        point_id,
+        start_date,
+        end_date,
+        species=species,
+        call_type=call_type,
+        method=method,
+    )
+
+
+@router.get("/{detection_id}", response_model=DetectionResponse)
+def get_detection(
+    detection_id: int,
+    db: Session = Depends(get_read_db),
+    current_user=Depends(get_current_user),
+):
+    return DetectionService(db).get_detection(detection_id)
+
+
+@router.post("/", response_model=DetectionResponse)
+def create_detection(
+    detection: DetectionCreate,
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user),
+):
+    return DetectionService(db).create_detection(detection, current_user.id)
+
+
+@router.post("/bulk", response_model=DetectionBulkResponse)
+def bulk_ingest_detections(
+    deployment_id: int,
+    file: UploadFile = File(...),
+    method: DetectionMethod = DetectionMethod.MODEL,
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user),
+):
+    """
+    批次匯入偵測器輸出 (CSV)。
+
+    欄位：``start_time``、``end_time`` (必填)，``audio_id``、``freq_min``、
+    ``freq_max``、``species``、``call_type``、``confidence`` (選填)。
+    以 PostgreSQL COPY 寫入，整份檔案為單一交易。
+    """
+    stream = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    inserted = DetectionService(db).bulk_ingest(
+        deployment_id, stream, method=method.value, user_id=current_user.id
+    )
+    return DetectionBulkResponse(deployment_id=deployment_id, inserted=inserted)
+
+
+@router.delete("/{detection_id}")
+def delete_detection(
+    detection_id: int,
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user),
+):
+    """刪除偵測紀錄，僅限建立者或 Admin。"""
+    detection = DetectionService(db).get_detection(detection_id)
+    if (
+        current_user.role != UserRole.ADMIN.value
+        and current_user.id != detection.created_by
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only the creator or admin can delete this detection",
+        )
+    return DetectionService(db).delete_detection(detection_id)
@@ -0,0 +1,62 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+
+from app.core.auth import get_current_user
+from app.db.session import get_db
+from app.enums.enums import JobStatus
+from app.models.user import UserRole
+from app.schemas.job import JobResponse
+from app.services.job_service import JobService
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+
+def _get_visible_job(db: Session, job_id: int, current_user):
+    job = JobService(db).get_job(job_id)
+    # 一般使用者只能看到自己建立的工作；不透露其他工作是否存在
+    if current_user.role != UserRole.ADMIN.value and job.created_by != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Job not found"
+        )
+    return job
+
+
+@router.get("/", response_model=list[JobResponse])
+def get_jobs(
+    job_status: JobStatus | None = Query(None, alias="status"),
+    job_type: str | None = None,
+    skip: int = 0,
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user),
+):
+    """列出背景工作 (新到舊)；Admin 可看到所有人的工作。"""
+    user_id = None if current_user.role == UserRole.ADMIN.value else current_user.id
+    return JobService(db).get_jobs(
+        user_id=user_id,
+        job_status=job_status,
+        job_type=job_type,
+        skip=skip,
+        limit=limit,
+    )
+
+
+@router.get("/{job_id}", response_model=JobResponse)
+def get_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user),
+):
+    """查詢背景工作的狀態、進度 (``progress_current / progress_total``) 與結果。"""
+    return _get_visible_job(db, job_id, current_user)
+
+
+@router.post("/{job_id}/cancel", response_model=JobResponse)
+def cancel_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user),
+):
+    """取消工作；執行中的工作會在下一次回報進度時停止。串聯刪除/還原工作不可取消。"""
+    _get_visible_job(db, job_id, current_user)
+    return JobService(db).cancel_job(job_id)
@@ -0,0 +1,36 @@
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import PlainTextResponse
+
+from app.core.auth import get_current_user
+from app.db.pool import render_prometheus
+from app.db.session import pool_stats
+from app.models.user import UserRole
+from app.schemas.metrics import PoolStats
+
+router = APIRouter(prefix="/metrics", tags=["metrics"])
+
+
+@router.get("/db-pool", response_model=list[PoolStats])
+def get_db_pool_metrics(
+    format: Literal["json", "prometheus"] = "json",
+    current_user=Depends(get_current_user),
+):
+    """
+    本程序資料庫連線池的使用量與 checkout 等待時間 (Admin)。
+
+    ``saturation`` 為借出連線數 / (pool_size + max_overflow)；``timeouts``
+    為等待超過 ``db_pool_timeout`` 而失敗的次數。每個 uvicorn worker 各自統計。
+    """
+    if current_user.role != UserRole.ADMIN.value:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin permission required for metrics",
+        )
+    stats = pool_stats()
+    if format == "prometheus":
+        return PlainTextResponse(
+            render_prometheus(stats), media_type="text/plain; version=0.0.4"
+        )
+    return stats
@@ -0,0 +1,67 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+
+from app.core.auth import get_current_user
+from app.core.config import settings
+from app.db.session import get_db
+from app.models.user import UserRole
+from app.schemas.partition import (
+    AudioPartition,
+    AudioPartitionArchive,
+    AudioPartitionChange,
+)
+from app.services.partition_service import AudioPartitionService
+
+router = APIRouter(prefix="/partitions", tags=["partitions"])
+
+
+def _require_admin(current_user):
+    if current_user.role != UserRole.ADMIN.value:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin permission required for partition maintenance",
+        )
+
+
+@router.get("/audio", response_model=list[AudioPartition])
+def get_audio_partitions(
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user),
+):
+    """audio_info 的分區、範圍與大小 (Admin)。"""
+    _require_admin(current_user)
+    return AudioPartitionService(db).list_partitions()
+
+
+@router.post("/audio/ensure", response_model=AudioPartitionChange)
+def ensure_audio_partitions(
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user),
+):
+    """
+    立即建立目前與未來的分區 (Admin)。
+
+    worker 也會依 ``audio_partition_check_hours`` 定期自動執行。
+    """
+    _require_admin(current_user)
+    created = AudioPartitionService(db).ensure_partitions()
+    return AudioPartitionChange(message="Partitions created", partitions=created)
+
+
+@router.post("/audio/archive", response_model=AudioPartitionChange)
+def archive_audio_partitions(
+    archive: AudioPartitionArchive,
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user),
+):
+    """
+    Detach 舊分區並移到封存 schema (Admin)。
+
+    封存的音檔不再出現在 API 中；以 pg_dump 備份封存的表後即可 DROP。
+    """
+    _require_admin(current_user)
+    archived = AudioPartitionService(db).archive_partitions(archive.before)
+    return AudioPartitionChange(
+        message=f"Partitions moved to schema {settings.audio_archive_schema}",
+        partitions=archived,
+    )
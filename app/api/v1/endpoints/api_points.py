@@ -1,9 +1,10 @@
 from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.core.auth import get_current_user
-from app.db.session import get_db
+from app.db.session import get_async_read_db, get_db
 from app.models.point import PointInfo
 from app.models.user import UserRole
 from app.schemas.point import (
@@ -12,41 +13,47 @@ from app.schemas.point import (
     PointUpdate,
     PointWithProjectResponse,
 )
+from app.services.job_handlers import (
+    JOB_POINT_DELETE_AUDIOS,
+    JOB_POINT_RESTORE,
+    schedule_object_deletions,
+)
+from app.services.job_service import JobService
 from app.services.point_service import PointService
 
 router = APIRouter(prefix="/points", tags=["points"])
 
 
 @router.get("/", response_model=List[PointResponse])
-def get_points(
+async def get_points(
     project_id: int,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_read_db),
     current_user=Depends(get_current_user),
 ):
-    return PointService(db).get_points(project_id, skip=skip, limit=limit)
+    return await PointService(db).get_points_async(project_id, skip=skip, limit=limit)
 
 
 @router.get("/{point_id}", response_model=PointResponse)
-def get_point(
+async def get_point(
     point_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_read_db),
     current_user=Depends(get_current_user),
 ):
-    return PointService(db).get_point(point_id)
+    return await PointService(db).get_point_async(point_id)
 
 
 @router.get("/{point_id}/details", response_model=PointWithProjectResponse)
-def get_point_details(
+async def get_point_details(
     point_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_read_db),
     current_user=Depends(get_current_user),
 ):
     """
     Get a single point with its associated project details.
     """
-    return PointService(db).get_point_details(point_id)
+    return await PointService(db).get_point_details_async(point_id)
 
 
 @router.post("/", response_model=PointResponse)
@@ -71,15 +78,38 @@ def update_point(
 @router.delete("/{point_id}", response_model=PointResponse)
 def delete_point(
     point_id: int,
+    response: Response,
     db: Session = Depends(get_db),
     current_user=Depends(get_current_user),
 ):
-    return PointService(db).delete_point(point_id, current_user.id)
+    """
+    軟刪除 Point 與其 Deployment。
+
+    底下的 Audio 由背景工作分批標記刪除，進度可由 ``X-Job-Id`` 標頭所指的
+    ``/jobs/{id}`` 查詢。
+    """
+    point = PointService(db).delete_point(point_id, current_user.id)
+    job = JobService(db).enqueue(
+        JOB_POINT_DELETE_AUDIOS,
+        {
+            "point_id": point_id,
+            "user_id": current_user.id,
+            "deleted_at": point.deleted_at.isoformat(),
+            "deletion_batch_id": point.deletion_batch_id,
+        },
+        user_id=current_user.id,
+        commit=False,
+    )
+    # 軟刪除與 cascade 工作一起提交，中途當機不會留下沒有工作接手的刪除
+    db.commit()
+    response.headers["X-Job-Id"] = str(job.id)
+    return point
 
 
 @router.post("/{point_id}/restore", response_model=PointResponse)
 def restore_point(
     point_id: int,
+    response: Response,
     db: Session = Depends(get_db),
     current_user=Depends(get_current_user),
 ):
@@ -97,7 +127,18 @@ def restore_point(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Only the deleter or admin can restore this resource",
         )
-    return PointService(db).restore_point(point_id)
+    point = PointService(db).validate_restore(point_id)
+    if not point.is_deleted:
+        return point
+    # 底下的資料由背景工作分批還原，最後才還原本身；進度見 X-Job-Id 所指的工作
+    job = JobService(db).enqueue(
+        JOB_POINT_RESTORE,
+        {"point_id": point_id, "deletion_batch_id": point.deletion_batch_id},
+        user_id=current_user.id,
+        dedup_key=str(point_id),
+    )
+    response.headers["X-Job-Id"] = str(job.id)
+    return point
 
 
 @router.delete("/{point_id}/permanent", response_model=dict)
@@ -109,7 +150,7 @@ def hard_delete_point(
     """
     永久刪除 Point 及所有相關資料。
 
-    - 刪除 MinIO 中該 Point 下的所有物件
+    - 由背景工作 (回傳的 ``job_id``) 刪除 MinIO 中該 Point 下的所有物件
     - 刪除資料庫中的所有相關記錄
     - 釋放名稱，可重新使用
 
@@ -120,4 +161,6 @@ def hard_delete_point(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Admin permission required for permanent deletion",
         )
-    return PointService(db).hard_delete_point(point_id)
+    result = PointService(db).hard_delete_point(point_id)
+    result["job_id"] = schedule_object_deletions(db, current_user.id).id
+    return result
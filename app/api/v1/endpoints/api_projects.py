@@ -1,36 +1,42 @@
-from datetime import datetime
 from typing import List
 
-from fastapi import APIRouter, Depends, BackgroundTasks, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.core.auth import get_current_user
-from app.db.session import get_db, SessionLocal
+from app.db.session import get_async_read_db, get_db
 from app.models.project import ProjectInfo
 from app.models.user import UserRole
 from app.schemas.project import ProjectCreate, ProjectResponse, ProjectUpdate
+from app.services.job_handlers import (
+    JOB_PROJECT_DELETE_AUDIOS,
+    JOB_PROJECT_RESTORE,
+    schedule_object_deletions,
+)
+from app.services.job_service import JobService
 from app.services.project_service import ProjectService
 
 router = APIRouter(prefix="/projects", tags=["projects"])
 
 
 @router.get("/", response_model=List[ProjectResponse])
-def get_projects(
+async def get_projects(
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_read_db),
     current_user=Depends(get_current_user),
 ):
-    return ProjectService(db).get_projects(skip=skip, limit=limit)
+    return await ProjectService(db).get_projects_async(skip=skip, limit=limit)
 
 
 @router.get("/{project_id}", response_model=ProjectResponse)
-def get_project(
+async def get_project(
     project_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_read_db),
     current_user=Depends(get_current_user),
 ):
-    return ProjectService(db).get_project(project_id)
+    return await ProjectService(db).get_project_async(project_id)
 
 
 @router.post("/", response_model=ProjectResponse)
@@ -52,36 +58,41 @@ def update_project(
     return ProjectService(db).update_project(project_id, project)
 
 
-def background_delete_project_audios(
-    project_id: int, user_id: int, deleted_at: datetime
-):
-    db = SessionLocal()
-    try:
-        ProjectService(db).delete_project_audios(project_id, user_id, deleted_at)
-    finally:
-        db.close()
-
-
 @router.delete("/{project_id}", response_model=ProjectResponse)
 def delete_project(
     project_id: int,
-    background_tasks: BackgroundTasks,
+    response: Response,
     db: Session = Depends(get_db),
     current_user=Depends(get_current_user),
 ):
+    """
+    軟刪除 Project。
+
+    底下的 Audio 由背景工作標記刪除，進度可由 ``X-Job-Id`` 標頭所指的
+    ``/jobs/{id}`` 查詢。
+    """
     project = ProjectService(db).delete_project(project_id, current_user.id)
-    background_tasks.add_task(
-        background_delete_project_audios,
-        project_id,
-        current_user.id,
-        project.deleted_at,
+    job = JobService(db).enqueue(
+        JOB_PROJECT_DELETE_AUDIOS,
+        {
+            "project_id": project_id,
+            "user_id": current_user.id,
+            "deleted_at": project.deleted_at.isoformat(),
+            "deletion_batch_id": project.deletion_batch_id,
+        },
+        user_id=current_user.id,
+        commit=False,
     )
+    # 軟刪除與 cascade 工作一起提交，中途當機不會留下沒有工作接手的刪除
+    db.commit()
+    response.headers["X-Job-Id"] = str(job.id)
     return project
 
 
 @router.post("/{project_id}/restore", response_model=ProjectResponse)
 def restore_project(
     project_id: int,
+    response: Response,
     db: Session = Depends(get_db),
     current_user=Depends(get_current_user),
 ):
@@ -99,7 +110,18 @@ def restore_project(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Only the deleter or admin can restore this resource",
         )
-    return ProjectService(db).restore_project(project_id)
+    project = ProjectService(db).validate_restore(project_id)
+    if not project.is_deleted:
+        return project
+    # 底下的資料由背景工作分批還原，最後才還原本身；進度見 X-Job-Id 所指的工作
+    job = JobService(db).enqueue(
+        JOB_PROJECT_RESTORE,
+        {"project_id": project_id, "deletion_batch_id": project.deletion_batch_id},
+        user_id=current_user.id,
+        dedup_key=str(project_id),
+    )
+    response.headers["X-Job-Id"] = str(job.id)
+    return project
 
 
 @router.delete("/{project_id}/permanent", response_model=dict)
@@ -111,9 +133,9 @@ def hard_delete_project(
     """
     永久刪除 Project 及所有相關資料。
 
-    - 刪除 MinIO Bucket 和所有物件
+    - 由背景工作 (回傳的 ``job_id``) 刪除 MinIO Bucket 和所有物件
     - 刪除資料庫中的所有相關記錄
-    - 釋放名稱，可重新使用
+    - outbox 清空後釋放名稱，可重新使用
 
     需要 Admin 權限。
     """
@@ -122,4 +144,6 @@ def hard_delete_project(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Admin permission required for permanent deletion",
         )
-    return ProjectService(db).hard_delete_project(project_id)
+    result = ProjectService(db).hard_delete_project(project_id)
+    result["job_id"] = schedule_object_deletions(db, current_user.id).id
+    return result
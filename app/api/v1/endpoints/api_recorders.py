@@ -3,7 +3,7 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 
 from app.core.auth import get_current_user
-from app.db.session import get_db
+from app.db.session import get_db, get_read_db
 from app.models.recorder import RecorderInfo
 from app.models.user import UserRole
 from app.schemas.recorder import RecorderCreate, RecorderResponse, RecorderUpdate
@@ -15,7 +15,7 @@ router = APIRouter(prefix="/recorders", tags=["recorders"])
 @router.get("/{recorder_id}", response_model=RecorderResponse)
 def get_recorder(
     recorder_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user=Depends(get_current_user),
 ):
     return RecorderService(db).get_recorder(recorder_id)
@@ -25,7 +25,7 @@ def get_recorder(
 def get_recorders(
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user=Depends(get_current_user),
 ):
     return RecorderService(db).get_recorders(skip=skip, limit=limit)
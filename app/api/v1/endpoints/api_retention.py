@@ -0,0 +1,63 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+
+from app.core.auth import get_current_user
+from app.db.session import get_db
+from app.models.user import UserRole
+from app.schemas.retention import (
+    RetentionPolicy,
+    RetentionPreview,
+    RetentionRunResponse,
+)
+from app.services.job_handlers import JOB_RETENTION_PURGE
+from app.services.job_service import JobService
+from app.services.retention_service import RetentionService
+
+router = APIRouter(prefix="/retention", tags=["retention"])
+
+
+def _require_admin(current_user):
+    if current_user.role != UserRole.ADMIN.value:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin permission required for retention purge",
+        )
+
+
+@router.post("/preview", response_model=RetentionPreview)
+def preview_purge(
+    policy: RetentionPolicy,
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user),
+):
+    """Dry run：列出將被永久刪除的資料筆數與可回收的儲存空間。"""
+    _require_admin(current_user)
+    return RetentionService(db, policy.retention_days).report()
+
+
+@router.post(
+    "/purge",
+    response_model=RetentionRunResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+def purge(
+    policy: RetentionPolicy,
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user),
+):
+    """
+    立即排程永久刪除超過保留期限的軟刪除資料 (Admin)。
+
+    worker 也會依 ``retention_purge_interval_hours`` 定期自動執行。
+    """
+    _require_admin(current_user)
+    report = RetentionService(db, policy.retention_days).report()
+    job = JobService(db).enqueue(
+        JOB_RETENTION_PURGE,
+        policy.model_dump(),
+        user_id=current_user.id,
+        dedup_key="manual",
+    )
+    return RetentionRunResponse(
+        message="Retention purge scheduled", job_id=job.id, **report
+    )
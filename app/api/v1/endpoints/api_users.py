@@ -4,7 +4,7 @@ from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 
 from app.core.auth import get_current_user
-from app.core.security import create_access_token
+from app.core.security import create_access_token, user_claims
 from app.db.session import get_db
 from app.enums.enums import UserRole
 from app.schemas.oauth import (
@@ -39,7 +39,7 @@ def login(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
         )
-    token = create_access_token({"sub": user.email})
+    token = create_access_token(user_claims(user))
     return {"access_token": token, "token_type": "bearer"}
 
 
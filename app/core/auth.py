@@ -1,15 +1,203 @@
+import logging
+import select as selectors
+import threading
+import time
+
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
-from sqlalchemy.orm import Session
+from sqlalchemy import event, func, inspect
+from sqlalchemy import select as sql_select
+from sqlalchemy.orm import Session, make_transient_to_detached
 
 from app.core.config import settings
-from app.db.session import get_db
+from app.db.lookups import user_by_email
+from app.db.session import SessionLocal, engine, get_db
 from app.models.user import UserInfo
 from app.enums.enums import UserRole
+from app.utils.cache import LRUCache
+
+logger = logging.getLogger(__name__)
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.api_prefix}/users/login")
 
+# 以 token subject (email) 為鍵、程序內的已驗證使用者快取，命中時不查資料庫。
+# 使用者資料變更時由 invalidate_principal 清除本程序的快取，並在同一交易中
+# NOTIFY PRINCIPAL_CHANNEL，其他程序的 PrincipalListener 收到後立即清除；
+# listener 斷線期間不使用快取與 role claim，一律查資料庫
+principal_cache = LRUCache(
+    maxsize=settings.auth_principal_cache_size,
+    ttl=settings.auth_principal_cache_ttl or None,
+)
+# 密碼與重設 token 不放進快取，需要時才由資料庫載入
+UNCACHED_COLUMNS = frozenset({"password_hash", "reset_token", "reset_token_expires_at"})
+# invalidate_principal 的時間；在此之前簽發的 token 不再信任其 role claim
+_revoked_at = LRUCache(
+    maxsize=settings.auth_principal_cache_size,
+    ttl=settings.access_token_expire_minutes * 60,
+)
+
+
+def invalidate_principal(*emails: str | None) -> None:
+    """使用者的帳號狀態、角色、密碼或 OAuth 連結變更後呼叫。"""
+    now = time.time()
+    for email in emails:
+        if email:
+            principal_cache.invalidate(email)
+            _revoked_at.set(email, now)
+
+
+def clear_principals() -> None:
+    principal_cache.clear()
+    _revoked_at.clear()
+
+
+PRINCIPAL_CHANNEL = "auth_principal"
+# 影響驗證結果的欄位；只更新 last_login_at 等其他欄位時不廣播
+AUTH_COLUMNS = (
+    "email",
+    "role",
+    "is_active",
+    "is_deleted",
+    "password_hash",
+    "oauth_provider",
+    "oauth_sub",
+)
+
+
+def _changed_emails(user: UserInfo) -> set[str]:
+    state = inspect(user)
+    if not any(state.attrs[key].history.has_changes() for key in AUTH_COLUMNS):
+        return set()
+    email = state.attrs.email.history
+    return {*email.deleted, *email.unchanged, *email.added} - {None}
+
+
+@event.listens_for(SessionLocal, "after_flush")
+def _broadcast_changes(session, flush_context):
+    # pg_notify 隨交易提交才送出，rollback 時不會誤清其他程序的快取
+    emails = {obj.email for obj in session.deleted if isinstance(obj, UserInfo)}
+    for obj in session.dirty:
+        if isinstance(obj, UserInfo):
+            emails |= _changed_emails(obj)
+    for email in sorted(emails):
+        session.execute(sql_select(func.pg_notify(PRINCIPAL_CHANNEL, email)))
+
+
+class PrincipalListener:
+    """
+    Background thread that ``LISTEN``s on :data:`PRINCIPAL_CHANNEL`.
+
+    Every notification invalidates that principal in this process. While
+    the connection is down notifications may be lost, so ``connected`` is
+    False and :func:`get_current_user` bypasses the cache; after
+    reconnecting the cache is emptied before it is trusted again.
+    """
+
+    def __init__(self, poll_seconds: float = 5.0, retry_seconds: float = 5.0):
+        self.poll_seconds = poll_seconds
+        self.retry_seconds = retry_seconds
+        self.connected = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="principal-listener", daemon=True
+        )
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join(timeout=self.poll_seconds + 1)
+
+    def _connect(self):
+        # 獨立於連線池的長連線
+        cargs, cparams = engine.dialect.create_connect_args(engine.url)
+        connection = engine.dialect.connect(*cargs, **cparams)
+        connection.autocommit = True
+        connection.cursor().execute(f"LISTEN {PRINCIPAL_CHANNEL}")
+        return connection
+
+    def _listen(self, connection) -> None:
+        principal_cache.clear()
+        self.connected = True
+        while not self._stop.is_set():
+            if not selectors.select([connection], [], [], self.poll_seconds)[0]:
+                continue
+            connection.poll()
+            while connection.notifies:
+                email = connection.notifies.pop(0).payload
+                principal_cache.invalidate(email)
+                _revoked_at.set(email, time.time())
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            connection = None
+            try:
+                connection = self._connect()
+                self._listen(connection)
+            except Exception:
+                logger.warning("Principal invalidation listener lost", exc_info=True)
+            finally:
+                self.connected = False
+                if connection is not None:
+                    connection.close()
+            self._stop.wait(self.retry_seconds)
+
+
+_listener: PrincipalListener | None = None
+
+
+def start_principal_listener() -> None:
+    global _listener
+    if _listener is None and settings.auth_principal_listen:
+        _listener = PrincipalListener()
+        _listener.start()
+
+
+def stop_principal_listener() -> None:
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def _cache_trusted() -> bool:
+    """沒有啟動 listener (例如測試或停用廣播) 時僅依 TTL；否則需訂閱中。"""
+    return _listener is None or _listener.connected
+
+
+def _snapshot(user: UserInfo) -> dict:
+    return {
+        column.key: getattr(user, column.key)
+        for column in UserInfo.__table__.columns
+        if column.key not in UNCACHED_COLUMNS
+    }
+
+
+def _claims_principal(payload: dict) -> dict | None:
+    """由簽章過的 uid / role claim 組出使用者；只接受在最後一次變更之後簽發的 token。"""
+    if "uid" not in payload or "role" not in payload:
+        return None
+    revoked_at = _revoked_at.get(payload["sub"])
+    if revoked_at is not None and payload.get("iat", 0) <= revoked_at:
+        return None
+    # 只有啟用中的帳號能取得 token
+    return {
+        "id": payload["uid"],
+        "email": payload["sub"],
+        "role": payload["role"],
+        "is_active": True,
+        "is_deleted": False,
+    }
+
+
+def _attach(db: Session, fields: dict) -> UserInfo:
+    # 不查資料庫即成為此 session 中的 persistent 物件；未快取的欄位存取時才載入
+    user = UserInfo(**fields)
+    make_transient_to_detached(user)
+    return db.merge(user, load=False)
+
 
 def get_current_user(
     token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)
@@ -29,9 +217,25 @@ def get_current_user(
     except JWTError:
         raise credentials_error
 
-    user = db.query(UserInfo).filter(UserInfo.email == email).first()
-    if not user:
-        raise credentials_error
+    trusted = _cache_trusted()
+    fields = principal_cache.get(email) if trusted else None
+    if fields is None and trusted and settings.auth_role_claims:
+        fields = _claims_principal(payload)
+    if fields is not None:
+        user = _attach(db, fields)
+    else:
+        started = time.time()
+        user = db.scalars(user_by_email(email)).first()
+        if not user:
+            raise credentials_error
+        # 查詢期間被 invalidate 的結果可能已過期，不放進快取
+        revoked_at = _revoked_at.get(email)
+        if (
+            trusted
+            and settings.auth_principal_cache_ttl > 0
+            and (revoked_at is None or revoked_at < started)
+        ):
+            principal_cache.set(email, _snapshot(user))
     if not user.is_active:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Inactive user"
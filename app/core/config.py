@@ -37,10 +37,106 @@ class Settings(BaseSettings):
     aws_secret_access_key: str | None = None
     minio_bucket_name: str = "data"
 
+    # Database connection pool (每個程序各自一組；總連線數需低於 max_connections)
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30.0
+    # 連線使用超過此秒數後重新建立，-1 表示不回收
+    db_pool_recycle: int = 1800
+    db_pool_pre_ping: bool = True
+    # 經由 PgBouncer (transaction pooling) 連線時停用 asyncpg 的 prepared statement 快取
+    db_pgbouncer: bool = False
+    # 每個 engine 快取的編譯後 SQL 數量；asyncpg 每條連線在 server 端
+    # prepare 的 statement 數量 (db_pgbouncer 時固定為 0)
+    db_query_cache_size: int = 500
+    db_prepared_statement_cache_size: int = 100
+
+    # Read replica (選填)：未設定主機時所有讀取都走主庫
+    postgres_replica_ip_address: str | None = None
+    postgres_replica_port: int | None = None
+    # 複寫延遲超過此秒數時讀取改回主庫；延遲檢查結果快取的秒數
+    replica_max_lag_seconds: float = 5.0
+    replica_lag_check_seconds: float = 2.0
+    # 使用者自己寫入後，此秒數內的讀取固定走主庫 (read-your-writes)
+    read_your_writes_seconds: float = 5.0
+
+    # audio_info 依 record_time 分區 (month / year)；worker 定期預先建立
+    # 目前與未來 premake 個區間的分區
+    audio_partition_interval: str = "year"
+    audio_partition_premake: int = 2
+    audio_partition_check_hours: float = 24
+    # detach 後的舊分區移入此 schema，備份後可直接 DROP
+    audio_archive_schema: str = "archive"
+
+    # app.db.migrations 的 online helpers：DDL 等鎖上限，backfill 每批列數與
+    # 每秒最多更新的列數 (0 不限速)
+    migration_lock_timeout: str = "5s"
+    migration_batch_size: int = 5000
+    migration_rows_per_second: float = 20000
+
+    # Cold storage tiering
+    cold_storage_bucket: str = "cold-storage"
+    cold_storage_min_age_days: int = 365
+    cold_storage_batch_size: int = 100
+    cold_restore_bytes_per_second: int = 64 * 1024 * 1024
+    cold_restore_max_pending: int = 10000
+
+    # Duplicate audio detection
+    # reject: 拒絕登錄 / link: 登錄並標記 duplicate_of_id / allow: 不檢查
+    duplicate_audio_policy: str = "link"
+    audio_fingerprint_seconds: int = 30
+
+    # Background job queue (worker: python -m app.worker)
+    job_poll_seconds: float = 2.0
+    job_heartbeat_seconds: float = 30.0
+    job_stale_seconds: float = 300.0
+    job_retry_base_seconds: float = 30.0
+    job_retry_max_seconds: float = 3600.0
+    # 每種工作類型的全域並行上限，例如 {"ltsa.build": 2}；未設定者使用預設值
+    job_concurrency: dict[str, int] = {}
+
+    # 級聯軟刪除每個交易更新的音檔筆數
+    cascade_delete_batch_size: int = 10000
+    # 永久刪除時清除 MinIO 物件的並行 delete_objects 呼叫數與每個 key 的重試上限
+    object_deletion_concurrency: int = 8
+    object_deletion_max_attempts: int = 10
+    # 每秒最多刪除的 MinIO 物件數，0 表示不限速
+    object_deletion_objects_per_second: float = 0
+
+    # 軟刪除資料的保留天數；到期後由週期性工作永久刪除 (間隔設為 0 停用排程)
+    soft_delete_retention_days: int = 90
+    retention_purge_interval_hours: float = 24
+    # 清除時每秒最多刪除的音檔列數與每次執行處理的根節點上限
+    purge_rows_per_second: float = 5000
+    purge_max_roots_per_run: int = 500
+
+    # 已驗證使用者的程序內快取 (秒，0 停用)；停用、刪除與角色變更以 Postgres
+    # LISTEN/NOTIFY 立即通知其他程序。關閉 auth_principal_listen 時其他程序
+    # 最多延遲 TTL 秒才生效
+    auth_principal_cache_ttl: float = 30
+    auth_principal_cache_size: int = 1024
+    auth_principal_listen: bool = True
+    # token 內加入簽章過的 uid / role，快取未命中時也不查資料庫；
+    # 在程序啟動前發生的停用與角色變更要到 token 到期才生效
+    auth_role_claims: bool = False
+
+    # bcrypt 在獨立的 process pool 執行 (0 個 worker 表示在請求的執行緒內計算)；
+    # 執行中加排隊的請求超過 workers + queue_size 時回 429，等待逾時回 503
+    bcrypt_rounds: int = 12
+    password_hash_workers: int = 2
+    password_hash_queue_size: int = 8
+    password_hash_timeout: float = 10.0
+
     # Google OAuth settings
     google_oauth_client_id: str | None = None
     google_oauth_client_secret: str | None = None
     google_oauth_redirect_uri: str = "http://localhost:8000/api/v1/oauth/google/callback"
+    # Google 的 token / userinfo / JWKS 端點 (測試時可指向本機 stub server)
+    google_oauth_token_url: str = "https://oauth2.googleapis.com/token"
+    google_oauth_userinfo_url: str = "https://www.googleapis.com/oauth2/v3/userinfo"
+    google_oauth_jwks_url: str = "https://www.googleapis.com/oauth2/v3/certs"
+    # 呼叫 Google 的共用 keep-alive 連線數上限
+    google_oauth_pool_size: int = 10
 
     # Password reset settings
     password_reset_token_expire_minutes: int = 30
@@ -55,6 +151,21 @@ class Settings(BaseSettings):
     def get_database_url(self) -> str:
         return f"postgresql://{self.postgres_user}:{self.postgres_password}@{self.postgres_ip_address}:{self.postgres_port}/{self.postgres_db}"
 
+    def get_async_database_url(self) -> str:
+        return self.get_database_url().replace(
+            "postgresql://", "postgresql+asyncpg://", 1
+        )
+
+    def get_replica_database_url(self) -> str | None:
+        if not self.postgres_replica_ip_address:
+            return None
+        port = self.postgres_replica_port or self.postgres_port
+        return f"postgresql://{self.postgres_user}:{self.postgres_password}@{self.postgres_replica_ip_address}:{port}/{self.postgres_db}"
+
+    def get_async_replica_database_url(self) -> str | None:
+        url = self.get_replica_database_url()
+        return url and url.replace("postgresql://", "postgresql+asyncpg://", 1)
+
     model_config = SettingsConfigDict(
         env_file=".env",
         env_file_encoding="utf-8",
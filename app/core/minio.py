@@ -2,6 +2,9 @@ import boto3
 from botocore.client import Config
 from app.core.config import settings
 
+# 串流讀取 MinIO 物件時每次迭代的 chunk 大小
+STREAM_CHUNK_BYTES = 8 * 1024 * 1024
+
 
 def get_s3_client():
     return boto3.client(
@@ -12,3 +15,30 @@ def get_s3_client():
         config=Config(signature_version="s3v4"),
         region_name="us-east-1",
     )
+
+
+def get_object_range(
+    s3_client, bucket: str, key: str, start: int, end: int | None = None
+) -> bytes:
+    """Read bytes ``start``..``end`` (inclusive) of an object."""
+    byte_range = f"bytes={start}-" if end is None else f"bytes={start}-{end}"
+    response = s3_client.get_object(Bucket=bucket, Key=key, Range=byte_range)
+    return response["Body"].read()
+
+
+def iter_object_range(
+    s3_client,
+    bucket: str,
+    key: str,
+    start: int,
+    end: int | None = None,
+    chunk_size: int = STREAM_CHUNK_BYTES,
+):
+    """Stream bytes ``start``..``end`` of an object with a single ranged GET."""
+    byte_range = f"bytes={start}-" if end is None else f"bytes={start}-{end}"
+    response = s3_client.get_object(Bucket=bucket, Key=key, Range=byte_range)
+    body = response["Body"]
+    try:
+        yield from body.iter_chunks(chunk_size)
+    finally:
+        body.close()
@@ -1,31 +1,137 @@
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime, timedelta, timezone
 
 import bcrypt
+from fastapi import HTTPException, status
 from jose import jwt, JWTError
 
 from app.core.config import settings
 
+# bcrypt 交給獨立的 process pool，登入尖峰只佔用固定數量的請求執行緒；
+# 執行中加排隊的工作以 slot 限制，滿了直接回 429 而不是無限排隊
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(
+    max(settings.password_hash_workers, 0) + settings.password_hash_queue_size
+)
+
+
+def _hashpw(password: bytes, salt: bytes) -> bytes:
+    return bcrypt.hashpw(password, salt)
+
+
+def _checkpw(password: bytes, hashed: bytes) -> bool:
+    return bcrypt.checkpw(password, hashed)
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn：不複製 web server 的執行緒、連線與鎖
+            _pool = ProcessPoolExecutor(
+                settings.password_hash_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+
+def _discard_pool(pool: ProcessPoolExecutor) -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def shutdown_password_pool() -> None:
+    with _pool_lock:
+        pool = _pool
+    if pool is not None:
+        _discard_pool(pool)
+
+
+def _busy(status_code: int, detail: str) -> HTTPException:
+    return HTTPException(
+        status_code=status_code, detail=detail, headers={"Retry-After": "1"}
+    )
+
+
+def _run(fn, *args):
+    if settings.password_hash_workers <= 0:
+        return fn(*args)
+    if not _slots.acquire(blocking=False):
+        raise _busy(
+            status.HTTP_429_TOO_MANY_REQUESTS,
+            "Too many password requests, please retry later",
+        )
+    pool = _get_pool()
+    try:
+        future = pool.submit(fn, *args)
+    except BrokenProcessPool:
+        _slots.release()
+        _discard_pool(pool)
+        raise _busy(
+            status.HTTP_503_SERVICE_UNAVAILABLE, "Password service unavailable"
+        ) from None
+    # slot 在工作真正結束時才歸還，逾時放棄等待的工作仍計入上限
+    future.add_done_callback(lambda _: _slots.release())
+    try:
+        return future.result(timeout=settings.password_hash_timeout)
+    except FutureTimeoutError:
+        future.cancel()
+        raise _busy(
+            status.HTTP_503_SERVICE_UNAVAILABLE,
+            "Password service is busy, please retry later",
+        ) from None
+    except BrokenProcessPool:
+        _discard_pool(pool)
+        raise _busy(
+            status.HTTP_503_SERVICE_UNAVAILABLE, "Password service unavailable"
+        ) from None
+
 
 def hash_password(password: str) -> str:
-    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+    salt = bcrypt.gensalt(settings.bcrypt_rounds)
+    return _run(_hashpw, password.encode("utf-8"), salt).decode("utf-8")
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return bcrypt.checkpw(
-        plain_password.encode("utf-8"), hashed_password.encode("utf-8")
+    return _run(
+        _checkpw, plain_password.encode("utf-8"), hashed_password.encode("utf-8")
     )
 
 
+def needs_rehash(hashed_password: str) -> bool:
+    """Whether ``hashed_password`` uses a cost other than ``bcrypt_rounds``."""
+    try:
+        return int(hashed_password.split("$")[2]) != settings.bcrypt_rounds
+    except (IndexError, ValueError):
+        return True
+
+
 def create_access_token(data: dict, expires_delta: timedelta | None = None) -> str:
     """Create a signed JWT access token."""
     to_encode = data.copy()
     expire = datetime.now(timezone.utc) + (
         expires_delta or timedelta(minutes=settings.access_token_expire_minutes)
     )
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "iat": datetime.now(timezone.utc)})
     return jwt.encode(to_encode, settings.secret_key, algorithm=settings.algorithm)
 
 
+def user_claims(user) -> dict:
+    """Claims identifying ``user`` in an access token."""
+    claims = {"sub": user.email}
+    if settings.auth_role_claims:
+        claims.update({"uid": user.id, "role": user.role})
+    return claims
+
+
 def decode_access_token(token: str) -> dict:
     """Decode a JWT and return payload; raises JWTError on failure."""
     return jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
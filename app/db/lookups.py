@@ -0,0 +1,36 @@
+"""
+Cached statements for the per-request lookups.
+
+Every authenticated request loads its user by email, and most detail routes
+load one audio, deployment or point by id. Built through ``db.query(...)``
+these statements are reconstructed and their cache key recomputed on every
+call. ``lambda_stmt`` analyses each lambda once per call site; later calls
+only pull the new bound values out of the closure, and the compiled SQL
+comes from the engine's compiled cache (``db_query_cache_size``).
+
+With asyncpg the SQL is also prepared server-side once per connection
+(``db_prepared_statement_cache_size``); psycopg2 has no server-side
+prepared statements, so sync sessions only save the Python-side work.
+
+``query_test/statement_cache_benchmark.py`` measures the CPU saved.
+"""
+
+from sqlalchemy import lambda_stmt, select
+from sqlalchemy.sql.lambdas import StatementLambdaElement
+
+from app.models.user import UserInfo
+
+
+def user_by_email(email: str) -> StatementLambdaElement:
+    return lambda_stmt(
+        lambda: select(UserInfo).where(
+            UserInfo.email == email, UserInfo.is_deleted.is_(False)
+        )
+    )
+
+
+def active_by_id(model, obj_id: int) -> StatementLambdaElement:
+    """未軟刪除、``id`` 為 ``obj_id`` 的列；不同 model 各自快取。"""
+    return lambda_stmt(
+        lambda: select(model).where(model.id == obj_id, model.is_deleted.is_(False))
+    )
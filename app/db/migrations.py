@@ -0,0 +1,206 @@
+"""
+Helpers for Alembic migrations that must not block writes on large tables.
+
+Alembic runs a revision in one transaction, so every lock it takes is held
+until the revision ends. Heavy steps go through :func:`online_step` instead:
+they run outside the revision's transaction (autocommit) with a short
+``lock_timeout``, so DDL that cannot get its lock fails fast instead of
+queueing every writer behind it. On top of that:
+
+- :func:`create_index_concurrently` / :func:`drop_index_concurrently` build
+  indexes without blocking writes, including on partitioned tables, which do
+  not support ``CONCURRENTLY`` directly.
+- :func:`backfill` updates a table in key-range batches, each committed on
+  its own, throttled to ``migration_rows_per_second`` with progress logging.
+
+A revision that only uses these helpers sets ``online = True`` at module
+level; ``alembic -x online=true upgrade head`` refuses to run pending
+revisions without it (see ``alembic/env.py``).
+
+Every helper is re-runnable: a failed concurrent build leaves an invalid
+index behind, which is dropped before the next attempt, and a backfill with
+a ``where`` that skips finished rows resumes where it stopped.
+"""
+
+import logging
+import time
+from collections.abc import Callable, Iterable, Sequence
+from contextlib import contextmanager
+
+from alembic import op
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.utils.rate_limit import TokenBucket
+
+# alembic.ini 只對 alembic.* 輸出 INFO
+logger = logging.getLogger("alembic.online")
+
+PARTITIONS_SQL = text(
+    """
+    SELECT c.relname FROM pg_inherits i
+    JOIN pg_class c ON c.oid = i.inhrelid
+    WHERE i.inhparent = CAST(:table AS regclass)
+    ORDER BY c.relname
+    """
+)
+INVALID_INDEX_SQL = text(
+    """
+    SELECT 1 FROM pg_index i
+    JOIN pg_class c ON c.oid = i.indexrelid
+    WHERE c.relname = :name AND c.relkind = 'i' AND NOT i.indisvalid
+    """
+)
+PARTITIONED_INDEX_SQL = text(
+    "SELECT 1 FROM pg_class WHERE relname = :name AND relkind = 'I'"
+)
+
+
+@contextmanager
+def online_step(description: str, lock_timeout: str | None = None):
+    """
+    在 revision 的交易之外 (autocommit) 執行一段較重的步驟。
+
+    區塊內每個語句各自 commit；``lock_timeout`` 內拿不到鎖的 DDL 直接失敗，
+    不會讓後續的寫入排在它後面等待。
+    """
+    lock_timeout = lock_timeout or settings.migration_lock_timeout
+    started = time.monotonic()
+    logger.info(f"Online step: {description}")
+    with op.get_context().autocommit_block():
+        op.execute(f"SET lock_timeout = '{lock_timeout}'")
+        try:
+            yield
+        finally:
+            op.execute("RESET lock_timeout")
+    logger.info(f"Online step done in {time.monotonic() - started:.1f}s: {description}")
+
+
+def _index_sql(
+    name: str,
+    table: str,
+    columns: Sequence[str],
+    unique: bool,
+    where: str | None,
+    modifier: str,
+) -> str:
+    return (
+        f"CREATE {'UNIQUE ' if unique else ''}INDEX {modifier}IF NOT EXISTS {name} "
+        f"ON {table} ({', '.join(columns)})" + (f" WHERE {where}" if where else "")
+    )
+
+
+def _drop_invalid_index(name: str) -> None:
+    # 中斷的 CONCURRENTLY 會留下 invalid 的索引，IF NOT EXISTS 會誤以為已建好
+    if op.get_bind().execute(INVALID_INDEX_SQL, {"name": name}).first():
+        logger.info(f"Dropping invalid index {name} left by an earlier attempt")
+        op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+
+
+def create_index_concurrently(
+    name: str,
+    table: str,
+    columns: Sequence[str],
+    unique: bool = False,
+    where: str | None = None,
+) -> None:
+    """
+    以 ``CREATE INDEX CONCURRENTLY`` 建立索引，建立期間不阻擋寫入。
+
+    分區表不支援 CONCURRENTLY：先在父表建立 ``ON ONLY`` 的索引，再逐一對
+    分區並行建立並 attach，全部 attach 後父表的索引才會生效。
+    ``columns`` 與 ``where`` 為 SQL 片段。
+    """
+    with online_step(f"create index {name} on {table}"):
+        partitions = list(op.get_bind().scalars(PARTITIONS_SQL, {"table": table}))
+        if not partitions:
+            _drop_invalid_index(name)
+            op.execute(_index_sql(name, table, columns, unique, where, "CONCURRENTLY "))
+            return
+
+        op.execute(_index_sql(name, f"ONLY {table}", columns, unique, where, ""))
+        for partition in partitions:
+            child = f"{partition}_{name.removeprefix('ix_')}"[:63]
+            _drop_invalid_index(child)
+            op.execute(
+                _index_sql(child, partition, columns, unique, where, "CONCURRENTLY ")
+            )
+            op.execute(f"ALTER INDEX {name} ATTACH PARTITION {child}")
+
+
+def drop_index_concurrently(name: str) -> None:
+    """以 ``DROP INDEX CONCURRENTLY`` 刪除索引；分區表的索引只能一般刪除。"""
+    with online_step(f"drop index {name}"):
+        partitioned = op.get_bind().execute(PARTITIONED_INDEX_SQL, {"name": name})
+        concurrently = "" if partitioned.first() else "CONCURRENTLY "
+        op.execute(f"DROP INDEX {concurrently}IF EXISTS {name}")
+
+
+def backfill(
+    table: str,
+    set_clause: str,
+    where: str | None = None,
+    key: str = "id",
+    batch_size: int | None = None,
+    rows_per_second: float | None = None,
+    progress: Callable[[int, int, int], None] | None = None,
+    params: dict | None = None,
+) -> int:
+    """
+    分批執行 ``UPDATE table SET set_clause``，回傳更新的列數。
+
+    依 ``key`` (整數遞增欄位) 的範圍切批，每批各自 commit，鎖只持有一批的
+    時間；依實際更新的列數限速。``where`` 應排除已處理的列 (例如
+    ``new_col IS NULL``)，中斷後重跑即從未完成處接續。
+    ``progress(done_keys, total_keys, updated)`` 在每批之後呼叫。
+    """
+    batch_size = batch_size or settings.migration_batch_size
+    if rows_per_second is None:
+        rows_per_second = settings.migration_rows_per_second
+    limiter = TokenBucket(rows_per_second) if rows_per_second > 0 else None
+    condition = f"{key} >= :batch_start AND {key} < :batch_end"
+    if where:
+        condition += f" AND ({where})"
+    statement = text(f"UPDATE {table} SET {set_clause} WHERE {condition}")
+
+    updated = 0
+    with online_step(f"backfill {table}"):
+        bind = op.get_bind()
+        first, last = bind.execute(
+            text(f"SELECT min({key}), max({key}) FROM {table}")
+        ).one()
+        if first is None:
+            return 0
+        total = last - first + 1
+        logged = time.monotonic()
+        for start in range(first, last + 1, batch_size):
+            result = bind.execute(
+                statement,
+                {
+                    **(params or {}),
+                    "batch_start": start,
+                    "batch_end": start + batch_size,
+                },
+            )
+            updated += result.rowcount
+            done = min(start + batch_size, last + 1) - first
+            if progress:
+                progress(done, total, updated)
+            if time.monotonic() - logged >= 10 or done == total:
+                logged = time.monotonic()
+                logger.info(
+                    f"Backfill {table}: {done / total:.0%} of {key} range, "
+                    f"{updated} rows updated"
+                )
+            if limiter and result.rowcount:
+                limiter.acquire(result.rowcount)
+    return updated
+
+
+def offline_revisions(revisions: Iterable) -> list[str]:
+    """待執行的 revision 中沒有標記 ``online = True`` 的 (需要維護時段)。"""
+    return [
+        revision.revision
+        for revision in revisions
+        if not getattr(revision.module, "online", False)
+    ]
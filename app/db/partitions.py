@@ -0,0 +1,63 @@
+"""
+Naming and bounds of the ``audio_info`` range partitions.
+
+``audio_info`` is partitioned by ``record_time`` into monthly or yearly
+partitions (``audio_partition_interval``) named ``audio_info_p2024`` /
+``audio_info_p2024_06``. Rows without a ``record_time``, or outside every
+created range, land in ``audio_info_default``. Bounds are UTC.
+
+Shared by the partitioning migration and ``AudioPartitionService``.
+"""
+
+from datetime import UTC, datetime
+
+PARENT_TABLE = "audio_info"
+DEFAULT_PARTITION = "audio_info_default"
+INTERVALS = ("month", "year")
+
+
+def period_start(value: datetime, interval: str) -> datetime:
+    """``value`` 所在分區的起點 (UTC)。"""
+    if interval not in INTERVALS:
+        raise ValueError(f"Unknown partition interval: {interval}")
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=UTC)
+    value = value.astimezone(UTC)
+    month = value.month if interval == "month" else 1
+    return datetime(value.year, month, 1, tzinfo=UTC)
+
+
+def next_period(start: datetime, interval: str) -> datetime:
+    if interval == "year":
+        return start.replace(year=start.year + 1)
+    if start.month == 12:
+        return start.replace(year=start.year + 1, month=1)
+    return start.replace(month=start.month + 1)
+
+
+def partition_name(start: datetime, interval: str) -> str:
+    if interval == "year":
+        return f"{PARENT_TABLE}_p{start.year}"
+    return f"{PARENT_TABLE}_p{start.year}_{start.month:02d}"
+
+
+def partition_ranges(
+    first: datetime, last: datetime, interval: str
+) -> list[tuple[str, datetime, datetime]]:
+    """涵蓋 ``first`` 到 ``last`` (含) 的所有分區 ``(name, start, end)``。"""
+    ranges = []
+    start = period_start(first, interval)
+    stop = next_period(period_start(last, interval), interval)
+    while start < stop:
+        end = next_period(start, interval)
+        ranges.append((partition_name(start, interval), start, end))
+        start = end
+    return ranges
+
+
+def bounds_sql(start: datetime, end: datetime) -> str:
+    return f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+
+
+def create_partition_sql(name: str, start: datetime, end: datetime) -> str:
+    return f"CREATE TABLE {name} PARTITION OF {PARENT_TABLE} {bounds_sql(start, end)}"
@@ -0,0 +1,185 @@
+"""
+Connection pool configuration and instrumentation.
+
+Both engines use a ``QueuePool`` subclass that times every checkout, so the
+time requests spend waiting for a free connection (and how often they give
+up after ``pool_timeout``) can be read next to the pool's current
+saturation. Metrics are per process: each uvicorn / worker process reports
+its own pools.
+"""
+
+import bisect
+import threading
+import time
+import uuid
+
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
+
+from app.core.config import settings
+
+# checkout 等待時間的 histogram 上界 (秒)
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class PoolMetrics:
+    """Thread-safe checkout counters and wait-time histogram for one pool."""
+
+    def __init__(self, name: str, buckets: tuple[float, ...] = WAIT_BUCKETS):
+        self.name = name
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        # 最後一格為 +Inf
+        self.bucket_counts = [0] * (len(buckets) + 1)
+
+    def observe(self, seconds: float, timed_out: bool = False) -> None:
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+            self.bucket_counts[bisect.bisect_left(self.buckets, seconds)] += 1
+
+    def snapshot(self, pool: Pool) -> dict:
+        """目前的連線使用量與累計的 checkout 統計。"""
+        size = pool.size()
+        checked_out = pool.checkedout()
+        # max_overflow < 0 代表不限制溢出連線數
+        max_overflow = getattr(pool, "_max_overflow", 0)
+        capacity = size + max_overflow if max_overflow >= 0 else None
+        with self._lock:
+            return {
+                "name": self.name,
+                "size": size,
+                "capacity": capacity,
+                "checked_out": checked_out,
+                "checked_in": pool.checkedin(),
+                "overflow": max(pool.overflow(), 0),
+                "saturation": round(checked_out / capacity, 3) if capacity else None,
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_seconds_total": round(self.wait_seconds_total, 6),
+                "wait_seconds_max": round(self.wait_seconds_max, 6),
+                "wait_buckets": {
+                    **{
+                        str(bound): count
+                        for bound, count in zip(
+                            self.buckets, self.bucket_counts, strict=False
+                        )
+                    },
+                    "+Inf": self.bucket_counts[-1],
+                },
+            }
+
+
+class _InstrumentedPoolMixin:
+    metrics: PoolMetrics | None = None
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            if self.metrics:
+                self.metrics.observe(time.perf_counter() - started, timed_out=True)
+            raise
+        if self.metrics:
+            self.metrics.observe(time.perf_counter() - started)
+        return connection
+
+    def recreate(self):
+        # engine.dispose() 以 recreate 建立新的 pool，沿用同一份統計
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+sync_pool_metrics = PoolMetrics("sync")
+async_pool_metrics = PoolMetrics("async")
+
+
+def engine_options(async_driver: bool = False) -> dict:
+    """依 settings 組出 ``create_engine`` / ``create_async_engine`` 的連線池參數。"""
+    options = {
+        "poolclass": (
+            InstrumentedAsyncQueuePool if async_driver else InstrumentedQueuePool
+        ),
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+        "query_cache_size": settings.db_query_cache_size,
+    }
+    if async_driver and not settings.db_pgbouncer:
+        options["connect_args"] = {
+            "prepared_statement_cache_size": settings.db_prepared_statement_cache_size
+        }
+    if settings.db_pgbouncer and async_driver:
+        # PgBouncer transaction mode 下每個交易可能換到不同的 server 連線，
+        # 不能依賴 asyncpg 快取的具名 prepared statement；psycopg2 本來就
+        # 不使用 server 端 prepared statement，同步 engine 不需調整
+        options["connect_args"] = {
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+            "prepared_statement_name_func": _unique_statement_name,
+        }
+    return options
+
+
+def _unique_statement_name() -> str:
+    return f"__asyncpg_{uuid.uuid4()}__"
+
+
+def render_prometheus(stats: list[dict]) -> str:
+    """以 Prometheus text exposition format 輸出 ``pool_stats()`` 的結果。"""
+    gauges = ("size", "capacity", "checked_out", "checked_in", "overflow", "saturation")
+    lines = []
+    for name in gauges:
+        lines.append(f"# TYPE db_pool_{name} gauge")
+        lines.extend(
+            f'db_pool_{name}{{pool="{s["name"]}"}} {s[name]}'
+            for s in stats
+            if s[name] is not None
+        )
+    for name in ("checkouts", "timeouts"):
+        lines.append(f"# TYPE db_pool_{name}_total counter")
+        lines.extend(
+            f'db_pool_{name}_total{{pool="{s["name"]}"}} {s[name]}' for s in stats
+        )
+    lines.append("# TYPE db_pool_wait_seconds_max gauge")
+    lines.extend(
+        f'db_pool_wait_seconds_max{{pool="{s["name"]}"}} {s["wait_seconds_max"]}'
+        for s in stats
+    )
+    lines.append("# TYPE db_pool_wait_seconds histogram")
+    for s in stats:
+        cumulative = 0
+        for bound, count in s["wait_buckets"].items():
+            cumulative += count
+            lines.append(
+                f'db_pool_wait_seconds_bucket{{pool="{s["name"]}",le="{bound}"}} '
+                f"{cumulative}"
+            )
+        lines.append(
+            f'db_pool_wait_seconds_sum{{pool="{s["name"]}"}} {s["wait_seconds_total"]}'
+        )
+        lines.append(
+            f'db_pool_wait_seconds_count{{pool="{s["name"]}"}} '
+            f"{s['checkouts'] + s['timeouts']}"
+        )
+    return "\n".join(lines) + "\n"
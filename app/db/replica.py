@@ -0,0 +1,135 @@
+"""
+Read-replica routing helpers.
+
+Read-only routes use the replica unless the replica is lagging more than
+``replica_max_lag_seconds`` behind the primary, or the caller wrote something
+in the last ``read_your_writes_seconds``. Recent writes are remembered per
+token subject in this process; across uvicorn processes they are carried by
+the ``X-Primary-Until`` response header (which clients may send back) and,
+for browsers, a cookie. The lag is measured on the replica itself and
+cached for ``replica_lag_check_seconds`` instead of being queried per request.
+"""
+
+import logging
+import math
+import threading
+import time
+
+from fastapi import Request, Response
+from jose import JWTError
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+from app.core.security import decode_access_token
+from app.utils.cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+READ_YOUR_WRITES_COOKIE = "primary_until"
+# bearer token 用戶端不保存 cookie：寫入後的回應帶此 header，之後的請求可原樣帶回
+READ_YOUR_WRITES_HEADER = "X-Primary-Until"
+# 不會寫入資料的 HTTP method；其餘成功的請求都視為寫入
+SAFE_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+# 主庫 (非 recovery) 或已重播完所有收到的 WAL 時延遲為 0；
+# 否則為最後重播的交易距今的秒數，從未重播過時為 NULL
+LAG_SQL = text(
+    """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE extract(epoch FROM now() - pg_last_xact_replay_timestamp())
+    END
+    """
+)
+
+
+class ReplicaLagMonitor:
+    """Caches the replica's replication lag for ``ttl`` seconds."""
+
+    def __init__(
+        self, engine: Engine, max_lag: float, ttl: float, clock=time.monotonic
+    ):
+        self.engine = engine
+        self.max_lag = max_lag
+        self.ttl = ttl
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._lag: float | None = None
+        self._checked_at: float | None = None
+
+    def due(self) -> bool:
+        return self._checked_at is None or self.clock() - self._checked_at >= self.ttl
+
+    def refresh(self) -> float | None:
+        """查詢目前的延遲秒數；查詢失敗或無法判斷時為 None (視為不可用)。"""
+        with self._lock:
+            # 等鎖期間其他執行緒可能已經更新過
+            if not self.due():
+                return self._lag
+            try:
+                with self.engine.connect() as connection:
+                    lag = connection.execute(LAG_SQL).scalar()
+                lag = None if lag is None else float(lag)
+            except Exception:
+                logger.warning("Replica lag check failed", exc_info=True)
+                lag = None
+            self._lag = lag
+            self._checked_at = self.clock()
+            return lag
+
+    def lag(self) -> float | None:
+        return self.refresh() if self.due() else self._lag
+
+    def healthy(self) -> bool:
+        lag = self.lag()
+        return lag is not None and lag <= self.max_lag
+
+
+# token subject -> 主庫讀取期限 (time.time())；只在本程序有效
+_recent_writers = LRUCache(maxsize=10000, ttl=settings.read_your_writes_seconds or None)
+
+
+def request_principal(request: Request) -> str | None:
+    """Bearer token 的 subject；沒有 token 或驗證失敗時為 None。"""
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        return decode_access_token(token).get("sub")
+    except JWTError:
+        return None
+
+
+def mark_write(request: Request, response: Response, seconds: float) -> None:
+    """讓此使用者 / 用戶端接下來 ``seconds`` 秒內的讀取都走主庫。"""
+    until = time.time() + seconds
+    principal = request_principal(request)
+    if principal:
+        _recent_writers.set(principal, until)
+    response.headers[READ_YOUR_WRITES_HEADER] = f"{until:.3f}"
+    response.set_cookie(
+        READ_YOUR_WRITES_COOKIE,
+        f"{until:.3f}",
+        max_age=math.ceil(seconds),
+        httponly=True,
+        samesite="lax",
+    )
+
+
+def recently_wrote(request: Request) -> bool:
+    now = time.time()
+    principal = request_principal(request)
+    if principal and _recent_writers.get(principal, 0) > now:
+        return True
+    for value in (
+        request.headers.get(READ_YOUR_WRITES_HEADER),
+        request.cookies.get(READ_YOUR_WRITES_COOKIE),
+    ):
+        try:
+            if value and float(value) > now:
+                return True
+        except ValueError:
+            continue
+    return False
@@ -0,0 +1,98 @@
+"""
+Single-statement inserts guarded by the partial unique indexes.
+
+Soft-deleted rows keep their unique keys reserved until they are hard
+deleted, while the ``*_active`` partial unique indexes only cover active
+rows. :func:`insert_unique` checks both in one round trip::
+
+    INSERT INTO t (...) SELECT :values WHERE NOT EXISTS (soft-deleted row
+    with the same key) ON CONFLICT DO NOTHING RETURNING t.*
+
+Concurrent creates are decided by the unique indexes instead of earlier
+``SELECT``s. When nothing is inserted, :func:`find_conflict` tells in one
+more query which key clashed and whether with an active row or a
+reservation.
+"""
+
+from collections.abc import Sequence
+from typing import Any
+
+from sqlalchemy import and_, exists, literal, or_, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+# unique_violation
+UNIQUE_VIOLATION = "23505"
+
+Key = tuple[str, ...]
+
+
+def _matches(model, values: dict[str, Any], keys: Sequence[Key]):
+    # NULL 不會與任何列衝突 (例如未填的 name_zh)
+    return or_(
+        *(
+            and_(*(getattr(model, column) == values[column] for column in key))
+            for key in keys
+            if all(values[column] is not None for column in key)
+        )
+    )
+
+
+def is_unique_violation(error: IntegrityError) -> bool:
+    code = getattr(error.orig, "pgcode", None) or getattr(error.orig, "sqlstate", None)
+    return code == UNIQUE_VIOLATION
+
+
+def insert_unique(db: Session, model, values: dict[str, Any], keys: Sequence[Key]):
+    """
+    新增一列並回傳 ORM 物件；任一 ``keys`` 與現有或軟刪除的列衝突時回傳 None。
+
+    由 trigger 維護唯一性的表 (audio_info 的 object_key) 無法以 ON CONFLICT
+    判斷，其 unique_violation 同樣視為衝突，session 會被 rollback。
+    呼叫端負責 commit。
+    """
+    table = model.__table__
+    names = list(values)
+    reserved = exists().where(model.is_deleted.is_(True), _matches(model, values, keys))
+    source = select(
+        *(literal(values[name], type_=table.c[name].type) for name in names)
+    ).where(~reserved)
+    statement = (
+        insert(model)
+        .from_select(names, source)
+        .on_conflict_do_nothing()
+        .returning(model)
+    )
+    try:
+        return db.scalars(statement).one_or_none()
+    except IntegrityError as e:
+        if not is_unique_violation(e):
+            raise
+        db.rollback()
+        return None
+
+
+def find_conflict(
+    db: Session, model, values: dict[str, Any], keys: Sequence[Key]
+) -> tuple[Key, bool]:
+    """
+    回傳 ``(衝突的 key, 是否為軟刪除保留)``。
+
+    與現有列的衝突優先於軟刪除保留；同類衝突依 ``keys`` 的順序。衝突的列
+    已在兩次查詢之間被刪除時，視為 ``keys[0]`` 與現有列衝突。
+    """
+    columns = sorted({column for key in keys for column in key})
+    rows = db.execute(
+        select(model.is_deleted, *(getattr(model, c) for c in columns)).where(
+            _matches(model, values, keys)
+        )
+    ).all()
+    for reserved in (False, True):
+        for key in keys:
+            for row in rows:
+                if bool(row.is_deleted) == reserved and all(
+                    getattr(row, column) == values[column] for column in key
+                ):
+                    return key, reserved
+    return keys[0], False
@@ -26,6 +26,14 @@ class RecorderStatus(StrEnum):
     CHECKED_OUT = "checked-out"
 
 
+class JobStatus(StrEnum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
 class DetectionMethod(StrEnum):
     MANUAL = "manually"
     NTU_PAM = "ntu-pam"
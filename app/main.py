@@ -1,7 +1,35 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
 
 from app.api.v1.api import api_router
+from app.core.auth import start_principal_listener, stop_principal_listener
 from app.core.config import settings
+from app.core.security import shutdown_password_pool
+from app.db import session
+from app.db.replica import SAFE_METHODS, mark_write
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    start_principal_listener()
+    yield
+    stop_principal_listener()
+    shutdown_password_pool()
 
-app = FastAPI(title=settings.app_name)
+
+app = FastAPI(title=settings.app_name, lifespan=lifespan)
 app.include_router(api_router, prefix=settings.api_prefix)
+
+
+@app.middleware("http")
+async def read_your_writes(request: Request, call_next):
+    # 成功寫入後的短時間內，同一個使用者 / 用戶端的讀取改走主庫 (見 get_read_db)
+    response = await call_next(request)
+    if (
+        session.replica_engine is not None
+        and request.method not in SAFE_METHODS
+        and response.status_code < 400
+    ):
+        mark_write(request, response, settings.read_your_writes_seconds)
+    return response
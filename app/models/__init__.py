@@ -2,6 +2,11 @@ from .user import UserInfo
 from .project import ProjectInfo
 from .deployment import DeploymentInfo
 from .point import PointInfo
-from .audio import AudioInfo
+from .audio import AudioInfo, AudioObjectKey
 from .recorder import RecorderInfo
+from .detection import DetectionInfo
+from .analysis import AudioAnalysisRun
+from .acoustic_index import AcousticIndexMinute
+from .job import BackgroundJob
+from .object_deletion import ObjectDeletion
 from app.db.base import Base
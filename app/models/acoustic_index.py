@@ -0,0 +1,37 @@
+from sqlalchemy import (
+    REAL,
+    BigInteger,
+    Column,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+)
+
+from app.db.base import Base
+
+
+class AcousticIndexMinute(Base):
+    """每分鐘的聲景指數；數值欄位用 REAL 以縮小表格。"""
+
+    __tablename__ = "acoustic_index_minute"
+
+    id = Column(BigInteger, primary_key=True)
+    deployment_id = Column(
+        Integer,
+        ForeignKey("deployment_info.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    # audio_info 已分區，參照由 trigger 檢查，音檔刪除時一併刪除
+    audio_id = Column(Integer, nullable=False, index=True)
+    minute_time = Column(DateTime(timezone=True), nullable=False)
+    duration = Column(REAL, nullable=False)
+    aci = Column(REAL)
+    adi = Column(REAL)
+    h = Column(REAL)
+    ndsi = Column(REAL)
+    spl = Column(REAL)
+
+    __table_args__ = (
+        Index("ix_acoustic_index_deployment_time", "deployment_id", "minute_time"),
+    )
@@ -0,0 +1,34 @@
+from sqlalchemy import (
+    Column,
+    DateTime,
+    Index,
+    Integer,
+    String,
+)
+from sqlalchemy.sql import func
+
+from app.db.base import Base
+
+
+class AudioAnalysisRun(Base):
+    """每個音檔已完成的分析紀錄，批次工作據此跳過已處理的檔案。"""
+
+    __tablename__ = "audio_analysis_run"
+
+    id = Column(Integer, primary_key=True)
+    # audio_info 已分區，參照由 trigger 檢查，音檔刪除時一併刪除
+    audio_id = Column(Integer, nullable=False)
+    analysis = Column(String(50), nullable=False)
+    params_hash = Column(String(64), nullable=False)
+    result_count = Column(Integer, nullable=False, default=0)
+    processed_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index(
+            "uq_audio_analysis_run",
+            "audio_id",
+            "analysis",
+            "params_hash",
+            unique=True,
+        ),
+    )
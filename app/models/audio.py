@@ -9,6 +9,7 @@ from sqlalchemy import (
     Boolean,
     BigInteger,
     Index,
+    PrimaryKeyConstraint,
     text,
 )
 from sqlalchemy.orm import relationship
@@ -18,7 +19,18 @@ from app.db.base import Base
 
 
 class AudioInfo(Base):
+    """
+    Audio file metadata, range-partitioned by ``record_time``.
+
+    The table is managed by the ``partition_audio_info`` migration: on a
+    partitioned table ``id`` cannot be a primary key, references to it are
+    enforced by triggers, and active ``object_key`` uniqueness is kept in
+    :class:`AudioObjectKey`. Queries that filter on ``record_time`` only scan
+    the matching partitions.
+    """
+
     __tablename__ = "audio_info"
+    # ORM 的 identity 仍為 id；資料庫只有 sequence 與 ix_audio_info_id
     id = Column(Integer, primary_key=True)
     deployment_id = Column(
         Integer, ForeignKey("deployment_info.id"), nullable=False, index=True
@@ -29,6 +41,10 @@ class AudioInfo(Base):
     file_format = Column(String(10))
     file_size = Column(BigInteger)
     checksum = Column(String(64))
+    fingerprint = Column(String(64))
+    # 內容與另一筆 Audio 相同時指向最早登錄的那一筆
+    # 由 trigger 檢查並在被刪除時設為 NULL (分區表的 id 無法被 FK 參照)
+    duplicate_of_id = Column(Integer, nullable=True, index=True)
     record_time = Column(DateTime(timezone=True), index=True)
     record_duration = Column(Float)
     fs = Column(Integer)
@@ -46,12 +62,53 @@ class AudioInfo(Base):
     )
     deleted_at = Column(DateTime(timezone=True), nullable=True)
     deleted_by = Column(Integer, nullable=True)
+    deletion_batch_id = Column(String(32), nullable=True)
 
     __table_args__ = (
+        Index("ix_audio_info_id", "id"),
         Index(
-            "ix_audio_object_key_active",
+            "ix_audio_info_deletion_batch_id",
+            "deletion_batch_id",
+            postgresql_where=(deletion_batch_id.isnot(None)),
+        ),
+        # 保留期限到期清除時只掃描已軟刪除的列
+        Index(
+            "ix_audio_info_purge",
+            "deleted_at",
+            postgresql_where=(is_deleted.is_(True)),
+        ),
+        # 唯一性由 audio_object_key_active 保證，這裡只供查詢
+        Index(
+            "ix_audio_info_object_key_active",
             "object_key",
-            unique=True,
             postgresql_where=(is_deleted.is_(False)),
         ),
+        Index(
+            "ix_audio_checksum_active",
+            "checksum",
+            postgresql_where=(is_deleted.is_(False) & checksum.isnot(None)),
+        ),
+        Index(
+            "ix_audio_fingerprint_active",
+            "fingerprint",
+            postgresql_where=(is_deleted.is_(False) & fingerprint.isnot(None)),
+        ),
+        {"postgresql_partition_by": "RANGE (record_time)"},
+    )
+
+
+class AudioObjectKey(Base):
+    """
+    Active ``object_key`` reservations of ``audio_info``.
+
+    Maintained by the ``audio_info_sync_object_key`` trigger; replaces the
+    partial unique index that a partitioned ``audio_info`` cannot have.
+    """
+
+    __tablename__ = "audio_object_key_active"
+    object_key = Column(String(1024), nullable=False)
+    audio_id = Column(Integer, nullable=False)
+
+    __table_args__ = (
+        PrimaryKeyConstraint("object_key", name="ix_audio_object_key_active"),
     )
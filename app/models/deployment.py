@@ -55,8 +55,20 @@ class DeploymentInfo(Base):
     )
     deleted_at = Column(DateTime(timezone=True), nullable=True)
     deleted_by = Column(Integer, nullable=True)
+    deletion_batch_id = Column(String(32), nullable=True)
 
     __table_args__ = (
+        Index(
+            "ix_deployment_info_deletion_batch_id",
+            "deletion_batch_id",
+            postgresql_where=(deletion_batch_id.isnot(None)),
+        ),
+        # 保留期限到期清除時只掃描已軟刪除的列
+        Index(
+            "ix_deployment_info_purge",
+            "deleted_at",
+            postgresql_where=(is_deleted.is_(True)),
+        ),
         Index(
             "uq_deployment_point_start_time_active",
             "point_id",
@@ -0,0 +1,53 @@
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    DateTime,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    text,
+)
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
+
+from app.db.base import Base
+
+
+class DetectionInfo(Base):
+    __tablename__ = "detection_info"
+
+    id = Column(BigInteger, primary_key=True)
+    deployment_id = Column(
+        Integer,
+        ForeignKey("deployment_info.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    deployment = relationship("DeploymentInfo")
+    # audio_info 已分區，參照由 trigger 檢查，音檔刪除時設為 NULL
+    audio_id = Column(Integer, index=True)
+    audio = relationship(
+        "AudioInfo", primaryjoin="foreign(DetectionInfo.audio_id) == AudioInfo.id"
+    )
+    start_time = Column(DateTime(timezone=True), nullable=False)
+    end_time = Column(DateTime(timezone=True), nullable=False)
+    freq_min = Column(Float)
+    freq_max = Column(Float)
+    method = Column(String(50), nullable=False)
+    species = Column(Integer, nullable=False, server_default=text("0"))
+    call_type = Column(Integer, nullable=False, server_default=text("0"))
+    confidence = Column(Float)
+    created_by = Column(Integer, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_detection_deployment_time", "deployment_id", "start_time"),
+        Index(
+            "ix_detection_deployment_species_time",
+            "deployment_id",
+            "species",
+            "call_type",
+            "start_time",
+        ),
+    )
@@ -0,0 +1,83 @@
+from sqlalchemy import (
+    JSON,
+    BigInteger,
+    Boolean,
+    Column,
+    DateTime,
+    Index,
+    Integer,
+    String,
+    Text,
+    text,
+)
+from sqlalchemy.sql import func
+
+from app.db.base import Base
+from app.enums.enums import JobStatus
+
+
+class BackgroundJob(Base):
+    """
+    長時間工作的持久化佇列。
+
+    由獨立的 worker 程序以 ``SELECT ... FOR UPDATE SKIP LOCKED`` 領取，
+    失敗時依 ``run_after`` 延後重試；API 程序重啟不會遺失工作。
+    """
+
+    __tablename__ = "background_job"
+
+    id = Column(Integer, primary_key=True)
+    job_type = Column(String(50), nullable=False)
+    payload = Column(JSON, nullable=False, default=dict)
+    status = Column(
+        String(20),
+        nullable=False,
+        default=JobStatus.QUEUED.value,
+        server_default=JobStatus.QUEUED.value,
+    )
+    priority = Column(Integer, nullable=False, default=0, server_default=text("0"))
+    # 同類型中相同 dedup_key 的工作在排隊 / 執行中時只保留一筆
+    dedup_key = Column(String(255), nullable=True)
+    attempts = Column(Integer, nullable=False, default=0, server_default=text("0"))
+    max_attempts = Column(Integer, nullable=False, default=3, server_default=text("3"))
+    run_after = Column(DateTime(timezone=True), server_default=func.now())
+    progress_current = Column(BigInteger, nullable=True)
+    progress_total = Column(BigInteger, nullable=True)
+    cancel_requested = Column(
+        Boolean, nullable=False, default=False, server_default=text("false")
+    )
+    result = Column(JSON, nullable=True)
+    last_error = Column(Text, nullable=True)
+    locked_by = Column(String(100), nullable=True)
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)
+    created_by = Column(Integer, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        # 領取工作時只掃描排隊中的列
+        Index(
+            "ix_background_job_ready",
+            "priority",
+            "run_after",
+            "id",
+            postgresql_where=text("status = 'queued'"),
+        ),
+        Index(
+            "ix_background_job_running",
+            "job_type",
+            "heartbeat_at",
+            postgresql_where=text("status = 'running'"),
+        ),
+        Index(
+            "uq_background_job_dedup",
+            "job_type",
+            "dedup_key",
+            unique=True,
+            postgresql_where=text(
+                "dedup_key IS NOT NULL AND status IN ('queued', 'running')"
+            ),
+        ),
+        Index("ix_background_job_created_by", "created_by"),
+    )
@@ -0,0 +1,41 @@
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    DateTime,
+    Index,
+    Integer,
+    String,
+    Text,
+    text,
+)
+from sqlalchemy.sql import func
+
+from app.db.base import Base
+
+
+class ObjectDeletion(Base):
+    """
+    待刪除的 MinIO 物件 (outbox)。
+
+    與資料列的刪除寫在同一個交易中，由 worker 批次呼叫 ``delete_objects``
+    清除，失敗的 key 依 ``next_attempt_at`` 延後重試。
+    ``object_key`` 為 NULL 的列代表刪除整個 bucket，須等該 bucket 的物件
+    全部清除後才執行。
+    """
+
+    __tablename__ = "object_deletion_outbox"
+
+    id = Column(BigInteger, primary_key=True)
+    bucket = Column(String(255), nullable=False)
+    object_key = Column(String(1024), nullable=True)
+    attempts = Column(Integer, nullable=False, default=0, server_default=text("0"))
+    next_attempt_at = Column(
+        DateTime(timezone=True), nullable=False, server_default=func.now()
+    )
+    last_error = Column(Text)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_object_deletion_outbox_ready", "next_attempt_at", "id"),
+        Index("ix_object_deletion_outbox_bucket", "bucket"),
+    )
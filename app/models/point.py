@@ -50,8 +50,20 @@ class PointInfo(Base):
     )
     deleted_at = Column(DateTime(timezone=True), nullable=True)
     deleted_by = Column(Integer, nullable=True)
+    deletion_batch_id = Column(String(32), nullable=True)
 
     __table_args__ = (
+        Index(
+            "ix_point_info_deletion_batch_id",
+            "deletion_batch_id",
+            postgresql_where=(deletion_batch_id.isnot(None)),
+        ),
+        # 保留期限到期清除時只掃描已軟刪除的列
+        Index(
+            "ix_point_info_purge",
+            "deleted_at",
+            postgresql_where=(is_deleted.is_(True)),
+        ),
         Index(
             "uq_point_project_name_active",
             "project_id",
@@ -30,6 +30,8 @@ class ProjectInfo(Base):
     )
     deleted_at = Column(DateTime(timezone=True), nullable=True)
     deleted_by = Column(Integer, nullable=True)
+    # 同一次刪除操作 (含級聯) 影響的所有列共用同一個 id，還原時依此找回
+    deletion_batch_id = Column(String(32), nullable=True)
 
     points = relationship(
         "PointInfo",
@@ -38,6 +40,17 @@ class ProjectInfo(Base):
     )
 
     __table_args__ = (
+        Index(
+            "ix_project_info_deletion_batch_id",
+            "deletion_batch_id",
+            postgresql_where=(deletion_batch_id.isnot(None)),
+        ),
+        # 保留期限到期清除時只掃描已軟刪除的列
+        Index(
+            "ix_project_info_purge",
+            "deleted_at",
+            postgresql_where=(is_deleted.is_(True)),
+        ),
         Index(
             "ix_project_name_active",
             "name",
@@ -0,0 +1,49 @@
+from datetime import datetime, timedelta, timezone
+
+from pydantic import BaseModel, Field, field_serializer, model_validator
+
+
+class AcousticIndexParams(BaseModel):
+    """聲景指數參數；每分鐘以同一個 STFT 計算全部指數。"""
+
+    nfft: int = Field(512, ge=64, le=16384)
+    adi_fmax: float = Field(10000.0, gt=0)
+    adi_step: float = Field(1000.0, gt=0)
+    adi_threshold_db: float = Field(-50.0, lt=0)
+    channel: int = Field(0, ge=0)
+
+    @model_validator(mode="after")
+    def check_nfft(self):
+        if self.nfft & (self.nfft - 1):
+            raise ValueError("nfft must be a power of two")
+        if self.adi_step > self.adi_fmax:
+            raise ValueError("adi_step must not exceed adi_fmax")
+        return self
+
+
+class AcousticIndexRunResponse(BaseModel):
+    message: str
+    deployment_id: int
+    job_id: int
+
+
+class AcousticIndexSeries(BaseModel):
+    """
+    每分鐘聲景指數的時間序列，以欄位陣列回傳以減少 JSON 體積。
+
+    ``spl`` 為 dB re 1 µPa，Deployment 未設定 sensitivity 時為 null。
+    """
+
+    deployment_id: int
+    times: list[datetime]
+    duration: list[float]
+    aci: list[float | None]
+    adi: list[float | None]
+    h: list[float | None]
+    ndsi: list[float | None]
+    spl: list[float | None]
+
+    @field_serializer("times")
+    def serialize_times(self, times: list[datetime], _info):
+        tz = timezone(timedelta(hours=8))
+        return [t.astimezone(tz) for t in times]
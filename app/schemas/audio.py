@@ -11,6 +11,7 @@ class AudioBase(BaseModel):
     file_format: Optional[str] = "wav"
     file_size: Optional[int] = None
     checksum: Optional[str] = None
+    fingerprint: Optional[str] = None
     record_time: Optional[datetime] = None
     record_duration: Optional[float] = None
     fs: Optional[int] = None
@@ -42,6 +43,7 @@ class AudioUpdate(BaseModel):
     file_format: Optional[str] = None
     file_size: Optional[int] = None
     checksum: Optional[str] = None
+    fingerprint: Optional[str] = None
     record_time: Optional[datetime] = None
     record_duration: Optional[float] = None
     fs: Optional[int] = None
@@ -55,6 +57,7 @@ class AudioUpdate(BaseModel):
 
 class AudioResponse(AudioBase):
     id: int
+    duplicate_of_id: Optional[int] = None
     updated_at: Optional[datetime] = None
 
     model_config = ConfigDict(from_attributes=True)
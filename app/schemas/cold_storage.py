@@ -0,0 +1,47 @@
+from pydantic import BaseModel, Field
+
+from app.core.config import settings
+
+
+class ColdStoragePolicy(BaseModel):
+    """
+    冷儲存轉存政策。
+
+    錄音時間早於 ``min_age_days`` 天前的音檔才會轉存；``require_finished``
+    為 true 時只處理已結案 (``is_finished``) 的專案。
+    """
+
+    min_age_days: int = Field(
+        default_factory=lambda: settings.cold_storage_min_age_days, ge=0
+    )
+    require_finished: bool = True
+    project_id: int | None = None
+    deployment_id: int | None = None
+    limit: int | None = Field(None, gt=0)
+
+
+class ColdStoragePreview(BaseModel):
+    files: int
+    bytes: int
+
+
+class ColdStorageRunResponse(BaseModel):
+    message: str
+    files: int
+    bytes: int
+    job_id: int
+
+
+class ColdRestoreRequest(BaseModel):
+    audio_ids: list[int] = Field(..., min_length=1, max_length=10000)
+
+
+class ColdRestoreResponse(BaseModel):
+    message: str
+    queued: int
+    pending: int
+
+
+class ColdRestoreQueueStatus(BaseModel):
+    pending: int
+    in_progress: int | None = None
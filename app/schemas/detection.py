@@ -0,0 +1,101 @@
+from datetime import date, datetime, timedelta, timezone
+from typing import Literal
+
+from pydantic import (
+    BaseModel,
+    ConfigDict,
+    Field,
+    field_serializer,
+    field_validator,
+    model_validator,
+)
+
+from app.enums.enums import CetaceanCallType, CetaceanSpecies, DetectionMethod
+
+
+class DetectionBase(BaseModel):
+    deployment_id: int
+    audio_id: int | None = None
+    start_time: datetime
+    end_time: datetime
+    freq_min: float | None = Field(None, ge=0)
+    freq_max: float | None = Field(None, ge=0)
+    method: DetectionMethod = DetectionMethod.MANUAL
+    species: CetaceanSpecies = CetaceanSpecies.UNKNOWN
+    call_type: CetaceanCallType = CetaceanCallType.UNKNOWN
+    confidence: float | None = Field(None, ge=0, le=1)
+
+    @field_validator("start_time", "end_time")
+    @classmethod
+    def set_timezone(cls, v: datetime) -> datetime:
+        if v.tzinfo is None:
+            # 如果時間沒有時區資訊，預設加上台灣時區 (UTC+8)
+            return v.replace(tzinfo=timezone(timedelta(hours=8)))
+        return v
+
+    @model_validator(mode="after")
+    def check_bounds(self):
+        if self.end_time < self.start_time:
+            raise ValueError("end_time must not be earlier than start_time")
+        if (
+            self.freq_min is not None
+            and self.freq_max is not None
+            and self.freq_max < self.freq_min
+        ):
+            raise ValueError("freq_max must not be lower than freq_min")
+        return self
+
+
+class DetectionCreate(DetectionBase):
+    pass
+
+
+class DetectionResponse(DetectionBase):
+    id: int
+    created_by: int | None = None
+    created_at: datetime | None = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+    @field_serializer("start_time", "end_time", "created_at")
+    def serialize_dt(self, dt: datetime | None, _info):
+        if dt is None:
+            return None
+        return dt.astimezone(timezone(timedelta(hours=8)))
+
+
+class DetectionBulkResponse(BaseModel):
+    deployment_id: int
+    inserted: int
+
+
+class DetectionCount(BaseModel):
+    bucket: datetime
+    species: int | None = None
+    call_type: int | None = None
+    count: int
+
+    @field_serializer("bucket")
+    def serialize_dt(self, dt: datetime, _info):
+        return dt.astimezone(timezone(timedelta(hours=8)))
+
+
+class DetectionCountResponse(BaseModel):
+    deployment_id: int
+    interval: Literal["hour", "day"]
+    counts: list[DetectionCount]
+
+
+class DetectionHeatmapResponse(BaseModel):
+    """
+    (日期 x 小時) 偵測分鐘矩陣，皆為 ``[len(dates)][24]``，時間為 UTC+8。
+
+    ``ratio`` = ``positive_minutes / recorded_minutes``，該小時沒有錄音時為 None。
+    """
+
+    point_id: int
+    dates: list[date]
+    hours: list[int]
+    recorded_minutes: list[list[float]]
+    positive_minutes: list[list[int]]
+    ratio: list[list[float | None]]
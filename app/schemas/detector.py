@@ -0,0 +1,29 @@
+from pydantic import BaseModel, Field, model_validator
+
+
+class EnergyDetectorParams(BaseModel):
+    """頻帶能量偵測器參數；秒數皆相對於音檔開頭。"""
+
+    fmin: float = Field(..., ge=0)
+    fmax: float = Field(..., gt=0)
+    threshold_db: float = Field(10.0, gt=0)
+    nfft: int = Field(1024, ge=64, le=16384)
+    noise_window: float = Field(30.0, gt=0)
+    min_duration: float = Field(0.1, ge=0)
+    max_gap: float = Field(0.1, ge=0)
+    channel: int = Field(0, ge=0)
+
+    @model_validator(mode="after")
+    def check_band(self):
+        if self.fmax <= self.fmin:
+            raise ValueError("fmax must be greater than fmin")
+        if self.nfft & (self.nfft - 1):
+            raise ValueError("nfft must be a power of two")
+        return self
+
+
+class EnergyDetectorRunResponse(BaseModel):
+    message: str
+    deployment_id: int
+    params_hash: str
+    job_id: int
@@ -0,0 +1,27 @@
+from typing import Literal
+
+from pydantic import BaseModel
+
+DuplicateKey = Literal["checksum", "fingerprint"]
+DuplicatePolicy = Literal["reject", "link", "allow"]
+
+
+class DuplicateGroup(BaseModel):
+    """內容相同的一組音檔；``audio_ids`` 依 id 排序，第一筆為最早登錄者。"""
+
+    key: str
+    audio_ids: list[int]
+    count: int
+    total_bytes: int
+    reclaimable_bytes: int
+
+
+class DuplicateReport(BaseModel):
+    by: DuplicateKey
+    groups: list[DuplicateGroup]
+    truncated: bool
+
+
+class DuplicateScanResponse(BaseModel):
+    message: str
+    job_id: int
@@ -0,0 +1,31 @@
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+from pydantic import BaseModel, ConfigDict, field_serializer
+
+
+class JobResponse(BaseModel):
+    id: int
+    job_type: str
+    status: str
+    priority: int
+    attempts: int
+    max_attempts: int
+    progress_current: int | None = None
+    progress_total: int | None = None
+    cancel_requested: bool = False
+    result: Any = None
+    last_error: str | None = None
+    created_by: int | None = None
+    created_at: datetime | None = None
+    run_after: datetime | None = None
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+    @field_serializer("created_at", "run_after", "started_at", "finished_at")
+    def serialize_dt(self, dt: datetime | None, _info):
+        if dt is None:
+            return None
+        return dt.astimezone(timezone(timedelta(hours=8)))
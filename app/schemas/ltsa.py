@@ -0,0 +1,48 @@
+from datetime import datetime
+
+from pydantic import BaseModel
+
+
+class LtsaManifest(BaseModel):
+    deployment_id: int
+    build_id: str
+    t0: datetime
+    bin_seconds: float
+    nfft: int
+    fs: int | None = None
+    n_freq: int
+    freq_step: float | None = None
+    tile_bins: int
+    n_levels: int
+    n_bins: int
+    files_processed: int
+    files_skipped: int
+    dropped_frames: int = 0
+    built_at: datetime
+
+
+class LtsaWindowResponse(BaseModel):
+    """
+    LTSA 視窗資料。
+
+    ``data[t][f]`` 為 dB re 1 FS²/Hz，沒有錄音的 bin 為 null。
+    以 ``format=f16`` 請求時改以 little-endian float16 二進位回傳，
+    其餘欄位放在 ``X-LTSA-*`` header。
+    """
+
+    deployment_id: int
+    level: int
+    start_time: datetime
+    bin_seconds: float
+    # 建置時取不到取樣率的 LTSA 沒有頻率軸
+    freq_min: float | None = None
+    freq_step: float | None = None
+    n_time: int
+    n_freq: int
+    data: list[list[float | None]]
+
+
+class LtsaBuildResponse(BaseModel):
+    message: str
+    deployment_id: int
+    job_id: int
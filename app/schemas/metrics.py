@@ -0,0 +1,17 @@
+from pydantic import BaseModel
+
+
+class PoolStats(BaseModel):
+    name: str
+    size: int
+    capacity: int | None
+    checked_out: int
+    checked_in: int
+    overflow: int
+    saturation: float | None
+    checkouts: int
+    timeouts: int
+    wait_seconds_total: float
+    wait_seconds_max: float
+    # histogram 上界 (秒) -> 該區間的 checkout 次數，非累計
+    wait_buckets: dict[str, int]
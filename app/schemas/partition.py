@@ -0,0 +1,23 @@
+from datetime import datetime
+
+from pydantic import BaseModel
+
+
+class AudioPartition(BaseModel):
+    name: str
+    start: datetime | None
+    end: datetime | None
+    is_default: bool
+    rows: int | None
+    bytes: int
+
+
+class AudioPartitionArchive(BaseModel):
+    """結束時間不晚於 ``before`` 的分區會被 detach 並移到封存 schema。"""
+
+    before: datetime
+
+
+class AudioPartitionChange(BaseModel):
+    message: str
+    partitions: list[str]
@@ -0,0 +1,27 @@
+from pydantic import BaseModel
+
+
+class PeaksResponse(BaseModel):
+    """
+    波形 peak 資料。
+
+    ``min`` / ``max`` / ``rms`` 皆為 ``[n_blocks][channels]``，以滿刻度 1.0
+    表示；第 i 個 block 起點為 ``(start_block + i) * block_size / fs`` 秒。
+    """
+
+    audio_id: int
+    level: int
+    fs: int
+    channels: int
+    block_size: int
+    start_block: int
+    n_blocks: int
+    min: list[list[float]]
+    max: list[list[float]]
+    rms: list[list[float]]
+
+
+class PeaksBuildResponse(BaseModel):
+    message: str
+    audio_id: int
+    job_id: int
@@ -0,0 +1,30 @@
+from datetime import datetime
+
+from pydantic import BaseModel, Field
+
+from app.core.config import settings
+
+
+class RetentionPolicy(BaseModel):
+    """軟刪除超過 ``retention_days`` 天的資料會被永久刪除。"""
+
+    retention_days: int = Field(
+        default_factory=lambda: settings.soft_delete_retention_days, ge=1
+    )
+    max_roots: int | None = Field(None, gt=0)
+
+
+class RetentionPreview(BaseModel):
+    retention_days: int
+    cutoff: datetime
+    projects: int
+    points: int
+    deployments: int
+    audios: int
+    bytes: int
+    cold_bytes: int
+
+
+class RetentionRunResponse(RetentionPreview):
+    message: str
+    job_id: int
@@ -0,0 +1,180 @@
+"""Per-minute soundscape indices (ACI, ADI, H, NDSI, SPL) for a deployment."""
+
+import math
+from collections.abc import Callable
+from concurrent.futures import Executor
+from datetime import datetime, timedelta
+
+from fastapi import HTTPException, status
+from sqlalchemy import delete, insert
+from sqlalchemy.orm import Session
+
+from app.core.minio import get_s3_client
+from app.models.acoustic_index import AcousticIndexMinute
+from app.models.audio import AudioInfo
+from app.models.deployment import DeploymentInfo
+from app.schemas.acoustic_index import AcousticIndexParams
+from app.services.analysis_run_service import AnalysisRunService
+from app.services.audio_reader import AudioObjectReader
+from app.services.deployment_service import DeploymentService
+from app.utils.acoustic_indices import compute_indices
+from app.utils.dsp import rfft_freqs, stft_power
+from app.utils.time_utils import as_aware
+
+ACOUSTIC_INDICES = "acoustic-indices"
+INDEX_FIELDS = ("aci", "adi", "h", "ndsi", "spl")
+INDEX_MINUTE_SECONDS = 60
+# 檔尾不足此秒數的片段不計算，避免極短片段的指數失真
+INDEX_MIN_SECONDS = 10.0
+# 單次查詢最多回傳的分鐘數 (約 90 天)
+INDEX_MAX_ROWS = 131_072
+
+
+def calibration_db(deployment: DeploymentInfo) -> float | None:
+    """
+    數位滿刻度到 dB re 1 µPa 的換算量。
+
+    sensitivity 為水下麥克風靈敏度 (dB re 1 V/µPa，通常為負值)，
+    gain 為前級增益 (dB)；未設定 sensitivity 時無法換算。
+    """
+    if deployment.sensitivity is None:
+        return None
+    return -deployment.sensitivity - (deployment.gain or 0.0)
+
+
+def compute_file_indices(
+    bucket: str, key: str, file_size: int | None, options: dict
+) -> list[tuple]:
+    """
+    在 worker 程序中計算單一音檔每分鐘的聲景指數。
+
+    音檔以一次 Range GET 串流、每次解碼一分鐘，每分鐘只做一次 STFT，
+    所有指數都由同一個頻譜計算。回傳 ``(offset_s, duration_s, aci, adi,
+    h, ndsi, spl)``。
+    """
+    reader = AudioObjectReader(get_s3_client(), bucket, key, file_size)
+    wav = reader.header
+    channel = options["channel"]
+    if channel >= wav.channels:
+        raise ValueError(f"Audio has only {wav.channels} channel(s)")
+
+    nfft = options["nfft"]
+    freqs = rfft_freqs(nfft, wav.fs)
+    minute_frames = INDEX_MINUTE_SECONDS * wav.fs
+    results = []
+    offset = 0
+    for block in reader.iter_blocks(minute_frames):
+        duration = len(block) / wav.fs
+        if duration >= INDEX_MIN_SECONDS:
+            _, psd = stft_power(block[:, channel], wav.fs, nfft)
+            indices = compute_indices(
+                psd,
+                freqs,
+                calibration_db=options["calibration_db"],
+                adi_fmax=options["adi_fmax"],
+                adi_step=options["adi_step"],
+                adi_threshold_db=options["adi_threshold_db"],
+            )
+            results.append(
+                (offset / wav.fs, duration, *(indices[k] for k in INDEX_FIELDS))
+            )
+        offset += len(block)
+    return results
+
+
+def _finite(value: float | None) -> float | None:
+    if value is None or not math.isfinite(value):
+        return None
+    return float(value)
+
+
+class AcousticIndexService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def run_deployment(
+        self,
+        deployment_id: int,
+        params: AcousticIndexParams,
+        executor: Executor | None = None,
+        max_workers: int | None = None,
+        progress: Callable[[int, int], None] | None = None,
+    ) -> dict:
+        """
+        對 deployment 內所有音檔計算每分鐘聲景指數。
+
+        校正量 (sensitivity / gain) 也列入參數雜湊，修改 Deployment 校正值
+        後重跑會重新計算；相同參數重跑時跳過已處理的檔案。
+        """
+        deployment = DeploymentService(self.db).get_deployment_details(deployment_id)
+        options = {**params.model_dump(), "calibration_db": calibration_db(deployment)}
+
+        def store(audio: AudioInfo, minutes) -> int:
+            # 以新參數重算時取代該音檔先前的結果
+            self.db.execute(
+                delete(AcousticIndexMinute).where(
+                    AcousticIndexMinute.audio_id == audio.id
+                )
+            )
+            rows = [
+                {
+                    "deployment_id": deployment_id,
+                    "audio_id": audio.id,
+                    "minute_time": audio.record_time + timedelta(seconds=offset),
+                    "duration": duration,
+                    **{
+                        k: _finite(v) for k, v in zip(INDEX_FIELDS, values, strict=True)
+                    },
+                }
+                for offset, duration, *values in minutes
+            ]
+            if rows:
+                self.db.execute(insert(AcousticIndexMinute), rows)
+            return len(rows)
+
+        return AnalysisRunService(self.db).run(
+            ACOUSTIC_INDICES,
+            deployment,
+            options,
+            compute_file_indices,
+            store,
+            executor=executor,
+            max_workers=max_workers,
+            progress=progress,
+        )
+
+    def get_indices(self, deployment_id: int, start: datetime, end: datetime) -> dict:
+        """以 (deployment_id, minute_time) 索引取出時間視窗內的每分鐘指數。"""
+        start, end = as_aware(start), as_aware(end)
+        if end <= start:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="end must be later than start",
+            )
+        DeploymentService(self.db).get_deployment(deployment_id)
+        rows = (
+            self.db.query(
+                AcousticIndexMinute.minute_time,
+                AcousticIndexMinute.duration,
+                *(getattr(AcousticIndexMinute, k) for k in INDEX_FIELDS),
+            )
+            .filter(
+                AcousticIndexMinute.deployment_id == deployment_id,
+                AcousticIndexMinute.minute_time >= start,
+                AcousticIndexMinute.minute_time < end,
+            )
+            .order_by(AcousticIndexMinute.minute_time)
+            .limit(INDEX_MAX_ROWS + 1)
+            .all()
+        )
+        if len(rows) > INDEX_MAX_ROWS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Time window exceeds {INDEX_MAX_ROWS} minutes",
+            )
+        columns = list(zip(*rows, strict=True)) or [()] * (2 + len(INDEX_FIELDS))
+        series = dict(zip(("times", "duration", *INDEX_FIELDS), columns, strict=True))
+        return {
+            "deployment_id": deployment_id,
+            **{k: list(v) for k, v in series.items()},
+        }
@@ -0,0 +1,128 @@
+"""Resumable per-file batch analyses over the audio files of a deployment."""
+
+import hashlib
+import json
+import logging
+import multiprocessing
+from collections.abc import Callable
+from concurrent.futures import Executor, ProcessPoolExecutor, as_completed
+from typing import Any
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models.analysis import AudioAnalysisRun
+from app.models.audio import AudioInfo
+from app.models.deployment import DeploymentInfo
+
+logger = logging.getLogger(__name__)
+
+
+def params_hash(analysis: str, params: dict) -> str:
+    payload = json.dumps({"analysis": analysis, **params}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class AnalysisRunService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def pending_audios(
+        self, deployment_id: int, analysis: str, digest: str
+    ) -> list[AudioInfo]:
+        """尚未以相同參數處理過、有錄音時間且不在冷儲存的音檔。"""
+        processed = self.db.query(AudioAnalysisRun.audio_id).filter(
+            AudioAnalysisRun.analysis == analysis,
+            AudioAnalysisRun.params_hash == digest,
+        )
+        return (
+            self.db.query(AudioInfo)
+            .filter(
+                AudioInfo.deployment_id == deployment_id,
+                AudioInfo.is_deleted.is_(False),
+                AudioInfo.is_cold_storage.isnot(True),
+                AudioInfo.record_time.isnot(None),
+                AudioInfo.id.notin_(processed),
+            )
+            .order_by(AudioInfo.record_time)
+            .all()
+        )
+
+    def run(
+        self,
+        analysis: str,
+        deployment: DeploymentInfo,
+        options: dict,
+        worker: Callable[[str, str, int | None, dict], Any],
+        store: Callable[[AudioInfo, Any], int],
+        executor: Executor | None = None,
+        max_workers: int | None = None,
+        progress: Callable[[int, int], None] | None = None,
+    ) -> dict:
+        """
+        以 process pool 對 deployment 內尚未處理的音檔逐檔執行 ``worker``。
+
+        ``worker(bucket, object_key, file_size, options)`` 在 worker 程序中
+        執行，參數與回傳值都必須可 pickle；``store(audio, result)`` 在本程序
+        寫入結果並回傳筆數。每個檔案的結果與處理紀錄在同一個交易 commit，
+        因此重跑時會跳過已完成的檔案，中途失敗也不會留下半套資料。
+        """
+        bucket = deployment.point.project.name
+        digest = params_hash(analysis, options)
+        audios = self.pending_audios(deployment.id, analysis, digest)
+
+        summary = {
+            "deployment_id": deployment.id,
+            "analysis": analysis,
+            "params_hash": digest,
+            "files_pending": len(audios),
+            "files_processed": 0,
+            "files_failed": 0,
+            "results": 0,
+        }
+        own_executor = executor is None
+        if own_executor:
+            # spawn 避免 fork 到 API 程序中的連線與執行緒
+            executor = ProcessPoolExecutor(
+                max_workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        try:
+            futures = {
+                executor.submit(
+                    worker, bucket, audio.object_key, audio.file_size, options
+                ): audio
+                for audio in audios
+            }
+            for done, future in enumerate(as_completed(futures), start=1):
+                audio = futures[future]
+                try:
+                    count = store(audio, future.result())
+                    self.db.add(
+                        AudioAnalysisRun(
+                            audio_id=audio.id,
+                            analysis=analysis,
+                            params_hash=digest,
+                            result_count=count,
+                        )
+                    )
+                    self.db.commit()
+                    summary["results"] += count
+                    summary["files_processed"] += 1
+                except IntegrityError:
+                    # 另一個工作已處理過同一檔案
+                    self.db.rollback()
+                except Exception as e:
+                    self.db.rollback()
+                    summary["files_failed"] += 1
+                    logger.warning(
+                        f"{analysis} failed on audio {audio.id} "
+                        f"({audio.object_key}): {e}"
+                    )
+                if progress:
+                    progress(done, len(audios))
+        finally:
+            if own_executor:
+                executor.shutdown(cancel_futures=True)
+
+        logger.info(f"{analysis} finished: {summary}")
+        return summary
@@ -2,28 +2,60 @@ import logging
 from datetime import UTC, datetime
 
 from fastapi import HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session, joinedload
 
-from app.core.minio import get_s3_client
+from app.db.lookups import active_by_id
+from app.db.unique import find_conflict, insert_unique
 from app.models.audio import AudioInfo
 from app.models.deployment import DeploymentInfo
 from app.models.point import PointInfo
 from app.models.project import ProjectInfo
 from app.schemas.audio import AudioCreate, AudioUpdate
+from app.services.cascade_service import new_deletion_batch_id
+from app.services.duplicate_service import DuplicateAudioService
+from app.services.object_deletion_service import (
+    enqueue_object_deletions,
+    keys_pending_deletion,
+)
 
 logger = logging.getLogger(__name__)
 
+AUDIO_KEYS = (("object_key",),)
+
+
+def ensure_online(audio: AudioInfo) -> AudioInfo:
+    """已轉存到冷儲存的音檔需先還原才能讀取內容。"""
+    if audio.is_cold_storage:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Audio is in cold storage; request a restore first",
+        )
+    return audio
+
+
+def record_time_range(start: datetime | None, end: datetime | None) -> list:
+    """
+    ``record_time`` 落在 [start, end) 的條件。
+
+    audio_info 依 record_time 分區，帶上此條件的查詢只會掃描相符的分區。
+    """
+    conditions = []
+    if start is not None:
+        conditions.append(AudioInfo.record_time >= start)
+    if end is not None:
+        conditions.append(AudioInfo.record_time < end)
+    return conditions
+
 
 class AudioService:
-    def __init__(self, db: Session):
+    def __init__(self, db: Session | AsyncSession):
+        # *_async 方法需傳入 AsyncSession (get_async_db)，其餘方法使用 Session
         self.db = db
 
     def get_audio(self, audio_id: int) -> AudioInfo:
-        audio = (
-            self.db.query(AudioInfo)
-            .filter(AudioInfo.id == audio_id, AudioInfo.is_deleted.is_(False))
-            .first()
-        )
+        audio = self.db.scalars(active_by_id(AudioInfo, audio_id)).first()
         if not audio:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -50,47 +82,96 @@ class AudioService:
         return audio
 
     def get_audios(
-        self, deployment_id: int | None = None, skip: int = 0, limit: int = 100
+        self,
+        deployment_id: int | None = None,
+        skip: int = 0,
+        limit: int = 100,
+        start: datetime | None = None,
+        end: datetime | None = None,
     ) -> list[AudioInfo]:
-        query = self.db.query(AudioInfo).filter(AudioInfo.is_deleted.is_(False))
+        query = self.db.query(AudioInfo).filter(
+            AudioInfo.is_deleted.is_(False), *record_time_range(start, end)
+        )
         if deployment_id:
             query = query.filter(AudioInfo.deployment_id == deployment_id)
         return query.offset(skip).limit(limit).all()
 
-    def create_audio(self, audio_in: AudioCreate) -> AudioInfo:
-        # Check if object_key exists (unique constraint)
-        if (
-            self.db.query(AudioInfo)
-            .filter(
-                AudioInfo.object_key == audio_in.object_key,
-                AudioInfo.is_deleted.is_(False),
-            )
-            .first()
-        ):
+    async def get_audio_async(self, audio_id: int) -> AudioInfo:
+        audio = await self.db.scalar(active_by_id(AudioInfo, audio_id))
+        if not audio:
             raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Audio with this object_key already exists",
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Audio not found",
             )
+        return audio
 
-        # Check if object_key is reserved by a soft-deleted audio
-        if (
-            self.db.query(AudioInfo)
-            .filter(
-                AudioInfo.object_key == audio_in.object_key,
-                AudioInfo.is_deleted.is_(True),
+    async def get_audio_details_async(self, audio_id: int) -> AudioInfo:
+        audio = await self.db.scalar(
+            select(AudioInfo)
+            .options(
+                joinedload(AudioInfo.deployment)
+                .joinedload(DeploymentInfo.point)
+                .joinedload(PointInfo.project),
+                joinedload(AudioInfo.deployment).joinedload(DeploymentInfo.recorder),
             )
-            .first()
-        ):
+            .where(AudioInfo.id == audio_id, AudioInfo.is_deleted.is_(False))
+        )
+        if not audio:
             raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="object_key reserved by deleted audio. Hard delete to release.",
+                status_code=status.HTTP_404_NOT_FOUND, detail="Audio not found"
             )
+        return audio
+
+    async def get_audios_async(
+        self,
+        deployment_id: int | None = None,
+        skip: int = 0,
+        limit: int = 100,
+        start: datetime | None = None,
+        end: datetime | None = None,
+    ) -> list[AudioInfo]:
+        query = select(AudioInfo).where(
+            AudioInfo.is_deleted.is_(False), *record_time_range(start, end)
+        )
+        if deployment_id:
+            query = query.where(AudioInfo.deployment_id == deployment_id)
+        return list(await self.db.scalars(query.offset(skip).limit(limit)))
+
+    def create_audio(
+        self, audio_in: AudioCreate, on_duplicate: str | None = None
+    ) -> AudioInfo:
+        # 以 checksum / 指紋索引查詢重複內容，依政策拒絕或標記
+        duplicate_of_id = DuplicateAudioService(self.db).check_registration(
+            audio_in, on_duplicate
+        )
 
-        audio_data = audio_in.model_dump()
-        db_obj = AudioInfo(**audio_data)
-        self.db.add(db_obj)
+        # object_key 的唯一性由 audio_object_key_active 的 trigger 維護，
+        # 與軟刪除保留一併交由單一 INSERT 判斷
+        audio_data = {**audio_in.model_dump(), "duplicate_of_id": duplicate_of_id}
+        db_obj = insert_unique(self.db, AudioInfo, audio_data, AUDIO_KEYS)
+        if db_obj is None:
+            _, reserved = find_conflict(self.db, AudioInfo, audio_data, AUDIO_KEYS)
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=(
+                    "object_key reserved by deleted audio. Hard delete to release."
+                    if reserved
+                    else "Audio with this object_key already exists"
+                ),
+            )
+        bucket = self.db.scalar(
+            select(ProjectInfo.name)
+            .join(PointInfo, PointInfo.project_id == ProjectInfo.id)
+            .join(DeploymentInfo, DeploymentInfo.point_id == PointInfo.id)
+            .where(DeploymentInfo.id == db_obj.deployment_id)
+        )
+        if keys_pending_deletion(self.db, bucket, [db_obj.object_key]):
+            self.db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="object_key still being deleted from storage. Retry later.",
+            )
         self.db.commit()
-        self.db.refresh(db_obj)
         return db_obj
 
     def update_audio(self, audio_id: int, audio_in: AudioUpdate) -> AudioInfo:
@@ -110,6 +191,7 @@ class AudioService:
         audio.is_deleted = True
         audio.deleted_at = datetime.now(UTC)
         audio.deleted_by = user_id
+        audio.deletion_batch_id = new_deletion_batch_id()
         self.db.add(audio)
         self.db.commit()
         self.db.refresh(audio)
@@ -141,6 +223,7 @@ class AudioService:
         audio.is_deleted = False
         audio.deleted_at = None
         audio.deleted_by = None
+        audio.deletion_batch_id = None
         self.db.add(audio)
         self.db.commit()
         self.db.refresh(audio)
@@ -151,9 +234,9 @@ class AudioService:
         永久刪除單一 Audio。
 
         包含：
-        - 刪除 MinIO 物件
+        - 將 MinIO 物件排入刪除 outbox (由 worker 清除)
         - 刪除資料庫記錄
-        - 釋放 object_key，可重新使用
+        - outbox 清空後釋放 object_key，可重新使用
         """
         # 查詢 Audio (包含已軟刪除)
         audio = self.db.query(AudioInfo).filter(AudioInfo.id == audio_id).first()
@@ -196,12 +279,8 @@ class AudioService:
             )
         bucket_name = project.name
 
-        # 刪除 MinIO 物件
-        s3_client = get_s3_client()
-        try:
-            s3_client.delete_object(Bucket=bucket_name, Key=audio.object_key)
-        except Exception as e:
-            logger.warning(f"Failed to delete object {audio.object_key}: {e}")
+        # MinIO 物件 (含冷儲存副本) 寫入 outbox，與 DB 刪除同一交易提交
+        enqueue_object_deletions(self.db, bucket_name, AudioInfo.id == audio_id)
 
         # 刪除 DB 記錄
         self.db.query(AudioInfo).filter(AudioInfo.id == audio_id).delete()
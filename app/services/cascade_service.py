@@ -0,0 +1,205 @@
+"""Batched cascade soft/hard delete and deletion-batch restore for the project tree."""
+
+import logging
+import time
+import uuid
+from collections.abc import Callable
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.audio import AudioInfo
+from app.services.object_deletion_service import enqueue_object_deletions
+from app.utils.rate_limit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+
+def new_deletion_batch_id() -> str:
+    return uuid.uuid4().hex
+
+
+def deleted_values(user_id: int, deleted_at, deletion_batch_id: str) -> dict:
+    return {
+        "is_deleted": True,
+        "deleted_at": deleted_at,
+        "deleted_by": user_id,
+        "deletion_batch_id": deletion_batch_id,
+    }
+
+
+def soft_delete_audios(
+    db: Session,
+    deployment_ids,
+    values: dict,
+    batch_size: int | None = None,
+    progress: Callable[[int, int | None], None] | None = None,
+    clock=time.monotonic,
+) -> dict:
+    """
+    以固定大小的批次軟刪除 ``deployment_ids`` (子查詢) 底下的音檔。
+
+    每批以 keyset (``id > last_id ORDER BY id LIMIT n``) 選出尚未刪除的列，
+    更新後立即 commit，列鎖只持有一個批次的時間，WAL 也分散寫入。
+    只處理 ``is_deleted = false`` 的列，中途失敗後重新執行會從剩下的部分繼續；
+    ``deployment_ids`` 應只包含仍為刪除狀態的 deployment，父層在執行期間
+    被還原時剩餘的批次就不會再刪除任何資料。
+
+    回傳處理筆數、批次數、吞吐量與每批持鎖時間 (毫秒)。
+    """
+    batch_size = batch_size or settings.cascade_delete_batch_size
+    pending = (
+        AudioInfo.deployment_id.in_(deployment_ids),
+        AudioInfo.is_deleted.is_(False),
+    )
+    total = db.execute(select(func.count(AudioInfo.id)).where(*pending)).scalar()
+    db.commit()
+    if progress:
+        progress(0, total)
+
+    done = batches = 0
+    last_id = 0
+    max_lock = total_lock = 0.0
+    started = clock()
+    while True:
+        batch = (
+            select(AudioInfo.id)
+            .where(*pending, AudioInfo.id > last_id)
+            .order_by(AudioInfo.id)
+            .limit(batch_size)
+            .scalar_subquery()
+        )
+        batch_start = clock()
+        ids = (
+            db.execute(
+                update(AudioInfo)
+                .where(AudioInfo.id.in_(batch))
+                .values(values)
+                .returning(AudioInfo.id)
+                .execution_options(synchronize_session=False)
+            )
+            .scalars()
+            .all()
+        )
+        db.commit()
+        lock_seconds = clock() - batch_start
+        if not ids:
+            break
+
+        batches += 1
+        done += len(ids)
+        last_id = max(ids)
+        max_lock = max(max_lock, lock_seconds)
+        total_lock += lock_seconds
+        logger.debug(
+            f"Soft-deleted batch of {len(ids)} audios up to id {last_id} "
+            f"in {lock_seconds * 1000:.0f} ms"
+        )
+        if progress:
+            progress(done, max(total, done))
+
+    elapsed = clock() - started
+    stats = {
+        "audios": done,
+        "batches": batches,
+        "seconds": round(elapsed, 3),
+        "rows_per_second": round(done / elapsed, 1) if elapsed > 0 else None,
+        "max_lock_ms": round(max_lock * 1000, 1),
+        "avg_lock_ms": round(total_lock * 1000 / batches, 1) if batches else 0.0,
+    }
+    logger.info(f"Cascade soft delete finished: {stats}")
+    return stats
+
+
+def restore_deletion_batch(
+    db: Session,
+    deletion_batch_id: str | None,
+    models,
+    batch_size: int | None = None,
+    progress: Callable[[int, int | None], None] | None = None,
+) -> dict[str, int]:
+    """
+    依序還原 ``models`` 中由同一次刪除操作標記的列。
+
+    以 ``deletion_batch_id`` 的部分索引找出資料，每批最多 ``batch_size`` 列、
+    各自 commit。還原的列會清掉 batch id，因此重新執行只會處理剩下的列；
+    父層應在子層全部還原後才還原，中途失敗時可再次執行。
+    每批之後以累計筆數呼叫 ``progress``。回傳各資料表還原的筆數。
+    """
+    batch_size = batch_size or settings.cascade_delete_batch_size
+    restored = {}
+    if deletion_batch_id is None:
+        return restored
+    done = 0
+    for model in models:
+        count = 0
+        while True:
+            batch = (
+                select(model.id)
+                .where(model.deletion_batch_id == deletion_batch_id)
+                .limit(batch_size)
+                .scalar_subquery()
+            )
+            rows = db.execute(
+                update(model)
+                .where(model.id.in_(batch))
+                .values(
+                    is_deleted=False,
+                    deleted_at=None,
+                    deleted_by=None,
+                    deletion_batch_id=None,
+                )
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            db.commit()
+            count += rows
+            done += rows
+            if progress:
+                progress(done, None)
+            if rows < batch_size:
+                break
+        restored[model.__tablename__] = count
+    logger.info(f"Restored deletion batch {deletion_batch_id}: {restored}")
+    return restored
+
+
+def hard_delete_audios(
+    db: Session,
+    bucket: str,
+    audio_filter,
+    batch_size: int | None = None,
+    limiter: TokenBucket | None = None,
+) -> tuple[int, int]:
+    """
+    分批永久刪除符合 ``audio_filter`` 的音檔。
+
+    每批與 ``hard_delete_*`` 相同，先把 MinIO 物件寫入 outbox 再刪除資料列，
+    兩者一起 commit；``limiter`` 以列數限速，避免長時間佔用 I/O 與 WAL。
+    回傳 (刪除的音檔數, 排入 outbox 的物件數)。
+    """
+    batch_size = batch_size or settings.cascade_delete_batch_size
+    deleted = queued = 0
+    while True:
+        ids = (
+            db.execute(
+                select(AudioInfo.id)
+                .where(audio_filter)
+                .order_by(AudioInfo.id)
+                .limit(batch_size)
+            )
+            .scalars()
+            .all()
+        )
+        if not ids:
+            break
+        queued += enqueue_object_deletions(db, bucket, AudioInfo.id.in_(ids))
+        deleted += db.execute(
+            delete(AudioInfo)
+            .where(AudioInfo.id.in_(ids))
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.commit()
+        if limiter:
+            limiter.acquire(len(ids))
+    return deleted, queued
@@ -0,0 +1,411 @@
+"""Cold storage tiering for audio objects.
+
+Archiving streams each WAV from the project bucket once, re-encodes the
+samples as FLAC in a worker process and keeps the original RIFF framing
+(every byte before and after the sample data) in a FLAC APPLICATION block,
+so a restore rebuilds the uploaded file byte for byte. The round trip is
+verified against the SHA-256 of the original before anything is moved.
+"""
+
+import hashlib
+import itertools
+import logging
+import multiprocessing
+import struct
+import tempfile
+from collections.abc import Callable, Iterator
+from concurrent.futures import Executor, ProcessPoolExecutor, as_completed
+from datetime import UTC, datetime, timedelta
+from typing import BinaryIO
+
+from fastapi import HTTPException, status
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.minio import STREAM_CHUNK_BYTES, get_s3_client
+from app.models.audio import AudioInfo
+from app.models.deployment import DeploymentInfo
+from app.models.point import PointInfo
+from app.models.project import ProjectInfo
+from app.schemas.cold_storage import ColdStoragePolicy
+from app.utils.flac import (
+    FLAC_MAX_APPLICATION_BYTES,
+    FLAC_SUPPORTED_BITS,
+    FlacDecoder,
+    FlacEncoder,
+)
+from app.utils.rate_limit import TokenBucket
+from app.utils.wav_utils import (
+    WAV_HEADER_PROBE_BYTES,
+    WAVE_FORMAT_PCM,
+    WavFormatError,
+    int_to_pcm,
+    iter_frame_chunks,
+    parse_wav_header,
+    pcm_to_int,
+)
+
+logger = logging.getLogger(__name__)
+
+# FLAC APPLICATION block：原始 WAV 的 SHA-256、資料區前後的 byte 數與內容
+COLD_APPLICATION_ID = b"OSAB"
+_RIFF_FRAMING = struct.Struct(">32sII")
+# AudioInfo.meta_json 中記錄冷儲存位置的 key
+COLD_META_KEY = "cold_storage"
+S3_DELETE_BATCH = 1000
+# 還原工作的優先序 (越小越先執行)：隨選還原排在批次還原之前
+RESTORE_PRIORITY_ON_DEMAND = 0
+RESTORE_PRIORITY_BATCH = 5
+
+
+class ColdStorageError(RuntimeError):
+    """Raised when an archive or restore round trip does not verify."""
+
+
+def _hashed(chunks, digest) -> Iterator[bytes]:
+    for chunk in chunks:
+        digest.update(chunk)
+        yield chunk
+
+
+def _flac_parts(fp: BinaryIO) -> tuple[bytes, Iterator[bytes]]:
+    """Original SHA-256 and the byte stream of the WAV stored in a FLAC file."""
+    decoder = FlacDecoder(fp)
+    payload = decoder.applications.get(COLD_APPLICATION_ID)
+    if payload is None:
+        raise ColdStorageError("FLAC object has no RIFF framing block")
+    sha256, prefix_len, suffix_len = _RIFF_FRAMING.unpack_from(payload)
+    framing = payload[_RIFF_FRAMING.size :]
+
+    def parts():
+        yield framing[:prefix_len]
+        for block in decoder.iter_blocks():
+            yield int_to_pcm(block, decoder.bits)
+        yield framing[prefix_len : prefix_len + suffix_len]
+
+    return sha256, parts()
+
+
+def _encode_flac(tmp: BinaryIO, stream, header, size: int, digest) -> None:
+    data_end = header.data_offset + header.data_size
+    prefix, suffix = bytearray(), bytearray()
+    encoder = FlacEncoder(tmp, header.fs, header.channels, header.bits_per_sample)
+
+    def samples():
+        pos = 0
+        for chunk in stream:
+            start, pos = pos, pos + len(chunk)
+            if start < header.data_offset:
+                prefix.extend(chunk[: header.data_offset - start])
+            lo, hi = max(start, header.data_offset), min(pos, data_end)
+            if lo < hi:
+                yield chunk[lo - start : hi - start]
+            if pos > data_end:
+                suffix.extend(chunk[max(start, data_end) - start :])
+
+    for raw in iter_frame_chunks(samples(), header.block_align):
+        encoder.write(pcm_to_int(raw, header))
+    if len(prefix) + len(suffix) != header.data_offset + size - data_end:
+        raise ColdStorageError("Object size changed while archiving")
+    encoder.applications[COLD_APPLICATION_ID] = (
+        _RIFF_FRAMING.pack(digest.digest(), len(prefix), len(suffix))
+        + bytes(prefix)
+        + bytes(suffix)
+    )
+    encoder.close()
+
+
+def archive_object(bucket: str, key: str, cold_bucket: str, cold_prefix: str) -> dict:
+    """
+    在 worker 程序中把一個音檔轉存到冷儲存。
+
+    整數 PCM WAV 轉成 FLAC，解碼驗證與原檔 SHA-256 相同後才上傳；
+    其他格式原樣複製。回傳寫入 ``meta_json`` 的冷儲存紀錄。
+    """
+    s3 = get_s3_client()
+    response = s3.get_object(Bucket=bucket, Key=key)
+    size = response["ContentLength"]
+    body = response["Body"]
+    digest = hashlib.sha256()
+    chunks = body.iter_chunks(STREAM_CHUNK_BYTES)
+    try:
+        head = b""
+        for chunk in chunks:
+            head += chunk
+            if len(head) >= WAV_HEADER_PROBE_BYTES:
+                break
+        try:
+            header = parse_wav_header(head[:WAV_HEADER_PROBE_BYTES], size)
+        except WavFormatError:
+            header = None
+        framing = size - (header.data_size if header else 0)
+        as_flac = (
+            header is not None
+            and header.format_tag == WAVE_FORMAT_PCM
+            and header.bits_per_sample in FLAC_SUPPORTED_BITS
+            and header.channels <= 8
+            and framing + _RIFF_FRAMING.size <= FLAC_MAX_APPLICATION_BYTES
+        )
+        stream = _hashed(itertools.chain([head], chunks), digest)
+
+        with tempfile.TemporaryFile() as tmp:
+            if as_flac:
+                _encode_flac(tmp, stream, header, size, digest)
+                tmp.seek(0)
+                stored, parts = _flac_parts(tmp)
+                check = hashlib.sha256()
+                for part in parts:
+                    check.update(part)
+                if not stored == check.digest() == digest.digest():
+                    raise ColdStorageError(f"FLAC round trip mismatch for {key}")
+            else:
+                for chunk in stream:
+                    tmp.write(chunk)
+
+            fmt = "flac" if as_flac else "wav"
+            cold_key = f"{cold_prefix}.{fmt}"
+            cold_size = tmp.seek(0, 2)
+            tmp.seek(0)
+            s3.upload_fileobj(
+                tmp,
+                cold_bucket,
+                cold_key,
+                ExtraArgs={
+                    "ContentType": f"audio/{fmt}",
+                    "Metadata": {"sha256": digest.hexdigest()},
+                },
+            )
+    finally:
+        body.close()
+
+    uploaded = s3.head_object(Bucket=cold_bucket, Key=cold_key)
+    if uploaded["ContentLength"] != cold_size:
+        raise ColdStorageError(f"Cold copy of {key} is incomplete")
+    return {
+        "bucket": cold_bucket,
+        "key": cold_key,
+        "format": fmt,
+        "size": cold_size,
+        "original_size": size,
+        "sha256": digest.hexdigest(),
+        "archived_at": datetime.now(UTC).isoformat(),
+    }
+
+
+def restore_object(record: dict, bucket: str, key: str) -> int:
+    """Rebuild the original object from its cold copy and verify its SHA-256."""
+    s3 = get_s3_client()
+    expected = bytes.fromhex(record["sha256"])
+    # FLAC 解碼需要可 seek 的檔案，先把冷儲存副本下載到暫存檔
+    with tempfile.TemporaryFile() as cold, tempfile.TemporaryFile() as tmp:
+        s3.download_fileobj(record["bucket"], record["key"], cold)
+        cold.seek(0)
+        if record["format"] == "flac":
+            stored, parts = _flac_parts(cold)
+            if stored != expected:
+                raise ColdStorageError(f"Cold copy of {key} belongs to another file")
+        else:
+            parts = iter(lambda: cold.read(STREAM_CHUNK_BYTES), b"")
+
+        digest = hashlib.sha256()
+        for part in parts:
+            digest.update(part)
+            tmp.write(part)
+        if digest.digest() != expected:
+            raise ColdStorageError(f"Restored {key} does not match its checksum")
+        size = tmp.tell()
+        tmp.seek(0)
+        s3.upload_fileobj(tmp, bucket, key, ExtraArgs={"ContentType": "audio/wav"})
+    return size
+
+
+class ColdStorageService:
+    def __init__(self, db: Session, s3_client=None):
+        self.db = db
+        self.s3_client = s3_client or get_s3_client()
+
+    def _candidates(self, policy: ColdStoragePolicy):
+        cutoff = datetime.now(UTC) - timedelta(days=policy.min_age_days)
+        query = (
+            self.db.query(AudioInfo, ProjectInfo.name)
+            .join(DeploymentInfo, AudioInfo.deployment_id == DeploymentInfo.id)
+            .join(PointInfo, DeploymentInfo.point_id == PointInfo.id)
+            .join(ProjectInfo, PointInfo.project_id == ProjectInfo.id)
+            .filter(
+                AudioInfo.is_deleted.is_(False),
+                AudioInfo.is_cold_storage.isnot(True),
+                AudioInfo.record_time < cutoff,
+                ProjectInfo.is_deleted.is_(False),
+            )
+        )
+        if policy.require_finished:
+            query = query.filter(ProjectInfo.is_finished.is_(True))
+        if policy.project_id is not None:
+            query = query.filter(ProjectInfo.id == policy.project_id)
+        if policy.deployment_id is not None:
+            query = query.filter(AudioInfo.deployment_id == policy.deployment_id)
+        return query
+
+    def preview(self, policy: ColdStoragePolicy) -> dict:
+        """符合政策、尚未轉存的音檔數量與熱儲存佔用量 (dry run)。"""
+        files, size = (
+            self._candidates(policy)
+            .with_entities(
+                func.count(AudioInfo.id),
+                func.coalesce(func.sum(AudioInfo.file_size), 0),
+            )
+            .one()
+        )
+        return {"files": files, "bytes": int(size)}
+
+    def archive(
+        self,
+        policy: ColdStoragePolicy,
+        executor: Executor | None = None,
+        max_workers: int | None = None,
+        progress: Callable[[int], None] | None = None,
+    ) -> dict:
+        """
+        依政策把音檔分批轉存到冷儲存。
+
+        每批在 process pool 轉檔、驗證並上傳，成功的檔案在同一個交易中
+        設定 ``is_cold_storage``，commit 後才刪除熱儲存的物件。批次以 id
+        keyset 分頁，失敗的檔案留在熱儲存，不會在同一次執行中重試。
+        """
+        cold_bucket = settings.cold_storage_bucket
+        try:
+            self.s3_client.head_bucket(Bucket=cold_bucket)
+        except Exception:
+            self.s3_client.create_bucket(Bucket=cold_bucket)
+
+        summary = {
+            "files_archived": 0,
+            "files_failed": 0,
+            "bytes_before": 0,
+            "bytes_after": 0,
+        }
+        own_executor = executor is None
+        if own_executor:
+            # spawn 避免 fork 到 API 程序中的連線與執行緒
+            executor = ProcessPoolExecutor(
+                max_workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        last_id = 0
+        remaining = policy.limit
+        try:
+            while remaining is None or remaining > 0:
+                batch_size = settings.cold_storage_batch_size
+                if remaining is not None:
+                    batch_size = min(batch_size, remaining)
+                batch = (
+                    self._candidates(policy)
+                    .filter(AudioInfo.id > last_id)
+                    .order_by(AudioInfo.id)
+                    .limit(batch_size)
+                    .all()
+                )
+                if not batch:
+                    break
+                last_id = batch[-1][0].id
+                if remaining is not None:
+                    remaining -= len(batch)
+                self._archive_batch(batch, cold_bucket, executor, summary)
+                if progress:
+                    progress(summary["files_archived"] + summary["files_failed"])
+        finally:
+            if own_executor:
+                executor.shutdown(cancel_futures=True)
+
+        logger.info(f"Cold storage archive finished: {summary}")
+        return summary
+
+    def _archive_batch(self, batch, cold_bucket: str, executor, summary: dict):
+        futures = {
+            executor.submit(
+                archive_object,
+                bucket,
+                audio.object_key,
+                cold_bucket,
+                f"{bucket}/{audio.object_key}",
+            ): (audio, bucket)
+            for audio, bucket in batch
+        }
+        moved: dict[str, list[dict]] = {}
+        for future in as_completed(futures):
+            audio, bucket = futures[future]
+            try:
+                record = future.result()
+            except Exception as e:
+                summary["files_failed"] += 1
+                logger.warning(f"Failed to archive {bucket}/{audio.object_key}: {e}")
+                continue
+            audio.is_cold_storage = True
+            audio.meta_json = {**(audio.meta_json or {}), COLD_META_KEY: record}
+            moved.setdefault(bucket, []).append({"Key": audio.object_key})
+            summary["files_archived"] += 1
+            summary["bytes_before"] += record["original_size"]
+            summary["bytes_after"] += record["size"]
+        self.db.commit()
+
+        # flag 已提交才刪除熱儲存的物件，讀取端不會看到指向不存在物件的紀錄
+        for bucket, objects in moved.items():
+            for i in range(0, len(objects), S3_DELETE_BATCH):
+                try:
+                    self.s3_client.delete_objects(
+                        Bucket=bucket,
+                        Delete={"Objects": objects[i : i + S3_DELETE_BATCH]},
+                    )
+                except Exception as e:
+                    logger.warning(f"Failed to delete hot objects in {bucket}: {e}")
+
+    def cold_audio_ids(self, audio_ids: list[int]) -> list[int]:
+        rows = (
+            self.db.query(AudioInfo.id)
+            .filter(
+                AudioInfo.id.in_(audio_ids),
+                AudioInfo.is_deleted.is_(False),
+                AudioInfo.is_cold_storage.is_(True),
+            )
+            .all()
+        )
+        return [row.id for row in rows]
+
+    def restore_audio(
+        self, audio_id: int, limiter: TokenBucket | None = None
+    ) -> AudioInfo:
+        """從冷儲存還原單一音檔到專案 bucket，驗證後清除 flag 與冷儲存副本。"""
+        row = (
+            self.db.query(AudioInfo, ProjectInfo.name)
+            .join(DeploymentInfo, AudioInfo.deployment_id == DeploymentInfo.id)
+            .join(PointInfo, DeploymentInfo.point_id == PointInfo.id)
+            .join(ProjectInfo, PointInfo.project_id == ProjectInfo.id)
+            .filter(AudioInfo.id == audio_id, AudioInfo.is_deleted.is_(False))
+            .first()
+        )
+        if not row:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Audio not found"
+            )
+        audio, bucket = row
+        if not audio.is_cold_storage:
+            return audio
+        record = (audio.meta_json or {}).get(COLD_META_KEY)
+        if not record:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Cold storage location of this audio is unknown",
+            )
+        if limiter:
+            limiter.acquire(record["original_size"])
+
+        restore_object(record, bucket, audio.object_key)
+        meta = {k: v for k, v in audio.meta_json.items() if k != COLD_META_KEY}
+        audio.is_cold_storage = False
+        audio.meta_json = meta or None
+        self.db.commit()
+        try:
+            self.s3_client.delete_object(Bucket=record["bucket"], Key=record["key"])
+        except Exception as e:
+            logger.warning(f"Failed to delete cold object {record['key']}: {e}")
+        return audio
@@ -1,32 +1,40 @@
 import logging
-from datetime import UTC, datetime, timedelta
+from datetime import UTC, datetime
 
 from fastapi import HTTPException, status
-from sqlalchemy import func
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session, joinedload
 
-from app.core.minio import get_s3_client
+from app.db.lookups import active_by_id
 from app.models.audio import AudioInfo
 from app.models.deployment import DeploymentInfo
 from app.models.point import PointInfo
 from app.models.project import ProjectInfo
 from app.schemas.deployment import DeploymentCreate, DeploymentUpdate
+from app.services.cascade_service import (
+    deleted_values,
+    new_deletion_batch_id,
+    restore_deletion_batch,
+    soft_delete_audios,
+)
+from app.services.object_deletion_service import (
+    enqueue_ltsa_deletions,
+    enqueue_object_deletions,
+)
 
 logger = logging.getLogger(__name__)
 
 
 class DeploymentService:
-    def __init__(self, db: Session):
+    def __init__(self, db: Session | AsyncSession):
+        # *_async 方法需傳入 AsyncSession (get_async_db)，其餘方法使用 Session
         self.db = db
 
     def get_deployment(self, deployment_id: int) -> DeploymentInfo:
-        deployment = (
-            self.db.query(DeploymentInfo)
-            .filter(
-                DeploymentInfo.id == deployment_id, DeploymentInfo.is_deleted.is_(False)
-            )
-            .first()
-        )
+        deployment = self.db.scalars(
+            active_by_id(DeploymentInfo, deployment_id)
+        ).first()
         if not deployment:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -59,13 +67,56 @@ class DeploymentService:
         return (
             self.db.query(DeploymentInfo)
             .filter(
-                DeploymentInfo.point_id == point_id, DeploymentInfo.is_deleted.is_(False)
+                DeploymentInfo.point_id == point_id,
+                DeploymentInfo.is_deleted.is_(False),
             )
             .offset(skip)
             .limit(limit)
             .all()
         )
 
+    async def get_deployment_async(self, deployment_id: int) -> DeploymentInfo:
+        deployment = await self.db.scalar(active_by_id(DeploymentInfo, deployment_id))
+        if not deployment:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Deployment not found",
+            )
+        return deployment
+
+    async def get_deployment_details_async(self, deployment_id: int) -> DeploymentInfo:
+        deployment = await self.db.scalar(
+            select(DeploymentInfo)
+            .options(
+                joinedload(DeploymentInfo.point).joinedload(PointInfo.project),
+                joinedload(DeploymentInfo.recorder),
+            )
+            .where(
+                DeploymentInfo.id == deployment_id, DeploymentInfo.is_deleted.is_(False)
+            )
+        )
+        if not deployment:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Deployment not found",
+            )
+        return deployment
+
+    async def get_deployments_async(
+        self, point_id: int, skip: int = 0, limit: int = 100
+    ) -> list[DeploymentInfo]:
+        return list(
+            await self.db.scalars(
+                select(DeploymentInfo)
+                .where(
+                    DeploymentInfo.point_id == point_id,
+                    DeploymentInfo.is_deleted.is_(False),
+                )
+                .offset(skip)
+                .limit(limit)
+            )
+        )
+
     def create_deployment(self, deployment_in: DeploymentCreate) -> DeploymentInfo:
         # Auto-calculate Phase: Max phase for this point + 1
         max_phase = (
@@ -102,33 +153,49 @@ class DeploymentService:
         return deployment
 
     def delete_deployment(self, deployment_id: int, user_id: int) -> DeploymentInfo:
-        deployment = self.get_deployment(deployment_id)
+        """
+        Soft delete a deployment.
 
-        now = datetime.now(UTC)
+        Audios under the deployment are cascaded separately in batches by
+        ``delete_deployment_audios`` (run as a background job). Nothing is
+        committed; the caller enqueues that job and commits both at once.
+        """
+        deployment = self.get_deployment(deployment_id)
 
-        # 1. Mark Deployment as deleted
         deployment.is_deleted = True
-        deployment.deleted_at = now
+        deployment.deleted_at = datetime.now(UTC)
         deployment.deleted_by = user_id
-
-        # 2. Cascade Soft Delete: Mark related Audios
-        self.db.query(AudioInfo).filter(
-            AudioInfo.deployment_id == deployment_id
-        ).update(
-            {
-                AudioInfo.is_deleted: True,
-                AudioInfo.deleted_at: now,
-                AudioInfo.deleted_by: user_id,
-            },
-            synchronize_session=False,
-        )
-
+        deployment.deletion_batch_id = new_deletion_batch_id()
         self.db.add(deployment)
-        self.db.commit()
-        self.db.refresh(deployment)
+        self.db.flush()
         return deployment
 
-    def restore_deployment(self, deployment_id: int) -> DeploymentInfo:
+    def delete_deployment_audios(
+        self,
+        deployment_id: int,
+        user_id: int,
+        deleted_at: datetime,
+        deletion_batch_id: str,
+        progress=None,
+    ) -> dict:
+        """
+        Background task to delete the live audios of a deployment, using the
+        deployment's deleted_at timestamp and deletion batch. Does nothing
+        once the deployment was restored (its batch id is cleared).
+        """
+        deployment_ids_sub = select(DeploymentInfo.id).where(
+            DeploymentInfo.id == deployment_id,
+            DeploymentInfo.deletion_batch_id == deletion_batch_id,
+        )
+        return soft_delete_audios(
+            self.db,
+            deployment_ids_sub,
+            deleted_values(user_id, deleted_at, deletion_batch_id),
+            progress=progress,
+        )
+
+    def validate_restore(self, deployment_id: int) -> DeploymentInfo:
+        """Return the (possibly deleted) deployment, or raise if it cannot be restored."""
         deployment = (
             self.db.query(DeploymentInfo)
             .filter(DeploymentInfo.id == deployment_id)
@@ -156,30 +223,37 @@ class DeploymentService:
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Active deployment with this phase already exists for the point. Cannot restore.",
             )
+        return deployment
 
-        # Cascade Restore Logic
-        # Only restore child records deleted at the same time as parent
-        update_values = {
-            "is_deleted": False,
-            "deleted_at": None,
-            "deleted_by": None,
-        }
-
-        # Time threshold: only restore records deleted within 5 seconds of parent
-        deleted_at = deployment.deleted_at
-        time_min = deleted_at - timedelta(seconds=5)
-        time_max = deleted_at + timedelta(seconds=5)
+    def restore_deployment(
+        self,
+        deployment_id: int,
+        deletion_batch_id: str | None = None,
+        progress=None,
+    ) -> DeploymentInfo:
+        """
+        Restore a deployment and the audios deleted with it (run as a
+        background job), restoring the deployment itself last. With
+        ``deletion_batch_id`` nothing happens unless the deployment is still
+        deleted by that batch.
+        """
+        deployment = self.validate_restore(deployment_id)
+        if (
+            deletion_batch_id is not None
+            and deployment.deletion_batch_id != deletion_batch_id
+        ):
+            return deployment
 
-        # 1. Cascade to Audios (Children)
-        self.db.query(AudioInfo).filter(
-            AudioInfo.deployment_id == deployment_id,
-            AudioInfo.deleted_at >= time_min,
-            AudioInfo.deleted_at <= time_max,
-        ).update(update_values, synchronize_session=False)
+        # Cascade Restore Logic
+        # Only restore audios stamped by the same delete operation as the deployment
+        restore_deletion_batch(
+            self.db, deployment.deletion_batch_id, (AudioInfo,), progress=progress
+        )
 
         deployment.is_deleted = False
         deployment.deleted_at = None
         deployment.deleted_by = None
+        deployment.deletion_batch_id = None
         self.db.add(deployment)
         self.db.commit()
         self.db.refresh(deployment)
@@ -190,7 +264,7 @@ class DeploymentService:
         永久刪除 Deployment 及所有相關資料。
 
         包含：
-        - 刪除 MinIO 中該 Deployment 下的所有物件
+        - 將 MinIO 中該 Deployment 下的所有物件排入刪除 outbox (由 worker 清除)
         - 刪除資料庫中的所有相關記錄 (Audios, Deployment)
         """
         # 查詢 Deployment (包含已軟刪除)
@@ -207,9 +281,7 @@ class DeploymentService:
 
         # 取得 bucket 名稱
         point = (
-            self.db.query(PointInfo)
-            .filter(PointInfo.id == deployment.point_id)
-            .first()
+            self.db.query(PointInfo).filter(PointInfo.id == deployment.point_id).first()
         )
         if not point:
             raise HTTPException(
@@ -229,27 +301,13 @@ class DeploymentService:
             )
         bucket_name = project.name
 
-        # 取得相關 Audio
-        audios = (
-            self.db.query(AudioInfo)
-            .filter(AudioInfo.deployment_id == deployment_id)
-            .all()
+        # MinIO 物件 (含 sidecar、冷儲存副本與 LTSA 前綴) 寫入 outbox，與 DB 刪除同一交易提交
+        queued_objects = enqueue_object_deletions(
+            self.db, bucket_name, AudioInfo.deployment_id == deployment_id
+        )
+        queued_objects += enqueue_ltsa_deletions(
+            self.db, bucket_name, DeploymentInfo.id == deployment_id
         )
-
-        # 刪除 MinIO 物件
-        s3_client = get_s3_client()
-        if audios:
-            objects_to_delete = [{"Key": a.object_key} for a in audios]
-            for i in range(0, len(objects_to_delete), 1000):
-                batch = objects_to_delete[i : i + 1000]
-                try:
-                    s3_client.delete_objects(
-                        Bucket=bucket_name, Delete={"Objects": batch}
-                    )
-                except Exception as e:
-                    logger.warning(
-                        f"Failed to delete objects in bucket {bucket_name}: {e}"
-                    )
 
         # 刪除 DB 記錄
         deleted_audios = (
@@ -258,13 +316,14 @@ class DeploymentService:
             .delete(synchronize_session=False)
         )
 
-        self.db.query(DeploymentInfo).filter(
-            DeploymentInfo.id == deployment_id
-        ).delete(synchronize_session=False)
+        self.db.query(DeploymentInfo).filter(DeploymentInfo.id == deployment_id).delete(
+            synchronize_session=False
+        )
 
         self.db.commit()
 
         return {
             "message": "Deployment permanently deleted",
             "deleted_audios": deleted_audios,
+            "queued_objects": queued_objects,
         }
@@ -0,0 +1,527 @@
+import csv
+import io
+import logging
+import threading
+from collections.abc import Iterable
+from datetime import date, datetime, time, timedelta
+from time import monotonic
+
+import numpy as np
+from fastapi import HTTPException, status
+from sqlalchemy import event, func, text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.enums.enums import CetaceanCallType, CetaceanSpecies, DetectionMethod
+from app.models.audio import AudioInfo
+from app.models.deployment import DeploymentInfo
+from app.models.detection import DetectionInfo
+from app.schemas.detection import DetectionCreate
+from app.services.audio_service import AudioService
+from app.services.deployment_service import DeploymentService
+from app.services.point_service import PointService
+from app.utils.cache import LRUCache
+from app.utils.time_utils import TW_TZ, as_aware
+
+logger = logging.getLogger(__name__)
+
+# 統計分桶所用的時區，與 API 回傳的 UTC+8 一致
+DETECTION_TIMEZONE = "Asia/Taipei"
+# 每累積這麼多列就送出一次 COPY，避免整份檔案留在記憶體
+DETECTION_COPY_BATCH = 50_000
+DETECTION_COPY_COLUMNS = (
+    "deployment_id",
+    "audio_id",
+    "start_time",
+    "end_time",
+    "freq_min",
+    "freq_max",
+    "method",
+    "species",
+    "call_type",
+    "confidence",
+    "created_by",
+)
+
+HEATMAP_MAX_DAYS = 3660
+HEATMAP_CACHE_TTL = 300
+# 單一音檔 / 偵測最長跨度，用來把時間條件收斂到 start 欄位的索引範圍
+HEATMAP_MAX_SPAN = timedelta(days=1)
+_WATCHED_TABLES = {
+    AudioInfo.__tablename__,
+    DeploymentInfo.__tablename__,
+    DetectionInfo.__tablename__,
+}
+
+# heatmap 快取鍵含 generation：本程序經 SessionLocal 建立的 session commit 了
+# audio / deployment / detection 的異動就換代 (listener 只掛在 SessionLocal，
+# 不影響其他 session)；其他 worker 程序則在 TTL 到期後取得新結果
+_heatmap_cache = LRUCache(maxsize=256, ttl=HEATMAP_CACHE_TTL)
+_generation = 0
+_generation_changed_at = float("-inf")
+_generation_lock = threading.Lock()
+
+HEATMAP_SQL = """
+WITH deployments AS (
+    SELECT id FROM deployment_info
+    WHERE point_id = :point_id AND is_deleted = false
+),
+grid AS (
+    SELECT generate_series(
+        CAST(:start AS timestamptz),
+        CAST(:end AS timestamptz) - interval '1 hour',
+        interval '1 hour'
+    ) AS hour
+),
+coverage AS (
+    SELECT h.hour,
+           sum(extract(epoch FROM least(a.end_time, h.hour + interval '1 hour')
+                                  - greatest(a.record_time, h.hour))) / 60 AS minutes
+    FROM (
+        SELECT record_time,
+               record_time + record_duration * interval '1 second' AS end_time
+        FROM audio_info
+        WHERE deployment_id IN (SELECT id FROM deployments)
+          AND is_deleted = false
+          AND record_duration > 0
+          AND record_time >= CAST(:start AS timestamptz) - :max_span
+          AND record_time < :end
+    ) a
+    CROSS JOIN LATERAL generate_series(
+        date_trunc('hour', a.record_time, :tz), a.end_time, interval '1 hour'
+    ) AS h(hour)
+    GROUP BY h.hour
+),
+positive AS (
+    SELECT date_trunc('hour', m.minute, :tz) AS hour, count(*) AS minutes
+    FROM (
+        SELECT DISTINCT gs.minute
+        FROM detection_info d
+        CROSS JOIN LATERAL generate_series(
+            date_trunc('minute', d.start_time, :tz),
+            greatest(d.start_time, d.end_time - interval '1 microsecond'),
+            interval '1 minute'
+        ) AS gs(minute)
+        WHERE d.deployment_id IN (SELECT id FROM deployments)
+          AND d.start_time >= CAST(:start AS timestamptz) - :max_span
+          AND d.start_time < :end
+          {filters}
+    ) m
+    GROUP BY 1
+)
+SELECT g.hour,
+       coalesce(c.minutes, 0) AS recorded,
+       coalesce(p.minutes, 0) AS positive
+FROM grid g
+LEFT JOIN coverage c ON c.hour = g.hour
+LEFT JOIN positive p ON p.hour = g.hour
+ORDER BY g.hour
+"""
+
+
+def invalidate_heatmaps() -> None:
+    global _generation, _generation_changed_at
+    with _generation_lock:
+        _generation += 1
+        _generation_changed_at = monotonic()
+
+
+def mark_changed(session: Session) -> None:
+    """Flag ``session`` so cached heatmaps are dropped when it commits."""
+    session.info["heatmap_dirty"] = True
+
+
+@event.listens_for(SessionLocal, "after_flush")
+def _track_flush(session, flush_context):
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if getattr(obj, "__tablename__", None) in _WATCHED_TABLES:
+            mark_changed(session)
+            return
+
+
+@event.listens_for(SessionLocal, "do_orm_execute")
+def _track_bulk(orm_execute_state):
+    # query(...).update() / .delete() 不經過 flush
+    if orm_execute_state.is_update or orm_execute_state.is_delete:
+        table = getattr(orm_execute_state.statement, "table", None)
+        if getattr(table, "name", None) in _WATCHED_TABLES:
+            mark_changed(orm_execute_state.session)
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _invalidate_on_commit(session):
+    if session.info.pop("heatmap_dirty", False):
+        invalidate_heatmaps()
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _reset_on_rollback(session):
+    session.info.pop("heatmap_dirty", None)
+
+
+def _required(row: dict, column: str) -> str:
+    # csv.DictReader 以 None 填補欄位不足的列
+    value = row.get(column)
+    if value is None or not value.strip():
+        raise ValueError(f"missing required field '{column}'")
+    return value
+
+
+def _parse_time(value: str) -> datetime:
+    dt = datetime.fromisoformat(value.strip())
+    return as_aware(dt)
+
+
+def _parse_float(value: str | None) -> float | None:
+    if value is None or not value.strip():
+        return None
+    return float(value)
+
+
+def _parse_enum(enum_cls, value: str | None) -> int:
+    """Accept either the integer value or the member name (case-insensitive)."""
+    if value is None or not value.strip():
+        return 0
+    value = value.strip()
+    if value.lstrip("-").isdigit():
+        return int(enum_cls(int(value)))
+    try:
+        return int(enum_cls[value.upper()])
+    except KeyError:
+        raise ValueError(f"'{value}' is not a valid {enum_cls.__name__}") from None
+
+
+class DetectionService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def get_detection(self, detection_id: int) -> DetectionInfo:
+        detection = (
+            self.db.query(DetectionInfo)
+            .filter(DetectionInfo.id == detection_id)
+            .first()
+        )
+        if not detection:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Detection not found",
+            )
+        return detection
+
+    def _filtered(
+        self,
+        deployment_id: int,
+        start: datetime | None = None,
+        end: datetime | None = None,
+        species: int | None = None,
+        call_type: int | None = None,
+        method: str | None = None,
+    ):
+        # 以起始時間落在 [start, end) 篩選，才能用上複合索引的 start_time 欄位
+        query = self.db.query(DetectionInfo).filter(
+            DetectionInfo.deployment_id == deployment_id
+        )
+        if start is not None:
+            query = query.filter(DetectionInfo.start_time >= start)
+        if end is not None:
+            query = query.filter(DetectionInfo.start_time < end)
+        if species is not None:
+            query = query.filter(DetectionInfo.species == species)
+        if call_type is not None:
+            query = query.filter(DetectionInfo.call_type == call_type)
+        if method is not None:
+            query = query.filter(DetectionInfo.method == method)
+        return query
+
+    def get_detections(
+        self,
+        deployment_id: int,
+        start: datetime | None = None,
+        end: datetime | None = None,
+        species: int | None = None,
+        call_type: int | None = None,
+        method: str | None = None,
+        skip: int = 0,
+        limit: int = 100,
+    ) -> list[DetectionInfo]:
+        DeploymentService(self.db).get_deployment(deployment_id)
+        return (
+            self._filtered(deployment_id, start, end, species, call_type, method)
+            .order_by(DetectionInfo.start_time, DetectionInfo.id)
+            .offset(skip)
+            .limit(limit)
+            .all()
+        )
+
+    def count_detections(
+        self,
+        deployment_id: int,
+        start: datetime | None = None,
+        end: datetime | None = None,
+        interval: str = "hour",
+        species: int | None = None,
+        call_type: int | None = None,
+        group_by: str | None = None,
+    ) -> list[dict]:
+        """
+        以資料庫 ``date_trunc`` 統計每小時 / 每日的偵測數量。
+
+        ``group_by`` 可為 ``species`` 或 ``call_type``，額外依該欄位分組。
+        """
+        DeploymentService(self.db).get_deployment(deployment_id)
+        bucket = func.date_trunc(
+            interval, DetectionInfo.start_time, DETECTION_TIMEZONE
+        ).label("bucket")
+        columns = [bucket]
+        if group_by is not None:
+            columns.append(getattr(DetectionInfo, group_by))
+
+        rows = (
+            self._filtered(deployment_id, start, end, species, call_type)
+            .with_entities(*columns, func.count().label("count"))
+            .group_by(*columns)
+            .order_by(*columns)
+            .all()
+        )
+        return [dict(row._mapping) for row in rows]
+
+    def create_detection(
+        self, detection_in: DetectionCreate, user_id: int
+    ) -> DetectionInfo:
+        DeploymentService(self.db).get_deployment(detection_in.deployment_id)
+        if detection_in.audio_id is not None:
+            audio = AudioService(self.db).get_audio(detection_in.audio_id)
+            if audio.deployment_id != detection_in.deployment_id:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Audio does not belong to this deployment",
+                )
+
+        db_obj = DetectionInfo(**detection_in.model_dump(), created_by=user_id)
+        self.db.add(db_obj)
+        self.db.commit()
+        self.db.refresh(db_obj)
+        return db_obj
+
+    def delete_detection(self, detection_id: int) -> dict:
+        detection = self.get_detection(detection_id)
+        self.db.delete(detection)
+        self.db.commit()
+        return {"message": "Detection deleted", "id": detection_id}
+
+    def _parse_rows(
+        self,
+        rows: Iterable[dict],
+        deployment_id: int,
+        method: str,
+        user_id: int,
+        audio_ids: set[int],
+    ):
+        for line, row in enumerate(rows, start=2):
+            try:
+                start_time = _parse_time(_required(row, "start_time"))
+                end_time = _parse_time(_required(row, "end_time"))
+                if end_time < start_time:
+                    raise ValueError("end_time is earlier than start_time")
+                freq_min = _parse_float(row.get("freq_min"))
+                freq_max = _parse_float(row.get("freq_max"))
+                if None not in (freq_min, freq_max) and freq_max < freq_min:
+                    raise ValueError("freq_max is lower than freq_min")
+                confidence = _parse_float(row.get("confidence"))
+                audio_id = row.get("audio_id")
+                audio_id = int(audio_id) if audio_id and audio_id.strip() else None
+                species = _parse_enum(CetaceanSpecies, row.get("species"))
+                call_type = _parse_enum(CetaceanCallType, row.get("call_type"))
+            except (KeyError, TypeError, ValueError) as e:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Line {line}: {e}",
+                ) from e
+
+            if audio_id is not None:
+                audio_ids.add(audio_id)
+            yield (
+                deployment_id,
+                audio_id,
+                start_time.isoformat(),
+                end_time.isoformat(),
+                freq_min,
+                freq_max,
+                method,
+                species,
+                call_type,
+                confidence,
+                user_id,
+            )
+
+    def _copy(self, cursor, buffer: io.StringIO) -> None:
+        buffer.seek(0)
+        cursor.copy_expert(
+            f"COPY {DetectionInfo.__tablename__} "
+            f"({', '.join(DETECTION_COPY_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+            buffer,
+        )
+        buffer.seek(0)
+        buffer.truncate()
+
+    def copy_detections(self, rows: Iterable[tuple]) -> int:
+        """
+        以 ``COPY`` 分批寫入欄位順序同 ``DETECTION_COPY_COLUMNS`` 的資料列。
+
+        與 Session 共用同一條連線 / 交易，由呼叫端決定 commit 或 rollback。
+        """
+        cursor = self.db.connection().connection.cursor()
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        count = 0
+        try:
+            for values in rows:
+                writer.writerow(values)
+                count += 1
+                if count % DETECTION_COPY_BATCH == 0:
+                    self._copy(cursor, buffer)
+            if buffer.tell():
+                self._copy(cursor, buffer)
+        finally:
+            cursor.close()
+        # COPY 不經過 ORM，需自行標記讓 heatmap 快取失效
+        mark_changed(self.db)
+        return count
+
+    def bulk_ingest(
+        self,
+        deployment_id: int,
+        stream: Iterable[str],
+        method: str = DetectionMethod.MODEL.value,
+        user_id: int | None = None,
+    ) -> int:
+        """
+        以 PostgreSQL ``COPY`` 匯入偵測器輸出的 CSV。
+
+        CSV 需有 ``start_time``、``end_time`` 欄位，可選 ``audio_id``、
+        ``freq_min``、``freq_max``、``species``、``call_type``、``confidence``；
+        species / call_type 可填數值或列舉名稱。整份檔案在同一個交易內匯入，
+        任何一列錯誤都會整批回滾。
+        """
+        DeploymentService(self.db).get_deployment(deployment_id)
+        reader = csv.DictReader(stream)
+        if not reader.fieldnames or not {"start_time", "end_time"} <= set(
+            reader.fieldnames
+        ):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="CSV must have start_time and end_time columns",
+            )
+
+        audio_ids: set[int] = set()
+        try:
+            inserted = self.copy_detections(
+                self._parse_rows(reader, deployment_id, method, user_id, audio_ids)
+            )
+
+            if audio_ids:
+                valid = {
+                    audio_id
+                    for (audio_id,) in self.db.query(AudioInfo.id).filter(
+                        AudioInfo.id.in_(audio_ids),
+                        AudioInfo.deployment_id == deployment_id,
+                        AudioInfo.is_deleted.is_(False),
+                    )
+                }
+                invalid = sorted(audio_ids - valid)
+                if invalid:
+                    raise HTTPException(
+                        status_code=status.HTTP_400_BAD_REQUEST,
+                        detail=(
+                            "Audio does not belong to this deployment: "
+                            f"{', '.join(map(str, invalid[:20]))}"
+                        ),
+                    )
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+
+        logger.info(f"Ingested {inserted} detections into deployment {deployment_id}")
+        return inserted
+
+    def get_heatmap(
+        self,
+        point_id: int,
+        start_date: date,
+        end_date: date,
+        species: int | None = None,
+        call_type: int | None = None,
+        method: str | None = None,
+    ) -> dict:
+        """
+        計算 point 在 [start_date, end_date] 的 (日期 x 小時) 偵測分鐘矩陣。
+
+        ``positive_minutes`` 為有偵測的分鐘數，``recorded_minutes`` 為依
+        ``record_time`` / ``record_duration`` 計算的實際錄音分鐘數，
+        ``ratio`` 為兩者相除 (無錄音時為 None)。日期與小時皆為 UTC+8。
+        """
+        n_days = (end_date - start_date).days + 1
+        if n_days < 1 or n_days > HEATMAP_MAX_DAYS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Date range must cover between 1 and {HEATMAP_MAX_DAYS} days",
+            )
+        PointService(self.db).get_point(point_id)
+
+        key = (_generation, point_id, start_date, end_date, species, call_type, method)
+        result = _heatmap_cache.get(key)
+        if result is None:
+            result = self._compute_heatmap(
+                point_id, start_date, n_days, species, call_type, method
+            )
+            # replica 可能還沒收到剛換代的異動，落後期間的結果不寫入新一代的快取
+            if not (
+                self.db.info.get("replica")
+                and monotonic() - _generation_changed_at
+                < settings.replica_max_lag_seconds
+            ):
+                _heatmap_cache.set(key, result)
+        return result
+
+    def _compute_heatmap(
+        self, point_id, start_date, n_days, species, call_type, method
+    ):
+        start = datetime.combine(start_date, time(), tzinfo=TW_TZ)
+        params = {
+            "point_id": point_id,
+            "start": start,
+            "end": start + timedelta(days=n_days),
+            "max_span": HEATMAP_MAX_SPAN,
+            "tz": DETECTION_TIMEZONE,
+        }
+        filters = []
+        for column, value in (
+            ("species", species),
+            ("call_type", call_type),
+            ("method", method),
+        ):
+            if value is not None:
+                filters.append(f"AND d.{column} = :{column}")
+                params[column] = value
+
+        rows = self.db.execute(
+            text(HEATMAP_SQL.format(filters=" ".join(filters))), params
+        ).all()
+        recorded = np.array([float(r.recorded) for r in rows]).reshape(n_days, 24)
+        positive = np.array([int(r.positive) for r in rows]).reshape(n_days, 24)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ratio = np.where(recorded > 0, np.minimum(positive / recorded, 1.0), np.nan)
+
+        return {
+            "point_id": point_id,
+            "dates": [start_date + timedelta(days=i) for i in range(n_days)],
+            "hours": list(range(24)),
+            "recorded_minutes": np.round(recorded, 3).tolist(),
+            "positive_minutes": positive.tolist(),
+            "ratio": [
+                [None if np.isnan(v) else round(float(v), 4) for v in day]
+                for day in ratio
+            ],
+        }
@@ -0,0 +1,264 @@
+"""Duplicate audio detection by checksum and spectral fingerprint."""
+
+import logging
+import multiprocessing
+from collections.abc import Callable
+from concurrent.futures import Executor, ProcessPoolExecutor
+
+from fastapi import HTTPException, status
+from sqlalchemy import func, update
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.minio import get_s3_client
+from app.models.audio import AudioInfo
+from app.models.deployment import DeploymentInfo
+from app.models.point import PointInfo
+from app.models.project import ProjectInfo
+from app.schemas.audio import AudioCreate
+from app.services.audio_reader import AudioObjectReader
+from app.utils.fingerprint import spectral_fingerprint
+
+logger = logging.getLogger(__name__)
+
+# 無法產生指紋 (靜音或過短) 的音檔標記為空字串，避免每次掃描重讀
+NO_FINGERPRINT = ""
+FINGERPRINT_BATCH_SIZE = 500
+
+
+def fingerprint_file(
+    bucket: str, key: str, file_size: int | None, seconds: int
+) -> str | None:
+    """在 worker 程序中以一次 Range GET 讀取開頭 ``seconds`` 秒並產生指紋。"""
+    reader = AudioObjectReader(get_s3_client(), bucket, key, file_size)
+    fs = reader.header.fs
+    return spectral_fingerprint(reader.read_frames(0, seconds * fs), fs)
+
+
+class DuplicateAudioService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def _column(self, by: str):
+        column = getattr(AudioInfo, by)
+        # 部分索引只涵蓋未刪除且有值的列；查詢條件需與索引條件一致
+        return column, (
+            AudioInfo.is_deleted.is_(False),
+            column.isnot(None),
+            column != NO_FINGERPRINT,
+        )
+
+    def find_duplicate(
+        self,
+        checksum: str | None = None,
+        fingerprint: str | None = None,
+        exclude_id: int | None = None,
+    ) -> AudioInfo | None:
+        """以 checksum、再以指紋做索引等值查詢，回傳最早登錄的相同內容音檔。"""
+        for by, value in (("checksum", checksum), ("fingerprint", fingerprint)):
+            if not value:
+                continue
+            column, active = self._column(by)
+            query = self.db.query(AudioInfo).filter(*active, column == value)
+            if exclude_id is not None:
+                query = query.filter(AudioInfo.id != exclude_id)
+            match = query.order_by(AudioInfo.id).first()
+            if match:
+                return match
+        return None
+
+    def check_registration(
+        self, audio_in: AudioCreate, policy: str | None = None
+    ) -> int | None:
+        """
+        登錄前檢查重複內容。
+
+        ``reject`` 時直接拒絕；``link`` 時回傳要寫入 ``duplicate_of_id``
+        的原始音檔 id；``allow`` 不做檢查。
+        """
+        policy = policy or settings.duplicate_audio_policy
+        if policy == "allow":
+            return None
+        match = self.find_duplicate(audio_in.checksum, audio_in.fingerprint)
+        if match is None:
+            return None
+        original_id = match.duplicate_of_id or match.id
+        if policy == "reject":
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Audio content duplicates existing audio {original_id}",
+            )
+        return original_id
+
+    def get_duplicates(self, audio_id: int) -> list[AudioInfo]:
+        """與指定音檔 checksum 或指紋相同的其他未刪除音檔。"""
+        audio = (
+            self.db.query(AudioInfo)
+            .filter(AudioInfo.id == audio_id, AudioInfo.is_deleted.is_(False))
+            .first()
+        )
+        if not audio:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Audio not found"
+            )
+        found: dict[int, AudioInfo] = {}
+        for by in ("checksum", "fingerprint"):
+            value = getattr(audio, by)
+            if not value:
+                continue
+            column, active = self._column(by)
+            for match in (
+                self.db.query(AudioInfo)
+                .filter(*active, column == value, AudioInfo.id != audio_id)
+                .all()
+            ):
+                found[match.id] = match
+        return [found[k] for k in sorted(found)]
+
+    def report(self, by: str = "checksum", limit: int = 100) -> dict:
+        """
+        全庫重複群組報表。
+
+        在部分索引上做一次 GROUP BY，不做兩兩比對；群組依檔案數由多到少
+        排序，最多回傳 ``limit`` 組。
+        """
+        column, active = self._column(by)
+        count = func.count(AudioInfo.id)
+        rows = (
+            self.db.query(
+                column,
+                func.array_agg(aggregate_order_by(AudioInfo.id, AudioInfo.id)),
+                count,
+                func.coalesce(func.sum(AudioInfo.file_size), 0),
+                func.coalesce(func.min(AudioInfo.file_size), 0),
+            )
+            .filter(*active)
+            .group_by(column)
+            .having(count > 1)
+            .order_by(count.desc(), column)
+            .limit(limit + 1)
+            .all()
+        )
+        groups = [
+            {
+                "key": key,
+                "audio_ids": list(ids),
+                "count": n,
+                "total_bytes": total,
+                "reclaimable_bytes": total - smallest,
+            }
+            for key, ids, n, total, smallest in rows[:limit]
+        ]
+        return {"by": by, "groups": groups, "truncated": len(rows) > limit}
+
+    def link_duplicates(self, by: str) -> int:
+        """將各重複群組中較晚登錄、尚未標記的音檔指向群組內最早的一筆。"""
+        column, active = self._column(by)
+        groups = (
+            self.db.query(
+                AudioInfo.id.label("id"),
+                func.min(AudioInfo.id).over(partition_by=column).label("original"),
+            )
+            .filter(*active)
+            .subquery()
+        )
+        result = self.db.execute(
+            update(AudioInfo)
+            .where(
+                AudioInfo.id == groups.c.id,
+                groups.c.original != groups.c.id,
+                AudioInfo.duplicate_of_id.is_(None),
+            )
+            .values(duplicate_of_id=groups.c.original)
+            .execution_options(synchronize_session=False)
+        )
+        self.db.commit()
+        return result.rowcount
+
+    def fingerprint_pending(
+        self,
+        seconds: int | None = None,
+        executor: Executor | None = None,
+        max_workers: int | None = None,
+        batch_size: int = FINGERPRINT_BATCH_SIZE,
+        progress: Callable[[int], None] | None = None,
+    ) -> dict:
+        """
+        為尚未有指紋的音檔補算指紋。
+
+        依 id 做 keyset 分批，每批在 process pool 平行計算後一次 commit，
+        中斷後重跑會從尚未處理的音檔繼續。冷儲存中的音檔略過。
+        """
+        seconds = seconds or settings.audio_fingerprint_seconds
+        summary = {"files_processed": 0, "files_failed": 0, "files_unfingerprinted": 0}
+        own_executor = executor is None
+        if own_executor:
+            # spawn 避免 fork 到 API 程序中的連線與執行緒
+            executor = ProcessPoolExecutor(
+                max_workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        last_id = 0
+        try:
+            while True:
+                batch = (
+                    self.db.query(AudioInfo, ProjectInfo.name)
+                    .join(DeploymentInfo, AudioInfo.deployment_id == DeploymentInfo.id)
+                    .join(PointInfo, DeploymentInfo.point_id == PointInfo.id)
+                    .join(ProjectInfo, PointInfo.project_id == ProjectInfo.id)
+                    .filter(
+                        AudioInfo.id > last_id,
+                        AudioInfo.is_deleted.is_(False),
+                        AudioInfo.is_cold_storage.isnot(True),
+                        AudioInfo.fingerprint.is_(None),
+                    )
+                    .order_by(AudioInfo.id)
+                    .limit(batch_size)
+                    .all()
+                )
+                if not batch:
+                    break
+                last_id = batch[-1][0].id
+                futures = [
+                    (
+                        audio,
+                        executor.submit(
+                            fingerprint_file,
+                            bucket,
+                            audio.object_key,
+                            audio.file_size,
+                            seconds,
+                        ),
+                    )
+                    for audio, bucket in batch
+                ]
+                for audio, future in futures:
+                    try:
+                        fingerprint = future.result()
+                    except Exception as e:
+                        # 讀取失敗保留 NULL，下次掃描重試
+                        summary["files_failed"] += 1
+                        logger.warning(
+                            f"Fingerprint failed on audio {audio.id} "
+                            f"({audio.object_key}): {e}"
+                        )
+                        continue
+                    summary["files_processed"] += 1
+                    if fingerprint is None:
+                        summary["files_unfingerprinted"] += 1
+                    audio.fingerprint = fingerprint or NO_FINGERPRINT
+                self.db.commit()
+                if progress:
+                    progress(summary["files_processed"] + summary["files_failed"])
+        finally:
+            if own_executor:
+                executor.shutdown(cancel_futures=True)
+        return summary
+
+    def scan(self, **kwargs) -> dict:
+        """補算指紋後，依 checksum 與指紋標記重複音檔。"""
+        summary = self.fingerprint_pending(**kwargs)
+        summary["linked_by_checksum"] = self.link_duplicates("checksum")
+        summary["linked_by_fingerprint"] = self.link_duplicates("fingerprint")
+        logger.info(f"Duplicate scan finished: {summary}")
+        return summary
@@ -0,0 +1,100 @@
+"""Batch band-limited energy detection over every audio file of a deployment."""
+
+from collections.abc import Callable
+from concurrent.futures import Executor
+from datetime import timedelta
+
+from sqlalchemy.orm import Session
+
+from app.core.minio import get_s3_client
+from app.enums.enums import CetaceanCallType, CetaceanSpecies, DetectionMethod
+from app.models.audio import AudioInfo
+from app.schemas.detector import EnergyDetectorParams
+from app.services.analysis_run_service import AnalysisRunService
+from app.services.audio_reader import AudioObjectReader
+from app.services.deployment_service import DeploymentService
+from app.services.detection_service import DetectionService
+from app.utils.detectors import BandEnergyDetector
+
+ENERGY_DETECTOR = "energy-detector"
+# 每次從 MinIO 串流解碼的 frame 數
+DETECTOR_BLOCK_FRAMES = 1 << 20
+
+
+def detect_file(
+    bucket: str, key: str, file_size: int | None, params: dict
+) -> list[tuple[float, float, float]]:
+    """
+    在 worker 程序中對單一音檔執行偵測。
+
+    S3 client 在 worker 內建立，音檔以一次 Range GET 串流、逐塊解碼，
+    記憶體用量與檔案長度無關。
+    """
+    reader = AudioObjectReader(get_s3_client(), bucket, key, file_size)
+    wav = reader.header
+    channel = params["channel"]
+    if channel >= wav.channels:
+        raise ValueError(f"Audio has only {wav.channels} channel(s)")
+
+    detector = BandEnergyDetector(
+        wav.fs,
+        fmin=params["fmin"],
+        fmax=min(params["fmax"], wav.fs / 2),
+        threshold_db=params["threshold_db"],
+        nfft=params["nfft"],
+        noise_window=params["noise_window"],
+        min_duration=params["min_duration"],
+        max_gap=params["max_gap"],
+    )
+    for block in reader.iter_blocks(DETECTOR_BLOCK_FRAMES):
+        detector.process(block[:, channel])
+    return detector.finish()
+
+
+class EnergyDetectorService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def run_deployment(
+        self,
+        deployment_id: int,
+        params: EnergyDetectorParams,
+        executor: Executor | None = None,
+        max_workers: int | None = None,
+        progress: Callable[[int, int], None] | None = None,
+    ) -> dict:
+        """
+        對 deployment 內所有音檔執行頻帶能量偵測，結果以 COPY 寫入偵測紀錄
+        (method = model-detect)；相同參數重跑時跳過已處理的檔案。
+        """
+        deployment = DeploymentService(self.db).get_deployment_details(deployment_id)
+
+        def store(audio: AudioInfo, events) -> int:
+            rows = (
+                (
+                    deployment_id,
+                    audio.id,
+                    audio.record_time + timedelta(seconds=start),
+                    audio.record_time + timedelta(seconds=end),
+                    params.fmin,
+                    params.fmax,
+                    DetectionMethod.MODEL.value,
+                    CetaceanSpecies.UNKNOWN.value,
+                    CetaceanCallType.UNKNOWN.value,
+                    None,
+                    None,
+                )
+                for start, end, _ in events
+            )
+            return DetectionService(self.db).copy_detections(rows)
+
+        return AnalysisRunService(self.db).run(
+            ENERGY_DETECTOR,
+            deployment,
+            params.model_dump(),
+            detect_file,
+            store,
+            executor=executor,
+            max_workers=max_workers,
+            progress=progress,
+        )
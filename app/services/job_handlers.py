@@ -0,0 +1,259 @@
+"""Job types run by the background worker (see ``app.worker``)."""
+
+import logging
+from datetime import datetime, timedelta
+
+from fastapi import HTTPException, status
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.enums.enums import JobStatus
+from app.schemas.acoustic_index import AcousticIndexParams
+from app.schemas.cold_storage import ColdStoragePolicy
+from app.schemas.detector import EnergyDetectorParams
+from app.services.acoustic_index_service import AcousticIndexService
+from app.services.cold_storage_service import ColdStorageService
+from app.services.deployment_service import DeploymentService
+from app.services.duplicate_service import DuplicateAudioService
+from app.services.energy_detector_service import EnergyDetectorService
+from app.services.job_service import JobProgress, JobService, job_handler
+from app.services.ltsa_service import LtsaService
+from app.services.object_deletion_service import ObjectDeletionService
+from app.services.partition_service import AudioPartitionService
+from app.services.peaks_service import PeaksService
+from app.services.point_service import PointService
+from app.services.project_service import ProjectService
+from app.services.retention_service import RetentionService
+from app.utils.rate_limit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+JOB_PROJECT_DELETE_AUDIOS = "project.delete_audios"
+JOB_POINT_DELETE_AUDIOS = "point.delete_audios"
+JOB_DEPLOYMENT_DELETE_AUDIOS = "deployment.delete_audios"
+JOB_PROJECT_RESTORE = "project.restore"
+JOB_POINT_RESTORE = "point.restore"
+JOB_DEPLOYMENT_RESTORE = "deployment.restore"
+JOB_LTSA_BUILD = "ltsa.build"
+JOB_PEAKS_BUILD = "peaks.build"
+JOB_ENERGY_DETECTOR = "deployment.energy_detector"
+JOB_ACOUSTIC_INDICES = "deployment.acoustic_indices"
+JOB_COLD_STORAGE_ARCHIVE = "cold_storage.archive"
+JOB_COLD_STORAGE_RESTORE = "cold_storage.restore"
+JOB_DUPLICATE_SCAN = "audio.duplicate_scan"
+JOB_OBJECT_DELETIONS = "storage.delete_objects"
+JOB_RETENTION_PURGE = "retention.purge"
+JOB_AUDIO_PARTITIONS = "audio.partitions"
+
+
+# 串聯刪除/還原分批提交，中途取消會留下部分軟刪除的樹且沒有工作能接續，
+# 因此不接受取消
+@job_handler(JOB_PROJECT_DELETE_AUDIOS, concurrency=2, cancellable=False)
+def delete_project_audios(db: Session, payload: dict, progress: JobProgress):
+    return ProjectService(db).delete_project_audios(
+        payload["project_id"],
+        payload["user_id"],
+        datetime.fromisoformat(payload["deleted_at"]),
+        payload["deletion_batch_id"],
+        progress=progress,
+    )
+
+
+@job_handler(JOB_POINT_DELETE_AUDIOS, concurrency=2, cancellable=False)
+def delete_point_audios(db: Session, payload: dict, progress: JobProgress):
+    return PointService(db).delete_point_audios(
+        payload["point_id"],
+        payload["user_id"],
+        datetime.fromisoformat(payload["deleted_at"]),
+        payload["deletion_batch_id"],
+        progress=progress,
+    )
+
+
+@job_handler(JOB_DEPLOYMENT_DELETE_AUDIOS, concurrency=2, cancellable=False)
+def delete_deployment_audios(db: Session, payload: dict, progress: JobProgress):
+    return DeploymentService(db).delete_deployment_audios(
+        payload["deployment_id"],
+        payload["user_id"],
+        datetime.fromisoformat(payload["deleted_at"]),
+        payload["deletion_batch_id"],
+        progress=progress,
+    )
+
+
+@job_handler(JOB_PROJECT_RESTORE, concurrency=2, cancellable=False)
+def restore_project(db: Session, payload: dict, progress: JobProgress):
+    project = ProjectService(db).restore_project(
+        payload["project_id"], payload["deletion_batch_id"], progress=progress
+    )
+    return {"project_id": project.id, "restored": not project.is_deleted}
+
+
+@job_handler(JOB_POINT_RESTORE, concurrency=2, cancellable=False)
+def restore_point(db: Session, payload: dict, progress: JobProgress):
+    point = PointService(db).restore_point(
+        payload["point_id"], payload["deletion_batch_id"], progress=progress
+    )
+    return {"point_id": point.id, "restored": not point.is_deleted}
+
+
+@job_handler(JOB_DEPLOYMENT_RESTORE, concurrency=2, cancellable=False)
+def restore_deployment(db: Session, payload: dict, progress: JobProgress):
+    deployment = DeploymentService(db).restore_deployment(
+        payload["deployment_id"], payload["deletion_batch_id"], progress=progress
+    )
+    return {"deployment_id": deployment.id, "restored": not deployment.is_deleted}
+
+
+@job_handler(JOB_LTSA_BUILD)
+def build_ltsa(db: Session, payload: dict, progress: JobProgress):
+    return LtsaService(db).build_ltsa(
+        payload["deployment_id"],
+        bin_seconds=payload["bin_seconds"],
+        nfft=payload["nfft"],
+        progress=progress,
+    )
+
+
+@job_handler(JOB_PEAKS_BUILD, concurrency=4)
+def build_peaks(db: Session, payload: dict, progress: JobProgress):
+    PeaksService(db).build_peaks(payload["audio_id"])
+
+
+@job_handler(JOB_ENERGY_DETECTOR)
+def run_energy_detector(db: Session, payload: dict, progress: JobProgress):
+    return EnergyDetectorService(db).run_deployment(
+        payload["deployment_id"],
+        EnergyDetectorParams(**payload["params"]),
+        progress=progress,
+    )
+
+
+@job_handler(JOB_ACOUSTIC_INDICES)
+def run_acoustic_indices(db: Session, payload: dict, progress: JobProgress):
+    return AcousticIndexService(db).run_deployment(
+        payload["deployment_id"],
+        AcousticIndexParams(**payload["params"]),
+        progress=progress,
+    )
+
+
+@job_handler(JOB_COLD_STORAGE_ARCHIVE)
+def archive_cold_storage(db: Session, payload: dict, progress: JobProgress):
+    return ColdStorageService(db).archive(
+        ColdStoragePolicy(**payload["policy"]), progress=progress
+    )
+
+
+# 還原工作全域一次只執行一個，每個 worker 程序以自己的 token bucket 限制還原的 bytes
+_restore_limiter = TokenBucket(settings.cold_restore_bytes_per_second)
+
+
+def schedule_cold_restores(
+    db: Session, audio_ids: list[int], priority: int, user_id: int | None = None
+) -> int:
+    """
+    每個音檔排入一筆還原工作 (dedup_key 為音檔 id) 並 commit。
+
+    已在排隊的音檔只提前優先序；排隊與執行中的還原超過
+    ``cold_restore_max_pending`` 時回 429。回傳新增或提前的工作數。
+    """
+    jobs = JobService(db)
+    keys = [str(audio_id) for audio_id in dict.fromkeys(audio_ids)]
+    new = len(keys) - jobs.count_active(JOB_COLD_STORAGE_RESTORE, keys)
+    if jobs.count_active(JOB_COLD_STORAGE_RESTORE) + new > (
+        settings.cold_restore_max_pending
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Cold storage restore queue is full",
+        )
+    changed = jobs.enqueue_many(
+        JOB_COLD_STORAGE_RESTORE,
+        {key: {"audio_id": int(key)} for key in keys},
+        user_id=user_id,
+        priority=priority,
+    )
+    db.commit()
+    return changed
+
+
+def cold_restore_status(db: Session) -> dict:
+    """排隊中的還原數與執行中的音檔 id。"""
+    jobs = JobService(db)
+    running = jobs.get_jobs(
+        job_status=JobStatus.RUNNING.value, job_type=JOB_COLD_STORAGE_RESTORE
+    )
+    return {
+        "pending": jobs.count_active(JOB_COLD_STORAGE_RESTORE) - len(running),
+        "in_progress": running[0].payload["audio_id"] if running else None,
+    }
+
+
+@job_handler(JOB_COLD_STORAGE_RESTORE)
+def restore_cold_storage(db: Session, payload: dict, progress: JobProgress):
+    audio = ColdStorageService(db).restore_audio(
+        payload["audio_id"], limiter=_restore_limiter
+    )
+    return {"audio_id": audio.id}
+
+
+@job_handler(JOB_DUPLICATE_SCAN)
+def scan_duplicates(db: Session, payload: dict, progress: JobProgress):
+    return DuplicateAudioService(db).scan(progress=progress)
+
+
+def schedule_object_deletions(db: Session, user_id: int | None = None):
+    """在永久刪除提交後排入 outbox 清除工作 (已有工作在排隊或執行時沿用)。"""
+    return JobService(db).enqueue(
+        JOB_OBJECT_DELETIONS, user_id=user_id, dedup_key="outbox"
+    )
+
+
+@job_handler(JOB_OBJECT_DELETIONS, max_attempts=20)
+def drain_object_deletions(db: Session, payload: dict, progress: JobProgress):
+    result = ObjectDeletionService(db).drain(progress=progress)
+    if result["pending"]:
+        # 交由工作佇列的指數退避在稍後再次清空 outbox
+        raise RuntimeError(
+            f"{result['pending']} object deletions waiting for retry: {result}"
+        )
+    return result
+
+
+@job_handler(
+    JOB_RETENTION_PURGE,
+    interval=(
+        timedelta(hours=settings.retention_purge_interval_hours)
+        if settings.retention_purge_interval_hours > 0
+        else None
+    ),
+)
+def purge_expired(db: Session, payload: dict, progress: JobProgress):
+    result = RetentionService(db, payload.get("retention_days")).purge(
+        max_roots=payload.get("max_roots"), progress=progress
+    )
+    # outbox 工作用完重試次數後仍有待刪除的列時由定期清除重新排入；
+    # 已放棄的列會一直保留名稱與 key，記錄錯誤供告警
+    outbox = ObjectDeletionService(db)
+    result["pending_object_deletions"] = outbox.pending()
+    result["stuck_object_deletions"] = outbox.stuck()
+    if result["queued_objects"] or result["pending_object_deletions"]:
+        result["outbox_job_id"] = schedule_object_deletions(db).id
+    if result["stuck_object_deletions"]:
+        logger.error(
+            f"{result['stuck_object_deletions']} object deletions gave up retrying"
+        )
+    return result
+
+
+@job_handler(
+    JOB_AUDIO_PARTITIONS,
+    interval=(
+        timedelta(hours=settings.audio_partition_check_hours)
+        if settings.audio_partition_check_hours > 0
+        else None
+    ),
+)
+def ensure_audio_partitions(db: Session, payload: dict, progress: JobProgress):
+    return {"created": AudioPartitionService(db).ensure_partitions()}
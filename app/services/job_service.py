@@ -0,0 +1,589 @@
+"""Durable Postgres-backed job queue shared by the API and the worker process."""
+
+import logging
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import UTC, datetime, timedelta
+from typing import Any
+
+from fastapi import HTTPException, status
+from sqlalchemy import case, func, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.enums.enums import JobStatus
+from app.models.job import BackgroundJob
+
+logger = logging.getLogger(__name__)
+
+# pg_advisory_xact_lock 的 namespace，避免與其他 advisory lock 衝突
+JOB_LOCK_NAMESPACE = 0x4A4F42
+JOB_ERROR_MAX_LENGTH = 4000
+ACTIVE_STATUSES = (JobStatus.QUEUED.value, JobStatus.RUNNING.value)
+PERIODIC_DEDUP_KEY = "periodic"
+
+
+class JobCancelledError(Exception):
+    """Raised from the progress callback once a running job is cancelled."""
+
+
+class JobLostError(Exception):
+    """Raised once a stale job was requeued away from the worker running it."""
+
+
+@dataclass(frozen=True)
+class JobHandler:
+    func: Callable[[Session, dict, "JobProgress"], Any]
+    concurrency: int
+    max_attempts: int
+    interval: timedelta | None = None
+    cancellable: bool = True
+
+
+JOB_HANDLERS: dict[str, JobHandler] = {}
+
+
+def job_handler(
+    job_type: str,
+    concurrency: int = 1,
+    max_attempts: int = 3,
+    interval: timedelta | None = None,
+    cancellable: bool = True,
+):
+    """
+    註冊工作類型。
+
+    ``func(db, payload, progress)`` 在 worker 程序中以獨立的 session 執行，
+    回傳值 (可 JSON 序列化) 存入 ``result``。``concurrency`` 為全部 worker
+    同時執行此類型工作的上限，可用 ``settings.job_concurrency`` 覆寫。
+    設定 ``interval`` 的類型由 worker 每隔該時間自動排入一次 (payload 為空)。
+    ``cancellable=False`` 的類型 (中途停止會留下不一致狀態者) 不接受取消。
+    """
+
+    def register(func):
+        JOB_HANDLERS[job_type] = JobHandler(
+            func, concurrency, max_attempts, interval, cancellable
+        )
+        return func
+
+    return register
+
+
+def concurrency_limit(job_type: str) -> int:
+    default = JOB_HANDLERS[job_type].concurrency if job_type in JOB_HANDLERS else 1
+    return settings.job_concurrency.get(job_type, default)
+
+
+def retry_delay(attempts: int) -> timedelta:
+    """指數退避：第 n 次失敗後等待 base * 2^(n-1) 秒，上限 max。"""
+    seconds = settings.job_retry_base_seconds * 2 ** max(attempts - 1, 0)
+    return timedelta(seconds=min(seconds, settings.job_retry_max_seconds))
+
+
+def is_retryable(error: Exception) -> bool:
+    # 4xx 代表輸入本身有問題 (例如資源已不存在)，重試也不會成功
+    if isinstance(error, HTTPException):
+        return error.status_code >= 500
+    return not isinstance(error, ValueError | KeyError | TypeError)
+
+
+def owned_by(job_id: int, worker_id: str | None) -> tuple:
+    """``job_id`` 的條件；帶 ``worker_id`` 時只比對仍由該 worker 執行中的列。"""
+    if worker_id is None:
+        return (BackgroundJob.id == job_id,)
+    return (
+        BackgroundJob.id == job_id,
+        BackgroundJob.status == JobStatus.RUNNING.value,
+        BackgroundJob.locked_by == worker_id,
+    )
+
+
+class JobProgress:
+    """
+    Progress callback handed to job handlers.
+
+    Calls are compatible with the services' ``progress(done, total)`` hooks.
+    Writes are throttled to one per ``min_interval`` seconds (the final
+    update always goes through) and each write also checks whether the job
+    was cancelled. With ``worker_id`` the write only applies while the job
+    is still running under that worker; otherwise ``JobLostError`` stops
+    the handler.
+    """
+
+    def __init__(
+        self,
+        session_factory,
+        job_id: int,
+        min_interval: float = 1.0,
+        clock=time.monotonic,
+        worker_id: str | None = None,
+    ):
+        self.session_factory = session_factory
+        self.job_id = job_id
+        self.worker_id = worker_id
+        self.min_interval = min_interval
+        self.clock = clock
+        self._last = float("-inf")
+
+    def __call__(self, current: int, total: int | None = None) -> None:
+        now = self.clock()
+        if now - self._last < self.min_interval and current != total:
+            return
+        self._last = now
+        db = self.session_factory()
+        try:
+            cancel = db.execute(
+                update(BackgroundJob)
+                .where(*owned_by(self.job_id, self.worker_id))
+                .values(
+                    progress_current=current,
+                    progress_total=total,
+                    heartbeat_at=func.now(),
+                )
+                .returning(BackgroundJob.cancel_requested)
+            ).scalar()
+            db.commit()
+        finally:
+            db.close()
+        if cancel is None and self.worker_id is not None:
+            raise JobLostError(
+                f"Job {self.job_id} is no longer run by {self.worker_id}"
+            )
+        if cancel:
+            raise JobCancelledError(f"Job {self.job_id} was cancelled")
+
+
+class Heartbeat:
+    """
+    Background thread that keeps ``heartbeat_at`` fresh while a job runs.
+
+    Stops beating once the job is no longer running under ``worker_id``.
+    """
+
+    def __init__(
+        self,
+        session_factory,
+        job_id: int,
+        interval: float,
+        worker_id: str | None = None,
+    ):
+        self.session_factory = session_factory
+        self.job_id = job_id
+        self.worker_id = worker_id
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name=f"job-heartbeat-{job_id}", daemon=True
+        )
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            db = self.session_factory()
+            try:
+                updated = db.execute(
+                    update(BackgroundJob)
+                    .where(*owned_by(self.job_id, self.worker_id))
+                    .values(heartbeat_at=func.now())
+                ).rowcount
+                db.commit()
+                if not updated:
+                    logger.warning(
+                        f"Job {self.job_id} is no longer run by {self.worker_id}"
+                    )
+                    return
+            except Exception as e:
+                logger.warning(f"Heartbeat failed for job {self.job_id}: {e}")
+            finally:
+                db.close()
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+class JobService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    # ----- API side -----
+
+    def _active(self, job_type: str, dedup_key: str) -> BackgroundJob | None:
+        return (
+            self.db.query(BackgroundJob)
+            .filter(
+                BackgroundJob.job_type == job_type,
+                BackgroundJob.dedup_key == dedup_key,
+                BackgroundJob.status.in_(ACTIVE_STATUSES),
+            )
+            .first()
+        )
+
+    def enqueue(
+        self,
+        job_type: str,
+        payload: dict | None = None,
+        user_id: int | None = None,
+        priority: int = 0,
+        dedup_key: str | None = None,
+        max_attempts: int | None = None,
+        commit: bool = True,
+    ) -> BackgroundJob:
+        """
+        新增工作；``priority`` 越小越先執行。
+
+        帶 ``dedup_key`` 時，若同類型已有相同 key 的工作在排隊或執行中，
+        直接回傳該工作 (排隊中的工作會提前到較高的優先序)。
+        ``commit=False`` 時只 flush，工作與呼叫端的變更由呼叫端一起 commit。
+        """
+        if job_type not in JOB_HANDLERS:
+            raise ValueError(f"Unknown job type: {job_type}")
+        if dedup_key is not None:
+            existing = self._active(job_type, dedup_key)
+            if existing:
+                if (
+                    existing.status == JobStatus.QUEUED.value
+                    and priority < existing.priority
+                ):
+                    existing.priority = priority
+                    if commit:
+                        self.db.commit()
+                return existing
+
+        job = BackgroundJob(
+            job_type=job_type,
+            payload=payload or {},
+            status=JobStatus.QUEUED.value,
+            priority=priority,
+            dedup_key=dedup_key,
+            attempts=0,
+            max_attempts=max_attempts or JOB_HANDLERS[job_type].max_attempts,
+            created_by=user_id,
+        )
+        try:
+            # savepoint：dedup 衝突只撤銷這筆工作，不影響同一交易中呼叫端的變更
+            with self.db.begin_nested():
+                self.db.add(job)
+        except IntegrityError:
+            # 同時送出的相同工作已被另一個請求建立
+            existing = self._active(job_type, dedup_key)
+            if existing is None:
+                raise
+            return existing
+        if commit:
+            self.db.commit()
+            self.db.refresh(job)
+        return job
+
+    def enqueue_many(
+        self,
+        job_type: str,
+        payloads: dict[str, dict],
+        user_id: int | None = None,
+        priority: int = 0,
+    ) -> int:
+        """
+        以 ``dedup_key -> payload`` 一次新增多筆工作，不 commit。
+
+        已在排隊的 key 提前到較高的優先序，執行中的 key 維持不變；
+        新增以 ``ON CONFLICT DO NOTHING`` 寫入，不逐筆查詢。
+        回傳新增加上提前的工作數。
+        """
+        if job_type not in JOB_HANDLERS:
+            raise ValueError(f"Unknown job type: {job_type}")
+        if not payloads:
+            return 0
+        promoted = self.db.execute(
+            update(BackgroundJob)
+            .where(
+                BackgroundJob.job_type == job_type,
+                BackgroundJob.dedup_key.in_(list(payloads)),
+                BackgroundJob.status == JobStatus.QUEUED.value,
+                BackgroundJob.priority > priority,
+            )
+            .values(priority=priority)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        max_attempts = JOB_HANDLERS[job_type].max_attempts
+        added = self.db.execute(
+            pg_insert(BackgroundJob)
+            .values(
+                [
+                    {
+                        "job_type": job_type,
+                        "payload": payload,
+                        "status": JobStatus.QUEUED.value,
+                        "priority": priority,
+                        "dedup_key": dedup_key,
+                        "attempts": 0,
+                        "max_attempts": max_attempts,
+                        "created_by": user_id,
+                    }
+                    for dedup_key, payload in payloads.items()
+                ]
+            )
+            .on_conflict_do_nothing()
+        ).rowcount
+        return promoted + added
+
+    def get_job(self, job_id: int) -> BackgroundJob:
+        job = self.db.query(BackgroundJob).filter(BackgroundJob.id == job_id).first()
+        if not job:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Job not found"
+            )
+        return job
+
+    def get_jobs(
+        self,
+        user_id: int | None = None,
+        job_status: str | None = None,
+        job_type: str | None = None,
+        skip: int = 0,
+        limit: int = 100,
+    ) -> list[BackgroundJob]:
+        query = self.db.query(BackgroundJob)
+        if user_id is not None:
+            query = query.filter(BackgroundJob.created_by == user_id)
+        if job_status:
+            query = query.filter(BackgroundJob.status == job_status)
+        if job_type:
+            query = query.filter(BackgroundJob.job_type == job_type)
+        return query.order_by(BackgroundJob.id.desc()).offset(skip).limit(limit).all()
+
+    def count_active(self, job_type: str, dedup_keys: list[str] | None = None) -> int:
+        query = self.db.query(func.count(BackgroundJob.id)).filter(
+            BackgroundJob.job_type == job_type,
+            BackgroundJob.status.in_(ACTIVE_STATUSES),
+        )
+        if dedup_keys is not None:
+            query = query.filter(BackgroundJob.dedup_key.in_(dedup_keys))
+        return query.scalar()
+
+    def cancel_job(self, job_id: int) -> BackgroundJob:
+        """
+        排隊中的工作直接取消；執行中的工作在下次回報進度時中止。
+
+        狀態轉換以單一條件 UPDATE 完成：worker 同時領走工作時這筆更新會等待
+        其列鎖並看到 running，改為要求中止，不會把執行中的工作標成已取消。
+        """
+        job = self.get_job(job_id)
+        handler = JOB_HANDLERS.get(job.job_type)
+        if handler and not handler.cancellable:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Job type {job.job_type} cannot be cancelled",
+            )
+        queued = BackgroundJob.status == JobStatus.QUEUED.value
+        updated = self.db.execute(
+            update(BackgroundJob)
+            .where(
+                BackgroundJob.id == job_id, BackgroundJob.status.in_(ACTIVE_STATUSES)
+            )
+            .values(
+                status=case(
+                    (queued, JobStatus.CANCELLED.value), else_=BackgroundJob.status
+                ),
+                finished_at=case((queued, func.now()), else_=BackgroundJob.finished_at),
+                cancel_requested=case(
+                    (queued, BackgroundJob.cancel_requested), else_=True
+                ),
+            )
+            .returning(BackgroundJob.id)
+            .execution_options(synchronize_session=False)
+        ).scalar()
+        self.db.commit()
+        self.db.refresh(job)
+        if updated is None:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Job already {job.status}",
+            )
+        return job
+
+    # ----- worker side -----
+
+    def claim(
+        self, worker_id: str, job_types: list[str] | None = None
+    ) -> BackgroundJob | None:
+        """
+        領取下一個可執行的工作。
+
+        以 ``FOR UPDATE SKIP LOCKED`` 鎖住候選列，多個 worker 不會互相等待；
+        再以該類型的 advisory lock 序列化並行數檢查，已達上限的類型本輪略過。
+        """
+        types = set(job_types or JOB_HANDLERS)
+        while types:
+            job = (
+                self.db.query(BackgroundJob)
+                .filter(
+                    BackgroundJob.status == JobStatus.QUEUED.value,
+                    BackgroundJob.run_after <= func.now(),
+                    BackgroundJob.job_type.in_(sorted(types)),
+                )
+                .order_by(
+                    BackgroundJob.priority, BackgroundJob.run_after, BackgroundJob.id
+                )
+                .limit(1)
+                .with_for_update(skip_locked=True)
+                .first()
+            )
+            if job is None:
+                self.db.rollback()
+                return None
+
+            self.db.execute(
+                select(
+                    func.pg_advisory_xact_lock(
+                        JOB_LOCK_NAMESPACE, func.hashtext(job.job_type)
+                    )
+                )
+            )
+            running = (
+                self.db.query(func.count(BackgroundJob.id))
+                .filter(
+                    BackgroundJob.job_type == job.job_type,
+                    BackgroundJob.status == JobStatus.RUNNING.value,
+                )
+                .scalar()
+            )
+            if running >= concurrency_limit(job.job_type):
+                self.db.rollback()
+                types.discard(job.job_type)
+                continue
+
+            now = datetime.now(UTC)
+            job.status = JobStatus.RUNNING.value
+            job.attempts += 1
+            job.locked_by = worker_id
+            job.started_at = now
+            job.heartbeat_at = now
+            job.last_error = None
+            self.db.commit()
+            return job
+        return None
+
+    def _finish(self, job: BackgroundJob, worker_id: str, **values) -> bool:
+        """
+        結束 ``worker_id`` 執行中的工作。
+
+        以 ``status = 'running' AND locked_by = worker_id`` 為條件更新：工作因
+        heartbeat 逾時被重新排隊、甚至已被其他 worker 領走時不覆寫其狀態，
+        回傳 False。
+        """
+        updated = self.db.execute(
+            update(BackgroundJob)
+            .where(*owned_by(job.id, worker_id))
+            .values(locked_by=None, **values)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        self.db.commit()
+        if not updated:
+            logger.warning(
+                f"Job {job.id} is no longer run by {worker_id}; result discarded"
+            )
+        return bool(updated)
+
+    def complete(self, job: BackgroundJob, worker_id: str, result: Any = None) -> bool:
+        return self._finish(
+            job,
+            worker_id,
+            status=JobStatus.SUCCEEDED.value,
+            result=result,
+            finished_at=datetime.now(UTC),
+            progress_current=func.coalesce(
+                BackgroundJob.progress_total, BackgroundJob.progress_current
+            ),
+        )
+
+    def cancelled(self, job: BackgroundJob, worker_id: str) -> bool:
+        return self._finish(
+            job,
+            worker_id,
+            status=JobStatus.CANCELLED.value,
+            finished_at=datetime.now(UTC),
+        )
+
+    def fail(self, job: BackgroundJob, worker_id: str, error: Exception) -> bool:
+        """記錄錯誤；可重試且未達次數上限時以指數退避重新排隊。"""
+        values = {
+            "last_error": f"{type(error).__name__}: {error}"[:JOB_ERROR_MAX_LENGTH]
+        }
+        # attempts 為本次領取時的值 (claim 後載入)
+        if is_retryable(error) and job.attempts < job.max_attempts:
+            values["status"] = JobStatus.QUEUED.value
+            values["run_after"] = datetime.now(UTC) + retry_delay(job.attempts)
+        else:
+            values["status"] = JobStatus.FAILED.value
+            values["finished_at"] = datetime.now(UTC)
+        return self._finish(job, worker_id, **values)
+
+    def schedule_periodic(self, job_types: list[str] | None = None) -> list[int]:
+        """
+        排入到期的週期性工作，回傳新排入 (或沿用) 的工作 id。
+
+        同類型最近一次建立的週期性工作早於 ``interval`` 前才排入；多個 worker
+        同時檢查時由 ``dedup_key`` 的唯一索引保證只有一筆在排隊。
+        """
+        job_ids = []
+        for job_type in sorted(job_types or JOB_HANDLERS):
+            interval = JOB_HANDLERS[job_type].interval
+            if interval is None:
+                continue
+            last = (
+                self.db.query(func.max(BackgroundJob.created_at))
+                .filter(
+                    BackgroundJob.job_type == job_type,
+                    BackgroundJob.dedup_key == PERIODIC_DEDUP_KEY,
+                )
+                .scalar()
+            )
+            if last is not None and last > datetime.now(UTC) - interval:
+                continue
+            job = self.enqueue(job_type, dedup_key=PERIODIC_DEDUP_KEY, priority=10)
+            job_ids.append(job.id)
+        self.db.rollback()
+        return job_ids
+
+    def requeue_stale(self, stale_seconds: float | None = None) -> int:
+        """把 heartbeat 逾時 (worker 已中止) 的執行中工作放回佇列或標為失敗。"""
+        cutoff = datetime.now(UTC) - timedelta(
+            seconds=stale_seconds or settings.job_stale_seconds
+        )
+        stale = (
+            BackgroundJob.status == JobStatus.RUNNING.value,
+            BackgroundJob.heartbeat_at < cutoff,
+        )
+        requeued = self.db.execute(
+            update(BackgroundJob)
+            .where(*stale, BackgroundJob.attempts < BackgroundJob.max_attempts)
+            .values(
+                status=JobStatus.QUEUED.value,
+                locked_by=None,
+                run_after=func.now(),
+                last_error="Worker stopped responding",
+            )
+        ).rowcount
+        failed = self.db.execute(
+            update(BackgroundJob)
+            .where(*stale)
+            .values(
+                status=JobStatus.FAILED.value,
+                locked_by=None,
+                finished_at=func.now(),
+                last_error="Worker stopped responding",
+            )
+        ).rowcount
+        self.db.commit()
+        if requeued or failed:
+            logger.warning(
+                f"Recovered stale jobs: {requeued} requeued, {failed} failed"
+            )
+        return requeued + failed
@@ -0,0 +1,428 @@
+"""Long-term spectral average (LTSA) products per deployment.
+
+An LTSA is built by streaming every audio file of a deployment once, in
+``record_time`` order, and averaging the power spectra that fall into each
+fixed time bin. Bins are written as a pyramid of float16 dB tiles to the
+project bucket so the viewer can fetch any window at any zoom by reading a
+handful of small objects.
+"""
+
+import io
+import json
+import logging
+import math
+from concurrent.futures import ThreadPoolExecutor
+from datetime import UTC, datetime
+
+import numpy as np
+from botocore.exceptions import ClientError
+from fastapi import HTTPException, status
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.core.minio import get_s3_client
+from app.models.audio import AudioInfo
+from app.services.audio_reader import AudioObjectReader
+from app.services.deployment_service import DeploymentService
+from app.utils.cache import LRUCache
+from app.utils.dsp import power_to_db, stft_power
+from app.utils.path_utils import ltsa_root
+from app.utils.time_utils import as_aware
+
+logger = logging.getLogger(__name__)
+
+LTSA_TILE_BINS = 256
+LTSA_MAX_WINDOW_BINS = 4096
+# 每次從 MinIO 串流解碼的 STFT frame 數
+LTSA_BLOCK_FFTS = 512
+
+_tile_cache = LRUCache(maxsize=2048)
+_manifest_cache = LRUCache(maxsize=256, ttl=30)
+_tile_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="ltsa-tile")
+
+
+def _is_missing_key(error: ClientError) -> bool:
+    return error.response.get("Error", {}).get("Code") in ("NoSuchKey", "404")
+
+
+class LtsaPyramidWriter:
+    """
+    Streams level-0 bin sums into a multi-resolution tile pyramid.
+
+    Level ``L`` merges ``2**L`` level-0 bins. Bins must arrive in ascending
+    order (files are processed by ``record_time``): a tile is flushed as soon
+    as a later tile starts, and frames that arrive for an already flushed
+    tile (overlapping files) are dropped and counted in ``dropped_frames``.
+    """
+
+    def __init__(self, n_levels: int, n_freq: int, sink, tile_bins=LTSA_TILE_BINS):
+        self.n_levels = n_levels
+        self.n_freq = n_freq
+        self.tile_bins = tile_bins
+        self.sink = sink
+        self.dropped_frames = 0
+        self.tiles_written = 0
+        self._tile: list[int | None] = [None] * n_levels
+        self._sum = [np.zeros((tile_bins, n_freq)) for _ in range(n_levels)]
+        self._count = [np.zeros(tile_bins, dtype=np.int64) for _ in range(n_levels)]
+
+    def add(self, bins: np.ndarray, power: np.ndarray) -> None:
+        if not len(bins):
+            return
+        if np.any(np.diff(bins) < 0):
+            order = np.argsort(bins, kind="stable")
+            bins, power = bins[order], power[order]
+
+        # 先在 level 0 合併同一 bin 的 frame，再逐層以 reduceat 合併
+        ub, starts = np.unique(bins, return_index=True)
+        sums = np.add.reduceat(power.astype(np.float64), starts, axis=0)
+        counts = np.diff(np.append(starts, len(bins)))
+
+        for level in range(self.n_levels):
+            level_bins = ub >> level
+            if level:
+                level_bins, lstarts = np.unique(level_bins, return_index=True)
+                level_sums = np.add.reduceat(sums, lstarts, axis=0)
+                level_counts = np.add.reduceat(counts, lstarts)
+            else:
+                level_sums, level_counts = sums, counts
+            self._accumulate(level, level_bins, level_sums, level_counts)
+
+    def _accumulate(self, level, bins, sums, counts) -> None:
+        tiles = bins // self.tile_bins
+        for tile in np.unique(tiles):
+            mask = tiles == tile
+            current = self._tile[level]
+            if current is None or tile > current:
+                if current is not None:
+                    self._flush(level)
+                self._tile[level] = int(tile)
+            elif tile < current:
+                if level == 0:
+                    self.dropped_frames += int(counts[mask].sum())
+                continue
+            idx = bins[mask] % self.tile_bins
+            self._sum[level][idx] += sums[mask]
+            self._count[level][idx] += counts[mask]
+
+    def _flush(self, level: int) -> None:
+        count = self._count[level]
+        filled = count > 0
+        if filled.any():
+            mean = np.zeros_like(self._sum[level])
+            mean[filled] = self._sum[level][filled] / count[filled, None]
+            tile = power_to_db(mean).astype(np.float16)
+            tile[~filled] = np.nan
+            self.sink(level, self._tile[level], tile)
+            self.tiles_written += 1
+        self._sum[level][:] = 0
+        count[:] = 0
+
+    def close(self) -> None:
+        for level in range(self.n_levels):
+            if self._tile[level] is not None:
+                self._flush(level)
+                self._tile[level] = None
+
+
+class LtsaService:
+    def __init__(self, db: Session, s3_client=None):
+        self.db = db
+        self.s3_client = s3_client or get_s3_client()
+
+    def _bucket(self, deployment_id: int) -> str:
+        deployment = DeploymentService(self.db).get_deployment_details(deployment_id)
+        return deployment.point.project.name
+
+    def build_ltsa(
+        self,
+        deployment_id: int,
+        bin_seconds: float = 60.0,
+        nfft: int = 2048,
+        progress=None,
+    ) -> dict:
+        """
+        計算並寫入 Deployment 的 LTSA 金字塔。
+
+        每個音檔只串流讀取一次；完成後才覆寫 manifest，讀取端不會看到
+        建置中的半成品。``progress(done, total)`` 可用來回報進度。
+        """
+        deployment = DeploymentService(self.db).get_deployment_details(deployment_id)
+        bucket = deployment.point.project.name
+
+        filters = (
+            AudioInfo.deployment_id == deployment_id,
+            AudioInfo.is_deleted.is_(False),
+            AudioInfo.record_time.isnot(None),
+        )
+        first, last, longest = (
+            self.db.query(
+                func.min(AudioInfo.record_time),
+                func.max(AudioInfo.record_time),
+                func.max(AudioInfo.record_duration),
+            )
+            .filter(*filters)
+            .one()
+        )
+        if first is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="No audio with record_time in this deployment",
+            )
+
+        t0 = math.floor(first.timestamp() / bin_seconds) * bin_seconds
+        span = last.timestamp() - t0 + (longest or 0) + bin_seconds
+        n_bins_est = math.ceil(span / bin_seconds)
+        n_levels = max(1, math.ceil(math.log2(max(n_bins_est / LTSA_TILE_BINS, 1))) + 1)
+        n_freq = nfft // 2 + 1
+
+        build_id = datetime.now(UTC).strftime("%Y%m%dT%H%M%S")
+        prefix = f"{ltsa_root(deployment_id)}/{build_id}"
+
+        def sink(level: int, tile: int, data: np.ndarray) -> None:
+            buf = io.BytesIO()
+            np.save(buf, data, allow_pickle=False)
+            self.s3_client.put_object(
+                Bucket=bucket, Key=f"{prefix}/L{level}/{tile}.npy", Body=buf.getvalue()
+            )
+
+        writer = LtsaPyramidWriter(n_levels, n_freq, sink)
+        fs = deployment.fs
+        processed = skipped = 0
+        max_bin = 0
+
+        audios = (
+            self.db.query(
+                AudioInfo.id,
+                AudioInfo.object_key,
+                AudioInfo.record_time,
+                AudioInfo.file_size,
+            )
+            .filter(*filters)
+            .order_by(AudioInfo.record_time, AudioInfo.id)
+            .all()
+        )
+        for done, audio in enumerate(audios, start=1):
+            reader = AudioObjectReader(
+                self.s3_client, bucket, audio.object_key, audio.file_size
+            )
+            try:
+                header = reader.header
+                fs = fs or header.fs
+                if header.fs != fs:
+                    logger.warning(
+                        f"Skip {audio.object_key}: fs {header.fs} != deployment fs {fs}"
+                    )
+                    skipped += 1
+                    continue
+                last_bin = self._accumulate_file(
+                    reader,
+                    audio.record_time.timestamp() - t0,
+                    nfft,
+                    bin_seconds,
+                    writer,
+                )
+                max_bin = max(max_bin, last_bin)
+                processed += 1
+            except Exception as e:
+                logger.warning(f"Skip {audio.object_key} in LTSA build: {e}")
+                skipped += 1
+            finally:
+                if progress:
+                    progress(done, len(audios))
+        writer.close()
+
+        manifest = {
+            "deployment_id": deployment_id,
+            "build_id": build_id,
+            "prefix": prefix,
+            "t0": datetime.fromtimestamp(t0, UTC).isoformat(),
+            "t0_epoch": t0,
+            "bin_seconds": bin_seconds,
+            "nfft": nfft,
+            "fs": fs,
+            "n_freq": n_freq,
+            "freq_step": (fs / nfft) if fs else None,
+            "tile_bins": LTSA_TILE_BINS,
+            "n_levels": n_levels,
+            "n_bins": max_bin + 1,
+            "files_processed": processed,
+            "files_skipped": skipped,
+            "dropped_frames": writer.dropped_frames,
+            "built_at": datetime.now(UTC).isoformat(),
+        }
+
+        previous = self._read_manifest(bucket, deployment_id)
+        self.s3_client.put_object(
+            Bucket=bucket,
+            Key=f"{ltsa_root(deployment_id)}/manifest.json",
+            Body=json.dumps(manifest).encode("utf-8"),
+            ContentType="application/json",
+        )
+        _manifest_cache.invalidate((bucket, deployment_id))
+        if previous and previous.get("prefix") != prefix:
+            self._delete_prefix(bucket, previous["prefix"])
+        return manifest
+
+    def _accumulate_file(self, reader, offset_s, nfft, bin_seconds, writer) -> int:
+        """Feed one file's frames into ``writer``; returns the last bin touched."""
+        fs = reader.header.fs
+        carry = np.empty(0, dtype=np.float32)
+        consumed = 0
+        last_bin = 0
+        for block in reader.iter_blocks(nfft * LTSA_BLOCK_FFTS):
+            # LTSA 以第一個聲道計算
+            x = np.concatenate([carry, block[:, 0]])
+            starts, psd = stft_power(x, fs, nfft)
+            if len(starts):
+                t = offset_s + (consumed + starts) / fs
+                bins = np.floor(t / bin_seconds).astype(np.int64)
+                writer.add(bins, psd)
+                last_bin = max(last_bin, int(bins[-1]))
+            used = len(starts) * nfft
+            carry = x[used:]
+            consumed += used
+        return last_bin
+
+    def _read_manifest(self, bucket: str, deployment_id: int) -> dict | None:
+        try:
+            response = self.s3_client.get_object(
+                Bucket=bucket, Key=f"{ltsa_root(deployment_id)}/manifest.json"
+            )
+        except ClientError as e:
+            if _is_missing_key(e):
+                return None
+            raise
+        return json.loads(response["Body"].read())
+
+    def _delete_prefix(self, bucket: str, prefix: str) -> None:
+        try:
+            paginator = self.s3_client.get_paginator("list_objects_v2")
+            for page in paginator.paginate(Bucket=bucket, Prefix=f"{prefix}/"):
+                keys = [{"Key": o["Key"]} for o in page.get("Contents", [])]
+                if keys:
+                    self.s3_client.delete_objects(
+                        Bucket=bucket, Delete={"Objects": keys}
+                    )
+        except Exception as e:
+            logger.warning(f"Failed to clean up old LTSA build {prefix}: {e}")
+
+    def get_manifest(self, deployment_id: int, bucket: str | None = None) -> dict:
+        bucket = bucket or self._bucket(deployment_id)
+        manifest = _manifest_cache.get((bucket, deployment_id))
+        if manifest is None:
+            manifest = self._read_manifest(bucket, deployment_id)
+            if manifest is None:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="LTSA has not been built for this deployment",
+                )
+            _manifest_cache.set((bucket, deployment_id), manifest)
+        return manifest
+
+    def _load_tile(self, bucket: str, prefix: str, level: int, tile: int, n_freq: int):
+        key = f"{prefix}/L{level}/{tile}.npy"
+        data = _tile_cache.get((bucket, key))
+        if data is None:
+            try:
+                response = self.s3_client.get_object(Bucket=bucket, Key=key)
+                data = np.load(io.BytesIO(response["Body"].read()), allow_pickle=False)
+            except ClientError as e:
+                if not _is_missing_key(e):
+                    raise
+                # 沒有錄音的時段不會寫入 tile
+                data = np.full((LTSA_TILE_BINS, n_freq), np.nan, dtype=np.float16)
+            _tile_cache.set((bucket, key), data)
+        return data
+
+    def get_window(
+        self,
+        deployment_id: int,
+        start: datetime,
+        end: datetime,
+        fmin: float | None = None,
+        fmax: float | None = None,
+        level: int | None = None,
+        max_bins: int = 1024,
+    ) -> dict:
+        """
+        回傳指定時間 / 頻率範圍的 LTSA 視窗。
+
+        未指定 ``level`` 時自動挑選不超過 ``max_bins`` 的最細層級，
+        只讀取涵蓋該範圍的 tile。
+        """
+        start, end = as_aware(start), as_aware(end)
+        if end <= start:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="end must be later than start",
+            )
+        bucket = self._bucket(deployment_id)
+        manifest = self.get_manifest(deployment_id, bucket)
+        freq_step = manifest["freq_step"]
+        if freq_step is None and (fmin is not None or fmax is not None):
+            # 建置時取不到取樣率，頻率軸沒有單位
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="LTSA was built without a sample rate; fmin/fmax unavailable",
+            )
+        bin_seconds = manifest["bin_seconds"]
+        n_levels = manifest["n_levels"]
+        n_freq = manifest["n_freq"]
+        tile_bins = manifest["tile_bins"]
+
+        b0 = max(
+            0, math.floor((start.timestamp() - manifest["t0_epoch"]) / bin_seconds)
+        )
+        b1 = min(
+            manifest["n_bins"],
+            math.ceil((end.timestamp() - manifest["t0_epoch"]) / bin_seconds),
+        )
+        b1 = max(b1, b0 + 1)
+
+        if level is None:
+            level = 0
+            while level < n_levels - 1 and math.ceil((b1 - b0) / 2**level) > max_bins:
+                level += 1
+        elif not 0 <= level < n_levels:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"level must be between 0 and {n_levels - 1}",
+            )
+
+        lb0 = b0 >> level
+        lb1 = ((b1 - 1) >> level) + 1
+        if lb1 - lb0 > LTSA_MAX_WINDOW_BINS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Requested window is too large for this level",
+            )
+
+        tiles = list(range(lb0 // tile_bins, (lb1 - 1) // tile_bins + 1))
+        arrays = list(
+            _tile_pool.map(
+                lambda t: self._load_tile(bucket, manifest["prefix"], level, t, n_freq),
+                tiles,
+            )
+        )
+        offset = tiles[0] * tile_bins
+        data = np.concatenate(arrays)[lb0 - offset : lb1 - offset]
+
+        f0 = 0 if fmin is None else max(0, math.floor(fmin / freq_step))
+        f1 = n_freq if fmax is None else min(n_freq, math.ceil(fmax / freq_step) + 1)
+        data = data[:, f0:f1]
+
+        level_seconds = bin_seconds * 2**level
+        return {
+            "deployment_id": deployment_id,
+            "level": level,
+            "start_time": datetime.fromtimestamp(
+                manifest["t0_epoch"] + lb0 * level_seconds, UTC
+            ),
+            "bin_seconds": level_seconds,
+            "freq_min": None if freq_step is None else f0 * freq_step,
+            "freq_step": freq_step,
+            "n_time": data.shape[0],
+            "n_freq": data.shape[1],
+            "data": data,
+        }
@@ -1,20 +1,82 @@
 """OAuth service for Google authentication."""
 
+import re
+import threading
+import time
 from datetime import UTC, datetime
 from urllib.parse import urlencode
 
 import requests
 from fastapi import HTTPException, status
+from jose import JWTError, jwt
+from requests.adapters import HTTPAdapter
 from sqlalchemy.orm import Session
 
+from app.core.auth import invalidate_principal
 from app.core.config import settings
-from app.core.security import create_access_token
+from app.core.security import create_access_token, user_claims
 from app.models.user import UserInfo
+from app.utils.cache import SingleFlight
 
-# Google OAuth endpoints
+# Google OAuth endpoints (token / userinfo / JWKS 見 settings)
 GOOGLE_AUTH_URL = "https://accounts.google.com/o/oauth2/v2/auth"
-GOOGLE_TOKEN_URL = "https://oauth2.googleapis.com/token"
-GOOGLE_USERINFO_URL = "https://www.googleapis.com/oauth2/v3/userinfo"
+GOOGLE_ISSUERS = ("https://accounts.google.com", "accounts.google.com")
+# JWKS 回應沒有 Cache-Control max-age 時的快取秒數
+DEFAULT_JWKS_MAX_AGE = 300
+
+# 所有請求共用的 keep-alive 連線，登入時不必每次重新 TLS handshake
+http_session = requests.Session()
+for _prefix in ("https://", "http://"):
+    http_session.mount(
+        _prefix, HTTPAdapter(pool_maxsize=settings.google_oauth_pool_size)
+    )
+
+
+class GoogleKeys:
+    """
+    Google's signing keys (JWKS), cached for the response's ``max-age``.
+
+    An unknown ``kid`` triggers one refresh so rotated keys are picked up
+    before the cached set expires. Concurrent refreshes are coalesced.
+    """
+
+    def __init__(self):
+        self._keys: dict[str, dict] = {}
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+        self._flight = SingleFlight()
+
+    def get(self, kid: str) -> dict | None:
+        """Return the JWK for ``kid``, or None when it cannot be fetched."""
+        with self._lock:
+            fresh = time.monotonic() < self._expires_at
+            key = self._keys.get(kid) if fresh else None
+        if key is None:
+            try:
+                self._flight.do("jwks", self._refresh)
+            except requests.RequestException:
+                return None
+            with self._lock:
+                key = self._keys.get(kid)
+        return key
+
+    def clear(self) -> None:
+        with self._lock:
+            self._keys = {}
+            self._expires_at = 0.0
+
+    def _refresh(self) -> None:
+        response = http_session.get(settings.google_oauth_jwks_url, timeout=10)
+        response.raise_for_status()
+        keys = {key["kid"]: key for key in response.json().get("keys", [])}
+        match = re.search(r"max-age=(\d+)", response.headers.get("Cache-Control", ""))
+        max_age = int(match.group(1)) if match else DEFAULT_JWKS_MAX_AGE
+        with self._lock:
+            self._keys = keys
+            self._expires_at = time.monotonic() + max_age
+
+
+google_keys = GoogleKeys()
 
 
 class OAuthService:
@@ -67,8 +129,8 @@ class OAuthService:
                 detail="Google OAuth is not configured",
             )
 
-        response = requests.post(
-            GOOGLE_TOKEN_URL,
+        response = http_session.post(
+            settings.google_oauth_token_url,
             data={
                 "client_id": settings.google_oauth_client_id,
                 "client_secret": settings.google_oauth_client_secret,
@@ -96,8 +158,8 @@ class OAuthService:
         Returns:
             User info from Google.
         """
-        response = requests.get(
-            GOOGLE_USERINFO_URL,
+        response = http_session.get(
+            settings.google_oauth_userinfo_url,
             headers={"Authorization": f"Bearer {access_token}"},
             timeout=10,
         )
@@ -110,6 +172,67 @@ class OAuthService:
 
         return response.json()
 
+    def verify_id_token(self, id_token: str, access_token: str | None) -> dict | None:
+        """Verify a Google ID token locally against the cached JWKS.
+
+        Args:
+            id_token: ID token from the token response.
+            access_token: Access token from the same response (checked
+                against the ``at_hash`` claim).
+
+        Returns:
+            Token claims, or None when the signing key is unavailable.
+        """
+        invalid = HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid ID token from Google",
+        )
+        try:
+            header = jwt.get_unverified_header(id_token)
+        except JWTError:
+            raise invalid from None
+        key = google_keys.get(header.get("kid"))
+        if key is None:
+            return None
+        try:
+            return jwt.decode(
+                id_token,
+                key,
+                algorithms=[key.get("alg", "RS256")],
+                audience=settings.google_oauth_client_id,
+                issuer=GOOGLE_ISSUERS,
+                access_token=access_token,
+            )
+        except JWTError:
+            raise invalid from None
+
+    def get_google_identity(self, tokens: dict) -> dict:
+        """Return the Google user's ``sub`` / ``email`` / ``name``.
+
+        Uses the verified ID token when it carries ``sub`` and ``email``;
+        otherwise falls back to the userinfo endpoint.
+
+        Args:
+            tokens: Token response from Google.
+
+        Returns:
+            User claims from the ID token or user info from Google.
+        """
+        access_token = tokens.get("access_token")
+        if not access_token:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="No access token in response",
+            )
+
+        id_token = tokens.get("id_token")
+        if id_token:
+            claims = self.verify_id_token(id_token, access_token)
+            if claims and claims.get("sub") and claims.get("email"):
+                return claims
+
+        return self.get_google_user_info(access_token)
+
     def authenticate_with_google(self, code: str) -> tuple[UserInfo, bool]:
         """Authenticate user with Google OAuth.
 
@@ -126,16 +249,9 @@ class OAuthService:
         """
         # Exchange code for tokens
         tokens = self.exchange_code_for_tokens(code)
-        access_token = tokens.get("access_token")
-
-        if not access_token:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="No access token in response",
-            )
 
-        # Get user info from Google
-        google_user = self.get_google_user_info(access_token)
+        # Get user info from the ID token (or Google's userinfo endpoint)
+        google_user = self.get_google_identity(tokens)
         google_sub = google_user.get("sub")
         email = google_user.get("email")
         name = google_user.get("name")
@@ -180,6 +296,7 @@ class OAuthService:
             existing_email_user.is_verified = True
             existing_email_user.last_login_at = datetime.now(UTC)
             self.db.commit()
+            invalidate_principal(existing_email_user.email)
             return existing_email_user, False
 
         # Check for soft-deleted user with same email
@@ -233,15 +350,7 @@ class OAuthService:
 
         # Exchange code and get Google user info
         tokens = self.exchange_code_for_tokens(code)
-        access_token = tokens.get("access_token")
-
-        if not access_token:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="No access token in response",
-            )
-
-        google_user = self.get_google_user_info(access_token)
+        google_user = self.get_google_identity(tokens)
         google_sub = google_user.get("sub")
 
         if not google_sub:
@@ -273,6 +382,7 @@ class OAuthService:
         user.oauth_sub = google_sub
         self.db.commit()
         self.db.refresh(user)
+        invalidate_principal(user.email)
 
         return user
 
@@ -304,6 +414,7 @@ class OAuthService:
         user.oauth_sub = None
         self.db.commit()
         self.db.refresh(user)
+        invalidate_principal(user.email)
 
         return user
 
@@ -317,4 +428,4 @@ def create_jwt_for_user(user: UserInfo) -> str:
     Returns:
         JWT access token.
     """
-    return create_access_token({"sub": user.email})
+    return create_access_token(user_claims(user))
@@ -0,0 +1,395 @@
+"""
+Outbox for MinIO objects removed by hard deletes.
+
+The hard-delete services write one outbox row per object (and one per
+bucket to drop) with ``INSERT ... SELECT`` in the same transaction that
+deletes the database rows, so nothing is loaded into Python and a rollback
+also drops the pending deletions. ``ObjectDeletionService.drain`` runs in
+the worker: it claims ready rows with ``FOR UPDATE SKIP LOCKED``, issues
+the ``delete_objects`` calls concurrently and reschedules only the keys
+MinIO reported as failed.
+
+Rows whose key ends with ``/`` are prefixes (a deployment's LTSA builds):
+the worker lists and deletes everything under them. Before dropping a
+bucket the worker also clears its ``_derived/`` prefix, so derived objects
+that cannot be traced back to a row (content-addressed spectrogram tiles)
+go with it; anything else left in the bucket keeps the drop pending.
+
+The database rows are gone as soon as the hard delete commits, but the
+bucket name and the object keys stay reserved until their outbox rows
+drain: creating a project with that name, registering an audio with that
+key or signing an upload URL for it is refused meanwhile, so a retried
+deletion can never remove newer objects.
+"""
+
+import logging
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import UTC, datetime
+
+from sqlalchemy import (
+    String,
+    cast,
+    exists,
+    func,
+    insert,
+    literal,
+    select,
+    union_all,
+)
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.minio import get_s3_client
+from app.models.audio import AudioInfo
+from app.models.deployment import DeploymentInfo
+from app.models.object_deletion import ObjectDeletion
+from app.services.cold_storage_service import COLD_META_KEY, S3_DELETE_BATCH
+from app.services.job_service import retry_delay
+from app.utils.path_utils import DERIVED_PREFIX, LTSA_DEPLOYMENT_PREFIX, PEAKS_SUFFIX
+from app.utils.rate_limit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# 物件已不存在視為刪除成功
+MISSING_CODES = {"NoSuchKey", "NoSuchBucket"}
+# object_key 以此結尾的列代表刪除整個前綴
+PREFIX_SUFFIX = "/"
+
+
+def _error_code(error: Exception) -> str | None:
+    response = getattr(error, "response", None)
+    return response.get("Error", {}).get("Code") if isinstance(response, dict) else None
+
+
+def enqueue_object_deletions(db: Session, bucket: str, audio_filter) -> int:
+    """
+    把符合 ``audio_filter`` 的音檔物件、峰值 sidecar 與冷儲存副本寫入 outbox。
+
+    不 commit，由呼叫端與資料列的刪除一起提交；回傳寫入的物件數。
+    sidecar 可能從未建立，刪除不存在的 key 視為成功。
+    """
+    bucket_column = literal(bucket, String)
+    queued = db.execute(
+        insert(ObjectDeletion).from_select(
+            ["bucket", "object_key"],
+            union_all(
+                select(bucket_column, AudioInfo.object_key).where(audio_filter),
+                select(bucket_column, AudioInfo.object_key + PEAKS_SUFFIX).where(
+                    audio_filter
+                ),
+            ),
+            include_defaults=False,
+        )
+    ).rowcount
+    cold = AudioInfo.meta_json[COLD_META_KEY]
+    queued += db.execute(
+        insert(ObjectDeletion).from_select(
+            ["bucket", "object_key"],
+            select(cold["bucket"].as_string(), cold["key"].as_string()).where(
+                audio_filter,
+                AudioInfo.is_cold_storage.is_(True),
+                cold["key"].as_string().isnot(None),
+            ),
+            include_defaults=False,
+        )
+    ).rowcount
+    return queued
+
+
+def enqueue_ltsa_deletions(db: Session, bucket: str, deployment_filter) -> int:
+    """
+    把符合 ``deployment_filter`` 的 deployment 的 LTSA 前綴寫入 outbox。
+
+    需在刪除 deployment 列之前呼叫；不 commit，回傳寫入的前綴數。
+    """
+    return db.execute(
+        insert(ObjectDeletion).from_select(
+            ["bucket", "object_key"],
+            select(
+                literal(bucket, String),
+                literal(LTSA_DEPLOYMENT_PREFIX, String)
+                + cast(DeploymentInfo.id, String)
+                + PREFIX_SUFFIX,
+            ).where(deployment_filter),
+            include_defaults=False,
+        )
+    ).rowcount
+
+
+def enqueue_bucket_deletion(db: Session, bucket: str) -> None:
+    """排入刪除 bucket；該 bucket 的物件全部清除後才會執行。"""
+    db.add(ObjectDeletion(bucket=bucket, object_key=None))
+
+
+def bucket_pending_deletion(db: Session, bucket: str) -> bool:
+    """bucket 是否仍有待清除的 outbox 列；清除前不可重新使用該名稱。"""
+    return db.scalar(select(exists().where(ObjectDeletion.bucket == bucket)))
+
+
+def keys_pending_deletion(db: Session, bucket: str, keys: list[str]) -> set[str]:
+    """``keys`` 中仍在 outbox 等待刪除的 key；清除前不可重新上傳或註冊。"""
+    return set(
+        db.scalars(
+            select(ObjectDeletion.object_key).where(
+                ObjectDeletion.bucket == bucket, ObjectDeletion.object_key.in_(keys)
+            )
+        )
+    )
+
+
+class ObjectDeletionService:
+    def __init__(
+        self,
+        db: Session,
+        s3_client=None,
+        concurrency: int | None = None,
+        max_attempts: int | None = None,
+        limiter: TokenBucket | None = None,
+    ):
+        self.db = db
+        self.s3_client = s3_client or get_s3_client()
+        self.concurrency = concurrency or settings.object_deletion_concurrency
+        self.max_attempts = max_attempts or settings.object_deletion_max_attempts
+        rate = settings.object_deletion_objects_per_second
+        self.limiter = limiter or (TokenBucket(rate) if rate > 0 else None)
+
+    def _ready(self):
+        return (
+            ObjectDeletion.next_attempt_at <= func.now(),
+            ObjectDeletion.attempts < self.max_attempts,
+        )
+
+    def _delete_chunk(self, bucket: str, keys: list[str]) -> dict[str, str]:
+        """刪除一批 key，回傳失敗的 key 與錯誤訊息。"""
+        try:
+            response = self.s3_client.delete_objects(
+                Bucket=bucket,
+                Delete={"Objects": [{"Key": key} for key in keys], "Quiet": True},
+            )
+        except Exception as e:
+            if _error_code(e) in MISSING_CODES:
+                return {}
+            return dict.fromkeys(keys, f"{type(e).__name__}: {e}")
+        return {
+            error["Key"]: f"{error.get('Code')}: {error.get('Message')}"
+            for error in response.get("Errors", [])
+            if error.get("Code") not in MISSING_CODES
+        }
+
+    def _delete_prefix(self, bucket: str, prefix: str = "") -> str | None:
+        """
+        列出並刪除 ``prefix`` 下的所有物件 (空字串代表整個 bucket)。
+
+        回傳第一個失敗的錯誤訊息；全部刪除或 bucket 已不存在時回傳 None。
+        """
+        paginator = self.s3_client.get_paginator("list_objects_v2")
+        try:
+            for page in paginator.paginate(
+                Bucket=bucket,
+                Prefix=prefix,
+                PaginationConfig={"PageSize": S3_DELETE_BATCH},
+            ):
+                keys = [item["Key"] for item in page.get("Contents", [])]
+                if not keys:
+                    continue
+                if self.limiter:
+                    self.limiter.acquire(len(keys))
+                errors = self._delete_chunk(bucket, keys)
+                if errors:
+                    key, error = next(iter(errors.items()))
+                    return f"{key}: {error}"
+        except Exception as e:
+            if _error_code(e) in MISSING_CODES:
+                return None
+            return f"{type(e).__name__}: {e}"
+        return None
+
+    def _reschedule(self, row: ObjectDeletion, error: str) -> None:
+        row.attempts += 1
+        row.last_error = error
+        row.next_attempt_at = datetime.now(UTC) + retry_delay(row.attempts)
+        if row.attempts >= self.max_attempts:
+            logger.error(
+                f"Giving up deleting {row.bucket}/{row.object_key or ''}: {error}"
+            )
+
+    def drain_objects(self) -> tuple[int, int]:
+        """
+        處理一批可執行的物件刪除 (每個並行呼叫最多 1000 個 key)。
+
+        回傳 (成功數, 失敗數)；兩者皆為 0 代表目前沒有可處理的列。
+        """
+        rows = (
+            self.db.query(ObjectDeletion)
+            .filter(
+                ObjectDeletion.object_key.isnot(None),
+                ~ObjectDeletion.object_key.endswith(PREFIX_SUFFIX),
+                *self._ready(),
+            )
+            .order_by(ObjectDeletion.id)
+            .limit(self.concurrency * S3_DELETE_BATCH)
+            .with_for_update(skip_locked=True)
+            .all()
+        )
+        if not rows:
+            self.db.rollback()
+            return 0, 0
+        if self.limiter:
+            # 限速等待期間列鎖仍由本交易持有，其他 worker 會略過這些列
+            self.limiter.acquire(len(rows))
+
+        by_bucket: dict[str, list[ObjectDeletion]] = defaultdict(list)
+        for row in rows:
+            by_bucket[row.bucket].append(row)
+        chunks = [
+            (bucket, bucket_rows[i : i + S3_DELETE_BATCH])
+            for bucket, bucket_rows in by_bucket.items()
+            for i in range(0, len(bucket_rows), S3_DELETE_BATCH)
+        ]
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            results = list(
+                pool.map(
+                    lambda chunk: self._delete_chunk(
+                        chunk[0], [row.object_key for row in chunk[1]]
+                    ),
+                    chunks,
+                )
+            )
+
+        done, failed = [], 0
+        for (_, chunk_rows), errors in zip(chunks, results, strict=True):
+            for row in chunk_rows:
+                if row.object_key in errors:
+                    self._reschedule(row, errors[row.object_key])
+                    failed += 1
+                else:
+                    done.append(row.id)
+        if done:
+            self.db.query(ObjectDeletion).filter(ObjectDeletion.id.in_(done)).delete(
+                synchronize_session=False
+            )
+        self.db.commit()
+        return len(done), failed
+
+    def drain_prefixes(self) -> tuple[int, int]:
+        """
+        處理一批可執行的前綴刪除，每個前綴由一條執行緒列出並刪除。
+
+        回傳 (成功的前綴數, 失敗的前綴數)。
+        """
+        rows = (
+            self.db.query(ObjectDeletion)
+            .filter(ObjectDeletion.object_key.endswith(PREFIX_SUFFIX), *self._ready())
+            .limit(self.concurrency)
+            .with_for_update(skip_locked=True)
+            .all()
+        )
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            results = list(
+                pool.map(
+                    lambda row: self._delete_prefix(row.bucket, row.object_key), rows
+                )
+            )
+        done = failed = 0
+        for row, error in zip(rows, results, strict=True):
+            if error:
+                self._reschedule(row, error)
+                failed += 1
+            else:
+                self.db.delete(row)
+                done += 1
+        self.db.commit()
+        return done, failed
+
+    def drain_buckets(self) -> int:
+        """
+        刪除物件已全部清除的 bucket，回傳刪除的 bucket 數。
+
+        刪除前先清除 ``_derived/`` 下沒有對應資料列的衍生檔案；其餘物件
+        只依 outbox 列逐一刪除，不會清空整個 bucket。仍有未知物件時
+        delete_bucket 以 BucketNotEmpty 失敗並延後重試。
+        """
+        remaining = ObjectDeletion.__table__.alias("remaining")
+        rows = (
+            self.db.query(ObjectDeletion)
+            .filter(
+                ObjectDeletion.object_key.is_(None),
+                *self._ready(),
+                ~select(remaining.c.id)
+                .where(
+                    remaining.c.bucket == ObjectDeletion.bucket,
+                    remaining.c.object_key.isnot(None),
+                )
+                .exists(),
+            )
+            .with_for_update(skip_locked=True)
+            .all()
+        )
+        deleted = 0
+        for row in rows:
+            error = self._delete_prefix(row.bucket, DERIVED_PREFIX)
+            if error:
+                self._reschedule(row, error)
+                continue
+            try:
+                self.s3_client.delete_bucket(Bucket=row.bucket)
+            except Exception as e:
+                if _error_code(e) not in MISSING_CODES:
+                    self._reschedule(row, f"{type(e).__name__}: {e}")
+                    continue
+            self.db.delete(row)
+            deleted += 1
+        self.db.commit()
+        return deleted
+
+    def pending(self) -> int:
+        """尚未放棄 (仍會重試) 的列數。"""
+        return (
+            self.db.query(func.count(ObjectDeletion.id))
+            .filter(ObjectDeletion.attempts < self.max_attempts)
+            .scalar()
+        )
+
+    def stuck(self) -> int:
+        """已放棄重試的列數；這些 bucket 名稱與 key 會一直保留，需人工處理。"""
+        return (
+            self.db.query(func.count(ObjectDeletion.id))
+            .filter(ObjectDeletion.attempts >= self.max_attempts)
+            .scalar()
+        )
+
+    def drain(self, progress=None) -> dict:
+        """處理所有目前可執行的刪除，回傳統計與仍待重試的列數。"""
+        deleted = failed = 0
+        while True:
+            ok, bad = self.drain_objects()
+            if not ok and not bad:
+                break
+            deleted += ok
+            failed += bad
+            if progress:
+                progress(deleted)
+        prefixes = 0
+        while True:
+            ok, bad = self.drain_prefixes()
+            if not ok and not bad:
+                break
+            prefixes += ok
+            failed += bad
+        buckets = self.drain_buckets()
+        result = {
+            "deleted_objects": deleted,
+            "deleted_prefixes": prefixes,
+            "failed_attempts": failed,
+            "deleted_buckets": buckets,
+            "pending": self.pending(),
+            "stuck": self.stuck(),
+        }
+        logger.info(f"Object deletion outbox drained: {result}")
+        if result["stuck"]:
+            logger.error(
+                f"{result['stuck']} object deletions exceeded "
+                f"{self.max_attempts} attempts; see object_deletion_outbox.last_error"
+            )
+        return result
@@ -0,0 +1,169 @@
+"""
+Maintenance of the ``audio_info`` range partitions.
+
+A periodic worker job keeps partitions for the current and the next
+``audio_partition_premake`` periods, so new audios never fall through to the
+default partition. Old partitions can be detached into the archive schema,
+where they can be dumped and dropped without touching the live table.
+"""
+
+import logging
+import re
+from datetime import UTC, datetime
+
+from fastapi import HTTPException, status
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.partitions import (
+    DEFAULT_PARTITION,
+    PARENT_TABLE,
+    bounds_sql,
+    create_partition_sql,
+    next_period,
+    partition_ranges,
+    period_start,
+)
+
+logger = logging.getLogger(__name__)
+
+LIST_SQL = text(
+    """
+    SELECT c.relname AS name,
+           pg_get_expr(c.relpartbound, c.oid) AS bound,
+           c.reltuples::bigint AS rows,
+           pg_total_relation_size(c.oid) AS bytes
+    FROM pg_inherits i
+    JOIN pg_class c ON c.oid = i.inhrelid
+    WHERE i.inhparent = CAST(:parent AS regclass)
+    ORDER BY c.relname
+    """
+)
+_BOUND_RE = re.compile(r"FROM \('([^']+)'\) TO \('([^']+)'\)")
+
+
+def _parse_bound(bound: str) -> tuple[datetime | None, datetime | None]:
+    match = _BOUND_RE.search(bound)
+    if not match:
+        return None, None
+    return tuple(datetime.fromisoformat(value) for value in match.groups())
+
+
+class AudioPartitionService:
+    def __init__(self, db: Session, interval: str | None = None):
+        self.db = db
+        self.interval = interval or settings.audio_partition_interval
+
+    def list_partitions(self) -> list[dict]:
+        """目前掛在 audio_info 下的分區；``rows`` 為估計值，未 ANALYZE 時為 None。"""
+        partitions = []
+        for row in self.db.execute(LIST_SQL, {"parent": PARENT_TABLE}):
+            start, end = _parse_bound(row.bound)
+            partitions.append(
+                {
+                    "name": row.name,
+                    "start": start,
+                    "end": end,
+                    "is_default": row.bound == "DEFAULT",
+                    "rows": row.rows if row.rows >= 0 else None,
+                    "bytes": row.bytes,
+                }
+            )
+        return partitions
+
+    def ensure_partitions(
+        self, now: datetime | None = None, premake: int | None = None
+    ) -> list[str]:
+        """建立目前與未來 ``premake`` 個區間中缺少的分區，回傳新建的分區名稱。"""
+        now = now or datetime.now(UTC)
+        if premake is None:
+            premake = settings.audio_partition_premake
+        last = period_start(now, self.interval)
+        for _ in range(premake):
+            last = next_period(last, self.interval)
+
+        existing = [
+            (p["start"], p["end"]) for p in self.list_partitions() if p["start"]
+        ]
+        created = []
+        for name, start, end in partition_ranges(now, last, self.interval):
+            # 以範圍判斷而非名稱，切換 month / year 後不會建立重疊的分區
+            if any(s < end and start < e for s, e in existing):
+                continue
+            self._create_partition(name, start, end)
+            created.append(name)
+        self.db.commit()
+        if created:
+            logger.info(f"Created audio_info partitions: {created}")
+        return created
+
+    def _create_partition(self, name: str, start: datetime, end: datetime) -> None:
+        params = {"start": start, "end": end}
+        in_range = "record_time >= :start AND record_time < :end"
+        stranded = self.db.execute(
+            text(f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} WHERE {in_range})"),
+            params,
+        ).scalar()
+        if not stranded:
+            self.db.execute(text(create_partition_sql(name, start, end)))
+            return
+
+        # 預設分區已有落在此範圍的列時無法直接建立分區：先 detach 預設分區，
+        # 把列搬進獨立的新表再 attach。detach 後的表沒有 trigger，
+        # 搬移不會觸發參照清除或 object_key 同步 (id 與 key 都不變)
+        self.db.execute(
+            text(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {DEFAULT_PARTITION}")
+        )
+        self.db.execute(
+            text(
+                f"CREATE TABLE {name} (LIKE {PARENT_TABLE} "
+                "INCLUDING DEFAULTS INCLUDING STORAGE)"
+            )
+        )
+        self.db.execute(
+            text(
+                f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} WHERE {in_range} "
+                f"RETURNING *) INSERT INTO {name} SELECT * FROM moved"
+            ),
+            params,
+        )
+        attach = f"ALTER TABLE {PARENT_TABLE} ATTACH PARTITION"
+        self.db.execute(text(f"{attach} {name} {bounds_sql(start, end)}"))
+        self.db.execute(text(f"{attach} {DEFAULT_PARTITION} DEFAULT"))
+
+    def archive_partitions(self, before: datetime) -> list[str]:
+        """
+        Detach 結束時間不晚於 ``before`` 的分區並移到封存 schema。
+
+        封存的音檔不再出現在任何查詢中，其 object_key 的保留一併釋放；
+        參照這些音檔的偵測與聲景指數保留原本的 audio_id，重新 attach 後即可還原。
+        """
+        if before.tzinfo is None:
+            before = before.replace(tzinfo=UTC)
+        if before > period_start(datetime.now(UTC), self.interval):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Only partitions before the current period can be archived",
+            )
+
+        schema = settings.audio_archive_schema
+        archived = []
+        for partition in self.list_partitions():
+            if partition["end"] is None or partition["end"] > before:
+                continue
+            name = partition["name"]
+            self.db.execute(text(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {name}"))
+            self.db.execute(
+                text(
+                    f"DELETE FROM audio_object_key_active k USING {name} a "
+                    "WHERE k.object_key = a.object_key AND k.audio_id = a.id"
+                )
+            )
+            self.db.execute(text(f'CREATE SCHEMA IF NOT EXISTS "{schema}"'))
+            self.db.execute(text(f'ALTER TABLE {name} SET SCHEMA "{schema}"'))
+            archived.append(name)
+        self.db.commit()
+        if archived:
+            logger.info(f"Archived audio_info partitions to {schema}: {archived}")
+        return archived
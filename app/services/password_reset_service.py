@@ -6,6 +6,7 @@ from datetime import UTC, datetime, timedelta
 from fastapi import HTTPException, status
 from sqlalchemy.orm import Session
 
+from app.core.auth import invalidate_principal
 from app.core.config import settings
 from app.core.security import hash_password
 from app.models.user import UserInfo
@@ -119,6 +120,7 @@ class PasswordResetService:
         user.reset_token_expires_at = None
         self.db.commit()
         self.db.refresh(user)
+        invalidate_principal(user.email)
 
         return user
 
@@ -0,0 +1,250 @@
+"""Waveform min/max/RMS peak pyramids stored as a binary sidecar.
+
+Sidecar layout (little-endian), stored at ``{object_key}.peaks``::
+
+    magic "PEAK" | version u16 | channels u16 | fs u32 | base_block u32
+    | factor u16 | n_levels u16
+    n_levels x (block_size u32 | n_blocks u64 | data_offset u64)
+    level data: int16[n_blocks, channels, 3]  (min, max, rms) * 32767
+
+Each level is contiguous, so any block range of any level is a single
+ranged GET.
+"""
+
+import logging
+import struct
+from dataclasses import dataclass
+
+import numpy as np
+from botocore.exceptions import ClientError
+from fastapi import HTTPException, status
+from sqlalchemy.orm import Session
+
+from app.core.minio import get_object_range, get_s3_client
+from app.services.audio_reader import AudioObjectReader
+from app.services.audio_service import AudioService, ensure_online
+from app.utils.cache import LRUCache
+from app.utils.path_utils import peaks_key
+
+logger = logging.getLogger(__name__)
+
+PEAKS_MAGIC = b"PEAK"
+PEAKS_VERSION = 1
+PEAKS_BASE_BLOCK = 256
+PEAKS_FACTOR = 4
+# 最粗層級的 block 數不超過此值即停止往上疊
+PEAKS_TOP_LEVEL_BLOCKS = 1024
+PEAKS_MAX_POINTS = 20000
+
+_HEADER = struct.Struct("<4sHHIIHH")
+_LEVEL = struct.Struct("<IQQ")
+_VALUES_PER_BLOCK = 3
+
+_header_cache = LRUCache(maxsize=4096)
+
+
+@dataclass(frozen=True)
+class PeaksLevel:
+    block_size: int
+    n_blocks: int
+    data_offset: int
+
+
+@dataclass(frozen=True)
+class PeaksHeader:
+    channels: int
+    fs: int
+    base_block: int
+    factor: int
+    levels: tuple[PeaksLevel, ...]
+
+    def pack(self) -> bytes:
+        out = _HEADER.pack(
+            PEAKS_MAGIC,
+            PEAKS_VERSION,
+            self.channels,
+            self.fs,
+            self.base_block,
+            self.factor,
+            len(self.levels),
+        )
+        for level in self.levels:
+            out += _LEVEL.pack(level.block_size, level.n_blocks, level.data_offset)
+        return out
+
+    @classmethod
+    def unpack(cls, buf: bytes) -> "PeaksHeader":
+        magic, version, channels, fs, base_block, factor, n_levels = (
+            _HEADER.unpack_from(buf)
+        )
+        if magic != PEAKS_MAGIC or version != PEAKS_VERSION:
+            raise ValueError("Not a supported peaks sidecar")
+        levels = tuple(
+            PeaksLevel(*_LEVEL.unpack_from(buf, _HEADER.size + i * _LEVEL.size))
+            for i in range(n_levels)
+        )
+        return cls(channels, fs, base_block, factor, levels)
+
+
+def plan_block_sizes(num_frames: int) -> list[int]:
+    """Block size of every level, finest first."""
+    sizes = [PEAKS_BASE_BLOCK]
+    while -(-num_frames // sizes[-1]) > PEAKS_TOP_LEVEL_BLOCKS:
+        sizes.append(sizes[-1] * PEAKS_FACTOR)
+    return sizes
+
+
+def reduce_blocks(samples: np.ndarray, block_size: int) -> np.ndarray:
+    """``(frames, ch)`` float samples -> ``(blocks, ch, 3)`` min/max/rms."""
+    starts = np.arange(0, len(samples), block_size)
+    counts = np.diff(np.append(starts, len(samples)))[:, None]
+    mins = np.minimum.reduceat(samples, starts, axis=0)
+    maxs = np.maximum.reduceat(samples, starts, axis=0)
+    rms = np.sqrt(
+        np.add.reduceat(samples.astype(np.float64) ** 2, starts, axis=0) / counts
+    )
+    return np.stack([mins, maxs, rms.astype(np.float32)], axis=-1)
+
+
+def quantize(values: np.ndarray) -> np.ndarray:
+    return np.clip(np.round(values * 32767), -32768, 32767).astype("<i2")
+
+
+class PeaksService:
+    def __init__(self, db: Session, s3_client=None):
+        self.db = db
+        self.s3_client = s3_client or get_s3_client()
+
+    def build_peaks(self, audio_id: int) -> PeaksHeader:
+        """
+        以單次串流讀取建立音檔的 peak 金字塔並寫入 sidecar。
+
+        串流區塊大小為最粗層級 block 的整數倍，因此每一層都能直接由
+        同一段樣本 reduce，不需再讀一次原始檔。
+        """
+        audio = ensure_online(AudioService(self.db).get_audio_details(audio_id))
+        bucket = audio.deployment.point.project.name
+        reader = AudioObjectReader(
+            self.s3_client, bucket, audio.object_key, audio.file_size
+        )
+        wav = reader.header
+        block_sizes = plan_block_sizes(wav.num_frames)
+        stream_frames = block_sizes[-1] * max(1, (1 << 20) // block_sizes[-1])
+
+        parts: list[list[np.ndarray]] = [[] for _ in block_sizes]
+        for block in reader.iter_blocks(stream_frames):
+            for level, size in enumerate(block_sizes):
+                parts[level].append(quantize(reduce_blocks(block, size)))
+
+        arrays = [
+            np.concatenate(p) if p else np.empty((0, wav.channels, 3), "<i2")
+            for p in parts
+        ]
+        offset = _HEADER.size + _LEVEL.size * len(block_sizes)
+        levels = []
+        for size, array in zip(block_sizes, arrays, strict=True):
+            levels.append(PeaksLevel(size, len(array), offset))
+            offset += array.nbytes
+        header = PeaksHeader(
+            channels=wav.channels,
+            fs=wav.fs,
+            base_block=PEAKS_BASE_BLOCK,
+            factor=PEAKS_FACTOR,
+            levels=tuple(levels),
+        )
+
+        body = header.pack() + b"".join(a.tobytes() for a in arrays)
+        key = peaks_key(audio.object_key)
+        self.s3_client.put_object(
+            Bucket=bucket, Key=key, Body=body, ContentType="application/octet-stream"
+        )
+        _header_cache.invalidate((bucket, key))
+        return header
+
+    def _read_header(self, bucket: str, key: str) -> PeaksHeader:
+        header = _header_cache.get((bucket, key))
+        if header is None:
+            try:
+                probe = get_object_range(self.s3_client, bucket, key, 0, 1023)
+            except ClientError as e:
+                if e.response.get("Error", {}).get("Code") in ("NoSuchKey", "404"):
+                    raise HTTPException(
+                        status_code=status.HTTP_404_NOT_FOUND,
+                        detail="Peak file has not been built for this audio",
+                    ) from e
+                raise
+            header = PeaksHeader.unpack(probe)
+            _header_cache.set((bucket, key), header)
+        return header
+
+    def get_peaks(
+        self,
+        audio_id: int,
+        start: float = 0.0,
+        end: float | None = None,
+        level: int | None = None,
+        max_points: int = 2000,
+    ) -> dict:
+        """
+        讀取指定時間範圍與層級的 peak 資料。
+
+        未指定 ``level`` 時選擇點數不超過 ``max_points`` 的最細層級；
+        只以一次 Range GET 讀取該層級所需的 block。
+        """
+        audio = AudioService(self.db).get_audio_details(audio_id)
+        bucket = audio.deployment.point.project.name
+        key = peaks_key(audio.object_key)
+        header = self._read_header(bucket, key)
+
+        total_seconds = header.levels[0].n_blocks * header.base_block / header.fs
+        end = total_seconds if end is None else min(end, total_seconds)
+        if start < 0 or end <= start:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Require 0 <= start < end",
+            )
+
+        if level is None:
+            level = 0
+            while level < len(header.levels) - 1 and (
+                (end - start) * header.fs / header.levels[level].block_size > max_points
+            ):
+                level += 1
+        elif not 0 <= level < len(header.levels):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"level must be between 0 and {len(header.levels) - 1}",
+            )
+
+        info = header.levels[level]
+        b0 = int(start * header.fs // info.block_size)
+        b1 = min(info.n_blocks, -(-int(end * header.fs) // info.block_size))
+        if b1 - b0 > PEAKS_MAX_POINTS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Requested range is too large for this level",
+            )
+
+        stride = header.channels * _VALUES_PER_BLOCK * 2
+        raw = b""
+        if b1 > b0:
+            raw = get_object_range(
+                self.s3_client,
+                bucket,
+                key,
+                info.data_offset + b0 * stride,
+                info.data_offset + b1 * stride - 1,
+            )
+        values = np.frombuffer(raw, dtype="<i2").reshape(
+            -1, header.channels, _VALUES_PER_BLOCK
+        )
+        return {
+            "audio_id": audio_id,
+            "level": level,
+            "fs": header.fs,
+            "channels": header.channels,
+            "block_size": info.block_size,
+            "start_block": b0,
+            "n_blocks": len(values),
+            "values": values,
+        }
@@ -1,29 +1,41 @@
 import logging
-from datetime import UTC, datetime, timedelta
+from datetime import UTC, datetime
 
 from fastapi import HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session, joinedload
 
-from app.core.minio import get_s3_client
+from app.db.lookups import active_by_id
+from app.db.unique import find_conflict, insert_unique
 from app.models.audio import AudioInfo
 from app.models.deployment import DeploymentInfo
 from app.models.point import PointInfo
 from app.models.project import ProjectInfo
 from app.schemas.point import PointCreate, PointUpdate
+from app.services.cascade_service import (
+    deleted_values,
+    new_deletion_batch_id,
+    restore_deletion_batch,
+    soft_delete_audios,
+)
+from app.services.object_deletion_service import (
+    enqueue_ltsa_deletions,
+    enqueue_object_deletions,
+)
 
 logger = logging.getLogger(__name__)
 
+POINT_KEYS = (("project_id", "name"),)
+
 
 class PointService:
-    def __init__(self, db: Session):
+    def __init__(self, db: Session | AsyncSession):
+        # *_async 方法需傳入 AsyncSession (get_async_db)，其餘方法使用 Session
         self.db = db
 
     def get_point(self, point_id: int) -> PointInfo:
-        point = (
-            self.db.query(PointInfo)
-            .filter(PointInfo.id == point_id, PointInfo.is_deleted.is_(False))
-            .first()
-        )
+        point = self.db.scalars(active_by_id(PointInfo, point_id)).first()
         if not point:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -59,43 +71,57 @@ class PointService:
             .all()
         )
 
-    def create_point(self, point_in: PointCreate) -> PointInfo:
-        # Check unique constraint (project_id, name)
-        if (
-            self.db.query(PointInfo)
-            .filter(
-                PointInfo.project_id == point_in.project_id,
-                PointInfo.name == point_in.name,
-                PointInfo.is_deleted.is_(False),
+    async def get_point_async(self, point_id: int) -> PointInfo:
+        point = await self.db.scalar(active_by_id(PointInfo, point_id))
+        if not point:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Point not found",
             )
-            .first()
-        ):
+        return point
+
+    async def get_point_details_async(self, point_id: int) -> PointInfo:
+        point = await self.db.scalar(
+            select(PointInfo)
+            .options(joinedload(PointInfo.project))
+            .where(PointInfo.id == point_id, PointInfo.is_deleted.is_(False))
+        )
+        if not point:
             raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Point name already exists in this project",
+                status_code=status.HTTP_404_NOT_FOUND, detail="Point not found"
             )
+        return point
 
-        # Check if name is reserved by a soft-deleted point
-        if (
-            self.db.query(PointInfo)
-            .filter(
-                PointInfo.project_id == point_in.project_id,
-                PointInfo.name == point_in.name,
-                PointInfo.is_deleted.is_(True),
+    async def get_points_async(
+        self, project_id: int, skip: int = 0, limit: int = 100
+    ) -> list[PointInfo]:
+        return list(
+            await self.db.scalars(
+                select(PointInfo)
+                .where(
+                    PointInfo.project_id == project_id,
+                    PointInfo.is_deleted.is_(False),
+                )
+                .offset(skip)
+                .limit(limit)
             )
-            .first()
-        ):
+        )
+
+    def create_point(self, point_in: PointCreate) -> PointInfo:
+        # 唯一性與軟刪除保留交由單一 INSERT 判斷 (uq_point_project_name_active)
+        point_data = point_in.model_dump()
+        db_obj = insert_unique(self.db, PointInfo, point_data, POINT_KEYS)
+        if db_obj is None:
+            _, reserved = find_conflict(self.db, PointInfo, point_data, POINT_KEYS)
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Name reserved by deleted point. Hard delete to release.",
+                detail=(
+                    "Name reserved by deleted point. Hard delete to release."
+                    if reserved
+                    else "Point name already exists in this project"
+                ),
             )
-
-        point_data = point_in.model_dump()
-
-        db_obj = PointInfo(**point_data)
-        self.db.add(db_obj)
         self.db.commit()
-        self.db.refresh(db_obj)
         return db_obj
 
     def update_point(self, point_id: int, point_in: PointUpdate) -> PointInfo:
@@ -131,53 +157,63 @@ class PointService:
         return point
 
     def delete_point(self, point_id: int, user_id: int) -> PointInfo:
+        """
+        Soft delete a point and its deployments.
+
+        Audios under the point are cascaded separately in batches by
+        ``delete_point_audios`` (run as a background job). Nothing is
+        committed; the caller enqueues that job and commits both at once.
+        """
         point = self.get_point(point_id)
 
         now = datetime.now(UTC)
+        deletion_batch_id = new_deletion_batch_id()
 
         # 1. Mark Point as deleted
         point.is_deleted = True
         point.deleted_at = now
         point.deleted_by = user_id
+        point.deletion_batch_id = deletion_batch_id
 
-        # 2. Cascade Soft Delete: Find related Deployments
-        deployments = (
-            self.db.query(DeploymentInfo.id)
-            .filter(DeploymentInfo.point_id == point_id)
-            .all()
+        # 2. Cascade Soft Delete to live Deployments
+        self.db.query(DeploymentInfo).filter(
+            DeploymentInfo.point_id == point_id,
+            DeploymentInfo.is_deleted.is_(False),
+        ).update(
+            deleted_values(user_id, now, deletion_batch_id),
+            synchronize_session=False,
         )
-        deployment_ids = [d.id for d in deployments]
-
-        if deployment_ids:
-            # 3. Cascade to Audios
-            self.db.query(AudioInfo).filter(
-                AudioInfo.deployment_id.in_(deployment_ids)
-            ).update(
-                {
-                    AudioInfo.is_deleted: True,
-                    AudioInfo.deleted_at: now,
-                    AudioInfo.deleted_by: user_id,
-                },
-                synchronize_session=False,
-            )
-            # Update Deployments
-            self.db.query(DeploymentInfo).filter(
-                DeploymentInfo.point_id == point_id
-            ).update(
-                {
-                    DeploymentInfo.is_deleted: True,
-                    DeploymentInfo.deleted_at: now,
-                    DeploymentInfo.deleted_by: user_id,
-                },
-                synchronize_session=False,
-            )
 
+        # Flushed only: the caller commits together with the audio cascade job
         self.db.add(point)
-        self.db.commit()
-        self.db.refresh(point)
+        self.db.flush()
         return point
 
-    def restore_point(self, point_id: int) -> PointInfo:
+    def delete_point_audios(
+        self,
+        point_id: int,
+        user_id: int,
+        deleted_at: datetime,
+        deletion_batch_id: str,
+        progress=None,
+    ) -> dict:
+        """
+        Background task to delete audios under the deployments removed with
+        a point, using the point's deleted_at timestamp and deletion batch.
+        """
+        deployment_ids_sub = select(DeploymentInfo.id).where(
+            DeploymentInfo.point_id == point_id,
+            DeploymentInfo.deletion_batch_id == deletion_batch_id,
+        )
+        return soft_delete_audios(
+            self.db,
+            deployment_ids_sub,
+            deleted_values(user_id, deleted_at, deletion_batch_id),
+            progress=progress,
+        )
+
+    def validate_restore(self, point_id: int) -> PointInfo:
+        """Return the (possibly deleted) point, or raise if it cannot be restored."""
         point = self.db.query(PointInfo).filter(PointInfo.id == point_id).first()
         if not point:
             raise HTTPException(
@@ -200,41 +236,39 @@ class PointService:
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Active point with this name already exists in the project. Cannot restore.",
             )
+        return point
 
-        # Cascade Restore Logic
-        # Only restore child records deleted at the same time as parent
-        update_values = {
-            "is_deleted": False,
-            "deleted_at": None,
-            "deleted_by": None,
-        }
-
-        # Time threshold: only restore records deleted within 5 seconds of parent
-        deleted_at = point.deleted_at
-        time_min = deleted_at - timedelta(seconds=5)
-        time_max = deleted_at + timedelta(seconds=5)
+    def restore_point(
+        self,
+        point_id: int,
+        deletion_batch_id: str | None = None,
+        progress=None,
+    ) -> PointInfo:
+        """
+        Restore a point and the children deleted with it (run as a background
+        job), restoring the point itself last. With ``deletion_batch_id``
+        nothing happens unless the point is still deleted by that batch.
+        """
+        point = self.validate_restore(point_id)
+        if (
+            deletion_batch_id is not None
+            and point.deletion_batch_id != deletion_batch_id
+        ):
+            return point
 
-        # 1. Cascade to Audios (Grandchildren)
-        # Subquery: Find all Deployment IDs in this point
-        deployment_ids_sub = self.db.query(DeploymentInfo.id).filter(
-            DeploymentInfo.point_id == point_id
+        # Cascade Restore Logic
+        # Only restore children stamped by the same delete operation as the point
+        restore_deletion_batch(
+            self.db,
+            point.deletion_batch_id,
+            (AudioInfo, DeploymentInfo),
+            progress=progress,
         )
-        self.db.query(AudioInfo).filter(
-            AudioInfo.deployment_id.in_(deployment_ids_sub),
-            AudioInfo.deleted_at >= time_min,
-            AudioInfo.deleted_at <= time_max,
-        ).update(update_values, synchronize_session=False)
-
-        # 2. Cascade to Deployments (Children)
-        self.db.query(DeploymentInfo).filter(
-            DeploymentInfo.point_id == point_id,
-            DeploymentInfo.deleted_at >= time_min,
-            DeploymentInfo.deleted_at <= time_max,
-        ).update(update_values, synchronize_session=False)
 
         point.is_deleted = False
         point.deleted_at = None
         point.deleted_by = None
+        point.deletion_batch_id = None
         self.db.add(point)
         self.db.commit()
         self.db.refresh(point)
@@ -245,7 +279,7 @@ class PointService:
         永久刪除 Point 及所有相關資料。
 
         包含：
-        - 刪除 MinIO 中該 Point 下的所有物件
+        - 將 MinIO 中該 Point 下的所有物件排入刪除 outbox (由 worker 清除)
         - 刪除資料庫中的所有相關記錄 (Audios, Deployments, Point)
         - 釋放名稱，可重新使用
         """
@@ -270,30 +304,17 @@ class PointService:
             )
         bucket_name = project.name
 
-        # 取得相關 Audio
         deployment_ids_sub = self.db.query(DeploymentInfo.id).filter(
             DeploymentInfo.point_id == point_id
         )
-        audios = (
-            self.db.query(AudioInfo)
-            .filter(AudioInfo.deployment_id.in_(deployment_ids_sub))
-            .all()
-        )
 
-        # 刪除 MinIO 物件
-        s3_client = get_s3_client()
-        if audios:
-            objects_to_delete = [{"Key": a.object_key} for a in audios]
-            for i in range(0, len(objects_to_delete), 1000):
-                batch = objects_to_delete[i : i + 1000]
-                try:
-                    s3_client.delete_objects(
-                        Bucket=bucket_name, Delete={"Objects": batch}
-                    )
-                except Exception as e:
-                    logger.warning(
-                        f"Failed to delete objects in bucket {bucket_name}: {e}"
-                    )
+        # MinIO 物件 (含 sidecar、冷儲存副本與 LTSA 前綴) 寫入 outbox，與 DB 刪除同一交易提交
+        queued_objects = enqueue_object_deletions(
+            self.db, bucket_name, AudioInfo.deployment_id.in_(deployment_ids_sub)
+        )
+        queued_objects += enqueue_ltsa_deletions(
+            self.db, bucket_name, DeploymentInfo.point_id == point_id
+        )
 
         # 刪除 DB 記錄 (先子後父)
         deleted_audios = (
@@ -315,4 +336,5 @@ class PointService:
         return {
             "message": "Point permanently deleted",
             "deleted_audios": deleted_audios,
+            "queued_objects": queued_objects,
         }
@@ -1,22 +1,46 @@
 import logging
-from datetime import UTC, datetime, timedelta
+from datetime import UTC, datetime
 
 from fastapi import HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session, selectinload
 
 from app.core.minio import get_s3_client
+from app.db.unique import find_conflict, insert_unique
 from app.models.audio import AudioInfo
 from app.models.deployment import DeploymentInfo
 from app.models.point import PointInfo
 from app.models.project import ProjectInfo
 from app.schemas.project import ProjectCreate, ProjectUpdate
+from app.services.cascade_service import (
+    deleted_values,
+    new_deletion_batch_id,
+    restore_deletion_batch,
+    soft_delete_audios,
+)
+from app.services.object_deletion_service import (
+    bucket_pending_deletion,
+    enqueue_bucket_deletion,
+    enqueue_object_deletions,
+)
 from app.utils.naming import generate_slug_from_zh
 
 logger = logging.getLogger(__name__)
 
+PROJECT_KEYS = (("name",), ("name_zh",))
+# (衝突的 key, 是否為軟刪除保留) -> 錯誤訊息
+PROJECT_CONFLICTS = {
+    (("name",), False): "Project with this name already exists",
+    (("name_zh",), False): "Project with this Chinese name (name_zh) already exists",
+    (("name",), True): "Name reserved by deleted project. Hard delete to release.",
+    (("name_zh",), True): "name_zh reserved by deleted project. Hard delete to release.",
+}
+
 
 class ProjectService:
-    def __init__(self, db: Session):
+    def __init__(self, db: Session | AsyncSession):
+        # *_async 方法需傳入 AsyncSession (get_async_db)，其餘方法使用 Session
         self.db = db
 
     def get_project(self, project_id: int) -> ProjectInfo:
@@ -52,6 +76,42 @@ class ProjectService:
             .all()
         )
 
+    async def get_project_async(self, project_id: int) -> ProjectInfo:
+        project = await self.db.scalar(
+            select(ProjectInfo).where(
+                ProjectInfo.id == project_id, ProjectInfo.is_deleted.is_(False)
+            )
+        )
+        if not project:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Project not found",
+            )
+        return project
+
+    async def get_projects_async(
+        self, skip: int = 0, limit: int = 100
+    ) -> list[ProjectInfo]:
+        return list(
+            await self.db.scalars(
+                select(ProjectInfo)
+                .where(ProjectInfo.is_deleted.is_(False))
+                .offset(skip)
+                .limit(limit)
+            )
+        )
+
+    async def get_projects_hierarchy_async(self) -> list[ProjectInfo]:
+        return list(
+            await self.db.scalars(
+                select(ProjectInfo)
+                .where(ProjectInfo.is_deleted.is_(False))
+                .options(
+                    selectinload(ProjectInfo.points).selectinload(PointInfo.deployments)
+                )
+            )
+        )
+
     def create_project(self, project_in: ProjectCreate) -> ProjectInfo:
         # Auto-generate name from name_zh if name is not provided
         if not project_in.name:
@@ -67,58 +127,25 @@ class ProjectService:
             # Update the input model
             project_in.name = candidate_name
 
-        # Check if project name exists
-        if (
-            self.db.query(ProjectInfo)
-            .filter(ProjectInfo.name == project_in.name)
-            .filter(ProjectInfo.is_deleted.is_(False))
-            .first()
-        ):
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Project with this name already exists",
-            )
-
-        # Check if Chinese name (name_zh) exists, if provided
-        if project_in.name_zh and (
-            self.db.query(ProjectInfo)
-            .filter(ProjectInfo.name_zh == project_in.name_zh)
-            .filter(ProjectInfo.is_deleted.is_(False))
-            .first()
-        ):
+        # 唯一性與軟刪除保留交由單一 INSERT 判斷
+        # (ix_project_name_active / ix_project_name_zh_active)
+        project_data = project_in.model_dump()
+        db_obj = insert_unique(self.db, ProjectInfo, project_data, PROJECT_KEYS)
+        if db_obj is None:
+            conflict = find_conflict(self.db, ProjectInfo, project_data, PROJECT_KEYS)
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Project with this Chinese name (name_zh) already exists",
+                detail=PROJECT_CONFLICTS[conflict],
             )
-
-        # Check if name is reserved by a soft-deleted project
-        if (
-            self.db.query(ProjectInfo)
-            .filter(ProjectInfo.name == project_in.name)
-            .filter(ProjectInfo.is_deleted.is_(True))
-            .first()
-        ):
+        # 同名專案已永久刪除但 bucket 尚未清除時，名稱仍保留；
+        # 插入成功代表刪除已提交，其 outbox 列此時必定可見
+        if bucket_pending_deletion(self.db, db_obj.name):
+            self.db.rollback()
             raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Name reserved by deleted project. Hard delete to release.",
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Name still being released by a deleted project. Retry later.",
             )
-
-        # Check if name_zh is reserved by a soft-deleted project
-        if project_in.name_zh and (
-            self.db.query(ProjectInfo)
-            .filter(ProjectInfo.name_zh == project_in.name_zh)
-            .filter(ProjectInfo.is_deleted.is_(True))
-            .first()
-        ):
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="name_zh reserved by deleted project. Hard delete to release.",
-            )
-
-        db_obj = ProjectInfo(**project_in.model_dump())
-        self.db.add(db_obj)
         self.db.commit()
-        self.db.refresh(db_obj)
 
         # Create MinIO bucket
         try:
@@ -163,14 +190,13 @@ class ProjectService:
         project = self.get_project(project_id)
 
         now = datetime.now(UTC)
-        update_values = {
-            "is_deleted": True,
-            "deleted_at": now,
-            "deleted_by": user_id,
-        }
+        deletion_batch_id = new_deletion_batch_id()
+        update_values = deleted_values(user_id, now, deletion_batch_id)
 
         # This synchronous part handles the faster updates for Project, Point, and Deployment.
-        # The slow Audio update is handled by a background task.
+        # The slow Audio update is handled by a background job enqueued by the
+        # caller in the same transaction.
+        # Children deleted earlier keep their own deletion batch.
 
         # Subquery: Find all Point IDs in this project
         point_ids_sub = self.db.query(PointInfo.id).filter(
@@ -179,49 +205,56 @@ class ProjectService:
 
         # 1. Cascade to Deployments
         self.db.query(DeploymentInfo).filter(
-            DeploymentInfo.point_id.in_(point_ids_sub)
+            DeploymentInfo.point_id.in_(point_ids_sub),
+            DeploymentInfo.is_deleted.is_(False),
         ).update(update_values, synchronize_session=False)
 
         # 2. Cascade to Points
-        self.db.query(PointInfo).filter(PointInfo.project_id == project_id).update(
-            update_values, synchronize_session=False
-        )
+        self.db.query(PointInfo).filter(
+            PointInfo.project_id == project_id, PointInfo.is_deleted.is_(False)
+        ).update(update_values, synchronize_session=False)
 
         # 3. Mark the Project itself as deleted
         project.is_deleted = True
         project.deleted_at = now
         project.deleted_by = user_id
+        project.deletion_batch_id = deletion_batch_id
 
+        # Flushed only: the caller commits together with the audio cascade job
         self.db.add(project)
-        self.db.commit()
-        self.db.refresh(project)
+        self.db.flush()
         return project
 
     def delete_project_audios(
-        self, project_id: int, user_id: int, deleted_at: datetime
-    ):
+        self,
+        project_id: int,
+        user_id: int,
+        deleted_at: datetime,
+        deletion_batch_id: str,
+        progress=None,
+    ) -> dict:
         """
         Background task to delete audios associated with a project.
-        Uses the same deleted_at timestamp as the parent project for consistency.
-        """
-        update_values = {
-            "is_deleted": True,
-            "deleted_at": deleted_at,
-            "deleted_by": user_id,
-        }
+        Uses the same deleted_at timestamp and deletion batch as the parent
+        project, and only touches deployments deleted in that batch.
 
-        point_ids_sub = self.db.query(PointInfo.id).filter(
-            PointInfo.project_id == project_id
+        Audios are updated in bounded batches (see ``soft_delete_audios``) so
+        row locks and WAL stay small; re-running resumes where it stopped.
+        """
+        point_ids_sub = select(PointInfo.id).where(PointInfo.project_id == project_id)
+        deployment_ids_sub = select(DeploymentInfo.id).where(
+            DeploymentInfo.point_id.in_(point_ids_sub),
+            DeploymentInfo.deletion_batch_id == deletion_batch_id,
         )
-        deployment_ids_sub = self.db.query(DeploymentInfo.id).filter(
-            DeploymentInfo.point_id.in_(point_ids_sub)
+        return soft_delete_audios(
+            self.db,
+            deployment_ids_sub,
+            deleted_values(user_id, deleted_at, deletion_batch_id),
+            progress=progress,
         )
-        self.db.query(AudioInfo).filter(
-            AudioInfo.deployment_id.in_(deployment_ids_sub)
-        ).update(update_values, synchronize_session=False)
-        self.db.commit()
 
-    def restore_project(self, project_id: int) -> ProjectInfo:
+    def validate_restore(self, project_id: int) -> ProjectInfo:
+        """Return the (possibly deleted) project, or raise if it cannot be restored."""
         # We need to query even if is_deleted is True
         project = (
             self.db.query(ProjectInfo).filter(ProjectInfo.id == project_id).first()
@@ -261,53 +294,41 @@ class ProjectService:
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Active project with this name_zh already exists. Cannot restore.",
             )
+        return project
 
-        # Cascade Restore Logic
-        # Only restore child records deleted at the same time as parent
-        update_values = {
-            "is_deleted": False,
-            "deleted_at": None,
-            "deleted_by": None,
-        }
-
-        # Time threshold: only restore records deleted within 5 seconds of parent
-        deleted_at = project.deleted_at
-        time_min = deleted_at - timedelta(seconds=5)
-        time_max = deleted_at + timedelta(seconds=5)
+    def restore_project(
+        self,
+        project_id: int,
+        deletion_batch_id: str | None = None,
+        progress=None,
+    ) -> ProjectInfo:
+        """
+        Restore a project and the children deleted with it (run as a
+        background job). The project itself is restored last, so a restore
+        interrupted midway can simply be run again. With
+        ``deletion_batch_id`` nothing happens unless the project is still
+        deleted by that batch.
+        """
+        project = self.validate_restore(project_id)
+        if (
+            deletion_batch_id is not None
+            and project.deletion_batch_id != deletion_batch_id
+        ):
+            return project
 
-        # 1. Cascade to Audios (Grandchildren)
-        # Subquery: Find all Point IDs in this project (even deleted ones)
-        point_ids_sub = self.db.query(PointInfo.id).filter(
-            PointInfo.project_id == project_id
-        )
-        # Subquery: Find all Deployment IDs in these points
-        deployment_ids_sub = self.db.query(DeploymentInfo.id).filter(
-            DeploymentInfo.point_id.in_(point_ids_sub)
+        # Cascade Restore Logic
+        # Only restore children stamped by the same delete operation as the project
+        restore_deletion_batch(
+            self.db,
+            project.deletion_batch_id,
+            (AudioInfo, DeploymentInfo, PointInfo),
+            progress=progress,
         )
-        # Update Audios (only those deleted with the project)
-        self.db.query(AudioInfo).filter(
-            AudioInfo.deployment_id.in_(deployment_ids_sub),
-            AudioInfo.deleted_at >= time_min,
-            AudioInfo.deleted_at <= time_max,
-        ).update(update_values, synchronize_session=False)
-
-        # 2. Cascade to Deployments (Children)
-        self.db.query(DeploymentInfo).filter(
-            DeploymentInfo.point_id.in_(point_ids_sub),
-            DeploymentInfo.deleted_at >= time_min,
-            DeploymentInfo.deleted_at <= time_max,
-        ).update(update_values, synchronize_session=False)
-
-        # 3. Cascade to Points (Direct Children)
-        self.db.query(PointInfo).filter(
-            PointInfo.project_id == project_id,
-            PointInfo.deleted_at >= time_min,
-            PointInfo.deleted_at <= time_max,
-        ).update(update_values, synchronize_session=False)
 
         project.is_deleted = False
         project.deleted_at = None
         project.deleted_by = None
+        project.deletion_batch_id = None
         self.db.add(project)
         self.db.commit()
         self.db.refresh(project)
@@ -318,9 +339,9 @@ class ProjectService:
         永久刪除 Project 及所有相關資料。
 
         包含：
-        - 刪除 MinIO Bucket 和所有物件
+        - 將 MinIO Bucket 和所有物件排入刪除 outbox (由 worker 清除)
         - 刪除資料庫中的所有相關記錄 (Audios, Deployments, Points, Project)
-        - 釋放名稱，可重新使用
+        - outbox 清空後釋放名稱，可重新使用
         """
         # 查詢 Project (包含已軟刪除)
         project = (
@@ -334,40 +355,20 @@ class ProjectService:
 
         project_name = project.name
 
-        # 取得所有相關 Audio 的 object_key
         point_ids_sub = self.db.query(PointInfo.id).filter(
             PointInfo.project_id == project_id
         )
         deployment_ids_sub = self.db.query(DeploymentInfo.id).filter(
             DeploymentInfo.point_id.in_(point_ids_sub)
         )
-        audios = (
-            self.db.query(AudioInfo)
-            .filter(AudioInfo.deployment_id.in_(deployment_ids_sub))
-            .all()
-        )
 
-        # 刪除 MinIO 物件
-        s3_client = get_s3_client()
-        bucket_name = project_name
-
-        if audios:
-            objects_to_delete = [{"Key": a.object_key} for a in audios]
-            # S3 每次最多刪除 1000 個物件
-            for i in range(0, len(objects_to_delete), 1000):
-                batch = objects_to_delete[i : i + 1000]
-                try:
-                    s3_client.delete_objects(
-                        Bucket=bucket_name, Delete={"Objects": batch}
-                    )
-                except Exception as e:
-                    logger.warning(f"Failed to delete objects in {bucket_name}: {e}")
-
-        # 刪除 MinIO Bucket
-        try:
-            s3_client.delete_bucket(Bucket=bucket_name)
-        except Exception as e:
-            logger.warning(f"Failed to delete bucket {bucket_name}: {e}")
+        # MinIO 物件 (含 sidecar 與冷儲存副本) 與 bucket 寫入 outbox，與 DB 刪除同一交易提交；
+        # bucket 刪除前 worker 會清除 _derived/ 下的衍生物件 (LTSA、spectrogram tile)，
+        # 名稱在 outbox 清空前仍保留
+        queued_objects = enqueue_object_deletions(
+            self.db, project_name, AudioInfo.deployment_id.in_(deployment_ids_sub)
+        )
+        enqueue_bucket_deletion(self.db, project_name)
 
         # 刪除 DB 記錄 (順序重要：先子後父)
         deleted_audios = (
@@ -393,4 +394,5 @@ class ProjectService:
         return {
             "message": f"Project '{project_name}' permanently deleted",
             "deleted_audios": deleted_audios,
+            "queued_objects": queued_objects,
         }
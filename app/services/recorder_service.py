@@ -4,10 +4,13 @@ from fastapi import HTTPException, status
 from sqlalchemy.orm import Session
 from sqlalchemy import exists
 
+from app.db.unique import find_conflict, insert_unique
 from app.models.deployment import DeploymentInfo
 from app.models.recorder import RecorderInfo
 from app.schemas.recorder import RecorderCreate, RecorderUpdate
 
+RECORDER_KEYS = (("brand", "model", "sn"),)
+
 
 class RecorderService:
     def __init__(self, db: Session):
@@ -45,49 +48,25 @@ class RecorderService:
             .all()
         )
 
-    def check_soft_deleted_recorder_exists(self, brand: str, model: str, sn: str) -> bool:
-        """檢查是否有軟刪除的 Recorder 佔用此識別碼。"""
-        return self.db.query(
-            exists().where(
-                RecorderInfo.brand == brand,
-                RecorderInfo.model == model,
-                RecorderInfo.sn == sn,
-                RecorderInfo.is_deleted.is_(True),
-            )
-        ).scalar()
-
     def create_recorder(self, recorder: RecorderCreate) -> RecorderInfo:
-        if self.check_recorder_exists(recorder.brand, recorder.model, recorder.sn):
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Recorder with brand '{recorder.brand}', model '{recorder.model}', and SN '{recorder.sn}' already exists.",
+        # 唯一性與軟刪除保留交由單一 INSERT 判斷 (uq_recorder_brand_model_sn_active)
+        recorder_data = recorder.model_dump()
+        db_recorder = insert_unique(
+            self.db, RecorderInfo, recorder_data, RECORDER_KEYS
+        )
+        if db_recorder is None:
+            _, reserved = find_conflict(
+                self.db, RecorderInfo, recorder_data, RECORDER_KEYS
             )
-
-        # 檢查軟刪除名稱保留
-        if self.check_soft_deleted_recorder_exists(
-            recorder.brand, recorder.model, recorder.sn
-        ):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Identifier reserved by deleted recorder. Hard delete to release.",
+                detail=(
+                    "Identifier reserved by deleted recorder. Hard delete to release."
+                    if reserved
+                    else f"Recorder with brand '{recorder.brand}', model '{recorder.model}', and SN '{recorder.sn}' already exists."
+                ),
             )
-
-        db_recorder = RecorderInfo(
-            brand=recorder.brand,
-            model=recorder.model,
-            sn=recorder.sn,
-            sensitivity=recorder.sensitivity,
-            high_gain=recorder.high_gain,
-            low_gain=recorder.low_gain,
-            status=recorder.status,
-            owner=recorder.owner,
-            recorder_channels=recorder.recorder_channels,
-            description=recorder.description,
-        )
-
-        self.db.add(db_recorder)
         self.db.commit()
-        self.db.refresh(db_recorder)
 
         return db_recorder
 
@@ -0,0 +1,244 @@
+"""
+Retention purge for soft-deleted project trees.
+
+Soft-deleted rows keep their names and object keys reserved and weigh down
+every ``is_deleted`` filter and partial index. Rows whose ``deleted_at`` is
+older than the retention are removed top-down with the admin hard-delete
+methods; the audios underneath each root are first removed in throttled
+batches so no single transaction touches a whole project.
+"""
+
+import logging
+from collections.abc import Callable
+from datetime import UTC, datetime, timedelta
+
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.audio import AudioInfo
+from app.models.deployment import DeploymentInfo
+from app.models.point import PointInfo
+from app.models.project import ProjectInfo
+from app.services.cascade_service import hard_delete_audios
+from app.services.cold_storage_service import COLD_META_KEY
+from app.services.deployment_service import DeploymentService
+from app.services.point_service import PointService
+from app.services.project_service import ProjectService
+from app.utils.rate_limit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+
+class RetentionService:
+    def __init__(self, db: Session, retention_days: int | None = None):
+        self.db = db
+        self.retention_days = retention_days or settings.soft_delete_retention_days
+        self.cutoff = datetime.now(UTC) - timedelta(days=self.retention_days)
+
+    def _expired(self, model):
+        return and_(model.is_deleted.is_(True), model.deleted_at < self.cutoff)
+
+    def _tree(self, *columns):
+        """Audio → Deployment → Point → Project 的 join，用於判斷祖先是否到期。"""
+        return (
+            select(*columns)
+            .select_from(AudioInfo)
+            .join(DeploymentInfo, AudioInfo.deployment_id == DeploymentInfo.id)
+            .join(PointInfo, DeploymentInfo.point_id == PointInfo.id)
+            .join(ProjectInfo, PointInfo.project_id == ProjectInfo.id)
+        )
+
+    def report(self) -> dict:
+        """
+        Dry run：各資料表將被永久刪除的列數與可回收的儲存空間。
+
+        自身或任一上層到期的列都會被清除，因此每張表都以到祖先的 join 計算。
+        ``bytes`` 為熱儲存物件大小，``cold_bytes`` 為冷儲存副本大小。
+        """
+        cold_size = AudioInfo.meta_json[COLD_META_KEY]["size"].as_integer()
+        audios, hot_bytes, cold_bytes = self.db.execute(
+            self._tree(
+                func.count(AudioInfo.id),
+                func.coalesce(
+                    func.sum(AudioInfo.file_size).filter(
+                        AudioInfo.is_cold_storage.isnot(True)
+                    ),
+                    0,
+                ),
+                func.coalesce(
+                    func.sum(cold_size).filter(AudioInfo.is_cold_storage.is_(True)),
+                    0,
+                ),
+            ).where(
+                or_(
+                    self._expired(AudioInfo),
+                    self._expired(DeploymentInfo),
+                    self._expired(PointInfo),
+                    self._expired(ProjectInfo),
+                )
+            )
+        ).one()
+        deployments = self.db.execute(
+            select(func.count(DeploymentInfo.id))
+            .join(PointInfo, DeploymentInfo.point_id == PointInfo.id)
+            .join(ProjectInfo, PointInfo.project_id == ProjectInfo.id)
+            .where(
+                or_(
+                    self._expired(DeploymentInfo),
+                    self._expired(PointInfo),
+                    self._expired(ProjectInfo),
+                )
+            )
+        ).scalar()
+        points = self.db.execute(
+            select(func.count(PointInfo.id))
+            .join(ProjectInfo, PointInfo.project_id == ProjectInfo.id)
+            .where(or_(self._expired(PointInfo), self._expired(ProjectInfo)))
+        ).scalar()
+        projects = self.db.execute(
+            select(func.count(ProjectInfo.id)).where(self._expired(ProjectInfo))
+        ).scalar()
+        return {
+            "retention_days": self.retention_days,
+            "cutoff": self.cutoff,
+            "projects": projects,
+            "points": points,
+            "deployments": deployments,
+            "audios": audios,
+            "bytes": int(hot_bytes),
+            "cold_bytes": int(cold_bytes),
+        }
+
+    def _roots(self, limit: int) -> list[tuple]:
+        """
+        依 Project → Point → Deployment → Audio 的順序列出到期的根節點。
+
+        回傳 (層級, id, bucket)；Audio 層以所屬 Deployment 為單位，只刪除
+        其中本身到期的音檔。上層的根節點會連同子層一起清除，子層在上層
+        處理完後才查詢，因此不會重複。
+        """
+        if limit <= 0:
+            return []
+        levels = (
+            (
+                "project",
+                select(ProjectInfo.id, ProjectInfo.name)
+                .where(self._expired(ProjectInfo))
+                .order_by(ProjectInfo.id),
+            ),
+            (
+                "point",
+                select(PointInfo.id, ProjectInfo.name)
+                .join(ProjectInfo, PointInfo.project_id == ProjectInfo.id)
+                .where(self._expired(PointInfo))
+                .order_by(PointInfo.id),
+            ),
+            (
+                "deployment",
+                select(DeploymentInfo.id, ProjectInfo.name)
+                .join(PointInfo, DeploymentInfo.point_id == PointInfo.id)
+                .join(ProjectInfo, PointInfo.project_id == ProjectInfo.id)
+                .where(self._expired(DeploymentInfo))
+                .order_by(DeploymentInfo.id),
+            ),
+            (
+                "audio",
+                self._tree(AudioInfo.deployment_id, ProjectInfo.name)
+                .where(self._expired(AudioInfo))
+                .group_by(AudioInfo.deployment_id, ProjectInfo.name)
+                .order_by(AudioInfo.deployment_id),
+            ),
+        )
+        for level, query in levels:
+            rows = self.db.execute(query.limit(limit)).all()
+            self.db.commit()
+            if rows:
+                return [(level, root_id, bucket) for root_id, bucket in rows]
+        return []
+
+    def _purge_root(
+        self, level: str, root_id: int, bucket: str, limiter: TokenBucket | None
+    ) -> tuple[int, int]:
+        """先分批刪除根節點底下的音檔，再以 admin 的永久刪除清掉其餘列。"""
+        if level == "audio":
+            return hard_delete_audios(
+                self.db,
+                bucket,
+                and_(AudioInfo.deployment_id == root_id, self._expired(AudioInfo)),
+                limiter=limiter,
+            )
+
+        if level == "project":
+            deployment_ids = (
+                select(DeploymentInfo.id)
+                .join(PointInfo, DeploymentInfo.point_id == PointInfo.id)
+                .where(PointInfo.project_id == root_id)
+            )
+        elif level == "point":
+            deployment_ids = select(DeploymentInfo.id).where(
+                DeploymentInfo.point_id == root_id
+            )
+        else:
+            deployment_ids = select(DeploymentInfo.id).where(
+                DeploymentInfo.id == root_id
+            )
+        deleted, queued = hard_delete_audios(
+            self.db,
+            bucket,
+            AudioInfo.deployment_id.in_(deployment_ids),
+            limiter=limiter,
+        )
+
+        if level == "project":
+            result = ProjectService(self.db).hard_delete_project(root_id)
+        elif level == "point":
+            result = PointService(self.db).hard_delete_point(root_id)
+        else:
+            result = DeploymentService(self.db).hard_delete_deployment(root_id)
+        return (
+            deleted + result["deleted_audios"],
+            queued + result["queued_objects"],
+        )
+
+    def purge(
+        self,
+        max_roots: int | None = None,
+        limiter: TokenBucket | None = None,
+        progress: Callable[[int, int | None], None] | None = None,
+    ) -> dict:
+        """
+        永久刪除到期的軟刪除資料，最多處理 ``max_roots`` 個根節點。
+
+        每個根節點各自提交，中途失敗後重新執行會從剩下的部分繼續。
+        MinIO 物件只寫入 outbox，由呼叫端排程清除工作。
+        """
+        max_roots = max_roots or settings.purge_max_roots_per_run
+        if limiter is None and settings.purge_rows_per_second > 0:
+            limiter = TokenBucket(settings.purge_rows_per_second)
+
+        summary = {
+            "projects": 0,
+            "points": 0,
+            "deployments": 0,
+            "audios": 0,
+            "queued_objects": 0,
+        }
+        done = 0
+        while done < max_roots:
+            roots = self._roots(max_roots - done)
+            if not roots:
+                break
+            for level, root_id, bucket in roots:
+                audios, queued = self._purge_root(level, root_id, bucket, limiter)
+                if level != "audio":
+                    summary[f"{level}s"] += 1
+                summary["audios"] += audios
+                summary["queued_objects"] += queued
+                done += 1
+                if progress:
+                    progress(done)
+        logger.info(
+            f"Retention purge (deleted before {self.cutoff.isoformat()}): {summary}"
+        )
+        return summary
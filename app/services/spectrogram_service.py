@@ -0,0 +1,240 @@
+"""Spectrogram tiles for arbitrary slices of a single audio file.
+
+Tiles are content addressed: the cache key is a hash of the audio checksum
+and every rendering parameter, so a tile never needs invalidation. Lookups
+go through an in-process LRU, then the ``_derived/spectrogram`` prefix of
+the project bucket, and only then to a ranged read + STFT. Concurrent
+requests for the same tile are coalesced into one computation.
+"""
+
+import hashlib
+import json
+import logging
+from dataclasses import asdict, dataclass
+
+import numpy as np
+from botocore.exceptions import ClientError
+from fastapi import HTTPException, status
+from sqlalchemy.orm import Session
+
+from app.core.minio import get_s3_client
+from app.services.audio_reader import AudioObjectReader
+from app.services.audio_service import AudioService, ensure_online
+from app.utils.cache import LRUCache, SingleFlight
+from app.utils.dsp import power_to_db, rfft_freqs, stft_power
+from app.utils.image_utils import encode_png_gray, scale_to_uint8
+from app.utils.path_utils import DERIVED_PREFIX
+from app.utils.wav_utils import WavFormatError
+
+logger = logging.getLogger(__name__)
+
+SPECTROGRAM_PREFIX = f"{DERIVED_PREFIX}spectrogram"
+SPECTROGRAM_MAX_SECONDS = 600
+SPECTROGRAM_MEDIA_TYPES = {"png": "image/png", "f16": "application/octet-stream"}
+
+_tile_cache = LRUCache(maxsize=512)
+_inflight = SingleFlight()
+
+
+@dataclass(frozen=True)
+class SpectrogramParams:
+    start: float
+    end: float
+    fmin: float | None
+    fmax: float | None
+    nfft: int
+    fmt: str
+    db_min: float
+    db_max: float
+
+
+@dataclass(frozen=True)
+class SpectrogramTile:
+    key: str
+    content: bytes
+    media_type: str
+    n_time: int
+    n_freq: int
+    time_step: float
+    freq_min: float
+    freq_step: float
+
+    def headers(self) -> dict[str, str]:
+        return {
+            "ETag": f'"{self.key}"',
+            "Cache-Control": "private, max-age=31536000, immutable",
+            "X-Spectrogram-N-Time": str(self.n_time),
+            "X-Spectrogram-N-Freq": str(self.n_freq),
+            "X-Spectrogram-Time-Step": str(self.time_step),
+            "X-Spectrogram-Freq-Min": str(self.freq_min),
+            "X-Spectrogram-Freq-Step": str(self.freq_step),
+        }
+
+
+class SpectrogramService:
+    def __init__(self, db: Session, s3_client=None):
+        self.db = db
+        self.s3_client = s3_client or get_s3_client()
+
+    def get_tile(
+        self,
+        audio_id: int,
+        start: float,
+        end: float,
+        fmin: float | None = None,
+        fmax: float | None = None,
+        nfft: int = 1024,
+        fmt: str = "png",
+        db_min: float = -140.0,
+        db_max: float = -40.0,
+    ) -> SpectrogramTile:
+        """
+        取得單一音檔的頻譜圖 tile。
+
+        ``start`` / ``end`` 為相對於檔案開頭的秒數；PNG 以 ``db_min`` ~
+        ``db_max`` (dB re 1 FS²/Hz) 線性對應灰階，低頻在下方。
+        """
+        if end <= start or start < 0:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Require 0 <= start < end",
+            )
+        if end - start > SPECTROGRAM_MAX_SECONDS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Spectrogram window is limited to {SPECTROGRAM_MAX_SECONDS} s",
+            )
+        if nfft & (nfft - 1):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="nfft must be a power of two",
+            )
+        # 在計算與快取之前擋下：否則會產生以 NaN 縮放或空白的 tile
+        if not (np.isfinite([db_min, db_max]).all() and db_min < db_max):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Require finite db_min < db_max",
+            )
+        if fmin is not None and fmax is not None and fmin >= fmax:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Require fmin < fmax",
+            )
+
+        audio = AudioService(self.db).get_audio_details(audio_id)
+        bucket = audio.deployment.point.project.name
+        params = SpectrogramParams(start, end, fmin, fmax, nfft, fmt, db_min, db_max)
+        identity = {
+            # 沒有 checksum 的舊資料退而使用 object_key + 檔案大小作為內容識別
+            "content": audio.checksum or f"{audio.object_key}:{audio.file_size}",
+            **asdict(params),
+        }
+        key = hashlib.sha256(
+            json.dumps(identity, sort_keys=True).encode("utf-8")
+        ).hexdigest()
+
+        tile = _tile_cache.get(key)
+        if tile is None:
+            tile = _inflight.do(
+                key, lambda: self._load_or_render(key, bucket, audio, params)
+            )
+            _tile_cache.set(key, tile)
+        return tile
+
+    def _object_key(self, key: str, fmt: str) -> str:
+        return f"{SPECTROGRAM_PREFIX}/{key[:2]}/{key}.{fmt}"
+
+    def _load_or_render(
+        self, key: str, bucket: str, audio, params: SpectrogramParams
+    ) -> SpectrogramTile:
+        object_key = self._object_key(key, params.fmt)
+        try:
+            response = self.s3_client.get_object(Bucket=bucket, Key=object_key)
+            meta = response.get("Metadata", {})
+            return SpectrogramTile(
+                key=key,
+                content=response["Body"].read(),
+                media_type=SPECTROGRAM_MEDIA_TYPES[params.fmt],
+                n_time=int(meta["n-time"]),
+                n_freq=int(meta["n-freq"]),
+                time_step=float(meta["time-step"]),
+                freq_min=float(meta["freq-min"]),
+                freq_step=float(meta["freq-step"]),
+            )
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") not in ("NoSuchKey", "404"):
+                raise
+        except (KeyError, ValueError):
+            logger.warning(f"Ignoring spectrogram tile with bad metadata: {object_key}")
+
+        # 已快取的 tile 不需要原始音檔；冷儲存的音檔只擋住重新計算
+        tile = self._render(key, bucket, ensure_online(audio), params)
+        try:
+            self.s3_client.put_object(
+                Bucket=bucket,
+                Key=object_key,
+                Body=tile.content,
+                ContentType=tile.media_type,
+                Metadata={
+                    "n-time": str(tile.n_time),
+                    "n-freq": str(tile.n_freq),
+                    "time-step": str(tile.time_step),
+                    "freq-min": str(tile.freq_min),
+                    "freq-step": str(tile.freq_step),
+                },
+            )
+        except Exception as e:
+            # 持久化失敗不影響本次回應，下次再重新計算
+            logger.warning(f"Failed to persist spectrogram tile {object_key}: {e}")
+        return tile
+
+    def _render(
+        self, key: str, bucket: str, audio, params: SpectrogramParams
+    ) -> SpectrogramTile:
+        reader = AudioObjectReader(
+            self.s3_client, bucket, audio.object_key, audio.file_size
+        )
+        try:
+            fs = reader.header.fs
+        except WavFormatError as e:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=f"Cannot decode audio: {e}",
+            ) from e
+
+        nfft, fmin, fmax = params.nfft, params.fmin, params.fmax
+        start_frame = int(round(params.start * fs))
+        n_frames = int(round((params.end - params.start) * fs))
+        # 頻譜圖以第一個聲道、50% overlap 計算
+        samples = reader.read_frames(start_frame, n_frames)[:, 0]
+        hop = nfft // 2
+        _, psd = stft_power(samples, fs, nfft, hop)
+
+        freqs = rfft_freqs(nfft, fs)
+        f0 = 0 if fmin is None else int(np.searchsorted(freqs, fmin, side="left"))
+        f1 = len(freqs) if fmax is None else int(np.searchsorted(freqs, fmax, "right"))
+        if f0 >= f1:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"No frequency bins between fmin and fmax (fs = {fs} Hz)",
+            )
+        # 轉置成 (freq, time)，低頻在最下方
+        levels = power_to_db(psd[:, f0:f1]).T[::-1]
+
+        if params.fmt == "png":
+            content = encode_png_gray(
+                scale_to_uint8(levels, params.db_min, params.db_max)
+            )
+        else:
+            content = levels.astype("<f2").tobytes()
+
+        return SpectrogramTile(
+            key=key,
+            content=content,
+            media_type=SPECTROGRAM_MEDIA_TYPES[params.fmt],
+            n_time=levels.shape[1],
+            n_freq=levels.shape[0],
+            time_step=hop / fs,
+            freq_min=float(freqs[f0]) if f0 < len(freqs) else 0.0,
+            freq_step=fs / nfft,
+        )
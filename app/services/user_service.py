@@ -3,7 +3,8 @@ from datetime import UTC, datetime
 from fastapi import HTTPException, status
 from sqlalchemy.orm import Session
 
-from app.core.security import hash_password, verify_password
+from app.core.auth import invalidate_principal
+from app.core.security import hash_password, needs_rehash, verify_password
 from app.enums.enums import UserRole
 from app.models.user import UserInfo
 from app.schemas.user import UserCreate, UserUpdate
@@ -57,6 +58,10 @@ class UserService:
             return None
         if not user.is_active:
             return None
+        if needs_rehash(user.password_hash):
+            # bcrypt_rounds 調整後，舊的雜湊在下次成功登入時改用新的成本
+            user.password_hash = hash_password(password)
+            self.db.commit()
         return user
 
     def get_users(self, skip: int = 0, limit: int = 100) -> list[UserInfo]:
@@ -80,6 +85,7 @@ class UserService:
                 detail="User not found",
             )
 
+        old_email = user.email
         update_data = user_in.model_dump(exclude_unset=True)
         if "password" in update_data:
             password = update_data.pop("password")
@@ -92,6 +98,8 @@ class UserService:
         self.db.add(user)
         self.db.commit()
         self.db.refresh(user)
+        # 角色、停用與 email 變更需立即反映在後續請求的驗證上
+        invalidate_principal(old_email, user.email)
         return user
 
     def delete_user(self, user_id: int, deleted_by_id: int) -> UserInfo:
@@ -112,6 +120,7 @@ class UserService:
         self.db.add(user)
         self.db.commit()
         self.db.refresh(user)
+        invalidate_principal(user.email)
         return user
 
     def restore_user(self, user_id: int) -> UserInfo:
@@ -143,6 +152,7 @@ class UserService:
         self.db.add(user)
         self.db.commit()
         self.db.refresh(user)
+        invalidate_principal(user.email)
         return user
 
     def set_password(self, user_id: int, password: str) -> UserInfo:
@@ -177,4 +187,5 @@ class UserService:
         self.db.add(user)
         self.db.commit()
         self.db.refresh(user)
+        invalidate_principal(user.email)
         return user
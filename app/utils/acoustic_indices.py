@@ -0,0 +1,117 @@
+"""Standard soundscape indices computed from one shared spectrogram.
+
+All functions take a one-sided PSD spectrogram ``psd`` of shape
+``(frames, bins)`` (as returned by :func:`app.utils.dsp.stft_power`) and the
+matching bin frequencies, so a block is transformed once and every index
+is a cheap reduction over the same array.
+"""
+
+import numpy as np
+
+_EPS = 1e-30
+
+
+def _band(freqs: np.ndarray, fmin: float, fmax: float) -> slice:
+    lo = int(np.searchsorted(freqs, fmin, side="left"))
+    hi = int(np.searchsorted(freqs, fmax, side="left"))
+    return slice(lo, hi)
+
+
+def _entropy(weights: np.ndarray, axis: int = -1) -> np.ndarray:
+    """Shannon entropy of ``weights`` normalised to a probability mass."""
+    p = weights / np.maximum(weights.sum(axis=axis, keepdims=True), _EPS)
+    return -np.sum(np.where(p > 0, p * np.log(np.maximum(p, _EPS)), 0.0), axis=axis)
+
+
+def acoustic_complexity(amplitude: np.ndarray) -> float:
+    """ACI (Pieretti et al. 2011) over the whole block, summed across bins."""
+    if len(amplitude) < 2:
+        return float("nan")
+    change = np.abs(np.diff(amplitude, axis=0)).sum(axis=0)
+    return float(np.sum(change / np.maximum(amplitude.sum(axis=0), _EPS)))
+
+
+def acoustic_diversity(
+    amplitude: np.ndarray,
+    freqs: np.ndarray,
+    fmax: float = 10000.0,
+    step: float = 1000.0,
+    threshold_db: float = -50.0,
+) -> float:
+    """ADI (Villanueva-Rivera et al. 2011).
+
+    Shannon entropy of the fraction of cells above ``threshold_db`` (relative
+    to the block maximum) in consecutive ``step``-wide bands up to ``fmax``.
+    """
+    level = 20 * np.log10(np.maximum(amplitude / max(amplitude.max(), _EPS), _EPS))
+    fmax = min(fmax, freqs[-1])
+    occupancy = []
+    for lo in np.arange(0.0, fmax, step):
+        band = level[:, _band(freqs, lo, lo + step)]
+        occupancy.append(np.mean(band > threshold_db) if band.size else 0.0)
+    occupancy = np.array(occupancy)
+    if not occupancy.any():
+        return 0.0
+    return float(_entropy(occupancy))
+
+
+def acoustic_entropy(psd: np.ndarray) -> float:
+    """H (Sueur et al. 2008): temporal entropy x spectral entropy, both in [0, 1].
+
+    The frame RMS stands in for the Hilbert envelope so the index reuses the
+    STFT instead of needing another pass over the samples.
+    """
+    frames, bins = psd.shape
+    if frames < 2 or bins < 2:
+        return float("nan")
+    envelope = np.sqrt(psd.sum(axis=1))
+    spectrum = np.sqrt(psd).mean(axis=0)
+    ht = _entropy(envelope) / np.log(frames)
+    hf = _entropy(spectrum) / np.log(bins)
+    return float(ht * hf)
+
+
+def soundscape_index(
+    psd: np.ndarray,
+    freqs: np.ndarray,
+    anthrophony: tuple[float, float] = (1000.0, 2000.0),
+    biophony: tuple[float, float] = (2000.0, 11000.0),
+) -> float:
+    """NDSI (Kasten et al. 2012): ``(B - A) / (B + A)`` of band power."""
+    mean = psd.mean(axis=0)
+    a = float(mean[_band(freqs, *anthrophony)].sum())
+    b = float(mean[_band(freqs, *biophony)].sum())
+    if a + b <= 0:
+        return float("nan")
+    return (b - a) / (b + a)
+
+
+def broadband_level(
+    psd: np.ndarray, freqs: np.ndarray, calibration_db: float | None
+) -> float | None:
+    """Mean broadband level; dB re 1 µPa when ``calibration_db`` is known."""
+    if calibration_db is None or not len(psd):
+        return None
+    df = freqs[1] - freqs[0]
+    power = float(psd.mean(axis=0).sum() * df)
+    return 10 * np.log10(max(power, _EPS)) + calibration_db
+
+
+def compute_indices(
+    psd: np.ndarray,
+    freqs: np.ndarray,
+    calibration_db: float | None = None,
+    adi_fmax: float = 10000.0,
+    adi_step: float = 1000.0,
+    adi_threshold_db: float = -50.0,
+) -> dict[str, float | None]:
+    amplitude = np.sqrt(psd)
+    return {
+        "aci": acoustic_complexity(amplitude),
+        "adi": acoustic_diversity(
+            amplitude, freqs, adi_fmax, adi_step, adi_threshold_db
+        ),
+        "h": acoustic_entropy(psd),
+        "ndsi": soundscape_index(psd, freqs),
+        "spl": broadband_level(psd, freqs, calibration_db),
+    }
@@ -0,0 +1,112 @@
+"""Streaming acoustic event detectors (NumPy only)."""
+
+import numpy as np
+
+from app.utils.dsp import power_to_db, rfft_freqs, stft_power
+
+
+class BandEnergyDetector:
+    """
+    Band-limited energy detector with an adaptive noise floor.
+
+    Each STFT frame's energy in ``[fmin, fmax]`` is compared with a noise
+    floor tracked by an exponential moving average (time constant
+    ``noise_window`` seconds). The floor only adapts on frames below the
+    threshold so it does not climb into long events. Active frames closer
+    than ``max_gap`` seconds are merged and events shorter than
+    ``min_duration`` are dropped. The floor starts at the median energy of
+    the first ``noise_window`` seconds, so results do not depend on how the
+    input is split into blocks.
+
+    Feed consecutive sample blocks to :meth:`process`; samples that do not
+    fill a whole frame are carried into the next block.
+    """
+
+    def __init__(
+        self,
+        fs: int,
+        fmin: float,
+        fmax: float,
+        threshold_db: float = 10.0,
+        nfft: int = 1024,
+        noise_window: float = 30.0,
+        min_duration: float = 0.1,
+        max_gap: float = 0.1,
+    ):
+        freqs = rfft_freqs(nfft, fs)
+        self.band = np.flatnonzero((freqs >= fmin) & (freqs <= fmax))
+        if not len(self.band):
+            raise ValueError("Frequency band contains no FFT bins")
+        self.fs = fs
+        self.nfft = nfft
+        self.hop = nfft // 2
+        self.df = fs / nfft
+        self.threshold_db = threshold_db
+        self.alpha = min(1.0, self.hop / fs / noise_window)
+        self.min_duration = min_duration
+        self.max_gap = max_gap
+
+        self._carry = np.empty(0, dtype=np.float32)
+        self._position = 0  # 下一個 frame 起點的樣本索引
+        self._floor: float | None = None
+        self._warmup_frames = max(1, int(noise_window * fs / self.hop))
+        self._warmup: list[tuple[np.ndarray, np.ndarray]] = []
+        self._event: list[float] | None = None  # [start, end, peak_snr]
+        self.events: list[tuple[float, float, float]] = []
+
+    def process(self, samples: np.ndarray) -> None:
+        buf = np.concatenate([self._carry, samples.astype(np.float32)])
+        starts, psd = stft_power(buf, self.fs, self.nfft, self.hop)
+        consumed = len(starts) * self.hop
+        self._carry = buf[consumed:]
+        if not len(starts):
+            return
+        energy = power_to_db(psd[:, self.band].sum(axis=1) * self.df)
+        times = (self._position + starts) / self.fs
+        self._position += consumed
+        if self._floor is None:
+            self._warmup.append((times, energy))
+            if sum(len(e) for _, e in self._warmup) >= self._warmup_frames:
+                self._flush_warmup()
+        else:
+            self._update(times, energy)
+
+    def _flush_warmup(self) -> None:
+        times = np.concatenate([t for t, _ in self._warmup])
+        energy = np.concatenate([e for _, e in self._warmup])
+        self._warmup = []
+        self._floor = float(np.median(energy[: self._warmup_frames]))
+        self._update(times, energy)
+
+    def _update(self, times: np.ndarray, energy: np.ndarray) -> None:
+        floor = self._floor
+        frame_seconds = self.nfft / self.fs
+        for t, e in zip(times.tolist(), energy.tolist(), strict=True):
+            snr = e - floor
+            if snr >= self.threshold_db:
+                if self._event is not None and t - self._event[1] > self.max_gap:
+                    self._close()
+                if self._event is None:
+                    self._event = [t, t + frame_seconds, snr]
+                else:
+                    self._event[1] = t + frame_seconds
+                    self._event[2] = max(self._event[2], snr)
+            else:
+                floor += self.alpha * (e - floor)
+                if self._event is not None and t - self._event[1] > self.max_gap:
+                    self._close()
+        self._floor = floor
+
+    def _close(self) -> None:
+        start, end, peak = self._event
+        if end - start >= self.min_duration:
+            self.events.append((start, end, peak))
+        self._event = None
+
+    def finish(self) -> list[tuple[float, float, float]]:
+        """Close any open event and return ``(start_s, end_s, peak_snr_db)``."""
+        if self._warmup:
+            self._flush_warmup()
+        if self._event is not None:
+            self._close()
+        return self.events
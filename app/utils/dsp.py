@@ -0,0 +1,106 @@
+"""Vectorised short-time spectral analysis helpers (NumPy only)."""
+
+from functools import lru_cache
+
+import numpy as np
+
+
+@lru_cache(maxsize=32)
+def hann_window(nfft: int) -> np.ndarray:
+    """Periodic Hann window, cached per length."""
+    window = np.hanning(nfft + 1)[:-1].astype(np.float32)
+    window.setflags(write=False)
+    return window
+
+
+def rfft_freqs(nfft: int, fs: int) -> np.ndarray:
+    return np.fft.rfftfreq(nfft, d=1.0 / fs)
+
+
+def stft_power(samples: np.ndarray, fs: int, nfft: int, hop: int | None = None):
+    """One-sided power spectral density of every frame of a mono signal.
+
+    Returns ``(frame_starts, psd)`` where ``frame_starts`` holds the sample
+    index of each frame and ``psd`` has shape ``(frames, nfft // 2 + 1)`` in
+    units of full-scale²/Hz. Samples that do not fill a whole frame are
+    ignored; callers streaming blocks should carry them over.
+    """
+    hop = hop or nfft
+    if samples.ndim != 1:
+        raise ValueError("stft_power expects a mono signal")
+    if len(samples) < nfft:
+        return np.empty(0, dtype=np.int64), np.empty((0, nfft // 2 + 1), np.float32)
+
+    frames = np.lib.stride_tricks.sliding_window_view(samples, nfft)[::hop]
+    window = hann_window(nfft)
+    spectrum = np.fft.rfft(frames * window, axis=1)
+    psd = (spectrum.real**2 + spectrum.imag**2).astype(np.float32)
+    psd /= fs * float(np.sum(window**2))
+    # 單邊頻譜：DC 與 Nyquist 以外的能量乘 2
+    psd[:, 1 : (nfft + 1) // 2] *= 2
+    starts = np.arange(len(frames), dtype=np.int64) * hop
+    return starts, psd
+
+
+def power_to_db(power: np.ndarray, floor: float = 1e-20) -> np.ndarray:
+    return 10.0 * np.log10(np.maximum(power, floor))
+
+
+def lowpass_fir(numtaps: int, cutoff: float) -> np.ndarray:
+    """Hamming-windowed sinc low-pass; ``cutoff`` is a fraction of ``fs``."""
+    n = np.arange(numtaps) - (numtaps - 1) / 2
+    taps = 2 * cutoff * np.sinc(2 * cutoff * n) * np.hamming(numtaps)
+    return (taps / taps.sum()).astype(np.float32)
+
+
+class FirDecimator:
+    """
+    Streaming anti-aliased decimation by an integer ``factor``.
+
+    Output sample ``k`` is the linear-phase low-pass filter centred on input
+    sample ``k * factor``, so the decimated signal stays time-aligned with
+    the input. ``lead`` real samples preceding the first output may be fed
+    first to avoid an edge transient; missing context is zero-padded.
+    Exactly ``n_out`` samples are produced in total.
+    """
+
+    def __init__(self, factor: int, channels: int, n_out: int, lead: int = 0):
+        self.factor = factor
+        self.n_out = n_out
+        self.delay = self.filter_delay(factor)
+        self.taps = lowpass_fir(2 * self.delay + 1, 0.45 / factor)
+        if lead > self.delay:
+            raise ValueError("lead must not exceed the filter delay")
+        self._buf = np.zeros((self.delay - lead, channels), dtype=np.float32)
+        self._emitted = 0
+
+    @staticmethod
+    def filter_delay(factor: int) -> int:
+        """Group delay (in input samples) of the anti-alias filter."""
+        return 10 * factor
+
+    def _drain(self) -> np.ndarray:
+        ntaps = len(self.taps)
+        available = (len(self._buf) - ntaps) // self.factor + 1
+        count = max(0, min(available, self.n_out - self._emitted))
+        if count == 0:
+            return np.empty((0, self._buf.shape[1]), dtype=np.float32)
+        windows = np.lib.stride_tricks.sliding_window_view(
+            self._buf[: (count - 1) * self.factor + ntaps], ntaps, axis=0
+        )[:: self.factor]
+        out = windows @ self.taps
+        self._buf = self._buf[count * self.factor :]
+        self._emitted += count
+        return out
+
+    def process(self, block: np.ndarray) -> np.ndarray:
+        self._buf = np.concatenate([self._buf, block.astype(np.float32)])
+        return self._drain()
+
+    def finish(self) -> np.ndarray:
+        missing = (self.n_out - self._emitted - 1) * self.factor + len(self.taps)
+        pad = max(0, missing - len(self._buf))
+        self._buf = np.concatenate(
+            [self._buf, np.zeros((pad, self._buf.shape[1]), dtype=np.float32)]
+        )
+        return self._drain()
@@ -0,0 +1,55 @@
+"""Compact spectral fingerprint for spotting re-uploaded audio content."""
+
+import numpy as np
+
+from app.utils.dsp import rfft_freqs, stft_power
+
+# 16 x 16 bits = 64 個 hex 字元，可直接以索引做等值查詢
+FINGERPRINT_BANDS = 16
+FINGERPRINT_SEGMENTS = 16
+FINGERPRINT_FMIN = 100.0
+FINGERPRINT_FMAX = 4000.0
+FINGERPRINT_HEX_LENGTH = FINGERPRINT_BANDS * FINGERPRINT_SEGMENTS // 4
+
+
+def _nfft(fs: int) -> int:
+    # 約 0.25 秒的視窗，使最低頻帶也分得到數個 bin
+    return 1 << max(8, int(np.ceil(np.log2(fs * 0.25))))
+
+
+def spectral_fingerprint(samples: np.ndarray, fs: int) -> str | None:
+    """
+    以降取樣的頻帶能量差分產生 256-bit 指紋 (hex)。
+
+    先混成單聲道並計算 STFT，將頻譜在 100 Hz–4 kHz (不超過 0.45 fs) 以
+    對數間距分成 17 個頻帶、時間上平均成 17 段，取相鄰頻帶與相鄰時段
+    log 能量差分的正負號作為位元。只用到能量比值，因此與增益、位元深度
+    和檔頭內容無關，同一段錄音以不同檔名或格式重新上傳時指紋相同。
+    訊號太短或全靜音時回傳 ``None``，避免所有靜音檔互相比對成重複。
+    """
+    mono = samples.mean(axis=1) if samples.ndim == 2 else samples
+    nfft = _nfft(fs)
+    if len(mono) < nfft * (FINGERPRINT_SEGMENTS + 1):
+        return None
+
+    _, psd = stft_power(np.ascontiguousarray(mono, dtype=np.float32), fs, nfft)
+    edges = np.geomspace(
+        FINGERPRINT_FMIN,
+        min(FINGERPRINT_FMAX, 0.45 * fs),
+        FINGERPRINT_BANDS + 2,
+    )
+    band = np.searchsorted(edges, rfft_freqs(nfft, fs), side="right") - 1
+    valid = (band >= 0) & (band <= FINGERPRINT_BANDS)
+    onehot = np.zeros((len(band), FINGERPRINT_BANDS + 1), dtype=np.float64)
+    onehot[np.flatnonzero(valid), band[valid]] = 1.0
+
+    energy = psd.astype(np.float64) @ onehot
+    if not np.any(energy > 0):
+        return None
+    segments = np.stack(
+        [s.mean(axis=0) for s in np.array_split(energy, FINGERPRINT_SEGMENTS + 1)]
+    )
+    log_energy = np.log10(np.maximum(segments, 1e-30))
+    band_diff = log_energy[:, :-1] - log_energy[:, 1:]
+    bits = (band_diff[1:] - band_diff[:-1]) > 0
+    return np.packbits(bits.ravel()).tobytes().hex()
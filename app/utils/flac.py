@@ -0,0 +1,160 @@
+"""Streaming FLAC encoder and decoder on top of libsndfile (``soundfile``).
+
+Samples go in and come out as ``(frames, channels)`` integer arrays at
+their native bit depth. libsndfile cannot write APPLICATION metadata
+blocks, so the encoder lets it produce a plain FLAC stream in a temporary
+file and then splices the APPLICATION blocks into the metadata chain while
+copying the stream to the destination. The decoder reads the metadata
+chain itself for those blocks and hands the audio frames to libsndfile,
+which checks every frame CRC.
+"""
+
+import shutil
+import tempfile
+from collections.abc import Iterator
+from typing import BinaryIO
+
+import numpy as np
+import soundfile as sf
+
+FLAC_BLOCK_SIZE = 4096
+FLAC_SUPPORTED_BITS = (8, 16, 24)
+# APPLICATION metadata block 的內容上限 (24-bit 長度扣掉 4 bytes id)
+FLAC_MAX_APPLICATION_BYTES = (1 << 24) - 1 - 4
+
+_METADATA_APPLICATION = 2
+_SUBTYPES = {8: "PCM_S8", 16: "PCM_16", 24: "PCM_24"}
+_SUBTYPE_BITS = {subtype: bits for bits, subtype in _SUBTYPES.items()}
+
+
+class FlacError(ValueError):
+    """Raised on malformed or unsupported FLAC streams."""
+
+
+def _read_metadata(fp: BinaryIO) -> list[tuple[int, bytes]]:
+    """``(type, body)`` of every metadata block; ``fp`` ends at the first frame."""
+    if fp.read(4) != b"fLaC":
+        raise FlacError("Not a FLAC stream")
+    blocks = []
+    last = False
+    while not last:
+        head = fp.read(4)
+        if len(head) != 4:
+            raise FlacError("Truncated FLAC metadata")
+        last = bool(head[0] & 0x80)
+        length = int.from_bytes(head[1:], "big")
+        body = fp.read(length)
+        if len(body) != length:
+            raise FlacError("Truncated FLAC metadata")
+        blocks.append((head[0] & 0x7F, body))
+    return blocks
+
+
+def _write_metadata(fp: BinaryIO, blocks: list[tuple[int, bytes]]) -> None:
+    fp.write(b"fLaC")
+    for i, (kind, body) in enumerate(blocks):
+        last = 0x80 if i == len(blocks) - 1 else 0
+        fp.write(bytes([last | kind]) + len(body).to_bytes(3, "big") + body)
+
+
+class FlacEncoder:
+    """
+    Streaming FLAC writer.
+
+    Samples are written as ``(frames, channels)`` integer arrays and the
+    stream is copied to ``fp`` on :meth:`close`. ``applications`` maps
+    4-byte ids to opaque APPLICATION block payloads and may be updated
+    until then (e.g. with a digest only known at the end).
+    """
+
+    def __init__(
+        self,
+        fp: BinaryIO,
+        fs: int,
+        channels: int,
+        bits: int,
+        applications: dict[bytes, bytes] | None = None,
+    ):
+        if bits not in FLAC_SUPPORTED_BITS:
+            raise FlacError(f"Unsupported bit depth {bits}")
+        if not 1 <= channels <= 8 or not 0 < fs < 1 << 20:
+            raise FlacError("Unsupported channel count or sample rate")
+
+        self.fs = fs
+        self.channels = channels
+        self.bits = bits
+        self.applications = dict(applications or {})
+        self.total_frames = 0
+        self._fp = fp
+        self._tmp = tempfile.TemporaryFile()
+        self._sf = sf.SoundFile(
+            self._tmp,
+            "w",
+            samplerate=fs,
+            channels=channels,
+            format="FLAC",
+            subtype=_SUBTYPES[bits],
+        )
+
+    def write(self, samples: np.ndarray):
+        samples = np.asarray(samples).reshape(-1, self.channels)
+        # libsndfile 的 int 介面以 32-bit 滿刻度為準，樣本需左移對齊
+        self._sf.write(samples.astype(np.int32) << (32 - self.bits))
+        self.total_frames += len(samples)
+
+    def close(self):
+        """Finish the stream and write it to ``fp`` with the APPLICATION blocks."""
+        for app_id, payload in self.applications.items():
+            if len(app_id) != 4 or len(payload) > FLAC_MAX_APPLICATION_BYTES:
+                raise FlacError("Invalid APPLICATION block")
+        self._sf.close()
+        try:
+            self._tmp.seek(0)
+            blocks = _read_metadata(self._tmp) + [
+                (_METADATA_APPLICATION, app_id + payload)
+                for app_id, payload in self.applications.items()
+            ]
+            _write_metadata(self._fp, blocks)
+            shutil.copyfileobj(self._tmp, self._fp)
+        finally:
+            self._tmp.close()
+
+
+class FlacDecoder:
+    """Streaming FLAC reader; ``fp`` must be seekable."""
+
+    def __init__(self, fp: BinaryIO):
+        start = fp.tell()
+        self.applications: dict[bytes, bytes] = {
+            body[:4]: body[4:]
+            for kind, body in _read_metadata(fp)
+            if kind == _METADATA_APPLICATION
+        }
+        fp.seek(start)
+        try:
+            self._sf = sf.SoundFile(fp)
+        except sf.LibsndfileError as e:
+            raise FlacError(f"Cannot open FLAC stream: {e}") from e
+        if self._sf.subtype not in _SUBTYPE_BITS:
+            raise FlacError(f"Unsupported FLAC subtype {self._sf.subtype}")
+        self.fs = self._sf.samplerate
+        self.channels = self._sf.channels
+        self.bits = _SUBTYPE_BITS[self._sf.subtype]
+        self.total_frames = self._sf.frames
+
+    def iter_blocks(self) -> Iterator[np.ndarray]:
+        """Yield decoded ``(frames, channels)`` int32 blocks."""
+        shift = 32 - self.bits
+        decoded = 0
+        try:
+            for block in self._sf.blocks(
+                FLAC_BLOCK_SIZE, dtype="int32", always_2d=True
+            ):
+                decoded += len(block)
+                yield block >> shift
+        except sf.LibsndfileError as e:
+            raise FlacError(f"Corrupt FLAC stream: {e}") from e
+        finally:
+            self._sf.close()
+        if decoded != self.total_frames:
+            raise FlacError("FLAC stream is truncated")
@@ -0,0 +1,35 @@
+"""Minimal image encoders (stdlib + NumPy, no imaging dependency)."""
+
+import struct
+import zlib
+
+import numpy as np
+
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+def _png_chunk(tag: bytes, data: bytes) -> bytes:
+    crc = zlib.crc32(tag + data) & 0xFFFFFFFF
+    return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", crc)
+
+
+def encode_png_gray(pixels: np.ndarray, compress_level: int = 6) -> bytes:
+    """Encode a 2-D ``uint8`` array as an 8-bit grayscale PNG."""
+    if pixels.ndim != 2 or pixels.dtype != np.uint8:
+        raise ValueError("encode_png_gray expects a 2-D uint8 array")
+    height, width = pixels.shape
+    # 每一列前面加上 filter type 0 (None)
+    raw = np.hstack([np.zeros((height, 1), dtype=np.uint8), pixels]).tobytes()
+    header = struct.pack(">IIBBBBB", width, height, 8, 0, 0, 0, 0)
+    return (
+        _PNG_SIGNATURE
+        + _png_chunk(b"IHDR", header)
+        + _png_chunk(b"IDAT", zlib.compress(raw, compress_level))
+        + _png_chunk(b"IEND", b"")
+    )
+
+
+def scale_to_uint8(values: np.ndarray, vmin: float, vmax: float) -> np.ndarray:
+    """Linearly map ``[vmin, vmax]`` to ``[0, 255]``; NaN becomes 0."""
+    scaled = (np.nan_to_num(values, nan=vmin) - vmin) / (vmax - vmin)
+    return (np.clip(scaled, 0.0, 1.0) * 255).round().astype(np.uint8)
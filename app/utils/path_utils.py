@@ -1,3 +1,19 @@
+# MinIO 上由音檔衍生的物件：峰值 sidecar、每個 deployment 的 LTSA 建置
+# 與 DERIVED_PREFIX 下其他可重建的快取 (spectrogram tile)
+PEAKS_SUFFIX = ".peaks"
+DERIVED_PREFIX = "_derived/"
+LTSA_PREFIX = f"{DERIVED_PREFIX}ltsa"
+LTSA_DEPLOYMENT_PREFIX = f"{LTSA_PREFIX}/deployment_"
+
+
+def peaks_key(object_key: str) -> str:
+    return f"{object_key}{PEAKS_SUFFIX}"
+
+
+def ltsa_root(deployment_id: int) -> str:
+    return f"{LTSA_DEPLOYMENT_PREFIX}{deployment_id}"
+
+
 def parse_filename_and_generate_key(point_name: str, filename: str) -> str:
     """
     Generate MinIO object key based on filename format.
@@ -0,0 +1,47 @@
+"""In-process rate limiting for background jobs."""
+
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket.
+
+    ``acquire(amount)`` blocks until ``amount`` tokens are available. A
+    request larger than ``capacity`` is let through once the bucket is full
+    and leaves it in debt, so oversized items are delayed instead of being
+    rejected or blocking forever.
+    """
+
+    def __init__(
+        self, rate: float, capacity: float | None = None, clock=time.monotonic
+    ):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self._clock = clock
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+
+    def reserve(self, amount: float) -> float:
+        """Take ``amount`` tokens and return how long the caller must wait."""
+        with self._lock:
+            self._refill()
+            needed = min(amount, self.capacity)
+            wait = max(0.0, (needed - self._tokens) / self.rate)
+            self._tokens -= amount
+            return wait
+
+    def acquire(self, amount: float = 1.0, sleep=time.sleep) -> float:
+        wait = self.reserve(amount)
+        if wait > 0:
+            sleep(wait)
+        return wait
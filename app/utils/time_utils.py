@@ -0,0 +1,11 @@
+from datetime import datetime, timedelta, timezone
+
+# 與 schemas 一致：未帶時區的時間視為台灣時間 (UTC+8)
+TW_TZ = timezone(timedelta(hours=8))
+
+
+def as_aware(dt: datetime | None) -> datetime | None:
+    """為沒有時區的 ``dt`` 補上 UTC+8；已帶時區或 None 原樣回傳。"""
+    if dt is not None and dt.tzinfo is None:
+        return dt.replace(tzinfo=TW_TZ)
+    return dt
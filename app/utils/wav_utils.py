@@ -0,0 +1,247 @@
+"""WAV (RIFF) header parsing and PCM decoding helpers.
+
+These helpers are pure: they work on ``bytes`` and byte-chunk iterators so
+that callers can feed them from MinIO range reads without ever holding a
+whole recording in memory.
+"""
+
+import struct
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+
+import numpy as np
+
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+# 讀取檔頭時先抓前 64 KB，足以涵蓋一般錄音機寫入的 LIST / bext chunk
+WAV_HEADER_PROBE_BYTES = 64 * 1024
+
+
+class WavFormatError(ValueError):
+    """Raised when a byte buffer is not a WAV file we can decode."""
+
+
+@dataclass(frozen=True)
+class WavHeader:
+    format_tag: int
+    channels: int
+    fs: int
+    bits_per_sample: int
+    block_align: int
+    data_offset: int
+    data_size: int
+
+    @property
+    def num_frames(self) -> int:
+        return self.data_size // self.block_align
+
+    @property
+    def duration(self) -> float:
+        return self.num_frames / self.fs
+
+    def frame_to_byte(self, frame: int) -> int:
+        """Absolute byte offset of ``frame`` inside the object."""
+        return self.data_offset + frame * self.block_align
+
+
+def parse_wav_header(buf: bytes, object_size: int | None = None) -> WavHeader:
+    """Parse the RIFF header at the start of ``buf``.
+
+    ``buf`` only needs to contain the bytes up to the start of the ``data``
+    chunk. When ``object_size`` is known the data size is clamped to it,
+    which repairs files whose recorder never rewrote the chunk length.
+    """
+    if len(buf) < 12 or buf[:4] not in (b"RIFF", b"RF64") or buf[8:12] != b"WAVE":
+        raise WavFormatError("Not a RIFF/WAVE file")
+
+    fmt = None
+    pos = 12
+    while pos + 8 <= len(buf):
+        chunk_id = buf[pos : pos + 4]
+        (chunk_size,) = struct.unpack_from("<I", buf, pos + 4)
+        body = pos + 8
+
+        if chunk_id == b"fmt ":
+            if body + 16 > len(buf):
+                break
+            format_tag, channels, fs, _, block_align, bits = struct.unpack_from(
+                "<HHIIHH", buf, body
+            )
+            if format_tag == WAVE_FORMAT_EXTENSIBLE and chunk_size >= 40:
+                # SubFormat GUID 的前兩個 byte 即實際格式
+                (format_tag,) = struct.unpack_from("<H", buf, body + 24)
+            fmt = (format_tag, channels, fs, block_align, bits)
+        elif chunk_id == b"data":
+            if fmt is None:
+                raise WavFormatError("data chunk found before fmt chunk")
+            format_tag, channels, fs, block_align, bits = fmt
+            if format_tag not in (WAVE_FORMAT_PCM, WAVE_FORMAT_IEEE_FLOAT):
+                raise WavFormatError(f"Unsupported WAV format tag {format_tag:#x}")
+            if channels < 1 or fs < 1 or block_align != channels * (bits // 8):
+                raise WavFormatError("Inconsistent fmt chunk")
+            data_size = chunk_size
+            if object_size is not None:
+                data_size = min(data_size, object_size - body)
+            data_size -= data_size % block_align
+            return WavHeader(
+                format_tag=format_tag,
+                channels=channels,
+                fs=fs,
+                bits_per_sample=bits,
+                block_align=block_align,
+                data_offset=body,
+                data_size=data_size,
+            )
+
+        # RIFF chunk 以 2 bytes 對齊
+        pos = body + chunk_size + (chunk_size & 1)
+
+    raise WavFormatError("data chunk not found in header probe")
+
+
+def pcm_to_int(raw: bytes, header: WavHeader) -> np.ndarray:
+    """Decode interleaved integer PCM bytes to ``(frames, channels)`` int32.
+
+    8-bit WAV samples are unsigned and are shifted to signed values.
+    """
+    if header.format_tag != WAVE_FORMAT_PCM:
+        raise WavFormatError("Not an integer PCM file")
+    usable = len(raw) - len(raw) % header.block_align
+    raw = raw[:usable]
+    bits = header.bits_per_sample
+
+    if bits == 8:
+        ints = np.frombuffer(raw, dtype=np.uint8).astype(np.int32) - 128
+    elif bits == 16:
+        ints = np.frombuffer(raw, dtype="<i2").astype(np.int32)
+    elif bits == 24:
+        b = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        ints = b[:, 0] | (b[:, 1] << 8) | (b[:, 2] << 16)
+        ints = np.where(ints & 0x800000, ints - 0x1000000, ints)
+    elif bits == 32:
+        ints = np.frombuffer(raw, dtype="<i4")
+    else:
+        raise WavFormatError(f"Unsupported bit depth {bits}")
+
+    return ints.reshape(-1, header.channels)
+
+
+def pcm_to_float(raw: bytes, header: WavHeader) -> np.ndarray:
+    """Decode interleaved PCM bytes to a ``(frames, channels)`` float32 array."""
+    if header.format_tag == WAVE_FORMAT_IEEE_FLOAT:
+        usable = len(raw) - len(raw) % header.block_align
+        dtype = "<f4" if header.bits_per_sample == 32 else "<f8"
+        samples = np.frombuffer(raw[:usable], dtype=dtype).astype(np.float32)
+        return samples.reshape(-1, header.channels)
+
+    scale = float(1 << (header.bits_per_sample - 1))
+    return pcm_to_int(raw, header).astype(np.float32) / scale
+
+
+def iter_pcm_blocks(
+    chunks: Iterable[bytes], header: WavHeader, block_frames: int
+) -> Iterator[np.ndarray]:
+    """Re-block a byte-chunk stream into float arrays of ``block_frames`` frames.
+
+    The last block may be shorter. Chunk boundaries that split a frame are
+    handled by carrying the remainder into the next chunk.
+    """
+    block_bytes = block_frames * header.block_align
+    pending = bytearray()
+    for chunk in chunks:
+        pending += chunk
+        while len(pending) >= block_bytes:
+            yield pcm_to_float(bytes(pending[:block_bytes]), header)
+            del pending[:block_bytes]
+    if len(pending) >= header.block_align:
+        yield pcm_to_float(bytes(pending), header)
+
+
+def iter_frame_chunks(chunks: Iterable[bytes], block_align: int) -> Iterator[bytes]:
+    """Re-cut a byte-chunk stream so every chunk holds whole frames only."""
+    pending = b""
+    for chunk in chunks:
+        pending += chunk
+        usable = len(pending) - len(pending) % block_align
+        if usable:
+            yield pending[:usable]
+            pending = pending[usable:]
+
+
+def select_channels(raw: bytes, header: WavHeader, channels: list[int]) -> bytes:
+    """Keep only ``channels`` of interleaved PCM bytes, without decoding."""
+    width = header.block_align // header.channels
+    frames = np.frombuffer(raw, dtype=np.uint8).reshape(-1, header.channels, width)
+    return frames[:, channels, :].tobytes()
+
+
+def float_to_pcm(samples: np.ndarray, format_tag: int, bits_per_sample: int) -> bytes:
+    """Encode ``(frames, channels)`` float samples as interleaved PCM bytes.
+
+    Inverse of :func:`pcm_to_float`; integer formats are rounded and clipped
+    to full scale.
+    """
+    if format_tag == WAVE_FORMAT_IEEE_FLOAT:
+        dtype = "<f4" if bits_per_sample == 32 else "<f8"
+        return samples.astype(dtype).tobytes()
+
+    scale = float(1 << (bits_per_sample - 1))
+    ints = np.clip(np.round(samples * scale), -scale, scale - 1).astype(np.int32)
+    return int_to_pcm(ints, bits_per_sample)
+
+
+def int_to_pcm(samples: np.ndarray, bits_per_sample: int) -> bytes:
+    """Encode ``(frames, channels)`` integer samples as interleaved PCM bytes."""
+    if bits_per_sample == 8:
+        return (samples + 128).astype(np.uint8).tobytes()
+    if bits_per_sample == 16:
+        return samples.astype("<i2").tobytes()
+    if bits_per_sample == 24:
+        b = samples.astype("<i4").view(np.uint8).reshape(-1, 4)[:, :3]
+        return b.tobytes()
+    if bits_per_sample == 32:
+        return samples.astype("<i4").tobytes()
+    raise WavFormatError(f"Unsupported bit depth {bits_per_sample}")
+
+
+def build_wav_header(
+    format_tag: int, channels: int, fs: int, bits_per_sample: int, n_frames: int
+) -> bytes:
+    """Canonical RIFF header for ``n_frames`` frames of interleaved samples.
+
+    Float files get the 18-byte ``fmt`` chunk and the ``fact`` chunk that the
+    spec requires for non-PCM formats.
+    """
+    block_align = channels * (bits_per_sample // 8)
+    data_size = n_frames * block_align
+    fmt = struct.pack(
+        "<HHIIHH",
+        format_tag,
+        channels,
+        fs,
+        fs * block_align,
+        block_align,
+        bits_per_sample,
+    )
+    extra = b""
+    if format_tag != WAVE_FORMAT_PCM:
+        fmt += struct.pack("<H", 0)
+        extra = b"fact" + struct.pack("<II", 4, n_frames)
+
+    # 奇數長度的 data chunk 後面要補一個 pad byte，由呼叫端寫入
+    riff_size = 4 + (8 + len(fmt)) + len(extra) + (8 + data_size + (data_size & 1))
+    if riff_size > 0xFFFFFFFF:
+        raise WavFormatError("Clip is too large for a RIFF/WAVE file")
+    return (
+        b"RIFF"
+        + struct.pack("<I", riff_size)
+        + b"WAVE"
+        + b"fmt "
+        + struct.pack("<I", len(fmt))
+        + fmt
+        + extra
+        + b"data"
+        + struct.pack("<I", data_size)
+    )
@@ -0,0 +1,141 @@
+"""
+Background job worker.
+
+Run one or more of these next to the API::
+
+    python -m app.worker --threads 2
+
+Each thread claims jobs from the ``background_job`` table with
+``SELECT ... FOR UPDATE SKIP LOCKED``, so any number of worker processes can
+share the queue; per-type concurrency limits are enforced in the database.
+"""
+
+import argparse
+import logging
+import os
+import signal
+import socket
+import threading
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.services import job_handlers  # noqa: F401 - registers job types
+from app.services.job_service import (
+    JOB_HANDLERS,
+    Heartbeat,
+    JobCancelledError,
+    JobLostError,
+    JobProgress,
+    JobService,
+)
+
+logger = logging.getLogger(__name__)
+
+# 每執行幾輪檢查一次逾時的工作與到期的週期性工作
+STALE_CHECK_EVERY = 30
+
+
+class JobWorker:
+    def __init__(
+        self,
+        session_factory=SessionLocal,
+        worker_id: str | None = None,
+        job_types: list[str] | None = None,
+        poll_interval: float | None = None,
+        heartbeat_interval: float | None = None,
+    ):
+        self.session_factory = session_factory
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.job_types = job_types
+        self.poll_interval = poll_interval or settings.job_poll_seconds
+        self.heartbeat_interval = heartbeat_interval or settings.job_heartbeat_seconds
+
+    def execute(self, service: JobService, job) -> None:
+        handler = JOB_HANDLERS[job.job_type]
+        progress = JobProgress(self.session_factory, job.id, worker_id=self.worker_id)
+        db = self.session_factory()
+        logger.info(f"{self.worker_id} running job {job.id} ({job.job_type})")
+        try:
+            with Heartbeat(
+                self.session_factory, job.id, self.heartbeat_interval, self.worker_id
+            ):
+                result = handler.func(db, dict(job.payload or {}), progress)
+        except JobLostError:
+            # 已被重新排隊 (可能由其他 worker 執行中)，不寫入任何狀態
+            db.rollback()
+            logger.warning(f"Job {job.id} was requeued while running; abandoned")
+        except JobCancelledError:
+            db.rollback()
+            service.cancelled(job, self.worker_id)
+            logger.info(f"Job {job.id} cancelled")
+        except Exception as e:
+            db.rollback()
+            service.fail(job, self.worker_id, e)
+            logger.exception(f"Job {job.id} ({job.job_type}) failed")
+        else:
+            service.complete(job, self.worker_id, result)
+        finally:
+            db.close()
+
+    def run_once(self, service: JobService) -> bool:
+        """領取並執行一個工作；佇列中沒有可執行的工作時回傳 False。"""
+        job = service.claim(self.worker_id, self.job_types)
+        if job is None:
+            return False
+        self.execute(service, job)
+        return True
+
+    def run(self, stop: threading.Event) -> None:
+        db = self.session_factory()
+        service = JobService(db)
+        rounds = 0
+        try:
+            while not stop.is_set():
+                try:
+                    if rounds % STALE_CHECK_EVERY == 0:
+                        service.requeue_stale()
+                        service.schedule_periodic(self.job_types)
+                    rounds += 1
+                    if not self.run_once(service):
+                        stop.wait(self.poll_interval)
+                except Exception:
+                    db.rollback()
+                    logger.exception("Job worker loop error")
+                    stop.wait(self.poll_interval)
+        finally:
+            db.close()
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Run background jobs")
+    parser.add_argument("--threads", type=int, default=1)
+    parser.add_argument(
+        "--types", nargs="*", choices=sorted(JOB_HANDLERS), help="Job types to run"
+    )
+    args = parser.parse_args(argv)
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s %(message)s"
+    )
+
+    stop = threading.Event()
+    # 收到停止訊號後不再領取新工作，執行中的工作完成後結束
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: stop.set())
+
+    base_id = f"{socket.gethostname()}:{os.getpid()}"
+    threads = [
+        threading.Thread(
+            target=JobWorker(worker_id=f"{base_id}:{i}", job_types=args.types).run,
+            args=(stop,),
+            name=f"job-worker-{i}",
+        )
+        for i in range(args.threads)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+if __name__ == "__main__":
+    main()
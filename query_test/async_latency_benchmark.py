@@ -0,0 +1,122 @@
+"""
+Compare request latency of the sync and async read paths under concurrency.
+
+The sync path mimics Starlette's threadpool: every request runs
+``AudioService.get_audios`` on one of ``--threads`` worker threads (40 by
+default, like anyio's limiter), so requests beyond that queue for a thread.
+The async path awaits ``get_audios_async`` on the event loop. Latency is
+measured from submission to completion, so queueing is included.
+
+    python query_test/async_latency_benchmark.py --deployment-id 5 \
+        --requests 2000 --concurrency 400
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Add project root to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.db.session import SessionLocal, get_async_engine, get_async_sessionmaker
+from app.services.audio_service import AudioService
+
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))
+    return ordered[index]
+
+
+def report(name: str, latencies: list[float], elapsed: float) -> None:
+    ms = [value * 1000 for value in latencies]
+    print(
+        f"{name:>6}: {len(ms) / elapsed:8.1f} req/s  "
+        f"p50 {statistics.median(ms):7.1f} ms  "
+        f"p95 {percentile(ms, 95):7.1f} ms  "
+        f"p99 {percentile(ms, 99):7.1f} ms  "
+        f"max {max(ms):7.1f} ms"
+    )
+
+
+def sync_request(deployment_id: int, limit: int, submitted: float) -> float:
+    db = SessionLocal()
+    try:
+        AudioService(db).get_audios(deployment_id=deployment_id, limit=limit)
+    finally:
+        db.close()
+    return time.perf_counter() - submitted
+
+
+def run_sync(args) -> None:
+    latencies = []
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        # 一次最多 concurrency 個請求在等待或執行，與 async 版本相同
+        for offset in range(0, args.requests, args.concurrency):
+            batch = min(args.concurrency, args.requests - offset)
+            futures = [
+                pool.submit(
+                    sync_request, args.deployment_id, args.limit, time.perf_counter()
+                )
+                for _ in range(batch)
+            ]
+            latencies.extend(future.result() for future in futures)
+    report("sync", latencies, time.perf_counter() - started)
+
+
+async def async_request(sessionmaker, deployment_id: int, limit: int) -> float:
+    submitted = time.perf_counter()
+    async with sessionmaker() as db:
+        await AudioService(db).get_audios_async(
+            deployment_id=deployment_id, limit=limit
+        )
+    return time.perf_counter() - submitted
+
+
+async def run_async(args) -> None:
+    sessionmaker = get_async_sessionmaker()
+    latencies = []
+    started = time.perf_counter()
+    for offset in range(0, args.requests, args.concurrency):
+        batch = min(args.concurrency, args.requests - offset)
+        latencies.extend(
+            await asyncio.gather(
+                *(
+                    async_request(sessionmaker, args.deployment_id, args.limit)
+                    for _ in range(batch)
+                )
+            )
+        )
+    report("async", latencies, time.perf_counter() - started)
+    await get_async_engine().dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--deployment-id", type=int, default=5)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=400)
+    parser.add_argument("--threads", type=int, default=40)
+    args = parser.parse_args()
+
+    print(
+        f"{args.requests} requests, {args.concurrency} concurrent, "
+        f"{args.threads} sync threads, deployment {args.deployment_id}"
+    )
+    # 先各跑一輪暖機，建立連線池
+    warmup = argparse.Namespace(**{**vars(args), "requests": args.concurrency})
+    run_sync(warmup)
+    asyncio.run(run_async(warmup))
+    print("--- measured ---")
+    run_sync(args)
+    asyncio.run(run_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+"""測試用的音訊產生工具。"""
+
+import io
+import wave
+
+import numpy as np
+
+
+def make_wav(samples: np.ndarray, fs: int) -> bytes:
+    """Build a 16-bit PCM WAV from a (frames,) or (frames, channels) array."""
+    if samples.ndim == 1:
+        samples = samples[:, None]
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(samples.shape[1])
+        w.setsampwidth(2)
+        w.setframerate(fs)
+        w.writeframes((samples * 32767).astype("<i2").tobytes())
+    return buf.getvalue()
+
+
+def tone(freq: float, fs: int, seconds: float, amplitude: float = 0.5) -> np.ndarray:
+    t = np.arange(int(fs * seconds)) / fs
+    return (amplitude * np.sin(2 * np.pi * freq * t)).astype(np.float32)
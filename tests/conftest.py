@@ -7,9 +7,16 @@ import pytest
 from unittest.mock import MagicMock, patch
 from fastapi.testclient import TestClient
 from app.main import app
-from app.core.auth import get_current_user
-from app.db.session import get_db
+from app.core.auth import clear_principals, get_current_user
+from app.db.session import get_async_db, get_async_read_db, get_db, get_read_db
 from app.enums.enums import UserRole
+from app.services import audio_reader, peaks_service
+
+
+@pytest.fixture(autouse=True)
+def clear_principal_cache():
+    """每個測試從空的已驗證使用者快取開始。"""
+    clear_principals()
 
 
 @pytest.fixture
@@ -36,6 +43,9 @@ def mock_current_user():
 def client(mock_db, mock_current_user):
     """Test client with mocked dependencies."""
     app.dependency_overrides[get_db] = lambda: mock_db
+    app.dependency_overrides[get_async_db] = lambda: mock_db
+    app.dependency_overrides[get_read_db] = lambda: mock_db
+    app.dependency_overrides[get_async_read_db] = lambda: mock_db
     app.dependency_overrides[get_current_user] = lambda: mock_current_user
     with TestClient(app) as c:
         yield c
@@ -49,3 +59,13 @@ def mock_s3_client():
         mock_client = MagicMock()
         mock_get_s3.return_value = mock_client
         yield mock_client
+
+
+@pytest.fixture
+def aws_credentials(monkeypatch):
+    """Fake AWS credentials for moto-backed S3 tests."""
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    # 每個 moto 測試都是全新的 bucket，不能沿用前一個測試快取的檔頭
+    audio_reader._header_cache.clear()
+    peaks_service._header_cache.clear()
@@ -0,0 +1,202 @@
+"""
+聲景指數測試模組。
+
+包含：
+- ACI / ADI / H / NDSI / SPL 的數值合理性
+- 以 moto 模擬 MinIO 的逐分鐘計算與批次寫入
+- 時間視窗查詢與 API
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import UTC, datetime, timedelta
+from unittest.mock import MagicMock, patch
+
+import boto3
+import numpy as np
+import pytest
+from audio_helpers import make_wav, tone
+from fastapi import HTTPException
+from moto import mock_aws
+
+from app.core.config import settings
+from app.models.analysis import AudioAnalysisRun
+from app.schemas.acoustic_index import AcousticIndexParams
+from app.services.acoustic_index_service import (
+    ACOUSTIC_INDICES,
+    AcousticIndexService,
+    calibration_db,
+    compute_file_indices,
+)
+from app.services.analysis_run_service import AnalysisRunService
+from app.utils.acoustic_indices import compute_indices
+from app.utils.dsp import rfft_freqs, stft_power
+
+FS = 22050
+NFFT = 512
+
+
+def indices(signal, calibration=None):
+    _, psd = stft_power(signal, FS, NFFT)
+    return compute_indices(psd, rfft_freqs(NFFT, FS), calibration_db=calibration)
+
+
+def noise(seconds=5.0, amplitude=0.1, seed=0):
+    rng = np.random.default_rng(seed)
+    return (amplitude * rng.standard_normal(int(FS * seconds))).astype(np.float32)
+
+
+class TestIndices:
+    def test_tone_is_less_diverse_than_noise(self):
+        pure = indices(tone(5000, FS, 5.0))
+        white = indices(noise())
+
+        assert pure["h"] < 0.5 < white["h"]
+        assert pure["adi"] < white["adi"]
+
+    def test_aci_rises_with_intensity_changes(self):
+        steady = tone(3000, FS, 5.0)
+        pulsed = steady * (np.arange(len(steady)) // (FS // 4) % 2)
+
+        assert indices(pulsed)["aci"] > indices(steady)["aci"]
+
+    def test_ndsi_sign_follows_dominant_band(self):
+        assert indices(tone(1500, FS, 5.0))["ndsi"] < -0.9
+        assert indices(tone(5000, FS, 5.0))["ndsi"] > 0.9
+
+    def test_spl_uses_calibration(self):
+        signal = tone(1000, FS, 5.0, amplitude=1.0)
+
+        assert indices(signal)["spl"] is None
+        # 滿刻度正弦波的均方值為 0.5 (約 -3 dB FS)
+        assert indices(signal, calibration=170.0)["spl"] == pytest.approx(167, abs=0.1)
+
+
+def test_calibration_from_deployment():
+    assert calibration_db(MagicMock(sensitivity=None, gain=10)) is None
+    assert calibration_db(MagicMock(sensitivity=-176.0, gain=None)) == 176.0
+    assert calibration_db(MagicMock(sensitivity=-176.0, gain=6.0)) == 170.0
+
+
+def options(**overrides):
+    return {**AcousticIndexParams().model_dump(), "calibration_db": None, **overrides}
+
+
+@mock_aws
+def test_compute_file_indices_per_minute(aws_credentials):
+    s3 = boto3.client("s3", region_name="us-east-1")
+    s3.create_bucket(Bucket="proj")
+    fs = 8000
+    # 2 分 5 秒：最後 5 秒不足最短長度，不計算
+    body = make_wav(np.concatenate([tone(3000, fs, 60), np.zeros(65 * fs)]), fs)
+    s3.put_object(Bucket="proj", Key="a.wav", Body=body)
+
+    with patch("app.services.acoustic_index_service.get_s3_client", return_value=s3):
+        minutes = compute_file_indices("proj", "a.wav", None, options())
+        with pytest.raises(ValueError):
+            compute_file_indices("proj", "a.wav", None, options(channel=1))
+
+    assert [(m[0], m[1]) for m in minutes] == [(0.0, 60.0), (60.0, 60.0)]
+    assert minutes[0][4] < 0.5
+    # 靜音分鐘沒有頻帶能量，NDSI 無定義
+    assert np.isnan(minutes[1][5])
+
+
+def test_run_deployment_replaces_rows_and_records_run(mock_db):
+    t0 = datetime(2024, 6, 11, 5, tzinfo=UTC)
+    audio = MagicMock(id=4, object_key="a.wav", file_size=None, record_time=t0)
+    deployment = MagicMock(sensitivity=-170.0, gain=0.0)
+    deployment.point.project.name = "proj"
+    minutes = [(0.0, 60.0, 1.0, 2.0, 0.3, 0.5, 120.0), (60.0, 30.0, *[np.nan] * 5)]
+
+    with (
+        patch("app.services.acoustic_index_service.DeploymentService") as MockDeploy,
+        patch(
+            "app.services.acoustic_index_service.compute_file_indices",
+            return_value=minutes,
+        ),
+        patch.object(AnalysisRunService, "pending_audios", return_value=[audio]),
+        ThreadPoolExecutor(1) as pool,
+    ):
+        MockDeploy.return_value.get_deployment_details.return_value = deployment
+        with patch(
+            "app.services.analysis_run_service.params_hash", return_value="h"
+        ) as digest:
+            summary = AcousticIndexService(mock_db).run_deployment(
+                7, AcousticIndexParams(), executor=pool
+            )
+
+    assert digest.call_args.args[1]["calibration_db"] == 170.0
+    assert summary["files_processed"] == 1
+    assert summary["results"] == 2
+    delete_stmt, (insert_stmt, rows) = (
+        mock_db.execute.call_args_list[0].args[0],
+        mock_db.execute.call_args_list[1].args,
+    )
+    assert "DELETE FROM acoustic_index_minute" in str(delete_stmt)
+    assert "INSERT INTO acoustic_index_minute" in str(insert_stmt)
+    assert rows[0]["minute_time"] == t0
+    assert rows[0]["spl"] == 120.0
+    assert rows[1]["minute_time"] == t0 + timedelta(minutes=1)
+    assert rows[1]["aci"] is None
+    run = mock_db.add.call_args.args[0]
+    assert isinstance(run, AudioAnalysisRun)
+    assert run.analysis == ACOUSTIC_INDICES
+
+
+def test_get_indices_returns_columns(mock_db):
+    t0 = datetime(2024, 6, 11, 5, tzinfo=UTC)
+    query = mock_db.query.return_value.filter.return_value.order_by.return_value
+    query.limit.return_value.all.return_value = [
+        (t0, 60.0, 1.0, 2.0, 0.3, 0.5, None),
+        (t0 + timedelta(minutes=1), 60.0, 1.5, 2.1, 0.4, -0.1, None),
+    ]
+
+    with patch("app.services.acoustic_index_service.DeploymentService"):
+        service = AcousticIndexService(mock_db)
+        series = service.get_indices(1, t0, t0 + timedelta(hours=1))
+        query.limit.return_value.all.return_value = []
+        empty = service.get_indices(1, t0, t0 + timedelta(hours=1))
+        with pytest.raises(HTTPException) as exc:
+            service.get_indices(1, t0, t0)
+
+    assert series["times"] == [t0, t0 + timedelta(minutes=1)]
+    assert series["ndsi"] == [0.5, -0.1]
+    assert empty["aci"] == []
+    assert exc.value.status_code == 400
+
+
+def test_acoustic_index_endpoints(client):
+    url = f"{settings.api_prefix}/deployments/1/acoustic-indices"
+    t0 = datetime(2024, 6, 11, 5, tzinfo=UTC)
+    series = {
+        "deployment_id": 1,
+        "times": [t0],
+        "duration": [60.0],
+        "aci": [1.0],
+        "adi": [2.0],
+        "h": [0.3],
+        "ndsi": [0.5],
+        "spl": [None],
+    }
+
+    with (
+        patch("app.api.v1.endpoints.api_deployments.DeploymentService"),
+        patch("app.api.v1.endpoints.api_deployments.JobService") as jobs,
+        patch("app.api.v1.endpoints.api_deployments.AcousticIndexService") as Mock,
+    ):
+        Mock.return_value.get_indices.return_value = series
+        jobs.return_value.enqueue.return_value.id = 9
+        scheduled = client.post(url)
+        invalid = client.post(url, json={"nfft": 500})
+        response = client.get(
+            url,
+            params={"start": "2024-06-11T00:00:00", "end": "2024-06-12T00:00:00"},
+        )
+
+    assert scheduled.status_code == 202
+    assert scheduled.json()["job_id"] == 9
+    payload = jobs.return_value.enqueue.call_args.args[1]
+    assert AcousticIndexParams(**payload["params"]) == AcousticIndexParams()
+    assert invalid.status_code == 422
+    assert response.status_code == 200
+    assert response.json()["times"] == ["2024-06-11T13:00:00+08:00"]
@@ -0,0 +1,152 @@
+"""
+Async 讀取路徑測試模組。
+
+包含：
+- 各 Service 的 *_async 查詢條件與 eager loading
+- 查無資料時回傳 404
+- async engine 延遲建立，API 啟動不需要 asyncpg
+
+所有測試使用 mock 的 AsyncSession，不連接真實資料庫。
+"""
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.dialects import postgresql
+
+from app.core.config import settings
+from app.services.audio_service import AudioService
+from app.services.deployment_service import DeploymentService
+from app.services.point_service import PointService
+from app.services.project_service import ProjectService
+
+
+def compiled(statement) -> str:
+    return str(
+        statement.compile(
+            dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}
+        )
+    )
+
+
+@pytest.fixture
+def async_db():
+    db = MagicMock()
+    db.scalar = AsyncMock()
+    db.scalars = AsyncMock(return_value=iter([]))
+    return db
+
+
+class TestAsyncLists:
+    @pytest.mark.parametrize(
+        ("call", "expected"),
+        [
+            (
+                lambda db: AudioService(db).get_audios_async(deployment_id=3, skip=10),
+                "audio_info.deployment_id = 3",
+            ),
+            (
+                lambda db: DeploymentService(db).get_deployments_async(2),
+                "deployment_info.point_id = 2",
+            ),
+            (
+                lambda db: PointService(db).get_points_async(1),
+                "point_info.project_id = 1",
+            ),
+            (
+                lambda db: ProjectService(db).get_projects_async(limit=5),
+                "project_info.is_deleted IS false",
+            ),
+        ],
+    )
+    def test_list_filters_deleted_and_pages(self, async_db, call, expected):
+        """
+        測試 async 列表查詢。
+
+        預期行為：
+        - 排除已軟刪除的列並套用分頁
+        - 回傳 list
+        """
+        rows = [MagicMock(), MagicMock()]
+        async_db.scalars.return_value = iter(rows)
+
+        result = asyncio.run(call(async_db))
+
+        assert result == rows
+        sql = compiled(async_db.scalars.await_args.args[0])
+        assert expected in sql
+        assert "is_deleted IS false" in sql
+        assert "LIMIT" in sql
+
+    def test_hierarchy_uses_selectinload(self, async_db):
+        """測試專案階層以 selectinload 載入，async session 不會觸發 lazy load。"""
+        asyncio.run(ProjectService(async_db).get_projects_hierarchy_async())
+
+        statement = async_db.scalars.await_args.args[0]
+        assert len(statement._with_options) == 1
+
+
+class TestAsyncGets:
+    @pytest.mark.parametrize(
+        ("call", "detail"),
+        [
+            (lambda db: AudioService(db).get_audio_async(9), "Audio not found"),
+            (
+                lambda db: AudioService(db).get_audio_details_async(9),
+                "Audio not found",
+            ),
+            (
+                lambda db: DeploymentService(db).get_deployment_async(9),
+                "Deployment not found",
+            ),
+            (
+                lambda db: DeploymentService(db).get_deployment_details_async(9),
+                "Deployment not found",
+            ),
+            (lambda db: PointService(db).get_point_async(9), "Point not found"),
+            (
+                lambda db: PointService(db).get_point_details_async(9),
+                "Point not found",
+            ),
+            (lambda db: ProjectService(db).get_project_async(9), "Project not found"),
+        ],
+    )
+    def test_missing_row_raises_404(self, async_db, call, detail):
+        """測試查無資料 (或已軟刪除) 時回傳 404。"""
+        async_db.scalar.return_value = None
+
+        with pytest.raises(HTTPException) as exc_info:
+            asyncio.run(call(async_db))
+
+        assert exc_info.value.status_code == 404
+        assert exc_info.value.detail == detail
+        sql = compiled(async_db.scalar.await_args.args[0])
+        assert ".id = 9" in sql
+        assert "is_deleted IS false" in sql
+
+    def test_details_join_parents(self, async_db):
+        """
+        測試 details 查詢一次 join 上層資料。
+
+        預期行為：
+        - Audio → Deployment → Point → Project 與 Recorder 都在同一個查詢載入
+        """
+        audio = MagicMock()
+        async_db.scalar.return_value = audio
+
+        result = asyncio.run(AudioService(async_db).get_audio_details_async(1))
+
+        assert result is audio
+        sql = compiled(async_db.scalar.await_args.args[0])
+        for table in ("deployment_info", "point_info", "project_info", "recorder_info"):
+            assert f"LEFT OUTER JOIN {table}" in sql
+
+
+def test_async_database_url_uses_asyncpg():
+    """測試 async engine 使用 asyncpg driver，且與同步連線指向同一個資料庫。"""
+    url = settings.get_async_database_url()
+
+    assert url.startswith("postgresql+asyncpg://")
+    assert url.split("://", 1)[1] == settings.get_database_url().split("://", 1)[1]
@@ -56,3 +56,28 @@ def test_generate_presigned_urls_batch(client, mock_s3_client):
     assert data[0]["filename"] == "file1.wav"
     assert data[1]["filename"] == "file2.wav"
     assert mock_s3_client.generate_presigned_url.call_count == 2
+
+
+def test_presigned_url_refused_while_key_is_being_deleted(
+    client, mock_db, mock_s3_client
+):
+    """
+    永久刪除後仍在 outbox 等待清除的 key 不可重新上傳。
+    """
+    key = "PointA/2024/06/Raw_Data/7505.240611130000.wav"
+    mock_db.scalars.return_value = [key]
+
+    response = client.post(
+        f"{settings.api_prefix}/audio/upload/presigned-urls",
+        json={
+            "project_id": 1,
+            "project_name": "ProjectA",
+            "point_id": 1,
+            "point_name": "PointA",
+            "filenames": ["7505.240611130000.wav", "7505.240612130000.wav"],
+        },
+    )
+
+    assert response.status_code == 409
+    assert key in response.json()["detail"]
+    mock_s3_client.generate_presigned_url.assert_not_called()
@@ -6,10 +6,15 @@ from unittest.mock import MagicMock, patch
 
 from fastapi import HTTPException
 from jose import jwt
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Session, make_transient_to_detached
 
-from app.core.auth import get_current_user, get_current_admin_user
+from app.core import auth
+from app.core.auth import get_current_user, get_current_admin_user, invalidate_principal
 from app.core.config import settings
+from app.db.lookups import user_by_email
 from app.enums.enums import UserRole
+from app.models.user import UserInfo
 
 
 class TestGetCurrentUser:
@@ -20,7 +25,7 @@ class TestGetCurrentUser:
         mock_db = MagicMock()
         mock_user = MagicMock()
         mock_user.is_active = True
-        mock_db.query.return_value.filter.return_value.first.return_value = mock_user
+        mock_db.scalars.return_value.first.return_value = mock_user
 
         # Create valid token
         expire = datetime.now(timezone.utc) + timedelta(minutes=30)
@@ -82,7 +87,7 @@ class TestGetCurrentUser:
     def test_get_current_user_user_not_found(self):
         """Should raise 401 when user not found in database."""
         mock_db = MagicMock()
-        mock_db.query.return_value.filter.return_value.first.return_value = None
+        mock_db.scalars.return_value.first.return_value = None
 
         # Create valid token
         expire = datetime.now(timezone.utc) + timedelta(minutes=30)
@@ -102,7 +107,7 @@ class TestGetCurrentUser:
         mock_db = MagicMock()
         mock_user = MagicMock()
         mock_user.is_active = False
-        mock_db.query.return_value.filter.return_value.first.return_value = mock_user
+        mock_db.scalars.return_value.first.return_value = mock_user
 
         # Create valid token
         expire = datetime.now(timezone.utc) + timedelta(minutes=30)
@@ -168,3 +173,181 @@ class TestGetCurrentAdminUser:
             get_current_admin_user(current_user=mock_user)
 
         assert exc_info.value.status_code == 403
+
+
+def make_token(**claims) -> str:
+    expire = datetime.now(timezone.utc) + timedelta(minutes=30)
+    return jwt.encode(
+        {"exp": expire, **claims}, settings.secret_key, algorithm=settings.algorithm
+    )
+
+
+def make_user(**fields) -> UserInfo:
+    values = {"id": 7, "email": "cached@example.com", "role": UserRole.USER.value}
+    values.update(is_active=True, is_deleted=False, password_hash="secret")
+    values.update(fields)
+    return UserInfo(**values)
+
+
+class TestPrincipalCache:
+    """Tests for the authenticated-principal cache in get_current_user."""
+
+    def test_second_request_skips_database(self):
+        """A cached principal is attached to the new session without SQL."""
+        token = make_token(sub="cached@example.com")
+        first_db = MagicMock()
+        first_db.scalars.return_value.first.return_value = make_user()
+        get_current_user(token=token, db=first_db)
+
+        # An unbound session raises on any SQL, so this proves no round trip
+        session = Session()
+        user = get_current_user(token=token, db=session)
+
+        assert user in session
+        assert (user.id, user.role, user.is_active) == (7, UserRole.USER.value, True)
+        assert "password_hash" not in user.__dict__
+        first_db.scalars.assert_called_once()
+
+    def test_cached_inactive_user_is_rejected(self):
+        token = make_token(sub="cached@example.com")
+        mock_db = MagicMock()
+        mock_db.scalars.return_value.first.return_value = make_user(is_active=False)
+
+        for db in (mock_db, Session()):
+            with pytest.raises(HTTPException) as exc_info:
+                get_current_user(token=token, db=db)
+            assert exc_info.value.status_code == 400
+        mock_db.scalars.assert_called_once()
+
+    def test_invalidate_forces_lookup(self):
+        """Deactivation through invalidate_principal applies on the next request."""
+        token = make_token(sub="cached@example.com")
+        mock_db = MagicMock()
+        mock_db.scalars.return_value.first.return_value = make_user()
+        get_current_user(token=token, db=mock_db)
+
+        mock_db.scalars.return_value.first.return_value = make_user(is_active=False)
+        invalidate_principal("cached@example.com")
+
+        with pytest.raises(HTTPException):
+            get_current_user(token=token, db=mock_db)
+        assert mock_db.scalars.call_count == 2
+
+    def test_lookup_ignores_soft_deleted_users(self):
+        sql = str(user_by_email("a@b.c").compile(dialect=postgresql.dialect()))
+
+        assert "user_info.is_deleted IS false" in sql
+
+    def test_role_claims_skip_database_until_invalidated(self):
+        """
+        Signed uid/role claims authenticate without a lookup, but tokens
+        issued before invalidate_principal fall back to the database.
+        """
+        issued = datetime.now(timezone.utc) - timedelta(seconds=5)
+        token = make_token(
+            sub="claims@example.com", uid=9, role=UserRole.ADMIN.value, iat=issued
+        )
+        mock_db = MagicMock()
+        mock_db.scalars.return_value.first.return_value = make_user(
+            email="claims@example.com"
+        )
+
+        with patch.object(settings, "auth_role_claims", True):
+            get_current_user(token=token, db=mock_db)
+            mock_db.scalars.assert_not_called()
+            merged = mock_db.merge.call_args.args[0]
+            assert (merged.id, merged.role) == (9, UserRole.ADMIN.value)
+
+            invalidate_principal("claims@example.com")
+            get_current_user(token=token, db=mock_db)
+            mock_db.scalars.assert_called_once()
+
+    def test_user_service_invalidates_old_and_new_email(self):
+        from app.schemas.user import UserUpdate
+        from app.services.user_service import UserService
+
+        mock_db = MagicMock()
+        mock_db.query.return_value.filter.return_value.first.return_value = make_user()
+
+        with patch("app.services.user_service.invalidate_principal") as invalidate:
+            UserService(mock_db).update_user(
+                7, UserUpdate(email="new@example.com", role=UserRole.ADMIN.value)
+            )
+
+        invalidate.assert_called_once_with("cached@example.com", "new@example.com")
+
+
+def attached_user(**fields) -> tuple[Session, UserInfo]:
+    user = make_user(**fields)
+    make_transient_to_detached(user)
+    session = Session()
+    return session, session.merge(user, load=False)
+
+
+class TestPrincipalBroadcast:
+    """Tests for cross-process invalidation over LISTEN/NOTIFY."""
+
+    def test_auth_changes_notify_old_and_new_email(self):
+        session, user = attached_user()
+        user.email = "new@example.com"
+        user.role = UserRole.ADMIN.value
+
+        with patch.object(session, "execute") as execute:
+            auth._broadcast_changes(session, None)
+
+        notified = [
+            list(c.args[0].compile(dialect=postgresql.dialect()).params.values())
+            for c in execute.call_args_list
+        ]
+        assert notified == [
+            ["auth_principal", "cached@example.com"],
+            ["auth_principal", "new@example.com"],
+        ]
+
+    def test_login_timestamp_is_not_broadcast(self):
+        session, user = attached_user()
+        user.last_login_at = datetime.now(timezone.utc)
+
+        with patch.object(session, "execute") as execute:
+            auth._broadcast_changes(session, None)
+
+        execute.assert_not_called()
+
+    def test_listener_invalidates_notified_principal(self):
+        """
+        A notification from another process drops the cached principal,
+        and connecting empties the cache in case notifications were missed.
+        """
+        auth.principal_cache.set("stale@example.com", {"id": 1})
+        auth.principal_cache.set("cached@example.com", {"id": 7})
+        listener = auth.PrincipalListener(poll_seconds=0)
+        connection = MagicMock()
+        connection.notifies = []
+
+        def poll():
+            assert auth.principal_cache.get("stale@example.com") is None
+            auth.principal_cache.set("cached@example.com", {"id": 7})
+            connection.notifies.append(MagicMock(payload="cached@example.com"))
+            listener._stop.set()
+
+        connection.poll.side_effect = poll
+        with patch.object(
+            auth.selectors, "select", return_value=([connection], [], [])
+        ):
+            listener._listen(connection)
+
+        assert listener.connected is True
+        assert auth.principal_cache.get("cached@example.com") is None
+        assert auth._revoked_at.get("cached@example.com") is not None
+
+    def test_cache_bypassed_while_listener_disconnected(self):
+        token = make_token(sub="cached@example.com")
+        mock_db = MagicMock()
+        mock_db.scalars.return_value.first.return_value = make_user()
+
+        with patch.object(auth, "_listener", MagicMock(connected=False)):
+            get_current_user(token=token, db=mock_db)
+            get_current_user(token=token, db=mock_db)
+
+        assert mock_db.scalars.call_count == 2
+        assert auth.principal_cache.get("cached@example.com") is None
@@ -0,0 +1,173 @@
+"""
+音檔片段擷取測試模組。
+
+包含：
+- WAV 檔頭重寫與 PCM 編碼
+- 串流 FIR 降頻
+- 以 moto 模擬 MinIO 的 Range 擷取、聲道挑選與降頻
+- API 串流回應
+"""
+
+import io
+import wave
+from unittest.mock import MagicMock, patch
+
+import boto3
+import numpy as np
+import pytest
+from audio_helpers import make_wav, tone
+from fastapi import HTTPException
+from moto import mock_aws
+
+from app.core.config import settings
+from app.services import clip_service
+from app.services.clip_service import AudioClip, ClipService
+from app.utils.dsp import FirDecimator
+from app.utils.wav_utils import (
+    WAVE_FORMAT_IEEE_FLOAT,
+    WAVE_FORMAT_PCM,
+    build_wav_header,
+    float_to_pcm,
+    parse_wav_header,
+    pcm_to_float,
+)
+
+
+class TestWavWriting:
+    @pytest.mark.parametrize(
+        "format_tag,bits",
+        [
+            (WAVE_FORMAT_PCM, 8),
+            (WAVE_FORMAT_PCM, 16),
+            (WAVE_FORMAT_PCM, 24),
+            (WAVE_FORMAT_PCM, 32),
+            (WAVE_FORMAT_IEEE_FLOAT, 32),
+        ],
+    )
+    def test_round_trip(self, format_tag, bits):
+        samples = np.stack([tone(50, 1000, 0.1), tone(70, 1000, 0.1)], axis=1)
+        data = build_wav_header(format_tag, 2, 1000, bits, len(samples))
+        data += float_to_pcm(samples, format_tag, bits)
+
+        header = parse_wav_header(data)
+
+        assert (header.format_tag, header.bits_per_sample) == (format_tag, bits)
+        assert header.num_frames == len(samples)
+        decoded = pcm_to_float(data[header.data_offset :], header)
+        np.testing.assert_allclose(decoded, samples, atol=2 / (1 << (bits - 1)))
+
+
+class TestFirDecimator:
+    def test_streaming_matches_single_pass(self):
+        rng = np.random.default_rng(0)
+        signal = rng.standard_normal((1000, 2)).astype(np.float32)
+
+        whole = FirDecimator(4, 2, 250)
+        expected = np.concatenate([whole.process(signal), whole.finish()])
+        streamed = FirDecimator(4, 2, 250)
+        parts = [streamed.process(signal[i : i + 37]) for i in range(0, 1000, 37)]
+        result = np.concatenate([*parts, streamed.finish()])
+
+        assert result.shape == (250, 2)
+        np.testing.assert_allclose(result, expected, atol=1e-5)
+
+    def test_removes_aliasing_tone(self):
+        fs = 8000
+        # 300 Hz 保留，3000 Hz 高於降頻後的 Nyquist (1000 Hz) 應被濾除
+        signal = (tone(300, fs, 1) + tone(3000, fs, 1))[:, None]
+        decimator = FirDecimator(4, 1, fs // 4)
+
+        out = np.concatenate([decimator.process(signal), decimator.finish()])[:, 0]
+
+        spectrum = np.abs(np.fft.rfft(out[200:-200]))
+        freqs = np.fft.rfftfreq(len(out) - 400, d=4 / fs)
+        assert abs(freqs[np.argmax(spectrum)] - 300) < 5
+        assert spectrum.max() > 100 * np.abs(spectrum[freqs > 600]).max()
+
+
+@pytest.fixture
+def clip_env(mock_db, aws_credentials):
+    with mock_aws():
+        fs = 8000
+        s3 = boto3.client("s3", region_name="us-east-1")
+        s3.create_bucket(Bucket="proj")
+        key = "P1/2024/06/Raw_Data/a.wav"
+        samples = np.stack([tone(100, fs, 3), tone(200, fs, 3, 0.25)], axis=1)
+        s3.put_object(Bucket="proj", Key=key, Body=make_wav(samples, fs))
+
+        audio = MagicMock(
+            object_key=key, file_name="a.wav", file_size=None, is_cold_storage=False
+        )
+        audio.deployment.point.project.name = "proj"
+        with patch("app.services.clip_service.AudioService") as MockService:
+            MockService.return_value.get_audio_details.return_value = audio
+            yield ClipService(mock_db, s3_client=s3), samples, fs
+
+
+def read_clip(clip: AudioClip):
+    data = b"".join(clip.body)
+    assert len(data) == clip.content_length
+    with wave.open(io.BytesIO(data)) as w:
+        frames = w.readframes(w.getnframes())
+        shape = (-1, w.getnchannels())
+        fs = w.getframerate()
+    return fs, np.frombuffer(frames, dtype="<i2").reshape(shape) / 32767
+
+
+def test_clip_is_sample_accurate(clip_env):
+    service, samples, fs = clip_env
+
+    with patch(
+        "app.services.clip_service.iter_object_range",
+        wraps=clip_service.iter_object_range,
+    ) as ranged:
+        clip = service.get_clip(1, offset=1.0, duration=0.5, channels=[1])
+        clip_fs, data = read_clip(clip)
+
+    assert clip.filename == "a_1s_0.5s.wav"
+    assert clip_fs == fs
+    np.testing.assert_allclose(data[:, 0], samples[fs : fs + fs // 2, 1], atol=1e-4)
+    # 只讀取片段本身的 byte 範圍
+    start, end = ranged.call_args.args[3:5]
+    assert end - start + 1 == fs // 2 * 4
+
+
+def test_clip_is_clamped_and_decimated(clip_env):
+    service, samples, fs = clip_env
+
+    clip_fs, data = read_clip(service.get_clip(1, offset=2.5, duration=5, decimate=4))
+
+    assert clip_fs == fs // 4
+    assert data.shape == (fs // 2 // 4, 2)
+    np.testing.assert_allclose(data[:-30], samples[int(2.5 * fs) : -120 : 4], atol=0.01)
+
+
+def test_clip_rejects_bad_requests(clip_env):
+    service, _, _ = clip_env
+
+    for kwargs in ({"offset": 10.0, "duration": 1.0}, {"channels": [2]}):
+        with pytest.raises(HTTPException) as exc:
+            service.get_clip(1, **{"offset": 0.0, "duration": 1.0, **kwargs})
+        assert exc.value.status_code == 400
+
+
+def test_get_clip_streams_wav(client):
+    clip = AudioClip(
+        filename="a_1s_2s.wav", content_length=6, body=iter([b"RI", b"FFxx"])
+    )
+    url = f"{settings.api_prefix}/audio/1/clip"
+
+    with patch("app.api.v1.endpoints.api_audio.ClipService") as MockService:
+        MockService.return_value.get_clip.return_value = clip
+
+        response = client.get(
+            url, params={"offset": 1, "duration": 2, "channel": [0, 1]}
+        )
+
+    assert response.status_code == 200
+    assert response.content == b"RIFFxx"
+    assert response.headers["content-type"] == "audio/wav"
+    assert "a_1s_2s.wav" in response.headers["content-disposition"]
+    MockService.return_value.get_clip.assert_called_once_with(
+        1, 1.0, 2.0, channels=[0, 1], decimate=1
+    )
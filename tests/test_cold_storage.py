@@ -0,0 +1,360 @@
+"""
+冷儲存分層測試模組。
+
+包含：
+- FLAC 編解碼 (位元深度、聲道、損毀偵測、以參考解碼器 flac -t 驗證)
+- 以 moto 模擬 MinIO 的轉存與還原 (逐 byte 還原原始檔)
+- 批次轉存、還原工作的優先序、上限與限速
+- API 權限與排程
+"""
+
+import io
+import shutil
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock, patch
+
+import boto3
+import numpy as np
+import pytest
+from audio_helpers import make_wav, tone
+from fastapi import HTTPException
+from moto import mock_aws
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.schemas.cold_storage import ColdStoragePolicy
+from app.services import job_handlers
+from app.services.cold_storage_service import (
+    COLD_META_KEY,
+    RESTORE_PRIORITY_BATCH,
+    RESTORE_PRIORITY_ON_DEMAND,
+    ColdStorageService,
+    archive_object,
+    restore_object,
+)
+from app.services.job_handlers import (
+    JOB_COLD_STORAGE_RESTORE,
+    cold_restore_status,
+    schedule_cold_restores,
+)
+from app.services.job_service import JOB_HANDLERS, JobService
+from app.utils.flac import FlacDecoder, FlacEncoder, FlacError
+from app.utils.rate_limit import TokenBucket
+from app.utils.wav_utils import WAVE_FORMAT_IEEE_FLOAT, build_wav_header
+
+FS = 8000
+
+
+def encode(samples, bits, fs=FS, applications=None):
+    buf = io.BytesIO()
+    encoder = FlacEncoder(buf, fs, samples.shape[1], bits, applications)
+    for i in range(0, len(samples), 3000):
+        encoder.write(samples[i : i + 3000])
+    encoder.close()
+    return buf.getvalue()
+
+
+def decode(data):
+    decoder = FlacDecoder(io.BytesIO(data))
+    return decoder, np.concatenate(list(decoder.iter_blocks()))
+
+
+class TestFlac:
+    @pytest.mark.parametrize("bits", [8, 16, 24])
+    @pytest.mark.parametrize("channels", [1, 2])
+    def test_round_trip_is_lossless(self, bits, channels):
+        rng = np.random.default_rng(bits + channels)
+        n = 3 * 4096 + 37
+        signal = np.sin(np.arange(n) * 0.03)[:, None] * 2 ** (bits - 2)
+        noise = rng.normal(0, 2 ** (bits - 12) + 1, (n, channels))
+        samples = np.clip(
+            signal + noise, -(2 ** (bits - 1)), 2 ** (bits - 1) - 1
+        ).astype(np.int64)
+        samples[:4096, 0] = 5  # CONSTANT subframe
+
+        data = encode(samples, bits, applications={b"TEST": b"framing"})
+        decoder, decoded = decode(data)
+
+        assert np.array_equal(decoded, samples)
+        assert (decoder.fs, decoder.channels, decoder.bits) == (FS, channels, bits)
+        assert decoder.total_frames == n
+        assert decoder.applications == {b"TEST": b"framing"}
+        assert len(data) < samples.size * bits / 8
+
+    def test_incompressible_noise_falls_back_to_verbatim(self):
+        rng = np.random.default_rng(0)
+        samples = rng.integers(-32768, 32768, (4096, 1))
+
+        data = encode(samples, 16)
+
+        assert np.array_equal(decode(data)[1], samples)
+        assert len(data) < samples.size * 2 + 200
+
+    def test_corruption_is_detected(self):
+        samples = (tone(440, FS, 1.0)[:, None] * 20000).astype(np.int64)
+        data = bytearray(encode(samples, 16))
+        data[-10] ^= 0x01
+
+        with pytest.raises(FlacError):
+            decode(bytes(data))
+
+    def test_unsupported_bit_depth(self):
+        with pytest.raises(FlacError):
+            FlacEncoder(io.BytesIO(), FS, 1, 32)
+
+    @pytest.mark.skipif(shutil.which("flac") is None, reason="flac CLI not installed")
+    @pytest.mark.parametrize("bits", [8, 16, 24])
+    def test_reference_decoder_accepts_output(self, bits, tmp_path):
+        samples = (tone(440, FS, 1.0)[:, None] * 2 ** (bits - 2)).astype(np.int64)
+        path = tmp_path / "out.flac"
+        path.write_bytes(
+            encode(samples.repeat(2, axis=1), bits, applications={b"TEST": b"x"})
+        )
+
+        subprocess.run(["flac", "-t", "-s", str(path)], check=True)
+
+
+def wav_with_trailer(bits=16):
+    body = make_wav(tone(440, FS, 2.5)[:, None].repeat(2, axis=1), FS)
+    if bits == 16:
+        # 奇數長度的 LIST chunk 與 pad byte 也必須原樣還原
+        return body + b"LIST" + (5).to_bytes(4, "little") + b"INFOx\x00"
+    samples = tone(440, FS, 1.0).astype("<f4")
+    return build_wav_header(WAVE_FORMAT_IEEE_FLOAT, 1, FS, 32, len(samples)) + (
+        samples.tobytes()
+    )
+
+
+@mock_aws
+def test_archive_and_restore_are_byte_exact(aws_credentials):
+    s3 = boto3.client("s3", region_name="us-east-1")
+    for bucket in ("proj", "cold"):
+        s3.create_bucket(Bucket=bucket)
+    original = wav_with_trailer()
+    s3.put_object(Bucket="proj", Key="a.wav", Body=original)
+
+    with patch("app.services.cold_storage_service.get_s3_client", return_value=s3):
+        record = archive_object("proj", "a.wav", "cold", "proj/a.wav")
+        s3.delete_object(Bucket="proj", Key="a.wav")
+        size = restore_object(record, "proj", "a.wav")
+
+    assert record["format"] == "flac"
+    assert record["key"] == "proj/a.wav.flac"
+    assert record["size"] < record["original_size"] == len(original)
+    assert size == len(original)
+    assert s3.get_object(Bucket="proj", Key="a.wav")["Body"].read() == original
+
+
+@mock_aws
+def test_non_pcm_audio_is_copied_verbatim(aws_credentials):
+    s3 = boto3.client("s3", region_name="us-east-1")
+    for bucket in ("proj", "cold"):
+        s3.create_bucket(Bucket=bucket)
+    original = wav_with_trailer(bits=32)
+    s3.put_object(Bucket="proj", Key="f.wav", Body=original)
+
+    with patch("app.services.cold_storage_service.get_s3_client", return_value=s3):
+        record = archive_object("proj", "f.wav", "cold", "proj/f.wav")
+        with pytest.raises(Exception, match="checksum"):
+            restore_object({**record, "sha256": "00" * 32}, "proj", "f.wav")
+
+    assert record["format"] == "wav"
+    cold = s3.get_object(Bucket="cold", Key="proj/f.wav.wav")["Body"].read()
+    assert cold == original
+
+
+@mock_aws
+def test_archive_batch_flips_flag_after_commit(mock_db, aws_credentials):
+    s3 = boto3.client("s3", region_name="us-east-1")
+    s3.create_bucket(Bucket="proj")
+    s3.put_object(Bucket="proj", Key="a.wav", Body=wav_with_trailer())
+    audio = MagicMock(id=1, object_key="a.wav", meta_json={"gain": 3})
+    missing = MagicMock(id=2, object_key="missing.wav", meta_json=None)
+    audio.is_cold_storage = missing.is_cold_storage = False
+    query = MagicMock()
+    batches = query.filter.return_value.order_by.return_value.limit.return_value
+    batches.all.side_effect = [
+        [(audio, "proj"), (missing, "proj")],
+        [],
+    ]
+
+    with (
+        patch("app.services.cold_storage_service.get_s3_client", return_value=s3),
+        patch.object(ColdStorageService, "_candidates", return_value=query),
+        ThreadPoolExecutor(2) as pool,
+    ):
+        summary = ColdStorageService(mock_db, s3).archive(
+            ColdStoragePolicy(), executor=pool
+        )
+
+    assert summary["files_archived"] == 1
+    assert summary["files_failed"] == 1
+    assert summary["bytes_after"] < summary["bytes_before"]
+    assert audio.is_cold_storage is True
+    assert audio.meta_json["gain"] == 3
+    assert audio.meta_json[COLD_META_KEY]["bucket"] == settings.cold_storage_bucket
+    assert missing.is_cold_storage is False
+    mock_db.commit.assert_called_once()
+    assert "Contents" not in s3.list_objects_v2(Bucket="proj")
+
+
+@mock_aws
+def test_restore_audio_clears_flag_and_cold_copy(mock_db, aws_credentials):
+    s3 = boto3.client("s3", region_name="us-east-1")
+    for bucket in ("proj", "cold"):
+        s3.create_bucket(Bucket=bucket)
+    original = wav_with_trailer()
+    s3.put_object(Bucket="proj", Key="a.wav", Body=original)
+
+    with patch("app.services.cold_storage_service.get_s3_client", return_value=s3):
+        record = archive_object("proj", "a.wav", "cold", "proj/a.wav")
+        s3.delete_object(Bucket="proj", Key="a.wav")
+        audio = MagicMock(
+            object_key="a.wav", is_cold_storage=True, meta_json={COLD_META_KEY: record}
+        )
+        query = mock_db.query.return_value.join.return_value.join.return_value
+        query.join.return_value.filter.return_value.first.return_value = (
+            audio,
+            "proj",
+        )
+        limiter = MagicMock()
+        ColdStorageService(mock_db, s3).restore_audio(1, limiter=limiter)
+
+    limiter.acquire.assert_called_once_with(len(original))
+    assert audio.is_cold_storage is False
+    assert audio.meta_json is None
+    mock_db.commit.assert_called_once()
+    assert s3.get_object(Bucket="proj", Key="a.wav")["Body"].read() == original
+    assert "Contents" not in s3.list_objects_v2(Bucket="cold")
+
+
+def test_candidates_follow_policy():
+    service = ColdStorageService(Session(), MagicMock())
+    policy = ColdStoragePolicy(min_age_days=30, deployment_id=4)
+    sql = str(
+        service._candidates(policy).statement.compile(dialect=postgresql.dialect())
+    )
+
+    assert "audio_info.is_cold_storage IS NOT true" in sql
+    assert "project_info.is_finished IS true" in sql
+    assert "audio_info.record_time <" in sql
+    assert "audio_info.deployment_id =" in sql
+    unfinished = ColdStoragePolicy(require_finished=False)
+    assert "is_finished" not in str(service._candidates(unfinished).statement)
+
+
+class TestColdRestoreJobs:
+    def test_restores_are_queued_as_jobs(self, mock_db):
+        with (
+            patch.object(JobService, "count_active", side_effect=[1, 4]),
+            patch.object(JobService, "enqueue_many", return_value=2) as enqueue,
+        ):
+            changed = schedule_cold_restores(
+                mock_db, [3, 1, 3], RESTORE_PRIORITY_ON_DEMAND, user_id=7
+            )
+
+        assert changed == 2
+        enqueue.assert_called_once_with(
+            JOB_COLD_STORAGE_RESTORE,
+            {"3": {"audio_id": 3}, "1": {"audio_id": 1}},
+            user_id=7,
+            priority=RESTORE_PRIORITY_ON_DEMAND,
+        )
+        mock_db.commit.assert_called_once()
+        assert RESTORE_PRIORITY_ON_DEMAND < RESTORE_PRIORITY_BATCH
+
+    def test_queue_is_bounded(self, mock_db, monkeypatch):
+        monkeypatch.setattr(settings, "cold_restore_max_pending", 2)
+        # 兩個 id 都未排隊，佇列中已有 1 筆
+        with (
+            patch.object(JobService, "count_active", side_effect=[0, 1]),
+            pytest.raises(HTTPException) as exc,
+        ):
+            schedule_cold_restores(mock_db, [1, 2], RESTORE_PRIORITY_BATCH)
+        assert exc.value.status_code == 429
+        mock_db.commit.assert_not_called()
+
+    def test_worker_restores_with_limiter(self, mock_db):
+        with patch("app.services.job_handlers.ColdStorageService") as mock_service:
+            mock_service.return_value.restore_audio.return_value.id = 7
+            result = JOB_HANDLERS[JOB_COLD_STORAGE_RESTORE].func(
+                mock_db, {"audio_id": 7}, MagicMock()
+            )
+
+        mock_service.return_value.restore_audio.assert_called_once_with(
+            7, limiter=job_handlers._restore_limiter
+        )
+        assert result == {"audio_id": 7}
+        assert JOB_HANDLERS[JOB_COLD_STORAGE_RESTORE].concurrency == 1
+
+    def test_status_reports_running_restore(self, mock_db):
+        with (
+            patch.object(JobService, "get_jobs") as get_jobs,
+            patch.object(JobService, "count_active", return_value=3),
+        ):
+            get_jobs.return_value = [MagicMock(payload={"audio_id": 5})]
+            assert cold_restore_status(mock_db) == {"pending": 2, "in_progress": 5}
+
+
+def test_token_bucket_throttles_bytes():
+    now = [0.0]
+    bucket = TokenBucket(100, clock=lambda: now[0])
+
+    assert bucket.reserve(100) == 0
+    assert bucket.reserve(50) == pytest.approx(0.5)
+    now[0] = 10.0
+    # 超過容量的請求等到桶子滿後放行，並留下欠額
+    assert bucket.reserve(300) == 0
+    assert bucket.reserve(10) == pytest.approx(2.1)
+
+
+def test_cold_storage_endpoints(client, mock_current_user):
+    url = f"{settings.api_prefix}/cold-storage"
+    with (
+        patch("app.api.v1.endpoints.api_cold_storage.ColdStorageService") as service,
+        patch("app.api.v1.endpoints.api_cold_storage.JobService") as jobs,
+        patch(
+            "app.api.v1.endpoints.api_cold_storage.schedule_cold_restores"
+        ) as schedule,
+        patch(
+            "app.api.v1.endpoints.api_cold_storage.cold_restore_status"
+        ) as restore_status,
+    ):
+        service.return_value.preview.return_value = {"files": 3, "bytes": 300}
+        service.return_value.cold_audio_ids.side_effect = [[1, 2], []]
+        schedule.return_value = 2
+        jobs.return_value.enqueue.return_value.id = 8
+        restore_status.return_value = {"pending": 2, "in_progress": None}
+
+        archived = client.post(f"{url}/archive", json={"min_age_days": 10})
+        batch = client.post(f"{url}/restore", json={"audio_ids": [1, 2, 5]})
+        missing = client.post(f"{url}/restore/9")
+        mock_current_user.role = "user"
+        forbidden = client.post(f"{url}/preview", json={})
+
+    assert archived.status_code == 202
+    assert archived.json()["files"] == 3
+    assert archived.json()["job_id"] == 8
+    assert jobs.return_value.enqueue.call_args.args[1]["policy"]["min_age_days"] == 10
+    assert batch.status_code == 202
+    assert batch.json()["queued"] == 2
+    assert schedule.call_args.args[1:] == ([1, 2], RESTORE_PRIORITY_BATCH)
+    assert missing.status_code == 404
+    assert forbidden.status_code == 403
+
+
+def test_cold_audio_cannot_be_read():
+    from app.services.audio_service import ensure_online
+
+    with pytest.raises(HTTPException) as exc:
+        ensure_online(MagicMock(is_cold_storage=True))
+    assert exc.value.status_code == 409
+    assert ensure_online(MagicMock(is_cold_storage=None)) is not None
+
+
+def test_policy_defaults_come_from_settings():
+    policy = ColdStoragePolicy()
+    assert policy.min_age_days == settings.cold_storage_min_age_days
+    assert policy.require_finished is True
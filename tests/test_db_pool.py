@@ -0,0 +1,169 @@
+"""
+資料庫連線池設定與統計測試模組。
+
+包含：
+- 由 settings 組出的連線池參數與 PgBouncer 模式
+- checkout 等待時間、逾時次數與飽和度
+- Prometheus 輸出與 /metrics/db-pool API
+"""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from app.core.config import settings
+from app.db.pool import (
+    InstrumentedAsyncQueuePool,
+    InstrumentedQueuePool,
+    PoolMetrics,
+    engine_options,
+    render_prometheus,
+)
+
+
+def make_pool(metrics, pool_size=1, max_overflow=0):
+    pool = InstrumentedQueuePool(
+        MagicMock, pool_size=pool_size, max_overflow=max_overflow, timeout=0.01
+    )
+    pool.metrics = metrics
+    return pool
+
+
+class TestEngineOptions:
+    def test_options_follow_settings(self):
+        """測試連線池大小、逾時、回收與 pre-ping 皆由 settings 控制。"""
+        with (
+            patch.object(settings, "db_pool_size", 20),
+            patch.object(settings, "db_max_overflow", 5),
+            patch.object(settings, "db_pool_timeout", 3.0),
+            patch.object(settings, "db_pool_recycle", 600),
+            patch.object(settings, "db_pool_pre_ping", False),
+            patch.object(settings, "db_query_cache_size", 1000),
+        ):
+            options = engine_options()
+
+        assert options == {
+            "poolclass": InstrumentedQueuePool,
+            "pool_size": 20,
+            "max_overflow": 5,
+            "pool_timeout": 3.0,
+            "pool_recycle": 600,
+            "pool_pre_ping": False,
+            "query_cache_size": 1000,
+        }
+
+    def test_asyncpg_prepared_statement_cache(self):
+        """測試 asyncpg 在 server 端 prepare 的 statement 數量由 settings 控制。"""
+        with patch.object(settings, "db_prepared_statement_cache_size", 250):
+            options = engine_options(async_driver=True)
+
+        assert options["connect_args"] == {"prepared_statement_cache_size": 250}
+
+    def test_pgbouncer_disables_asyncpg_statement_cache(self):
+        """
+        測試 PgBouncer 模式。
+
+        預期行為：
+        - async engine 關閉 prepared statement 快取並使用不重複的名稱
+        - 同步 engine (psycopg2) 不需額外參數
+        """
+        with patch.object(settings, "db_pgbouncer", True):
+            async_options = engine_options(async_driver=True)
+            sync_options = engine_options()
+
+        assert async_options["poolclass"] is InstrumentedAsyncQueuePool
+        connect_args = async_options["connect_args"]
+        assert connect_args["statement_cache_size"] == 0
+        assert connect_args["prepared_statement_cache_size"] == 0
+        name_func = connect_args["prepared_statement_name_func"]
+        assert name_func() != name_func()
+        assert "connect_args" not in sync_options
+
+
+class TestPoolMetrics:
+    def test_checkout_wait_and_saturation(self):
+        """
+        測試 checkout 統計。
+
+        預期行為：
+        - 成功的 checkout 計數並記錄等待時間
+        - 連線用盡時等待 pool_timeout 後失敗，計入 timeouts
+        - 飽和度為借出連線數 / 容量
+        """
+        metrics = PoolMetrics("test")
+        pool = make_pool(metrics)
+
+        connection = pool.connect()
+        with pytest.raises(PoolTimeoutError):
+            pool.connect()
+        stats = metrics.snapshot(pool)
+
+        assert stats["checkouts"] == 1
+        assert stats["timeouts"] == 1
+        assert stats["wait_seconds_max"] >= 0.01
+        assert sum(stats["wait_buckets"].values()) == 2
+        assert stats["capacity"] == 1
+        assert stats["checked_out"] == 1
+        assert stats["saturation"] == 1.0
+
+        connection.close()
+        assert metrics.snapshot(pool)["saturation"] == 0.0
+
+    def test_recreated_pool_keeps_metrics(self):
+        """測試 engine.dispose() 重建的 pool 沿用同一份統計。"""
+        metrics = PoolMetrics("test")
+        pool = make_pool(metrics, pool_size=2, max_overflow=-1)
+
+        recreated = pool.recreate()
+
+        assert recreated.metrics is metrics
+        assert metrics.snapshot(recreated)["capacity"] is None
+
+    def test_histogram_buckets(self):
+        """測試等待時間落在正確的 histogram 區間，超過上界計入 +Inf。"""
+        metrics = PoolMetrics("test", buckets=(0.1, 1.0))
+        for seconds in (0.05, 0.1, 0.5, 7.0):
+            metrics.observe(seconds)
+
+        pool = make_pool(metrics)
+        assert metrics.snapshot(pool)["wait_buckets"] == {
+            "0.1": 2,
+            "1.0": 1,
+            "+Inf": 1,
+        }
+
+
+def test_render_prometheus_uses_cumulative_buckets():
+    """測試 Prometheus 輸出的 histogram 為累計值。"""
+    metrics = PoolMetrics("sync", buckets=(0.1, 1.0))
+    metrics.observe(0.05)
+    metrics.observe(0.5)
+    metrics.observe(3.0, timed_out=True)
+
+    text = render_prometheus([metrics.snapshot(make_pool(metrics))])
+
+    assert 'db_pool_wait_seconds_bucket{pool="sync",le="0.1"} 1' in text
+    assert 'db_pool_wait_seconds_bucket{pool="sync",le="1.0"} 2' in text
+    assert 'db_pool_wait_seconds_bucket{pool="sync",le="+Inf"} 3' in text
+    assert 'db_pool_wait_seconds_count{pool="sync"} 3' in text
+    assert 'db_pool_timeouts_total{pool="sync"} 1' in text
+    assert 'db_pool_saturation{pool="sync"} 0.0' in text
+
+
+def test_db_pool_endpoint(client, mock_current_user):
+    url = f"{settings.api_prefix}/metrics/db-pool"
+
+    as_json = client.get(url)
+    as_text = client.get(url, params={"format": "prometheus"})
+    mock_current_user.role = "user"
+    forbidden = client.get(url)
+
+    assert as_json.status_code == 200
+    assert as_json.json()[0]["name"] == "sync"
+    assert as_json.json()[0]["capacity"] == (
+        settings.db_pool_size + settings.db_max_overflow
+    )
+    assert as_text.headers["content-type"].startswith("text/plain")
+    assert "# TYPE db_pool_wait_seconds histogram" in as_text.text
+    assert forbidden.status_code == 403
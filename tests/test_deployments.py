@@ -4,27 +4,31 @@ from app.core.config import settings
 
 
 def test_get_deployments(client):
-    with patch("app.api.v1.endpoints.api_deployments.DeploymentService") as MockService:
+    with patch(
+        "app.api.v1.endpoints.api_deployments.DeploymentService", autospec=True
+    ) as MockService:
         mock_service = MockService.return_value
-        mock_service.get_deployments.return_value = []
+        mock_service.get_deployments_async.return_value = []
 
         response = client.get(f"{settings.api_prefix}/deployments/?point_id=1")
         assert response.status_code == 200
         assert response.json() == []
-        mock_service.get_deployments.assert_called_once()
+        mock_service.get_deployments_async.assert_called_once()
 
 
 def test_get_deployment(client):
-    with patch("app.api.v1.endpoints.api_deployments.DeploymentService") as MockService:
+    with patch(
+        "app.api.v1.endpoints.api_deployments.DeploymentService", autospec=True
+    ) as MockService:
         mock_service = MockService.return_value
-        mock_service.get_deployment.return_value = DeploymentResponse(
+        mock_service.get_deployment_async.return_value = DeploymentResponse(
             id=1, point_id=1, recorder_id=1, phase=1
         )
 
         response = client.get(f"{settings.api_prefix}/deployments/1")
         assert response.status_code == 200
         assert response.json()["id"] == 1
-        mock_service.get_deployment.assert_called_once_with(1)
+        mock_service.get_deployment_async.assert_called_once_with(1)
 
 
 def test_create_deployment(client):
@@ -0,0 +1,300 @@
+"""
+偵測紀錄 (Detection) 測試模組。
+
+包含：
+- CSV 批次匯入 (COPY) 的解析、分批與錯誤處理
+- 每小時 / 每日統計的 SQL 產生
+- 偵測熱圖的矩陣組裝、快取與失效
+- API 端點
+"""
+
+import io
+from datetime import UTC, date, datetime
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Query, Session
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.audio import AudioInfo
+from app.services import detection_service
+from app.services.detection_service import DetectionService
+
+CSV_HEADER = "start_time,end_time,freq_min,freq_max,species,call_type,audio_id\n"
+
+
+@pytest.fixture
+def copied(mock_db):
+    """收集送進 COPY 的 CSV 內容。"""
+    batches = []
+    cursor = mock_db.connection.return_value.connection.cursor.return_value
+    cursor.copy_expert.side_effect = lambda sql, buf: batches.append((sql, buf.read()))
+    with patch("app.services.detection_service.DeploymentService"):
+        yield batches
+
+
+class TestBulkIngest:
+    def test_rows_are_copied_in_batches(self, mock_db, copied):
+        rows = "".join(
+            f"2024-06-11T13:00:0{i},2024-06-11T13:00:0{i}.5,1000,2000,0,UPSWEEP,\n"
+            for i in range(5)
+        )
+        with patch.object(detection_service, "DETECTION_COPY_BATCH", 2):
+            inserted = DetectionService(mock_db).bulk_ingest(
+                7, io.StringIO(CSV_HEADER + rows), user_id=3
+            )
+
+        assert inserted == 5
+        assert len(copied) == 3
+        sql, first = copied[0]
+        assert sql.startswith("COPY detection_info (deployment_id, audio_id,")
+        assert first.splitlines()[0] == (
+            "7,,2024-06-11T13:00:00+08:00,2024-06-11T13:00:00.500000+08:00,"
+            "1000.0,2000.0,model-detect,0,1,,3"
+        )
+        mock_db.commit.assert_called_once()
+
+    def test_bad_row_rolls_back(self, mock_db, copied):
+        rows = "2024-06-11T13:00:00,2024-06-11T12:00:00,,,,,\n"
+
+        with pytest.raises(HTTPException) as exc:
+            DetectionService(mock_db).bulk_ingest(7, io.StringIO(CSV_HEADER + rows))
+
+        assert exc.value.status_code == 400
+        assert exc.value.detail.startswith("Line 2:")
+        mock_db.rollback.assert_called_once()
+        mock_db.commit.assert_not_called()
+
+    def test_short_row_names_missing_field(self, mock_db, copied):
+        """欄位不足的列 (DictReader 補 None) 回 400 並指出行號與欄位。"""
+        rows = "2024-06-11T13:00:00,2024-06-11T13:00:01,,,,,\n2024-06-11T13:00:02\n"
+
+        with pytest.raises(HTTPException) as exc:
+            DetectionService(mock_db).bulk_ingest(7, io.StringIO(CSV_HEADER + rows))
+
+        assert exc.value.status_code == 400
+        assert exc.value.detail == "Line 3: missing required field 'end_time'"
+        mock_db.commit.assert_not_called()
+
+    def test_foreign_audio_is_rejected(self, mock_db, copied):
+        rows = "2024-06-11T13:00:00,2024-06-11T13:00:01,,,,,5\n"
+        mock_db.query.return_value.filter.return_value = []
+
+        with pytest.raises(HTTPException) as exc:
+            DetectionService(mock_db).bulk_ingest(7, io.StringIO(CSV_HEADER + rows))
+
+        assert "5" in exc.value.detail
+        mock_db.rollback.assert_called_once()
+
+    def test_missing_columns(self, mock_db, copied):
+        with pytest.raises(HTTPException) as exc:
+            DetectionService(mock_db).bulk_ingest(7, io.StringIO("start_time\n"))
+        assert exc.value.status_code == 400
+
+
+def test_count_detections_groups_in_sql():
+    captured = []
+
+    def fake_all(query):
+        captured.append(query.statement)
+        return []
+
+    with (
+        patch("app.services.detection_service.DeploymentService"),
+        patch.object(Query, "all", autospec=True, side_effect=fake_all),
+    ):
+        DetectionService(Session()).count_detections(
+            1,
+            start=datetime(2024, 6, 1, tzinfo=UTC),
+            interval="day",
+            species=0,
+            group_by="call_type",
+        )
+
+    sql = str(
+        captured[0].compile(
+            dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}
+        )
+    )
+    assert "date_trunc('day', detection_info.start_time, 'Asia/Taipei')" in sql
+    assert "count(*)" in sql
+    assert "GROUP BY" in sql and "detection_info.call_type" in sql
+    assert "detection_info.species = 0" in sql
+
+
+def test_get_detection_counts(client):
+    counts = [
+        {"bucket": datetime(2024, 6, 11, 5, tzinfo=UTC), "call_type": 1, "count": 3}
+    ]
+    with patch("app.api.v1.endpoints.api_detections.DetectionService") as MockService:
+        mock_service = MockService.return_value
+        mock_service.count_detections.return_value = counts
+
+        response = client.get(
+            f"{settings.api_prefix}/detections/counts",
+            params={"deployment_id": 1, "interval": "day", "group_by": "call_type"},
+        )
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["interval"] == "day"
+    assert body["counts"][0]["bucket"] == "2024-06-11T13:00:00+08:00"
+    assert body["counts"][0]["count"] == 3
+
+
+def test_get_detections_filters(client):
+    with patch("app.api.v1.endpoints.api_detections.DetectionService") as MockService:
+        mock_service = MockService.return_value
+        mock_service.get_detections.return_value = []
+
+        response = client.get(
+            f"{settings.api_prefix}/detections/",
+            params={"deployment_id": 1, "call_type": 2, "start": "2024-06-11T00:00"},
+        )
+
+    assert response.status_code == 200
+    kwargs = mock_service.get_detections.call_args.kwargs
+    assert kwargs["call_type"] == 2
+    assert kwargs["start"].utcoffset().total_seconds() == 8 * 3600
+
+
+def test_bulk_ingest_endpoint(client):
+    with patch("app.api.v1.endpoints.api_detections.DetectionService") as MockService:
+        mock_service = MockService.return_value
+        mock_service.bulk_ingest.side_effect = lambda dep, stream, **kw: (
+            len(stream.read().splitlines()) - 1
+        )
+
+        response = client.post(
+            f"{settings.api_prefix}/detections/bulk",
+            params={"deployment_id": 4},
+            files={"file": ("d.csv", CSV_HEADER + "a,b,,,,,\n", "text/csv")},
+        )
+
+    assert response.status_code == 200
+    assert response.json() == {"deployment_id": 4, "inserted": 1}
+    assert mock_service.bulk_ingest.call_args.kwargs["method"] == "model-detect"
+
+
+def test_delete_detection_requires_creator(client, mock_current_user):
+    with patch("app.api.v1.endpoints.api_detections.DetectionService") as MockService:
+        MockService.return_value.get_detection.return_value = MagicMock(
+            created_by=mock_current_user.id + 1
+        )
+        mock_current_user.role = "user"
+
+        response = client.delete(f"{settings.api_prefix}/detections/1")
+
+    assert response.status_code == 403
+
+
+class TestHeatmap:
+    @pytest.fixture(autouse=True)
+    def _services(self):
+        detection_service._heatmap_cache.clear()
+        with patch("app.services.detection_service.PointService"):
+            yield
+
+    def rows(self, n_days):
+        rows = [SimpleNamespace(recorded=0, positive=0) for _ in range(n_days * 24)]
+        rows[13] = SimpleNamespace(recorded=30.0, positive=6)
+        rows[-22] = SimpleNamespace(recorded=60.0, positive=0)
+        return rows
+
+    def test_dense_matrix_and_ratio(self, mock_db):
+        mock_db.execute.return_value.all.return_value = self.rows(2)
+
+        result = DetectionService(mock_db).get_heatmap(
+            1, date(2024, 6, 11), date(2024, 6, 12), species=0
+        )
+
+        assert result["dates"] == [date(2024, 6, 11), date(2024, 6, 12)]
+        assert result["positive_minutes"][0][13] == 6
+        assert result["ratio"][0][13] == 0.2
+        assert result["ratio"][1][2] == 0.0
+        assert result["recorded_minutes"][1][2] == 60.0
+        assert result["ratio"][0][0] is None
+        sql, params = mock_db.execute.call_args.args
+        assert "AND d.species = :species" in sql.text
+        assert "generate_series" in sql.text
+        assert params["species"] == 0
+        assert params["start"].utcoffset().total_seconds() == 8 * 3600
+
+    def test_cached_until_detections_change(self, mock_db):
+        mock_db.execute.return_value.all.return_value = self.rows(1)
+        service = DetectionService(mock_db)
+        day = date(2024, 6, 11)
+
+        service.get_heatmap(1, day, day)
+        service.get_heatmap(1, day, day)
+        assert mock_db.execute.call_count == 1
+
+        # 模擬任一 Session commit 了偵測資料的異動
+        session = Session()
+        detection_service.mark_changed(session)
+        detection_service._invalidate_on_commit(session)
+        service.get_heatmap(1, day, day)
+        assert mock_db.execute.call_count == 2
+
+    def test_flush_of_audio_marks_session(self):
+        session = MagicMock(info={})
+        session.new, session.dirty, session.deleted = [AudioInfo()], [], []
+
+        detection_service._track_flush(session, None)
+
+        assert session.info["heatmap_dirty"] is True
+
+    def test_listeners_only_watch_app_sessions(self):
+        for name, listener in [
+            ("after_flush", detection_service._track_flush),
+            ("do_orm_execute", detection_service._track_bulk),
+            ("after_commit", detection_service._invalidate_on_commit),
+        ]:
+            assert event.contains(SessionLocal, name, listener)
+            assert not event.contains(Session, name, listener)
+
+    def test_rejects_reversed_range(self, mock_db):
+        with pytest.raises(HTTPException) as exc:
+            DetectionService(mock_db).get_heatmap(
+                1, date(2024, 6, 12), date(2024, 6, 11)
+            )
+        assert exc.value.status_code == 400
+
+
+def test_get_detection_heatmap(client):
+    heatmap = {
+        "point_id": 1,
+        "dates": [date(2024, 6, 11)],
+        "hours": list(range(24)),
+        "recorded_minutes": [[60.0] * 24],
+        "positive_minutes": [[0] * 24],
+        "ratio": [[None] * 24],
+    }
+    with patch("app.api.v1.endpoints.api_detections.DetectionService") as MockService:
+        mock_service = MockService.return_value
+        mock_service.get_heatmap.return_value = heatmap
+
+        response = client.get(
+            f"{settings.api_prefix}/detections/heatmap",
+            params={
+                "point_id": 1,
+                "start_date": "2024-06-11",
+                "end_date": "2024-06-11",
+            },
+        )
+
+    assert response.status_code == 200
+    assert response.json()["dates"] == ["2024-06-11"]
+    mock_service.get_heatmap.assert_called_once_with(
+        1,
+        date(2024, 6, 11),
+        date(2024, 6, 11),
+        species=None,
+        call_type=None,
+        method=None,
+    )
@@ -0,0 +1,248 @@
+"""
+重複音檔偵測測試模組。
+
+包含：
+- 頻譜指紋對增益、位元深度與檔頭不敏感
+- 以 moto 模擬 MinIO 的指紋補算
+- 登錄時的拒絕 / 連結政策
+- 重複群組報表與標記 SQL
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock, patch
+
+import boto3
+import numpy as np
+import pytest
+from audio_helpers import make_wav, tone
+from fastapi import HTTPException
+from moto import mock_aws
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.schemas.audio import AudioCreate
+from app.services.duplicate_service import (
+    NO_FINGERPRINT,
+    DuplicateAudioService,
+    fingerprint_file,
+)
+from app.utils.fingerprint import FINGERPRINT_HEX_LENGTH, spectral_fingerprint
+
+FS = 8000
+
+
+def recording(seconds=30.0, seed=0):
+    rng = np.random.default_rng(seed)
+    chirps = tone(600 + 200 * seed, FS, seconds) * (
+        np.arange(int(FS * seconds)) // FS % 3 == 0
+    )
+    return 0.3 * chirps + 0.05 * rng.standard_normal(int(FS * seconds))
+
+
+class TestFingerprint:
+    def test_same_content_matches_across_gain_and_bit_depth(self):
+        signal = recording()
+        fingerprint = spectral_fingerprint(signal, FS)
+        quantized = np.round(signal * 0.5 * 32767) / 32767
+
+        assert len(fingerprint) == FINGERPRINT_HEX_LENGTH
+        assert spectral_fingerprint(quantized, FS) == fingerprint
+        assert spectral_fingerprint(np.stack([signal, signal], 1), FS) == fingerprint
+
+    def test_different_content_differs(self):
+        a = int(spectral_fingerprint(recording(seed=0), FS), 16)
+        b = int(spectral_fingerprint(recording(seed=1), FS), 16)
+
+        assert bin(a ^ b).count("1") > 64
+
+    def test_silence_and_short_audio_have_no_fingerprint(self):
+        assert spectral_fingerprint(np.zeros(FS * 30), FS) is None
+        assert spectral_fingerprint(recording(seconds=1.0), FS) is None
+
+
+@mock_aws
+def test_fingerprint_ignores_header_differences(aws_credentials):
+    s3 = boto3.client("s3", region_name="us-east-1")
+    s3.create_bucket(Bucket="proj")
+    body = make_wav(recording(seconds=40.0)[:, None], FS)
+    s3.put_object(Bucket="proj", Key="a.wav", Body=body)
+    s3.put_object(Bucket="proj", Key="b.wav", Body=body + b"LIST\x04\x00\x00\x00INFO")
+
+    with patch("app.services.duplicate_service.get_s3_client", return_value=s3):
+        a = fingerprint_file("proj", "a.wav", len(body), 30)
+        b = fingerprint_file("proj", "b.wav", len(body) + 12, 30)
+
+    assert a is not None
+    assert a == b
+
+
+@mock_aws
+def test_fingerprint_pending_marks_each_batch(mock_db, aws_credentials):
+    s3 = boto3.client("s3", region_name="us-east-1")
+    s3.create_bucket(Bucket="proj")
+    s3.put_object(Bucket="proj", Key="a.wav", Body=make_wav(recording()[:, None], FS))
+    s3.put_object(
+        Bucket="proj", Key="quiet.wav", Body=make_wav(np.zeros((FS * 30, 1)), FS)
+    )
+    audios = [
+        MagicMock(id=1, object_key="a.wav", file_size=None, fingerprint=None),
+        MagicMock(id=2, object_key="quiet.wav", file_size=None, fingerprint=None),
+        MagicMock(id=5, object_key="missing.wav", file_size=None, fingerprint=None),
+    ]
+    query = mock_db.query.return_value.join.return_value.join.return_value
+    batches = query.join.return_value.filter.return_value.order_by.return_value
+    batches.limit.return_value.all.side_effect = [
+        [(audios[0], "proj"), (audios[1], "proj")],
+        [(audios[2], "proj")],
+        [],
+    ]
+    progress = MagicMock()
+
+    with (
+        patch("app.services.duplicate_service.get_s3_client", return_value=s3),
+        ThreadPoolExecutor(2) as pool,
+    ):
+        summary = DuplicateAudioService(mock_db).fingerprint_pending(
+            executor=pool, batch_size=2, progress=progress
+        )
+
+    assert summary == {
+        "files_processed": 2,
+        "files_failed": 1,
+        "files_unfingerprinted": 1,
+    }
+    assert len(audios[0].fingerprint) == FINGERPRINT_HEX_LENGTH
+    assert audios[1].fingerprint == NO_FINGERPRINT
+    assert audios[2].fingerprint is None
+    assert mock_db.commit.call_count == 2
+    # 進度為已處理的檔案數，而非 audio id
+    assert [c.args[0] for c in progress.call_args_list] == [2, 3]
+
+
+class TestRegistration:
+    def audio_in(self):
+        return AudioCreate(
+            deployment_id=1, file_name="a.wav", object_key="p/a.wav", checksum="abc"
+        )
+
+    def test_link_points_at_original(self, mock_db):
+        service = DuplicateAudioService(mock_db)
+        with patch.object(
+            service, "find_duplicate", return_value=MagicMock(id=3, duplicate_of_id=1)
+        ) as find:
+            assert service.check_registration(self.audio_in(), "link") == 1
+        find.assert_called_once_with("abc", None)
+
+    def test_reject_raises(self, mock_db):
+        service = DuplicateAudioService(mock_db)
+        with patch.object(
+            service,
+            "find_duplicate",
+            return_value=MagicMock(id=3, duplicate_of_id=None),
+        ):
+            with pytest.raises(HTTPException) as exc:
+                service.check_registration(self.audio_in(), "reject")
+        assert exc.value.status_code == 400
+        assert "3" in exc.value.detail
+
+    def test_allow_skips_lookup(self, mock_db):
+        service = DuplicateAudioService(mock_db)
+        with patch.object(service, "find_duplicate") as find:
+            assert service.check_registration(self.audio_in(), "allow") is None
+        find.assert_not_called()
+
+    def test_default_policy_from_settings(self, mock_db):
+        service = DuplicateAudioService(mock_db)
+        with (
+            patch.object(settings, "duplicate_audio_policy", "reject"),
+            patch.object(
+                service, "find_duplicate", return_value=MagicMock(duplicate_of_id=2)
+            ),
+            pytest.raises(HTTPException),
+        ):
+            service.check_registration(self.audio_in())
+
+    def test_create_audio_stores_link(self, mock_db):
+        from app.services.audio_service import AudioService
+
+        with (
+            patch(
+                "app.services.audio_service.DuplicateAudioService"
+            ) as duplicate_service,
+            patch("app.services.audio_service.insert_unique") as insert_unique,
+        ):
+            duplicate_service.return_value.check_registration.return_value = 7
+            audio = AudioService(mock_db).create_audio(self.audio_in(), "link")
+
+        assert audio is insert_unique.return_value
+        assert insert_unique.call_args.args[2]["duplicate_of_id"] == 7
+        mock_db.commit.assert_called_once()
+
+
+def test_report_groups_and_truncation(mock_db):
+    rows = [("abc", [1, 4, 9], 3, 300, 100), ("def", [2, 3], 2, 40, 20)]
+    query = mock_db.query.return_value.filter.return_value.group_by.return_value
+    groups = query.having.return_value.order_by.return_value.limit.return_value
+    groups.all.return_value = rows
+
+    report = DuplicateAudioService(mock_db).report(by="checksum", limit=1)
+
+    assert report["truncated"] is True
+    assert report["groups"] == [
+        {
+            "key": "abc",
+            "audio_ids": [1, 4, 9],
+            "count": 3,
+            "total_bytes": 300,
+            "reclaimable_bytes": 200,
+        }
+    ]
+
+
+def test_link_duplicates_uses_window_update():
+    db = Session()
+    with (
+        patch.object(db, "execute", return_value=MagicMock(rowcount=4)) as execute,
+        patch.object(db, "commit") as commit,
+    ):
+        assert DuplicateAudioService(db).link_duplicates("fingerprint") == 4
+
+    sql = str(execute.call_args.args[0].compile(dialect=postgresql.dialect()))
+    assert "min(audio_info.id) OVER (PARTITION BY audio_info.fingerprint)" in sql
+    assert "audio_info.duplicate_of_id IS NULL" in sql
+    assert "audio_info.fingerprint !=" in sql
+    commit.assert_called_once()
+
+
+def test_duplicate_endpoints(client, mock_current_user):
+    url = f"{settings.api_prefix}/audio"
+    report = {"by": "fingerprint", "groups": [], "truncated": False}
+    with (
+        patch("app.api.v1.endpoints.api_audio.DuplicateAudioService") as service,
+        patch("app.api.v1.endpoints.api_audio.JobService") as jobs,
+        patch("app.api.v1.endpoints.api_audio.AudioService") as audio_service,
+    ):
+        service.return_value.report.return_value = report
+        jobs.return_value.enqueue.return_value.id = 6
+        audio_service.return_value.create_audio.side_effect = HTTPException(400, "x")
+
+        listed = client.get(f"{url}/duplicates", params={"by": "fingerprint"})
+        scanned = client.post(f"{url}/duplicates/scan")
+        created = client.post(
+            f"{url}/",
+            params={"on_duplicate": "reject"},
+            json={"deployment_id": 1, "file_name": "a.wav", "object_key": "k"},
+        )
+        mock_current_user.role = "user"
+        forbidden = client.post(f"{url}/duplicates/scan")
+
+    assert listed.status_code == 200
+    assert listed.json() == report
+    service.return_value.report.assert_called_once_with(by="fingerprint", limit=100)
+    assert scanned.status_code == 202
+    assert scanned.json()["job_id"] == 6
+    jobs.return_value.enqueue.assert_called_once()
+    assert created.status_code == 400
+    assert audio_service.return_value.create_audio.call_args.args[1] == "reject"
+    assert forbidden.status_code == 403
@@ -0,0 +1,153 @@
+"""
+頻帶能量偵測器測試模組。
+
+包含：
+- 串流偵測器的事件切割與自適應底噪
+- 以 moto 模擬 MinIO 的 deployment 批次偵測 (跳過已處理檔案、失敗隔離)
+- API 排程
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import UTC, datetime, timedelta
+from unittest.mock import MagicMock, patch
+
+import boto3
+import numpy as np
+from audio_helpers import make_wav
+from moto import mock_aws
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Query, Session
+
+from app.core.config import settings
+from app.models.analysis import AudioAnalysisRun
+from app.schemas.detector import EnergyDetectorParams
+from app.services.analysis_run_service import AnalysisRunService, params_hash
+from app.services.energy_detector_service import ENERGY_DETECTOR, EnergyDetectorService
+from app.utils.detectors import BandEnergyDetector
+
+FS = 8000
+
+
+def noisy_bursts(seconds=10.0, bursts=((2.0, 2.5), (6.0, 7.0)), freq=1000):
+    rng = np.random.default_rng(1)
+    t = np.arange(int(FS * seconds)) / FS
+    signal = 0.01 * rng.standard_normal(len(t))
+    for start, end in bursts:
+        mask = (t >= start) & (t < end)
+        signal[mask] += 0.3 * np.sin(2 * np.pi * freq * t[mask])
+    return signal.astype(np.float32)
+
+
+class TestBandEnergyDetector:
+    def run(self, signal, block):
+        detector = BandEnergyDetector(FS, 800, 1200, nfft=256, noise_window=5)
+        for i in range(0, len(signal), block):
+            detector.process(signal[i : i + block])
+        return detector.finish()
+
+    def test_finds_bursts_in_band(self):
+        events = self.run(noisy_bursts(), 4096)
+
+        assert len(events) == 2
+        for (start, end, snr), (t0, t1) in zip(
+            events, [(2.0, 2.5), (6.0, 7.0)], strict=True
+        ):
+            assert abs(start - t0) < 0.05
+            assert abs(end - t1) < 0.05
+            assert snr > 20
+
+    def test_streaming_block_size_does_not_matter(self):
+        signal = noisy_bursts()
+        assert self.run(signal, 1000) == self.run(signal, len(signal))
+
+    def test_ignores_out_of_band_energy(self):
+        assert self.run(noisy_bursts(freq=3000), 4096) == []
+
+
+@mock_aws
+def test_run_deployment_stores_events_and_isolates_failures(mock_db, aws_credentials):
+    s3 = boto3.client("s3", region_name="us-east-1")
+    s3.create_bucket(Bucket="proj")
+    s3.put_object(Bucket="proj", Key="a.wav", Body=make_wav(noisy_bursts(), FS))
+    t0 = datetime(2024, 6, 11, 5, tzinfo=UTC)
+    good = MagicMock(id=1, object_key="a.wav", file_size=None, record_time=t0)
+    missing = MagicMock(id=2, object_key="missing.wav", file_size=None, record_time=t0)
+
+    deployment = MagicMock()
+    deployment.point.project.name = "proj"
+    params = EnergyDetectorParams(fmin=800, fmax=1200, nfft=256, noise_window=5)
+    stored = []
+
+    def copy(rows):
+        stored.extend(rows)
+        return len(stored)
+
+    with (
+        patch("app.services.energy_detector_service.DeploymentService") as MockDeploy,
+        patch("app.services.energy_detector_service.DetectionService") as MockDetect,
+        patch("app.services.energy_detector_service.get_s3_client", return_value=s3),
+        patch.object(
+            AnalysisRunService, "pending_audios", return_value=[good, missing]
+        ),
+        ThreadPoolExecutor(2) as pool,
+    ):
+        MockDeploy.return_value.get_deployment_details.return_value = deployment
+        MockDetect.return_value.copy_detections.side_effect = copy
+
+        summary = EnergyDetectorService(mock_db).run_deployment(
+            9, params, executor=pool
+        )
+
+    assert summary["files_processed"] == 1
+    assert summary["files_failed"] == 1
+    assert summary["results"] == 2
+    assert stored[0][:2] == (9, 1)
+    assert stored[0][2] - t0 - timedelta(seconds=2) < timedelta(seconds=0.05)
+    assert stored[0][6] == "model-detect"
+    run = mock_db.add.call_args.args[0]
+    assert isinstance(run, AudioAnalysisRun)
+    assert (run.audio_id, run.analysis, run.result_count) == (1, ENERGY_DETECTOR, 2)
+    mock_db.commit.assert_called_once()
+    mock_db.rollback.assert_called_once()
+
+
+def test_pending_audios_skips_processed_files():
+    captured = []
+
+    def fake_all(query):
+        captured.append(query.statement)
+        return []
+
+    with patch.object(Query, "all", autospec=True, side_effect=fake_all):
+        AnalysisRunService(Session()).pending_audios(3, ENERGY_DETECTOR, "abc")
+
+    sql = str(
+        captured[0].compile(
+            dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}
+        )
+    )
+    assert "audio_info.id NOT IN (SELECT audio_analysis_run.audio_id" in sql
+    assert "audio_analysis_run.params_hash = 'abc'" in sql
+    assert "ORDER BY audio_info.record_time" in sql
+
+
+def test_run_energy_detector_is_scheduled(client):
+    body = {"fmin": 800, "fmax": 1200}
+    url = f"{settings.api_prefix}/deployments/1/energy-detector"
+
+    with (
+        patch("app.api.v1.endpoints.api_deployments.DeploymentService"),
+        patch("app.api.v1.endpoints.api_deployments.JobService") as jobs,
+    ):
+        jobs.return_value.enqueue.return_value.id = 3
+        response = client.post(url, json=body)
+        invalid = client.post(url, json={"fmin": 1200, "fmax": 800})
+
+    assert response.status_code == 202
+    job_type, payload = jobs.return_value.enqueue.call_args.args
+    assert job_type == "deployment.energy_detector"
+    assert response.json()["params_hash"] == params_hash(
+        ENERGY_DETECTOR, EnergyDetectorParams(**payload["params"]).model_dump()
+    )
+    assert response.json()["job_id"] == 3
+    assert invalid.status_code == 422
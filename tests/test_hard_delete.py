@@ -15,10 +15,14 @@ from datetime import datetime, timezone
 from unittest.mock import MagicMock, patch
 
 import pytest
+from botocore.exceptions import ClientError
 from fastapi import HTTPException
+from sqlalchemy.dialects import postgresql
 
 from app.core.config import settings
 from app.enums.enums import UserRole
+from app.models.object_deletion import ObjectDeletion
+from app.services.object_deletion_service import ObjectDeletionService
 
 
 # =============================================================================
@@ -291,39 +295,27 @@ class TestRecorderHardDelete:
 class TestProjectServiceHardDelete:
     """測試 ProjectService 的 hard_delete_project 方法。"""
 
-    def test_hard_delete_removes_minio_objects(self):
+    def test_hard_delete_queues_minio_objects(self):
         """
-        測試永久刪除會刪除 MinIO 物件。
+        測試永久刪除會把 MinIO 物件寫入 outbox。
 
         預期行為：
-        - S3 client 的 delete_objects 被呼叫
-        - S3 client 的 delete_bucket 被呼叫
+        - 以 INSERT ... SELECT 寫入音檔物件與冷儲存副本，不載入 Audio
+        - bucket 刪除也排入 outbox
+        - 與 DB 記錄刪除同一次 commit，不直接呼叫 S3
         """
         with patch("app.services.project_service.get_s3_client") as mock_get_s3:
-            mock_s3 = MagicMock()
-            mock_get_s3.return_value = mock_s3
-
             mock_db = MagicMock()
+            mock_db.execute.return_value.rowcount = 2
 
             # Mock Project
             mock_project = MagicMock()
             mock_project.id = 1
             mock_project.name = "test-project"
 
-            # Mock Audios
-            mock_audio1 = MagicMock()
-            mock_audio1.object_key = "point1/2024/01/audio1.wav"
-            mock_audio2 = MagicMock()
-            mock_audio2.object_key = "point1/2024/01/audio2.wav"
-
-            # Setup query chain
             mock_db.query.return_value.filter.return_value.first.return_value = (
                 mock_project
             )
-            mock_db.query.return_value.filter.return_value.all.return_value = [
-                mock_audio1,
-                mock_audio2,
-            ]
             mock_db.query.return_value.filter.return_value.delete.return_value = 2
 
             from app.services.project_service import ProjectService
@@ -331,9 +323,26 @@ class TestProjectServiceHardDelete:
             service = ProjectService(mock_db)
             result = service.hard_delete_project(1)
 
-            # 驗證 MinIO 操作
-            mock_s3.delete_objects.assert_called_once()
-            mock_s3.delete_bucket.assert_called_once_with(Bucket="test-project")
+            objects, cold = (
+                str(c.args[0].compile(dialect=postgresql.dialect()))
+                for c in mock_db.execute.call_args_list
+            )
+            assert objects.startswith(
+                "INSERT INTO object_deletion_outbox (bucket, object_key) SELECT"
+            )
+            assert "audio_info.object_key" in objects
+            assert "UNION ALL" in objects
+            assert "audio_info.object_key || %(object_key_1)s" in objects
+            assert "(audio_info.meta_json -> %(meta_json_1)s) ->>" in cold
+            assert "audio_info.is_cold_storage IS true" in cold
+
+            bucket_row = mock_db.add.call_args.args[0]
+            assert isinstance(bucket_row, ObjectDeletion)
+            assert bucket_row.bucket == "test-project"
+            assert bucket_row.object_key is None
+            assert result["queued_objects"] == 4
+            mock_db.commit.assert_called_once()
+            mock_get_s3.return_value.delete_objects.assert_not_called()
 
     def test_hard_delete_project_not_found_raises_404(self):
         """測試刪除不存在的專案時拋出 404。"""
@@ -420,58 +429,238 @@ class TestRecorderServiceHardDelete:
 class TestAudioServiceHardDelete:
     """測試 AudioService 的 hard_delete_audio 方法。"""
 
-    def test_hard_delete_removes_single_minio_object(self):
+    def test_hard_delete_queues_single_minio_object(self):
         """
-        測試永久刪除單一音檔會刪除對應 MinIO 物件。
+        測試永久刪除單一音檔會把對應 MinIO 物件寫入 outbox。
 
         預期行為：
-        - S3 client 的 delete_object 被呼叫一次
-        - 正確的 Bucket 和 Key
+        - outbox 寫入的 bucket 為所屬 Project，只選取該音檔
         """
-        with patch("app.services.audio_service.get_s3_client") as mock_get_s3:
-            mock_s3 = MagicMock()
-            mock_get_s3.return_value = mock_s3
+        mock_db = MagicMock()
 
-            mock_db = MagicMock()
+        # Mock Audio
+        mock_audio = MagicMock()
+        mock_audio.id = 1
+        mock_audio.object_key = "point1/2024/01/audio1.wav"
+        mock_audio.deployment_id = 1
+        mock_audio.is_cold_storage = False
+
+        # Mock Deployment -> Point -> Project chain
+        mock_deployment = MagicMock()
+        mock_deployment.point_id = 1
+        mock_point = MagicMock()
+        mock_point.project_id = 1
+        mock_project = MagicMock()
+        mock_project.name = "test-project"
 
-            # Mock Audio
-            mock_audio = MagicMock()
-            mock_audio.id = 1
-            mock_audio.object_key = "point1/2024/01/audio1.wav"
-            mock_audio.deployment_id = 1
-
-            # Mock Deployment -> Point -> Project chain
-            mock_deployment = MagicMock()
-            mock_deployment.point_id = 1
-            mock_point = MagicMock()
-            mock_point.project_id = 1
-            mock_project = MagicMock()
-            mock_project.name = "test-project"
+        # Setup query chain
+        def query_side_effect(model):
+            mock_query = MagicMock()
+            if "AudioInfo" in str(model):
+                mock_query.filter.return_value.first.return_value = mock_audio
+            elif "DeploymentInfo" in str(model):
+                mock_query.filter.return_value.first.return_value = mock_deployment
+            elif "PointInfo" in str(model):
+                mock_query.filter.return_value.first.return_value = mock_point
+            elif "ProjectInfo" in str(model):
+                mock_query.filter.return_value.first.return_value = mock_project
+            return mock_query
+
+        mock_db.query.side_effect = query_side_effect
+
+        from app.services.audio_service import AudioService
+
+        service = AudioService(mock_db)
+        result = service.hard_delete_audio(1)
+
+        # 驗證 outbox 寫入
+        stmt = mock_db.execute.call_args_list[0].args[0]
+        compiled = stmt.compile(dialect=postgresql.dialect())
+        assert "WHERE audio_info.id = %(id_1)s" in str(compiled)
+        assert compiled.params["param_1"] == "test-project"
+        assert compiled.params["id_1"] == 1
+        mock_db.commit.assert_called_once()
+
+
+class FakeS3:
+    """以 dict 模擬 MinIO；與 MinIO 相同，非空 bucket 不能刪除。"""
+
+    def __init__(self, buckets):
+        self.buckets = {name: set(keys) for name, keys in buckets.items()}
+        self.failing_keys = set()
 
-            # Setup query chain
-            def query_side_effect(model):
-                mock_query = MagicMock()
-                if "AudioInfo" in str(model):
-                    mock_query.filter.return_value.first.return_value = mock_audio
-                elif "DeploymentInfo" in str(model):
-                    mock_query.filter.return_value.first.return_value = mock_deployment
-                elif "PointInfo" in str(model):
-                    mock_query.filter.return_value.first.return_value = mock_point
-                elif "ProjectInfo" in str(model):
-                    mock_query.filter.return_value.first.return_value = mock_project
-                return mock_query
-
-            mock_db.query.side_effect = query_side_effect
-
-            from app.services.audio_service import AudioService
-
-            service = AudioService(mock_db)
-            result = service.hard_delete_audio(1)
-
-            # 驗證 MinIO 操作
-            mock_s3.delete_object.assert_called_once_with(
-                Bucket="test-project", Key="point1/2024/01/audio1.wav"
+    def delete_objects(self, Bucket, Delete):
+        errors = []
+        for obj in Delete["Objects"]:
+            if obj["Key"] in self.failing_keys:
+                errors.append(
+                    {"Key": obj["Key"], "Code": "SlowDown", "Message": "busy"}
+                )
+            else:
+                self.buckets[Bucket].discard(obj["Key"])
+        return {"Errors": errors}
+
+    def get_paginator(self, name):
+        assert name == "list_objects_v2"
+        keys = self.buckets
+
+        class Paginator:
+            def paginate(self, Bucket, Prefix, PaginationConfig):
+                listed = sorted(k for k in keys[Bucket] if k.startswith(Prefix))
+                size = PaginationConfig["PageSize"]
+                for i in range(0, len(listed), size):
+                    yield {"Contents": [{"Key": k} for k in listed[i : i + size]]}
+
+        return Paginator()
+
+    def delete_bucket(self, Bucket):
+        if self.buckets[Bucket]:
+            raise ClientError(
+                {"Error": {"Code": "BucketNotEmpty", "Message": "not empty"}},
+                "DeleteBucket",
             )
+        del self.buckets[Bucket]
+
+
+class TestDerivedObjectDeletion:
+    """測試峰值 sidecar、LTSA 建置與 spectrogram tile 隨永久刪除清除。"""
+
+    AUDIO = "p1/2024/06/Raw_Data/7505.240611130000.wav"
+    DERIVED = {
+        f"{AUDIO}.peaks",
+        "_derived/ltsa/deployment_1/manifest.json",
+        "_derived/ltsa/deployment_1/build-1/tile_0.f16",
+        "_derived/spectrogram/ab/abcdef.png",
+    }
+
+    def make_service(self, s3, objects=(), prefixes=(), buckets=()):
+        db = MagicMock()
+        claim = db.query.return_value.filter.return_value
+        objects_claim = claim.order_by.return_value.limit.return_value
+        objects_claim.with_for_update.return_value.all.side_effect = [list(objects), []]
+        prefixes_claim = claim.limit.return_value
+        prefixes_claim.with_for_update.return_value.all.side_effect = [
+            list(prefixes),
+            [],
+        ]
+        claim.with_for_update.return_value.all.return_value = list(buckets)
+        claim.scalar.return_value = 0
+        return ObjectDeletionService(db, s3_client=s3, concurrency=2, max_attempts=3)
+
+    def row(self, id, object_key, bucket="reef"):
+        return ObjectDeletion(id=id, bucket=bucket, object_key=object_key, attempts=0)
+
+    def test_project_with_peaks_and_ltsa_drops_bucket(self):
+        """
+        測試專案有峰值 sidecar 與 LTSA 建置時仍能刪除 bucket。
+
+        預期行為：
+        - outbox 列 (音檔、sidecar) 先刪除
+        - 刪除 bucket 前清空剩下的 LTSA 與 spectrogram 物件
+        - delete_bucket 不會因 BucketNotEmpty 失敗
+        """
+        s3 = FakeS3({"reef": {self.AUDIO, *self.DERIVED}})
+        bucket_row = self.row(9, None)
+        service = self.make_service(
+            s3,
+            objects=[self.row(1, self.AUDIO), self.row(2, f"{self.AUDIO}.peaks")],
+            buckets=[bucket_row],
+        )
+
+        result = service.drain()
+
+        assert "reef" not in s3.buckets
+        assert bucket_row.attempts == 0
+        assert result["deleted_objects"] == 2
+        assert result["deleted_buckets"] == 1
+
+    def test_bucket_is_kept_when_emptying_fails(self):
+        """
+        測試清空 bucket 失敗時延後重試，不呼叫 delete_bucket。
+        """
+        s3 = FakeS3({"reef": set(self.DERIVED)})
+        s3.failing_keys = {"_derived/spectrogram/ab/abcdef.png"}
+        bucket_row = self.row(9, None)
+        service = self.make_service(s3, buckets=[bucket_row])
+
+        assert service.drain_buckets() == 0
+
+        assert "reef" in s3.buckets
+        assert bucket_row.attempts == 1
+        assert "SlowDown" in bucket_row.last_error
+
+    def test_bucket_drop_only_deletes_derived_and_listed_objects(self):
+        """
+        測試刪除 bucket 時不會清空整個 bucket。
+
+        預期行為：
+        - 只清除 _derived/ 下的衍生物件
+        - 不在 outbox 中的其他物件保留，delete_bucket 失敗後延後重試
+        """
+        s3 = FakeS3({"reef": {self.AUDIO, *self.DERIVED}})
+        bucket_row = self.row(9, None)
+        service = self.make_service(s3, buckets=[bucket_row])
+
+        assert service.drain_buckets() == 0
+
+        assert s3.buckets["reef"] == {self.AUDIO, f"{self.AUDIO}.peaks"}
+        assert bucket_row.attempts == 1
+        assert "BucketNotEmpty" in bucket_row.last_error
+
+    def test_deployment_ltsa_prefix_is_deleted(self):
+        """
+        測試 deployment 的 LTSA 前綴列刪除該前綴下的所有物件。
+
+        預期行為：
+        - deployment_1 的建置全部刪除
+        - deployment_10 (前綴相近) 與其他物件保留
+        """
+        other = "_derived/ltsa/deployment_10/manifest.json"
+        s3 = FakeS3({"reef": {self.AUDIO, other, *self.DERIVED}})
+        service = self.make_service(
+            s3, prefixes=[self.row(3, "_derived/ltsa/deployment_1/")]
+        )
+
+        result = service.drain()
+
+        assert s3.buckets["reef"] == {
+            self.AUDIO,
+            other,
+            f"{self.AUDIO}.peaks",
+            "_derived/spectrogram/ab/abcdef.png",
+        }
+        assert result["deleted_prefixes"] == 1
+        assert result["failed_attempts"] == 0
+
+    def test_hard_delete_deployment_queues_ltsa_prefix(self):
+        """
+        測試永久刪除 deployment 時把 LTSA 前綴寫入 outbox。
+
+        預期行為：
+        - 音檔與 sidecar、冷儲存副本之後，以 INSERT ... SELECT 寫入前綴
+        - 前綴以 / 結尾，不會涵蓋其他 deployment
+        """
+        mock_db = MagicMock()
+        mock_db.execute.return_value.rowcount = 1
+        mock_db.query.return_value.filter.return_value.first.return_value.name = "reef"
+
+        from app.services.deployment_service import DeploymentService
+
+        result = DeploymentService(mock_db).hard_delete_deployment(1)
+
+        statement = mock_db.execute.call_args_list[2].args[0]
+        ltsa = str(
+            statement.compile(
+                dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}
+            )
+        )
+        assert (
+            "'_derived/ltsa/deployment_' || CAST(deployment_info.id AS VARCHAR) || '/'"
+            in ltsa
+        )
+        assert "WHERE deployment_info.id = 1" in ltsa
+        assert result["queued_objects"] == 3
+        mock_db.commit.assert_called_once()
 
 
 # =============================================================================
@@ -530,8 +719,8 @@ class TestHardDeleteErrorHandling:
         測試刪除沒有任何 Audio 的空 Project。
 
         預期行為：
-        - 不呼叫 delete_objects (沒有物件)
-        - 呼叫 delete_bucket
+        - 不直接呼叫 S3
+        - bucket 刪除仍排入 outbox
         - DB 記錄被刪除
         """
         with patch("app.services.project_service.get_s3_client") as mock_get_s3:
@@ -539,15 +728,14 @@ class TestHardDeleteErrorHandling:
             mock_get_s3.return_value = mock_s3
 
             mock_db = MagicMock()
+            mock_db.execute.return_value.rowcount = 0
 
             # Mock Project
             mock_project = MagicMock()
             mock_project.id = 1
             mock_project.name = "empty-project"
 
-            # Mock 空的 Audio 列表
             mock_db.query.return_value.filter.return_value.first.return_value = mock_project
-            mock_db.query.return_value.filter.return_value.all.return_value = []  # 空
             mock_db.query.return_value.filter.return_value.delete.return_value = 0
 
             from app.services.project_service import ProjectService
@@ -555,60 +743,135 @@ class TestHardDeleteErrorHandling:
             service = ProjectService(mock_db)
             result = service.hard_delete_project(1)
 
-            # 驗證沒有呼叫 delete_objects (因為沒有物件)
             mock_s3.delete_objects.assert_not_called()
-            # 驗證有呼叫 delete_bucket
-            mock_s3.delete_bucket.assert_called_once_with(Bucket="empty-project")
-
+            mock_s3.delete_bucket.assert_not_called()
+            assert mock_db.add.call_args.args[0].bucket == "empty-project"
+            assert result["queued_objects"] == 0
+
+
+class TestObjectDeletionOutbox:
+    """測試 outbox 的批次、並行刪除與重試。"""
+
+    def make_service(self, rows, s3=None):
+        db = MagicMock()
+        claim = db.query.return_value.filter.return_value.order_by.return_value
+        claim.limit.return_value.with_for_update.return_value.all.side_effect = [
+            rows,
+            [],
+        ]
+        service = ObjectDeletionService(
+            db, s3_client=s3 or MagicMock(), concurrency=4, max_attempts=3
+        )
+        return service, db
 
-class TestHardDeleteBatchProcessing:
-    """測試批量刪除處理。"""
+    def rows(self, count, bucket="large-project"):
+        return [
+            ObjectDeletion(id=i, bucket=bucket, object_key=f"audio_{i}.wav", attempts=0)
+            for i in range(count)
+        ]
 
-    def test_hard_delete_batch_over_1000_objects(self):
+    def test_drain_batches_1000_keys_per_call(self):
         """
-        測試刪除超過 1000 個物件時的分批處理。
+        測試超過 1000 個物件時分批並行刪除。
 
         預期行為：
-        - delete_objects 被呼叫多次
-        - 每批最多 1000 個物件
+        - delete_objects 被呼叫 2 次 (1000 + 500)
+        - 成功的列從 outbox 刪除
         """
-        with patch("app.services.project_service.get_s3_client") as mock_get_s3:
-            mock_s3 = MagicMock()
-            mock_get_s3.return_value = mock_s3
+        service, db = self.make_service(self.rows(1500))
+        service.s3_client.delete_objects.return_value = {}
 
-            mock_db = MagicMock()
+        assert service.drain_objects() == (1500, 0)
 
-            # Mock Project
-            mock_project = MagicMock()
-            mock_project.id = 1
-            mock_project.name = "large-project"
+        sizes = sorted(
+            len(c.kwargs["Delete"]["Objects"])
+            for c in service.s3_client.delete_objects.call_args_list
+        )
+        assert sizes == [500, 1000]
+        db.query.return_value.filter.return_value.delete.assert_called_once()
+        db.commit.assert_called_once()
 
-            # Mock 1500 個 Audio
-            mock_audios = []
-            for i in range(1500):
-                audio = MagicMock()
-                audio.object_key = f"point/2024/01/audio_{i}.wav"
-                mock_audios.append(audio)
+    def test_drain_waits_for_rate_limiter(self):
+        """
+        測試設定限速時每批先取得與物件數相同的額度。
 
-            mock_db.query.return_value.filter.return_value.first.return_value = mock_project
-            mock_db.query.return_value.filter.return_value.all.return_value = mock_audios
-            mock_db.query.return_value.filter.return_value.delete.return_value = 1500
+        預期行為：
+        - limiter.acquire 以領取的列數呼叫，之後才呼叫 delete_objects
+        """
+        service, db = self.make_service(self.rows(3))
+        service.limiter = MagicMock()
+        service.limiter.acquire.side_effect = lambda amount: (
+            service.s3_client.delete_objects.assert_not_called()
+        )
+        service.s3_client.delete_objects.return_value = {}
 
-            from app.services.project_service import ProjectService
+        assert service.drain_objects() == (3, 0)
+        service.limiter.acquire.assert_called_once_with(3)
 
-            service = ProjectService(mock_db)
-            result = service.hard_delete_project(1)
+    def test_failed_keys_are_rescheduled(self):
+        """
+        測試個別 key 失敗時只重試該 key。
 
-            # 驗證 delete_objects 被呼叫 2 次 (1000 + 500)
-            assert mock_s3.delete_objects.call_count == 2
+        預期行為：
+        - 回報錯誤的 key 增加 attempts 並延後重試
+        - NoSuchKey 視為已刪除
+        - 整批呼叫失敗時，該批所有 key 都延後重試
+        """
+        rows = self.rows(3) + self.rows(2, bucket="cold-storage")
+        s3 = MagicMock()
+
+        def delete_objects(Bucket, Delete):
+            if Bucket == "cold-storage":
+                raise ConnectionError("MinIO unreachable")
+            return {
+                "Errors": [
+                    {"Key": "audio_0.wav", "Code": "SlowDown", "Message": "busy"},
+                    {"Key": "audio_1.wav", "Code": "NoSuchKey", "Message": "gone"},
+                ]
+            }
+
+        s3.delete_objects.side_effect = delete_objects
+        service, db = self.make_service(rows, s3=s3)
+        before = datetime.now(timezone.utc)
 
-            # 驗證第一批有 1000 個物件
-            first_call = mock_s3.delete_objects.call_args_list[0]
-            assert len(first_call[1]["Delete"]["Objects"]) == 1000
+        assert service.drain_objects() == (2, 3)
 
-            # 驗證第二批有 500 個物件
-            second_call = mock_s3.delete_objects.call_args_list[1]
-            assert len(second_call[1]["Delete"]["Objects"]) == 500
+        failed = [row for row in rows if row.attempts]
+        assert [row.bucket for row in failed] == [
+            "large-project",
+            "cold-storage",
+            "cold-storage",
+        ]
+        assert failed[0].last_error == "SlowDown: busy"
+        assert "MinIO unreachable" in failed[1].last_error
+        assert all(row.next_attempt_at > before for row in failed)
+
+    def test_drain_deletes_emptied_buckets(self):
+        """
+        測試物件清除後才處理 bucket 刪除。
+
+        預期行為：
+        - 呼叫 delete_bucket 並回傳統計與待重試數
+        """
+        service, db = self.make_service(self.rows(2))
+        service.s3_client.delete_objects.return_value = {}
+        buckets = db.query.return_value.filter.return_value.with_for_update
+        buckets.return_value.all.return_value = [
+            ObjectDeletion(id=9, bucket="large-project", object_key=None, attempts=0)
+        ]
+        db.query.return_value.filter.return_value.scalar.return_value = 0
+
+        result = service.drain()
+
+        service.s3_client.delete_bucket.assert_called_once_with(Bucket="large-project")
+        assert result == {
+            "deleted_objects": 2,
+            "deleted_prefixes": 0,
+            "failed_attempts": 0,
+            "deleted_buckets": 1,
+            "pending": 0,
+            "stuck": 0,
+        }
 
 
 # =============================================================================
@@ -629,24 +892,11 @@ class TestNameRelease:
         """
         mock_db = MagicMock()
 
-        # 模擬沒有活躍的同名記錄
-        # 但有軟刪除的同名記錄
-        call_count = [0]
-
-        def filter_side_effect(*args, **kwargs):
-            mock_result = MagicMock()
-            call_count[0] += 1
-            if call_count[0] <= 2:
-                # 前兩次查詢 (活躍記錄) 回傳 None
-                mock_result.first.return_value = None
-            else:
-                # 第三次查詢 (軟刪除記錄) 回傳有記錄
-                mock_deleted = MagicMock()
-                mock_deleted.name = "reserved-name"
-                mock_result.first.return_value = mock_deleted
-            return mock_result
-
-        mock_db.query.return_value.filter.return_value.filter.side_effect = filter_side_effect
+        # 模擬 INSERT 因軟刪除的同名記錄而未新增任何列
+        mock_db.scalars.return_value.one_or_none.return_value = None
+        mock_deleted = MagicMock(is_deleted=True, name_zh="保留的名稱")
+        mock_deleted.name = "reserved-name"
+        mock_db.execute.return_value.all.return_value = [mock_deleted]
 
         from app.schemas.project import ProjectCreate
 
@@ -673,9 +923,9 @@ class TestNameRelease:
         """
         mock_db = MagicMock()
 
-        # 模擬所有查詢都回傳 None (名稱可用)
-        mock_db.query.return_value.filter.return_value.filter.return_value.first.return_value = None
-        mock_db.query.return_value.filter.return_value.first.return_value = None
+        # 模擬 INSERT 成功新增 (名稱可用)，舊 bucket 已清除
+        mock_db.scalars.return_value.one_or_none.return_value = MagicMock()
+        mock_db.scalar.return_value = False
 
         from app.schemas.project import ProjectCreate
 
@@ -689,16 +939,42 @@ class TestNameRelease:
             service = ProjectService(mock_db)
 
             # 不應該拋出異常
-            # (實際建立會在 mock_db.add 中，這裡只測試檢查邏輯)
             try:
                 service.create_project(project_in)
-                # 驗證 db.add 被呼叫
-                mock_db.add.assert_called_once()
+                # 驗證單一 INSERT 後 commit
+                mock_db.scalars.assert_called_once()
+                mock_db.commit.assert_called_once()
             except HTTPException as e:
                 if "reserved" in str(e.detail).lower():
                     pytest.fail(f"Name should be available: {e.detail}")
 
 
+    def test_name_held_until_bucket_is_drained(self):
+        """
+        測試永久刪除後 bucket 仍在 outbox 等待清除時，名稱暫不釋放。
+
+        預期行為：
+        - 回傳 409，不 commit 也不建立 bucket
+        - 避免重試中的刪除工作清除新專案的物件
+        """
+        mock_db = MagicMock()
+        mock_db.scalars.return_value.one_or_none.return_value = MagicMock()
+        mock_db.scalar.return_value = True
+
+        from app.schemas.project import ProjectCreate
+
+        with patch("app.services.project_service.get_s3_client") as mock_s3:
+            from app.services.project_service import ProjectService
+
+            with pytest.raises(HTTPException) as exc_info:
+                ProjectService(mock_db).create_project(ProjectCreate(name="reef"))
+
+        assert exc_info.value.status_code == 409
+        mock_db.rollback.assert_called_once()
+        mock_db.commit.assert_not_called()
+        mock_s3.return_value.create_bucket.assert_not_called()
+
+
 class TestRecorderNameRelease:
     """測試 Recorder Hard Delete 後識別碼可重新使用。"""
 
@@ -713,7 +989,10 @@ class TestRecorderNameRelease:
         mock_db = MagicMock()
 
         # 模擬沒有活躍的同識別碼記錄，但有軟刪除的
-        mock_db.query.return_value.scalar.side_effect = [False, True]
+        mock_db.scalars.return_value.one_or_none.return_value = None
+        mock_db.execute.return_value.all.return_value = [
+            MagicMock(is_deleted=True, brand="SoundTrap", model="ST600", sn="SN12345")
+        ]
 
         from app.schemas.recorder import RecorderCreate
         from app.services.recorder_service import RecorderService
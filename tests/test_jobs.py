@@ -0,0 +1,543 @@
+"""
+背景工作佇列測試模組。
+
+包含：
+- 以 SKIP LOCKED 領取工作與每種類型的並行上限
+- 失敗重試、指數退避與不可重試的錯誤
+- 進度回報節流與取消
+- worker 執行流程與 /jobs API
+"""
+
+from datetime import UTC, datetime, timedelta
+from unittest.mock import MagicMock, patch
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Query, Session
+
+from app.core.config import settings
+from app.enums.enums import JobStatus
+from app.models.job import BackgroundJob
+from app.services.job_handlers import (
+    JOB_DEPLOYMENT_DELETE_AUDIOS,
+    JOB_LTSA_BUILD,
+    JOB_POINT_DELETE_AUDIOS,
+    JOB_PROJECT_DELETE_AUDIOS,
+)
+from app.services.job_service import (
+    JOB_HANDLERS,
+    Heartbeat,
+    JobCancelledError,
+    JobLostError,
+    JobProgress,
+    JobService,
+    job_handler,
+    retry_delay,
+)
+from app.worker import JobWorker
+
+
+def update_values(db) -> dict:
+    """最後一次 ``db.execute`` 的 UPDATE 綁定參數。"""
+    return db.execute.call_args.args[0].compile().params
+
+
+def make_job(**kwargs):
+    values = {
+        "id": 1,
+        "job_type": JOB_LTSA_BUILD,
+        "payload": {},
+        "status": JobStatus.QUEUED.value,
+        "priority": 0,
+        "attempts": 0,
+        "max_attempts": 3,
+        "progress_total": None,
+    }
+    return BackgroundJob(**{**values, **kwargs})
+
+
+@pytest.fixture
+def test_handler():
+    calls = []
+
+    @job_handler("test.echo", concurrency=1, max_attempts=2)
+    def echo(db, payload, progress):
+        calls.append(payload)
+        if payload.get("error"):
+            raise payload["error"]
+        progress(1, 1)
+        return {"echo": payload.get("value")}
+
+    yield calls
+    JOB_HANDLERS.pop("test.echo")
+
+
+class TestClaim:
+    def test_claim_query_skips_locked_rows(self):
+        captured = []
+
+        def fake_first(query):
+            captured.append(query.statement)
+            return None
+
+        with patch.object(Query, "first", autospec=True, side_effect=fake_first):
+            assert JobService(Session()).claim("w1", [JOB_LTSA_BUILD]) is None
+
+        sql = str(captured[0].compile(dialect=postgresql.dialect()))
+        assert "FOR UPDATE SKIP LOCKED" in sql
+        assert "background_job.run_after <= now()" in sql
+        assert "ORDER BY background_job.priority, background_job.run_after" in sql
+
+    def test_claim_marks_job_running(self, mock_db):
+        job = make_job()
+        query = mock_db.query.return_value.filter.return_value
+        candidates = query.order_by.return_value.limit.return_value
+        candidates.with_for_update.return_value.first.return_value = job
+        query.scalar.return_value = 0
+
+        claimed = JobService(mock_db).claim("w1")
+
+        assert claimed is job
+        assert job.status == JobStatus.RUNNING.value
+        assert job.attempts == 1
+        assert job.locked_by == "w1"
+        candidates.with_for_update.assert_called_once_with(skip_locked=True)
+        lock = mock_db.execute.call_args.args[0]
+        assert "pg_advisory_xact_lock" in str(lock)
+        mock_db.commit.assert_called_once()
+
+    def test_claim_skips_saturated_types(self, mock_db):
+        job = make_job()
+        query = mock_db.query.return_value.filter.return_value
+        candidates = query.order_by.return_value.limit.return_value
+        candidates.with_for_update.return_value.first.return_value = job
+        query.scalar.return_value = 1
+
+        with patch.object(settings, "job_concurrency", {JOB_LTSA_BUILD: 1}):
+            assert JobService(mock_db).claim("w1", [JOB_LTSA_BUILD]) is None
+
+        assert job.status == JobStatus.QUEUED.value
+        mock_db.commit.assert_not_called()
+        mock_db.rollback.assert_called()
+
+
+class TestRetry:
+    def test_backoff_is_exponential_and_capped(self):
+        with (
+            patch.object(settings, "job_retry_base_seconds", 10),
+            patch.object(settings, "job_retry_max_seconds", 60),
+        ):
+            delays = [retry_delay(n).total_seconds() for n in (1, 2, 3, 4)]
+        assert delays == [10, 20, 40, 60]
+
+    def test_failed_job_is_requeued_later(self, mock_db):
+        job = make_job(status=JobStatus.RUNNING.value, attempts=1)
+        before = datetime.now(UTC)
+
+        JobService(mock_db).fail(job, "w1", RuntimeError("MinIO timeout"))
+
+        values = update_values(mock_db)
+        assert values["status"] == JobStatus.QUEUED.value
+        assert values["run_after"] >= before + retry_delay(1)
+        assert values["last_error"] == "RuntimeError: MinIO timeout"
+        assert values["locked_by"] is None
+        assert "finished_at" not in values
+
+    @pytest.mark.parametrize(
+        "error, attempts",
+        [
+            (RuntimeError("boom"), 3),
+            (HTTPException(status_code=404, detail="Deployment not found"), 1),
+            (ValueError("bad payload"), 1),
+        ],
+    )
+    def test_exhausted_or_permanent_errors_fail(self, mock_db, error, attempts):
+        job = make_job(status=JobStatus.RUNNING.value, attempts=attempts)
+
+        JobService(mock_db).fail(job, "w1", error)
+
+        values = update_values(mock_db)
+        assert values["status"] == JobStatus.FAILED.value
+        assert values["finished_at"] is not None
+
+
+class TestFinish:
+    """
+    測試結束工作時只更新仍由自己執行的列。
+
+    預期行為：
+    - UPDATE 以 id、status = 'running' 與 locked_by 為條件
+    - 工作已被重新排隊或由其他 worker 領走時不覆寫，回傳 False
+    """
+
+    def test_complete_is_guarded_by_worker(self, mock_db):
+        mock_db.execute.return_value.rowcount = 1
+        job = make_job(status=JobStatus.RUNNING.value, attempts=1)
+
+        assert JobService(mock_db).complete(job, "w1", {"ok": True}) is True
+
+        sql = str(
+            mock_db.execute.call_args.args[0].compile(dialect=postgresql.dialect())
+        )
+        assert "background_job.status = %(status_1)s" in sql
+        assert "background_job.locked_by = %(locked_by_1)s" in sql
+        assert "progress_current=coalesce(" in sql
+        values = update_values(mock_db)
+        assert values["status_1"] == JobStatus.RUNNING.value
+        assert values["locked_by_1"] == "w1"
+        assert values["status"] == JobStatus.SUCCEEDED.value
+        mock_db.commit.assert_called_once()
+
+    def test_requeued_job_is_not_overwritten(self, mock_db):
+        mock_db.execute.return_value.rowcount = 0
+        job = make_job(status=JobStatus.RUNNING.value, attempts=1)
+        service = JobService(mock_db)
+
+        assert service.complete(job, "w1") is False
+        assert service.cancelled(job, "w1") is False
+        assert service.fail(job, "w1", RuntimeError("boom")) is False
+
+
+class TestEnqueue:
+    def test_duplicate_returns_active_job_with_higher_priority(self, mock_db):
+        existing = make_job(id=5, priority=10)
+        mock_db.query.return_value.filter.return_value.first.return_value = existing
+
+        job = JobService(mock_db).enqueue(
+            JOB_LTSA_BUILD, {"deployment_id": 1}, priority=0, dedup_key="1"
+        )
+
+        assert job is existing
+        assert existing.priority == 0
+        mock_db.add.assert_not_called()
+
+    def test_new_job_uses_handler_defaults(self, mock_db, test_handler):
+        job = JobService(mock_db).enqueue("test.echo", {"value": 1}, user_id=7)
+
+        assert job.max_attempts == 2
+        assert job.created_by == 7
+        assert job.status == JobStatus.QUEUED.value
+        mock_db.add.assert_called_once_with(job)
+
+    def test_unknown_job_type(self, mock_db):
+        with pytest.raises(ValueError):
+            JobService(mock_db).enqueue("no.such.job")
+
+    def test_enqueue_many_promotes_queued_and_skips_active(self, mock_db, test_handler):
+        mock_db.execute.return_value.rowcount = 1
+
+        changed = JobService(mock_db).enqueue_many(
+            "test.echo", {"1": {"value": 1}, "2": {"value": 2}}, user_id=7, priority=3
+        )
+
+        promote, insert = (
+            str(c.args[0].compile(dialect=postgresql.dialect()))
+            for c in mock_db.execute.call_args_list
+        )
+        assert "background_job.status = %(status_1)s" in promote
+        assert "background_job.priority > %(priority_1)s" in promote
+        assert insert.endswith("ON CONFLICT DO NOTHING")
+        rows = mock_db.execute.call_args_list[1].args[0].compile().params
+        assert rows["max_attempts_m1"] == 2
+        assert rows["created_by_m0"] == 7
+        assert changed == 2
+        mock_db.commit.assert_not_called()
+
+    def test_cancel_is_a_single_guarded_update(self, mock_db):
+        """
+        取消以 status 為條件的單一 UPDATE 完成，worker 同時領走時不會誤標。
+
+        - queued 轉為 cancelled，running 只設定 cancel_requested
+        - 已結束 (UPDATE 未命中) 時回傳 409
+        """
+        done = make_job(status=JobStatus.SUCCEEDED.value)
+        service = JobService(mock_db)
+
+        with patch.object(service, "get_job", return_value=make_job()):
+            service.cancel_job(1)
+        statement = str(
+            mock_db.execute.call_args.args[0].compile(dialect=postgresql.dialect())
+        )
+        mock_db.execute.return_value.scalar.return_value = None
+        with (
+            patch.object(service, "get_job", return_value=done),
+            pytest.raises(HTTPException) as exc,
+        ):
+            service.cancel_job(done.id)
+
+        assert "SET status=CASE WHEN (background_job.status = " in statement
+        assert "AND background_job.status IN (" in statement
+        assert "RETURNING background_job.id" in statement
+        assert exc.value.status_code == 409
+        assert "succeeded" in exc.value.detail
+
+    def test_cascade_jobs_cannot_be_cancelled(self, mock_db):
+        job = make_job(job_type=JOB_PROJECT_DELETE_AUDIOS)
+        service = JobService(mock_db)
+
+        with (
+            patch.object(service, "get_job", return_value=job),
+            pytest.raises(HTTPException) as exc,
+        ):
+            service.cancel_job(job.id)
+
+        assert exc.value.status_code == 409
+        mock_db.execute.assert_not_called()
+
+
+def test_requeue_stale_recovers_dead_workers():
+    db = Session()
+    with (
+        patch.object(db, "execute", return_value=MagicMock(rowcount=1)) as execute,
+        patch.object(db, "commit"),
+    ):
+        assert JobService(db).requeue_stale(60) == 2
+
+    requeue, fail = (
+        str(call.args[0].compile(dialect=postgresql.dialect()))
+        for call in execute.call_args_list
+    )
+    assert "background_job.heartbeat_at <" in requeue
+    assert "background_job.attempts < background_job.max_attempts" in requeue
+    assert "background_job.attempts <" not in fail
+
+
+def test_progress_is_throttled_and_checks_cancel():
+    now = [0.0]
+    db = MagicMock()
+    db.execute.return_value.scalar.return_value = False
+    progress = JobProgress(lambda: db, 1, min_interval=5.0, clock=lambda: now[0])
+
+    progress(1, 10)
+    progress(2, 10)
+    now[0] = 6.0
+    progress(3, 10)
+    progress(10, 10)
+    assert db.commit.call_count == 3
+
+    db.execute.return_value.scalar.return_value = True
+    now[0] = 20.0
+    with pytest.raises(JobCancelledError):
+        progress(4, 10)
+
+
+def test_progress_and_heartbeat_stop_once_job_is_lost():
+    db = MagicMock()
+    db.execute.return_value.scalar.return_value = None
+    db.execute.return_value.rowcount = 0
+
+    with pytest.raises(JobLostError):
+        JobProgress(lambda: db, 1, worker_id="w1")(1, 10)
+    sql = str(db.execute.call_args.args[0].compile(dialect=postgresql.dialect()))
+    assert "background_job.locked_by = %(locked_by_1)s" in sql
+
+    heartbeat = Heartbeat(lambda: db, 1, interval=0.001, worker_id="w1")
+    with heartbeat:
+        heartbeat._thread.join(timeout=5)
+    assert not heartbeat._thread.is_alive()
+
+
+class TestWorker:
+    def worker(self, db):
+        return JobWorker(
+            session_factory=lambda: db, worker_id="w1", heartbeat_interval=60
+        )
+
+    def test_success_stores_result(self, mock_db, test_handler):
+        mock_db.execute.return_value.scalar.return_value = False
+        job = make_job(job_type="test.echo", payload={"value": 3})
+        service = MagicMock()
+
+        self.worker(mock_db).execute(service, job)
+
+        assert test_handler == [{"value": 3}]
+        service.complete.assert_called_once_with(job, "w1", {"echo": 3})
+
+    def test_failure_is_recorded(self, mock_db, test_handler):
+        error = RuntimeError("boom")
+        job = make_job(job_type="test.echo", payload={"error": error})
+        service = MagicMock()
+
+        self.worker(mock_db).execute(service, job)
+
+        service.fail.assert_called_once_with(job, "w1", error)
+        mock_db.rollback.assert_called()
+
+    def test_cancel_request_stops_job(self, mock_db, test_handler):
+        mock_db.execute.return_value.scalar.return_value = True
+        job = make_job(job_type="test.echo")
+        service = MagicMock()
+
+        self.worker(mock_db).execute(service, job)
+
+        service.cancelled.assert_called_once_with(job, "w1")
+        service.complete.assert_not_called()
+
+    def test_requeued_job_is_abandoned(self, mock_db, test_handler):
+        """進度回報發現工作已不屬於此 worker 時中止，且不寫入任何結果。"""
+        mock_db.execute.return_value.scalar.return_value = None
+        job = make_job(job_type="test.echo")
+        service = MagicMock()
+
+        self.worker(mock_db).execute(service, job)
+
+        service.complete.assert_not_called()
+        service.fail.assert_not_called()
+        service.cancelled.assert_not_called()
+
+    def test_run_once_returns_false_when_idle(self, mock_db):
+        service = MagicMock()
+        service.claim.return_value = None
+
+        assert self.worker(mock_db).run_once(service) is False
+
+
+class TestJobsApi:
+    def test_owner_and_admin_can_read_job(self, client, mock_current_user):
+        job = make_job(
+            id=3,
+            created_by=2,
+            status=JobStatus.RUNNING.value,
+            progress_current=5,
+            progress_total=10,
+            cancel_requested=False,
+            created_at=datetime(2024, 6, 1, tzinfo=UTC),
+        )
+        url = f"{settings.api_prefix}/jobs/3"
+        with patch("app.api.v1.endpoints.api_jobs.JobService") as service:
+            service.return_value.get_job.return_value = job
+            as_admin = client.get(url)
+            mock_current_user.role = "user"
+            as_other = client.get(url)
+            mock_current_user.id = 2
+            as_owner = client.get(url)
+
+        assert as_admin.status_code == 200
+        assert as_admin.json()["progress_current"] == 5
+        assert as_admin.json()["created_at"] == "2024-06-01T08:00:00+08:00"
+        assert as_other.status_code == 404
+        assert as_owner.status_code == 200
+
+    def test_users_only_list_their_jobs(self, client, mock_current_user):
+        mock_current_user.role = "user"
+        with patch("app.api.v1.endpoints.api_jobs.JobService") as service:
+            service.return_value.get_jobs.return_value = []
+            response = client.get(
+                f"{settings.api_prefix}/jobs/", params={"status": "failed"}
+            )
+
+        assert response.status_code == 200
+        kwargs = service.return_value.get_jobs.call_args.kwargs
+        assert kwargs["user_id"] == 1
+        assert kwargs["job_status"] == JobStatus.FAILED
+
+    def test_delete_project_enqueues_cascade(self, client, mock_db):
+        deleted_at = datetime(2024, 6, 1, tzinfo=UTC) + timedelta(hours=1)
+        with (
+            patch("app.api.v1.endpoints.api_projects.ProjectService") as projects,
+            patch("app.api.v1.endpoints.api_projects.JobService") as jobs,
+        ):
+            project = projects.return_value.delete_project.return_value
+            project.configure_mock(
+                id=1,
+                name="test-project",
+                name_zh=None,
+                area=None,
+                description=None,
+                start_time=None,
+                end_time=None,
+                is_finished=False,
+                owner=None,
+                contractor=None,
+                contact_name=None,
+                contact_phone=None,
+                contact_email=None,
+                deleted_at=deleted_at,
+                deletion_batch_id="b" * 32,
+            )
+            jobs.return_value.enqueue.return_value.id = 12
+            response = client.delete(f"{settings.api_prefix}/projects/1")
+
+        assert response.headers["x-job-id"] == "12"
+        job_type, payload = jobs.return_value.enqueue.call_args.args
+        assert job_type == JOB_PROJECT_DELETE_AUDIOS
+        assert payload == {
+            "project_id": 1,
+            "user_id": 1,
+            "deleted_at": deleted_at.isoformat(),
+            "deletion_batch_id": "b" * 32,
+        }
+        # 軟刪除與 cascade 工作在同一個交易提交
+        assert jobs.return_value.enqueue.call_args.kwargs["commit"] is False
+        mock_db.commit.assert_called_once()
+
+    def test_delete_point_enqueues_cascade(self, client):
+        deleted_at = datetime(2024, 6, 1, tzinfo=UTC)
+        with (
+            patch("app.api.v1.endpoints.api_points.PointService") as points,
+            patch("app.api.v1.endpoints.api_points.JobService") as jobs,
+        ):
+            point = points.return_value.delete_point.return_value
+            point.configure_mock(
+                id=4,
+                project_id=1,
+                name="test-point",
+                name_zh=None,
+                gps_lat_plan=23.5,
+                gps_lon_plan=121.5,
+                depth_plan=None,
+                description=None,
+                deleted_at=deleted_at,
+            )
+            jobs.return_value.enqueue.return_value.id = 13
+            response = client.delete(f"{settings.api_prefix}/points/4")
+
+        assert response.headers["x-job-id"] == "13"
+        job_type, payload = jobs.return_value.enqueue.call_args.args
+        assert job_type == JOB_POINT_DELETE_AUDIOS
+        assert payload["point_id"] == 4
+        assert payload["deleted_at"] == deleted_at.isoformat()
+
+    def test_delete_deployment_enqueues_cascade(self, client, mock_db):
+        deleted_at = datetime(2024, 6, 1, tzinfo=UTC)
+        with (
+            patch("app.api.v1.endpoints.api_deployments.DeploymentService") as svc,
+            patch("app.api.v1.endpoints.api_deployments.JobService") as jobs,
+        ):
+            deployment = svc.return_value.delete_deployment.return_value
+            deployment.configure_mock(
+                id=2,
+                point_id=1,
+                recorder_id=1,
+                phase=1,
+                start_time=None,
+                end_time=None,
+                deploy_time=None,
+                return_time=None,
+                gps_lat_exe=None,
+                gps_lon_exe=None,
+                depth_exe=None,
+                fs=None,
+                sensitivity=None,
+                gain=None,
+                status="test",
+                description=None,
+                created_at=deleted_at,
+                updated_at=deleted_at,
+                is_deleted=True,
+                deleted_at=deleted_at,
+                deleted_by=1,
+                deletion_batch_id="d" * 32,
+            )
+            jobs.return_value.enqueue.return_value.id = 14
+            response = client.delete(f"{settings.api_prefix}/deployments/2")
+
+        assert response.status_code == 200
+        assert response.headers["x-job-id"] == "14"
+        job_type, payload = jobs.return_value.enqueue.call_args.args
+        assert job_type == JOB_DEPLOYMENT_DELETE_AUDIOS
+        assert payload["deployment_id"] == 2
+        assert payload["deletion_batch_id"] == "d" * 32
+        assert jobs.return_value.enqueue.call_args.kwargs["commit"] is False
+        mock_db.commit.assert_called_once()
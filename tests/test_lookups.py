@@ -0,0 +1,34 @@
+"""
+快取查詢語句測試模組。
+
+包含：
+- lambda_stmt 的快取鍵不隨查詢值改變，不同 model 各自快取
+- 查詢值以 bind 參數帶入
+
+所有測試只編譯 SQL，不連接真實資料庫。
+"""
+
+from sqlalchemy.dialects import postgresql
+
+from app.db.lookups import active_by_id, user_by_email
+from app.models.audio import AudioInfo
+from app.models.point import PointInfo
+
+
+def test_active_by_id_reuses_cache_key():
+    first = active_by_id(AudioInfo, 1)._generate_cache_key()
+    second = active_by_id(AudioInfo, 2)._generate_cache_key()
+    point = active_by_id(PointInfo, 1)._generate_cache_key()
+
+    assert first.key == second.key
+    assert [b.value for b in second.bindparams] == [2]
+    assert point.key != first.key
+
+
+def test_statements_render_expected_sql():
+    audio = str(active_by_id(AudioInfo, 5).compile(dialect=postgresql.dialect()))
+    user = str(user_by_email("a@b.c").compile(dialect=postgresql.dialect()))
+
+    assert "FROM audio_info" in audio
+    assert "audio_info.id = %(obj_id_1)s AND audio_info.is_deleted IS false" in audio
+    assert "user_info.email = %(email_1)s" in user
@@ -0,0 +1,181 @@
+"""
+LTSA (Long-term spectral average) 測試模組。
+
+包含：
+- WAV 檔頭解析與 PCM 串流解碼
+- LTSA 金字塔寫入邏輯
+- 以 moto 模擬 MinIO 的建置與視窗查詢
+- API 的 JSON / float16 回應格式
+"""
+
+from datetime import UTC, datetime, timedelta
+from unittest.mock import MagicMock, patch
+
+import boto3
+import numpy as np
+import pytest
+from audio_helpers import make_wav, tone
+from fastapi import HTTPException
+from moto import mock_aws
+
+from app.core.config import settings
+from app.services.ltsa_service import LtsaPyramidWriter, LtsaService
+from app.utils.wav_utils import iter_pcm_blocks, parse_wav_header, pcm_to_float
+
+
+class TestWavUtils:
+    def test_parse_header_and_decode(self):
+        samples = np.stack([tone(100, 8000, 0.1), -tone(100, 8000, 0.1)], axis=1)
+        data = make_wav(samples, 8000)
+
+        header = parse_wav_header(data)
+
+        assert header.fs == 8000
+        assert header.channels == 2
+        assert header.bits_per_sample == 16
+        assert header.num_frames == 800
+        decoded = pcm_to_float(data[header.data_offset :], header)
+        np.testing.assert_allclose(decoded, samples, atol=1e-4)
+
+    def test_iter_pcm_blocks_handles_split_frames(self):
+        samples = tone(50, 1000, 1.0)
+        data = make_wav(samples, 1000)
+        header = parse_wav_header(data)
+        payload = data[header.data_offset :]
+        # 以奇數長度切分，確保 frame 被切斷時仍能正確組回
+        chunks = [payload[i : i + 7] for i in range(0, len(payload), 7)]
+
+        blocks = list(iter_pcm_blocks(chunks, header, 300))
+
+        assert [len(b) for b in blocks] == [300, 300, 300, 100]
+        np.testing.assert_allclose(np.concatenate(blocks)[:, 0], samples, atol=1e-4)
+
+
+class TestLtsaPyramidWriter:
+    def test_levels_average_bins(self):
+        written = {}
+        writer = LtsaPyramidWriter(
+            2, 3, lambda lv, t, d: written.__setitem__((lv, t), d), tile_bins=4
+        )
+
+        bins = np.repeat(np.arange(8), 2)
+        power = np.ones((16, 3))
+        power[bins >= 4] = 100.0
+        writer.add(bins, power)
+        writer.close()
+
+        assert set(written) == {(0, 0), (0, 1), (1, 0)}
+        np.testing.assert_allclose(written[(0, 0)].astype(float), 0.0)
+        np.testing.assert_allclose(written[(0, 1)].astype(float), 20.0)
+        # level 1 每個 bin 合併 level 0 的兩個 bin
+        level1 = written[(1, 0)].astype(float)
+        np.testing.assert_allclose(level1[:2], 0.0)
+        np.testing.assert_allclose(level1[2:], 20.0)
+
+    def test_late_frames_are_dropped(self):
+        written = {}
+        writer = LtsaPyramidWriter(
+            1, 2, lambda lv, t, d: written.__setitem__((lv, t), d), tile_bins=4
+        )
+
+        writer.add(np.array([5]), np.ones((1, 2)))
+        writer.add(np.array([1]), np.ones((1, 2)))
+        writer.close()
+
+        assert writer.dropped_frames == 1
+        assert set(written) == {(0, 1)}
+
+
+@mock_aws
+def test_build_and_query_ltsa(mock_db, aws_credentials):
+    fs = 8000
+    s3 = boto3.client("s3", region_name="us-east-1")
+    s3.create_bucket(Bucket="proj")
+    t0 = datetime(2024, 6, 11, 13, 0, tzinfo=UTC)
+    audios = []
+    for i, freq in enumerate([1000, 2000]):
+        key = f"P1/2024/06/Raw_Data/{i}.wav"
+        s3.put_object(Bucket="proj", Key=key, Body=make_wav(tone(freq, fs, 4), fs))
+        row = MagicMock(object_key=key, record_time=t0 + timedelta(seconds=4 * i))
+        row.file_size = None
+        audios.append(row)
+
+    query = mock_db.query.return_value.filter.return_value
+    query.one.return_value = (audios[0].record_time, audios[1].record_time, 4.0)
+    query.order_by.return_value.all.return_value = audios
+
+    deployment = MagicMock(fs=fs)
+    deployment.point.project.name = "proj"
+    with patch("app.services.ltsa_service.DeploymentService") as MockService:
+        MockService.return_value.get_deployment_details.return_value = deployment
+        service = LtsaService(mock_db, s3_client=s3)
+
+        manifest = service.build_ltsa(1, bin_seconds=1.0, nfft=256)
+        window = service.get_window(1, t0, t0 + timedelta(seconds=8))
+
+    assert manifest["files_processed"] == 2
+    assert manifest["n_bins"] == 8
+    assert window["level"] == 0
+    assert window["data"].shape == (8, 129)
+    peaks = np.argmax(window["data"].astype(float), axis=1) * window["freq_step"]
+    assert list(peaks[:4]) == [1000.0] * 4
+    assert list(peaks[4:]) == [2000.0] * 4
+
+
+def test_frequency_crop_needs_sample_rate(mock_db):
+    """建置時沒有取樣率 (freq_step 為 None) 的 LTSA 不能以 fmin / fmax 裁切。"""
+    service = LtsaService(mock_db, s3_client=MagicMock())
+    t0 = datetime(2024, 6, 11, 13, 0, tzinfo=UTC)
+
+    with (
+        patch.object(service, "_bucket", return_value="proj"),
+        patch.object(service, "get_manifest", return_value={"freq_step": None}),
+        pytest.raises(HTTPException) as exc,
+    ):
+        service.get_window(1, t0, t0 + timedelta(seconds=8), fmin=1000)
+
+    assert exc.value.status_code == 409
+
+
+def test_get_ltsa_window_formats(client):
+    window = {
+        "deployment_id": 1,
+        "level": 0,
+        "start_time": datetime(2024, 6, 11, tzinfo=UTC),
+        "bin_seconds": 60.0,
+        "freq_min": 0.0,
+        "freq_step": 10.0,
+        "n_time": 2,
+        "n_freq": 2,
+        "data": np.array([[1.0, np.nan], [2.0, 3.0]], dtype=np.float16),
+    }
+    url = f"{settings.api_prefix}/deployments/1/ltsa"
+    params = {"start": "2024-06-11T00:00:00", "end": "2024-06-11T00:02:00"}
+
+    with patch("app.api.v1.endpoints.api_deployments.LtsaService") as MockService:
+        MockService.return_value.get_window.side_effect = lambda *a, **k: dict(window)
+
+        response = client.get(url, params=params)
+        assert response.status_code == 200
+        assert response.json()["data"] == [[1.0, None], [2.0, 3.0]]
+
+        response = client.get(url, params={**params, "format": "f16"})
+        assert response.status_code == 200
+        assert response.headers["x-ltsa-n-time"] == "2"
+        assert len(response.content) == 4 * 2
+
+
+def test_build_ltsa_is_scheduled(client):
+    with (
+        patch("app.api.v1.endpoints.api_deployments.DeploymentService"),
+        patch("app.api.v1.endpoints.api_deployments.JobService") as jobs,
+    ):
+        jobs.return_value.enqueue.return_value.id = 4
+        response = client.post(f"{settings.api_prefix}/deployments/1/ltsa")
+
+    assert response.status_code == 202
+    assert response.json()["job_id"] == 4
+    assert jobs.return_value.enqueue.call_args.args == (
+        "ltsa.build",
+        {"deployment_id": 1, "bin_seconds": 60.0, "nfft": 2048},
+    )
@@ -0,0 +1,163 @@
+"""
+不停機遷移 helper 測試模組。
+
+包含：
+- CONCURRENTLY 建立索引 (一般表與分區表)、清除中斷留下的 invalid 索引
+- 分批 backfill 的範圍切分、進度與限速
+- online revision 標記檢查
+
+所有測試以 mock 取代 alembic 的 op，不連接真實資料庫。
+"""
+
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app.db import migrations
+
+
+@pytest.fixture
+def op():
+    with patch.object(migrations, "op") as mock_op:
+        yield mock_op
+
+
+def executed(op) -> list[str]:
+    return [str(call.args[0]) for call in op.execute.call_args_list]
+
+
+def test_online_step_runs_in_autocommit_block(op):
+    """測試 online_step 在 autocommit 區塊中設定並還原 lock_timeout。"""
+    with migrations.online_step("step", lock_timeout="2s"):
+        op.execute("SELECT 1")
+
+    op.get_context.return_value.autocommit_block.assert_called_once()
+    assert executed(op) == [
+        "SET lock_timeout = '2s'",
+        "SELECT 1",
+        "RESET lock_timeout",
+    ]
+
+
+def test_create_index_concurrently_plain_table(op):
+    """
+    測試一般表建立索引。
+
+    預期行為：
+    - 先刪除前次中斷留下的 invalid 索引
+    - 以 CONCURRENTLY IF NOT EXISTS 建立
+    """
+    bind = op.get_bind.return_value
+    bind.scalars.return_value = []
+    bind.execute.return_value.first.return_value = (1,)
+
+    migrations.create_index_concurrently(
+        "ix_point_name", "point_info", ["name"], where="is_deleted = false"
+    )
+
+    statements = executed(op)
+    assert "DROP INDEX CONCURRENTLY IF EXISTS ix_point_name" in statements
+    assert (
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_point_name ON point_info (name) "
+        "WHERE is_deleted = false"
+    ) in statements
+
+
+def test_create_index_concurrently_partitioned_table(op):
+    """
+    測試分區表建立索引。
+
+    預期行為：
+    - 父表以 ON ONLY 建立，各分區 CONCURRENTLY 建立後 attach 到父表索引
+    """
+    bind = op.get_bind.return_value
+    bind.scalars.return_value = ["audio_info_default", "audio_info_p2024"]
+    bind.execute.return_value.first.return_value = None
+
+    migrations.create_index_concurrently(
+        "ix_audio_info_sr", "audio_info", ["sr"], unique=False
+    )
+
+    statements = executed(op)
+    assert "CREATE INDEX IF NOT EXISTS ix_audio_info_sr ON ONLY audio_info (sr)" in (
+        statements
+    )
+    assert (
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS audio_info_p2024_audio_info_sr "
+        "ON audio_info_p2024 (sr)"
+    ) in statements
+    assert (
+        "ALTER INDEX ix_audio_info_sr ATTACH PARTITION audio_info_p2024_audio_info_sr"
+    ) in statements
+    assert not any(s.startswith("DROP") for s in statements)
+
+
+def test_drop_partitioned_index_without_concurrently(op):
+    """測試分區表的索引不能 CONCURRENTLY 刪除，改用一般 DROP。"""
+    op.get_bind.return_value.execute.return_value.first.return_value = (1,)
+
+    migrations.drop_index_concurrently("ix_audio_info_sr")
+
+    assert "DROP INDEX IF EXISTS ix_audio_info_sr" in executed(op)
+
+
+def test_backfill_batches_and_throttles(op):
+    """
+    測試分批 backfill。
+
+    預期行為：
+    - 依 id 範圍切批並帶入 where 條件
+    - 每批回報進度，依實際更新列數限速
+    """
+    bind = op.get_bind.return_value
+    bounds = MagicMock()
+    bounds.one.return_value = (1, 25)
+    batches = [MagicMock(rowcount=n) for n in (10, 0, 5)]
+    bind.execute.side_effect = [bounds, *batches]
+    progress = []
+
+    with patch.object(migrations, "TokenBucket") as MockBucket:
+        updated = migrations.backfill(
+            "audio_info",
+            "sr = :sr",
+            where="sr IS NULL",
+            batch_size=10,
+            rows_per_second=100,
+            progress=lambda *args: progress.append(args),
+            params={"sr": 48000},
+        )
+
+    assert updated == 15
+    updates = bind.execute.call_args_list[1:]
+    assert "WHERE id >= :batch_start AND id < :batch_end AND (sr IS NULL)" in str(
+        updates[0].args[0]
+    )
+    assert [call.args[1]["batch_start"] for call in updates] == [1, 11, 21]
+    assert updates[0].args[1]["sr"] == 48000
+    assert progress == [(10, 25, 10), (20, 25, 10), (25, 25, 15)]
+    MockBucket.assert_called_once_with(100)
+    assert [c.args[0] for c in MockBucket.return_value.acquire.call_args_list] == [
+        10,
+        5,
+    ]
+
+
+def test_backfill_empty_table(op):
+    bounds = MagicMock()
+    bounds.one.return_value = (None, None)
+    op.get_bind.return_value.execute.return_value = bounds
+
+    assert migrations.backfill("audio_info", "sr = 1", rows_per_second=0) == 0
+    assert op.get_bind.return_value.execute.call_count == 1
+
+
+def test_offline_revisions():
+    """測試只列出沒有標記 online = True 的 revision。"""
+    revisions = [
+        SimpleNamespace(revision="a", module=SimpleNamespace(online=True)),
+        SimpleNamespace(revision="b", module=SimpleNamespace()),
+        SimpleNamespace(revision="c", module=SimpleNamespace(online=False)),
+    ]
+
+    assert migrations.offline_revisions(revisions) == ["b", "c"]
@@ -0,0 +1,200 @@
+"""
+Google OAuth 對本機 stub server 的整合測試。
+
+包含：
+- 以共用的 keep-alive 連線呼叫 token / JWKS 端點
+- 在本機以快取的 JWKS 驗證 id_token，不再呼叫 userinfo
+- id_token 缺少 email、簽章金鑰無法取得時改用 userinfo
+- 金鑰輪替時重新下載 JWKS
+
+stub server 以 http.server 在本機隨機埠執行，不連線到 Google。
+"""
+
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import MagicMock
+
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from fastapi import HTTPException
+from jose import jwk, jwt
+from jose.utils import calculate_at_hash
+
+from app.services import oauth_service
+from app.services.oauth_service import OAuthService
+
+CLIENT_ID = "client-id.apps.googleusercontent.com"
+ACCESS_TOKEN = "stub-access-token"
+
+
+def make_key(kid: str) -> tuple[str, dict]:
+    private = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = private.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    ).decode()
+    public = jwk.construct(
+        private.public_key().public_bytes(
+            serialization.Encoding.PEM,
+            serialization.PublicFormat.SubjectPublicKeyInfo,
+        ),
+        "RS256",
+    ).to_dict()
+    public.update({"kid": kid, "alg": "RS256", "use": "sig"})
+    return pem, public
+
+
+class GoogleStub:
+    """Token / JWKS / userinfo 端點，記錄每個請求的路徑與用戶端連線埠。"""
+
+    def __init__(self):
+        self.kid = "key-1"
+        self.private_pem, self.public_jwk = make_key(self.kid)
+        self.jwks_status = 200
+        self.claims = {"sub": "google-sub", "email": "user@example.com", "name": "U"}
+        self.audience = CLIENT_ID
+        self.requests: list[str] = []
+        self.ports: set[int] = set()
+
+    def id_token(self) -> str:
+        now = int(time.time())
+        claims = {
+            **self.claims,
+            "iss": "https://accounts.google.com",
+            "aud": self.audience,
+            "iat": now,
+            "exp": now + 3600,
+            "at_hash": calculate_at_hash(ACCESS_TOKEN, hashlib.sha256),
+        }
+        return jwt.encode(
+            claims, self.private_pem, algorithm="RS256", headers={"kid": self.kid}
+        )
+
+    def rotate(self) -> None:
+        self.kid = "key-2"
+        self.private_pem, self.public_jwk = make_key(self.kid)
+
+    def handle(self, handler: BaseHTTPRequestHandler) -> tuple[int, dict, dict]:
+        self.requests.append(handler.path)
+        self.ports.add(handler.client_address[1])
+        if handler.path == "/token":
+            length = int(handler.headers.get("Content-Length", 0))
+            handler.rfile.read(length)
+            body = {"access_token": ACCESS_TOKEN, "id_token": self.id_token()}
+            return 200, {}, body
+        if handler.path == "/certs":
+            headers = {"Cache-Control": "public, max-age=3600"}
+            return self.jwks_status, headers, {"keys": [self.public_jwk]}
+        if handler.path == "/userinfo":
+            return 200, {}, {"sub": "google-sub", "email": "info@example.com"}
+        return 404, {}, {}
+
+
+@pytest.fixture
+def google(monkeypatch):
+    stub = GoogleStub()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _respond(self):
+            code, headers, body = stub.handle(self)
+            data = json.dumps(body).encode()
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        do_GET = do_POST = _respond  # noqa: N815
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    settings = oauth_service.settings
+    monkeypatch.setattr(settings, "google_oauth_client_id", CLIENT_ID)
+    monkeypatch.setattr(settings, "google_oauth_client_secret", "secret")
+    monkeypatch.setattr(settings, "google_oauth_token_url", f"{base}/token")
+    monkeypatch.setattr(settings, "google_oauth_jwks_url", f"{base}/certs")
+    monkeypatch.setattr(settings, "google_oauth_userinfo_url", f"{base}/userinfo")
+    oauth_service.google_keys.clear()
+    oauth_service.http_session.close()
+    yield stub
+    oauth_service.http_session.close()
+    oauth_service.google_keys.clear()
+    server.shutdown()
+    server.server_close()
+
+
+def new_service() -> OAuthService:
+    db = MagicMock()
+    db.query.return_value.filter.return_value.first.return_value = None
+    return OAuthService(db)
+
+
+def test_login_verifies_id_token_locally(google):
+    """
+    測試以 id_token 登入。
+
+    預期行為：
+    - 不呼叫 userinfo，JWKS 依 max-age 快取只下載一次
+    - 兩次登入共用同一條 keep-alive 連線
+    """
+    for _ in range(2):
+        user, is_new = new_service().authenticate_with_google("code")
+        assert is_new is True
+        assert user.email == "user@example.com"
+        assert user.oauth_sub == "google-sub"
+
+    assert google.requests == ["/token", "/certs", "/token"]
+    assert len(google.ports) == 1
+
+
+def test_id_token_without_email_uses_userinfo(google):
+    del google.claims["email"]
+
+    user, _ = new_service().authenticate_with_google("code")
+
+    assert user.email == "info@example.com"
+    assert google.requests == ["/token", "/certs", "/userinfo"]
+
+
+def test_unavailable_jwks_falls_back_to_userinfo(google):
+    google.jwks_status = 503
+
+    user, _ = new_service().authenticate_with_google("code")
+
+    assert user.email == "info@example.com"
+    assert google.requests == ["/token", "/certs", "/userinfo"]
+
+
+def test_rotated_key_refreshes_jwks(google):
+    new_service().authenticate_with_google("code")
+    google.rotate()
+
+    user, _ = new_service().authenticate_with_google("code")
+
+    assert user.email == "user@example.com"
+    assert google.requests == ["/token", "/certs", "/token", "/certs"]
+
+
+def test_id_token_for_other_client_is_rejected(google):
+    google.audience = "someone-else.apps.googleusercontent.com"
+
+    with pytest.raises(HTTPException) as exc_info:
+        new_service().authenticate_with_google("code")
+
+    assert exc_info.value.status_code == 401
+    assert exc_info.value.detail == "Invalid ID token from Google"
+    assert "/userinfo" not in google.requests
@@ -68,7 +68,7 @@ class TestExchangeCodeForTokens:
             mock_settings.google_oauth_client_secret = "client_secret"
             mock_settings.google_oauth_redirect_uri = "http://localhost/callback"
 
-            with patch("app.services.oauth_service.requests.post") as mock_post:
+            with patch("app.services.oauth_service.http_session.post") as mock_post:
                 mock_response = MagicMock()
                 mock_response.status_code = 200
                 mock_response.json.return_value = {
@@ -91,7 +91,7 @@ class TestExchangeCodeForTokens:
             mock_settings.google_oauth_client_secret = "client_secret"
             mock_settings.google_oauth_redirect_uri = "http://localhost/callback"
 
-            with patch("app.services.oauth_service.requests.post") as mock_post:
+            with patch("app.services.oauth_service.http_session.post") as mock_post:
                 mock_response = MagicMock()
                 mock_response.status_code = 400
                 mock_post.return_value = mock_response
@@ -136,13 +136,13 @@ class TestAuthenticateWithGoogle:
         with patch("app.services.oauth_service.settings") as mock_settings:
             self._setup_oauth_mocks(mock_settings)
 
-            with patch("app.services.oauth_service.requests.post") as mock_post:
+            with patch("app.services.oauth_service.http_session.post") as mock_post:
                 mock_response = MagicMock()
                 mock_response.status_code = 200
                 mock_response.json.return_value = {"access_token": "token123"}
                 mock_post.return_value = mock_response
 
-                with patch("app.services.oauth_service.requests.get") as mock_get:
+                with patch("app.services.oauth_service.http_session.get") as mock_get:
                     mock_user_response = MagicMock()
                     mock_user_response.status_code = 200
                     mock_user_response.json.return_value = {
@@ -172,13 +172,13 @@ class TestAuthenticateWithGoogle:
         with patch("app.services.oauth_service.settings") as mock_settings:
             self._setup_oauth_mocks(mock_settings)
 
-            with patch("app.services.oauth_service.requests.post") as mock_post:
+            with patch("app.services.oauth_service.http_session.post") as mock_post:
                 mock_response = MagicMock()
                 mock_response.status_code = 200
                 mock_response.json.return_value = {"access_token": "token123"}
                 mock_post.return_value = mock_response
 
-                with patch("app.services.oauth_service.requests.get") as mock_get:
+                with patch("app.services.oauth_service.http_session.get") as mock_get:
                     mock_user_response = MagicMock()
                     mock_user_response.status_code = 200
                     mock_user_response.json.return_value = {
@@ -211,13 +211,13 @@ class TestAuthenticateWithGoogle:
         with patch("app.services.oauth_service.settings") as mock_settings:
             self._setup_oauth_mocks(mock_settings)
 
-            with patch("app.services.oauth_service.requests.post") as mock_post:
+            with patch("app.services.oauth_service.http_session.post") as mock_post:
                 mock_response = MagicMock()
                 mock_response.status_code = 200
                 mock_response.json.return_value = {"access_token": "token123"}
                 mock_post.return_value = mock_response
 
-                with patch("app.services.oauth_service.requests.get") as mock_get:
+                with patch("app.services.oauth_service.http_session.get") as mock_get:
                     mock_user_response = MagicMock()
                     mock_user_response.status_code = 200
                     mock_user_response.json.return_value = {
@@ -249,13 +249,13 @@ class TestAuthenticateWithGoogle:
         with patch("app.services.oauth_service.settings") as mock_settings:
             self._setup_oauth_mocks(mock_settings)
 
-            with patch("app.services.oauth_service.requests.post") as mock_post:
+            with patch("app.services.oauth_service.http_session.post") as mock_post:
                 mock_response = MagicMock()
                 mock_response.status_code = 200
                 mock_response.json.return_value = {"access_token": "token123"}
                 mock_post.return_value = mock_response
 
-                with patch("app.services.oauth_service.requests.get") as mock_get:
+                with patch("app.services.oauth_service.http_session.get") as mock_get:
                     mock_user_response = MagicMock()
                     mock_user_response.status_code = 200
                     mock_user_response.json.return_value = {
@@ -291,13 +291,13 @@ class TestLinkGoogleAccount:
             mock_settings.google_oauth_client_secret = "client_secret"
             mock_settings.google_oauth_redirect_uri = "http://localhost/callback"
 
-            with patch("app.services.oauth_service.requests.post") as mock_post:
+            with patch("app.services.oauth_service.http_session.post") as mock_post:
                 mock_response = MagicMock()
                 mock_response.status_code = 200
                 mock_response.json.return_value = {"access_token": "token123"}
                 mock_post.return_value = mock_response
 
-                with patch("app.services.oauth_service.requests.get") as mock_get:
+                with patch("app.services.oauth_service.http_session.get") as mock_get:
                     mock_user_response = MagicMock()
                     mock_user_response.status_code = 200
                     mock_user_response.json.return_value = {
@@ -343,13 +343,13 @@ class TestLinkGoogleAccount:
             mock_settings.google_oauth_client_secret = "client_secret"
             mock_settings.google_oauth_redirect_uri = "http://localhost/callback"
 
-            with patch("app.services.oauth_service.requests.post") as mock_post:
+            with patch("app.services.oauth_service.http_session.post") as mock_post:
                 mock_response = MagicMock()
                 mock_response.status_code = 200
                 mock_response.json.return_value = {"access_token": "token123"}
                 mock_post.return_value = mock_response
 
-                with patch("app.services.oauth_service.requests.get") as mock_get:
+                with patch("app.services.oauth_service.http_session.get") as mock_get:
                     mock_user_response = MagicMock()
                     mock_user_response.status_code = 200
                     mock_user_response.json.return_value = {
@@ -0,0 +1,271 @@
+"""
+audio_info 分區維護測試模組。
+
+包含：
+- 分區命名與範圍計算 (month / year)
+- 建立未來分區、搬移預設分區中的列
+- detach 舊分區到封存 schema
+- AudioService 依 record_time 篩選以利 partition pruning
+
+所有測試使用 mock 的 Session，不連接真實資料庫。
+"""
+
+from datetime import UTC, datetime
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.dialects import postgresql
+
+from app.core.config import settings
+from app.db.partitions import (
+    create_partition_sql,
+    partition_name,
+    partition_ranges,
+    period_start,
+)
+from app.models.audio import AudioInfo
+from app.models.detection import DetectionInfo
+from app.services.audio_service import AudioService
+from app.services.partition_service import AudioPartitionService
+
+
+def utc(*args) -> datetime:
+    return datetime(*args, tzinfo=UTC)
+
+
+def partition_row(name, start=None, end=None, rows=1000):
+    bound = f"FOR VALUES FROM ('{start}') TO ('{end}')" if start else "DEFAULT"
+    return SimpleNamespace(name=name, bound=bound, rows=rows, bytes=8192)
+
+
+def make_db(partitions, stranded=False):
+    """依 SQL 內容回傳分區列表或預設分區是否有落在範圍內的列。"""
+    db = MagicMock()
+    executed = []
+
+    def execute(statement, params=None):
+        sql = str(statement)
+        executed.append(sql)
+        result = MagicMock()
+        if "pg_inherits" in sql:
+            result.__iter__.return_value = iter(partitions)
+        result.scalar.return_value = stranded
+        return result
+
+    db.execute.side_effect = execute
+    return db, executed
+
+
+class TestPartitionRanges:
+    @pytest.mark.parametrize(
+        ("interval", "expected_name", "expected_start"),
+        [
+            ("month", "audio_info_p2024_06", utc(2024, 6, 1)),
+            ("year", "audio_info_p2024", utc(2024, 1, 1)),
+        ],
+    )
+    def test_period_start_and_name(self, interval, expected_name, expected_start):
+        """測試分區起點以 UTC 計算，名稱依區間格式化。"""
+        # 台灣時間 6/30 23:00 為 UTC 6/30 15:00
+        value = datetime.fromisoformat("2024-06-30T23:00:00+08:00")
+
+        start = period_start(value, interval)
+
+        assert start == expected_start
+        assert partition_name(start, interval) == expected_name
+
+    def test_ranges_cover_first_to_last(self):
+        """測試範圍包含頭尾所在的區間且彼此相接，跨年正確。"""
+        ranges = partition_ranges(utc(2024, 11, 15), utc(2025, 1, 2), "month")
+
+        assert [name for name, _, _ in ranges] == [
+            "audio_info_p2024_11",
+            "audio_info_p2024_12",
+            "audio_info_p2025_01",
+        ]
+        assert all(ranges[i][2] == ranges[i + 1][1] for i in range(len(ranges) - 1))
+        assert ranges[-1][2] == utc(2025, 2, 1)
+
+    def test_create_partition_sql(self):
+        sql = create_partition_sql("audio_info_p2024", utc(2024, 1, 1), utc(2025, 1, 1))
+
+        assert sql == (
+            "CREATE TABLE audio_info_p2024 PARTITION OF audio_info FOR VALUES "
+            "FROM ('2024-01-01T00:00:00+00:00') TO ('2025-01-01T00:00:00+00:00')"
+        )
+
+    def test_unknown_interval(self):
+        with pytest.raises(ValueError):
+            period_start(utc(2024, 1, 1), "week")
+
+
+class TestAudioPartitionService:
+    def test_list_partitions_parses_bounds(self):
+        """測試解析 pg_get_expr 的分區範圍，未 ANALYZE 的列數為 None。"""
+        db, _ = make_db(
+            [
+                partition_row(
+                    "audio_info_p2024",
+                    "2024-01-01 08:00:00+08",
+                    "2025-01-01 08:00:00+08",
+                ),
+                partition_row("audio_info_default", rows=-1),
+            ]
+        )
+
+        partitions = AudioPartitionService(db).list_partitions()
+
+        assert partitions[0]["start"] == utc(2024, 1, 1)
+        assert partitions[0]["end"] == utc(2025, 1, 1)
+        assert partitions[0]["rows"] == 1000
+        assert partitions[1]["is_default"] is True
+        assert partitions[1]["rows"] is None
+
+    def test_ensure_creates_missing_future_partitions(self):
+        """
+        測試建立未來的分區。
+
+        預期行為：
+        - 建立目前與未來 premake 個區間中缺少的分區
+        - 已存在 (範圍重疊) 的分區跳過
+        """
+        db, executed = make_db(
+            [
+                partition_row(
+                    "audio_info_p2024",
+                    "2024-01-01 00:00:00+00",
+                    "2025-01-01 00:00:00+00",
+                )
+            ]
+        )
+
+        created = AudioPartitionService(db, "year").ensure_partitions(
+            now=utc(2024, 5, 1), premake=2
+        )
+
+        assert created == ["audio_info_p2025", "audio_info_p2026"]
+        creates = [sql for sql in executed if sql.startswith("CREATE TABLE")]
+        assert len(creates) == 2
+        assert "PARTITION OF audio_info" in creates[0]
+        db.commit.assert_called_once()
+
+    def test_ensure_moves_rows_out_of_default_partition(self):
+        """
+        測試預設分區已有落在新範圍的列。
+
+        預期行為：
+        - detach 預設分區後把列搬進新表，再依序 attach 新分區與預設分區
+        """
+        db, executed = make_db([], stranded=True)
+
+        AudioPartitionService(db, "year").ensure_partitions(
+            now=utc(2024, 5, 1), premake=0
+        )
+
+        ddl = [sql for sql in executed if sql.startswith(("ALTER", "CREATE", "WITH"))]
+        assert ddl[0] == "ALTER TABLE audio_info DETACH PARTITION audio_info_default"
+        assert ddl[1].startswith("CREATE TABLE audio_info_p2024 (LIKE audio_info")
+        assert "DELETE FROM audio_info_default" in ddl[2]
+        assert "INSERT INTO audio_info_p2024" in ddl[2]
+        assert ddl[3].startswith(
+            "ALTER TABLE audio_info ATTACH PARTITION audio_info_p2024 FOR VALUES"
+        )
+        assert ddl[4] == (
+            "ALTER TABLE audio_info ATTACH PARTITION audio_info_default DEFAULT"
+        )
+
+    def test_archive_detaches_old_partitions(self):
+        """
+        測試封存舊分區。
+
+        預期行為：
+        - 只 detach 結束時間不晚於 before 的分區，預設分區不動
+        - 釋放封存音檔的 object_key 保留並移到封存 schema
+        """
+        db, executed = make_db(
+            [
+                partition_row(
+                    "audio_info_p2019",
+                    "2019-01-01 00:00:00+00",
+                    "2020-01-01 00:00:00+00",
+                ),
+                partition_row(
+                    "audio_info_p2020",
+                    "2020-01-01 00:00:00+00",
+                    "2021-01-01 00:00:00+00",
+                ),
+                partition_row("audio_info_default"),
+            ]
+        )
+
+        archived = AudioPartitionService(db, "year").archive_partitions(utc(2020, 6, 1))
+
+        assert archived == ["audio_info_p2019"]
+        assert "ALTER TABLE audio_info DETACH PARTITION audio_info_p2019" in executed
+        assert any("DELETE FROM audio_object_key_active" in sql for sql in executed)
+        assert (
+            f'ALTER TABLE audio_info_p2019 SET SCHEMA "{settings.audio_archive_schema}"'
+            in executed
+        )
+        db.commit.assert_called_once()
+
+    def test_archive_rejects_current_period(self):
+        """測試不能封存目前或未來的分區。"""
+        db, executed = make_db([])
+
+        with pytest.raises(HTTPException) as exc_info:
+            AudioPartitionService(db, "year").archive_partitions(
+                datetime.now(UTC).replace(year=datetime.now(UTC).year + 1)
+            )
+
+        assert exc_info.value.status_code == 400
+        assert executed == []
+
+
+def test_list_filters_on_record_time():
+    """測試音檔列表帶入時間範圍時以 record_time 篩選，讓查詢只掃描相符的分區。"""
+    db = MagicMock()
+    query = db.query.return_value
+
+    AudioService(db).get_audios(
+        deployment_id=1, start=utc(2024, 1, 1), end=utc(2024, 2, 1)
+    )
+
+    conditions = [
+        str(c.compile(dialect=postgresql.dialect()))
+        for c in query.filter.call_args_list[0].args
+    ]
+    assert "audio_info.record_time >= %(record_time_1)s" in conditions
+    assert "audio_info.record_time < %(record_time_1)s" in conditions
+
+
+def test_models_match_partitioned_table():
+    """測試 audio_info 宣告為分區表，其他表不再以 FK 參照 audio_info.id。"""
+    table = AudioInfo.__table__
+
+    assert table.dialect_options["postgresql"]["partition_by"] == "RANGE (record_time)"
+    assert not any(index.unique for index in table.indexes)
+    for model in (AudioInfo, DetectionInfo):
+        assert not any(fk.column.table is table for fk in model.__table__.foreign_keys)
+    assert DetectionInfo.audio.property.mapper.class_ is AudioInfo
+
+
+def test_partition_endpoints_require_admin(client, mock_current_user):
+    url = f"{settings.api_prefix}/partitions/audio"
+    with patch(
+        "app.api.v1.endpoints.api_partitions.AudioPartitionService"
+    ) as MockService:
+        MockService.return_value.list_partitions.return_value = []
+        MockService.return_value.ensure_partitions.return_value = ["audio_info_p2027"]
+
+        listed = client.get(url)
+        ensured = client.post(f"{url}/ensure")
+        mock_current_user.role = "user"
+        forbidden = client.post(f"{url}/archive", json={"before": "2020-01-01"})
+
+    assert listed.status_code == 200
+    assert ensured.json()["partitions"] == ["audio_info_p2027"]
+    assert forbidden.status_code == 403
+    MockService.return_value.archive_partitions.assert_not_called()
@@ -0,0 +1,122 @@
+"""
+波形 peak 金字塔測試模組。
+
+包含：
+- block 規劃與 min / max / RMS reduce
+- 以 moto 模擬 MinIO 的 sidecar 建置與範圍讀取
+- API 的 JSON / int16 回應格式
+"""
+
+from unittest.mock import MagicMock, patch
+
+import boto3
+import numpy as np
+from audio_helpers import make_wav, tone
+from moto import mock_aws
+
+from app.core.config import settings
+from app.services import peaks_service
+from app.services.peaks_service import (
+    PEAKS_BASE_BLOCK,
+    PeaksService,
+    plan_block_sizes,
+    reduce_blocks,
+)
+
+
+class TestPeakReduction:
+    def test_plan_block_sizes(self):
+        assert plan_block_sizes(1000) == [PEAKS_BASE_BLOCK]
+        sizes = plan_block_sizes(48000 * 3600)
+        assert sizes[0] == PEAKS_BASE_BLOCK
+        assert all(b == a * 4 for a, b in zip(sizes, sizes[1:], strict=False))
+        assert -(-48000 * 3600 // sizes[-1]) <= 1024
+
+    def test_reduce_blocks_with_partial_tail(self):
+        samples = np.array([[1.0], [-1.0], [0.5], [0.5], [-0.25]], dtype=np.float32)
+
+        result = reduce_blocks(samples, 2)
+
+        assert result.shape == (3, 1, 3)
+        np.testing.assert_allclose(result[:, 0, 0], [-1.0, 0.5, -0.25])
+        np.testing.assert_allclose(result[:, 0, 1], [1.0, 0.5, -0.25])
+        np.testing.assert_allclose(result[:, 0, 2], [1.0, 0.5, 0.25])
+
+
+@mock_aws
+def test_build_and_read_peaks(mock_db, aws_credentials):
+    fs = 8000
+    s3 = boto3.client("s3", region_name="us-east-1")
+    s3.create_bucket(Bucket="proj")
+    key = "P1/2024/06/Raw_Data/a.wav"
+    # 前 2 秒振幅 0.5，後 2 秒振幅 0.1
+    samples = np.concatenate([tone(100, fs, 2, 0.5), tone(100, fs, 2, 0.1)])
+    s3.put_object(Bucket="proj", Key=key, Body=make_wav(samples, fs))
+
+    audio = MagicMock(object_key=key, file_size=None, is_cold_storage=False)
+    audio.deployment.point.project.name = "proj"
+    with patch("app.services.peaks_service.AudioService") as MockService:
+        MockService.return_value.get_audio_details.return_value = audio
+        service = PeaksService(mock_db, s3_client=s3)
+
+        header = service.build_peaks(1)
+        with patch(
+            "app.services.peaks_service.get_object_range",
+            wraps=peaks_service.get_object_range,
+        ) as ranged:
+            peaks = service.get_peaks(1, start=1.0, end=3.0, level=0)
+
+    assert header.channels == 1
+    assert header.levels[0].n_blocks == -(-len(samples) // PEAKS_BASE_BLOCK)
+    # 檔頭一次、資料一次
+    assert ranged.call_count == 2
+    values = peaks["values"][:, 0, :] / 32767
+    assert peaks["start_block"] == fs // PEAKS_BASE_BLOCK
+    half = len(values) // 2
+    np.testing.assert_allclose(values[2 : half - 1, 1], 0.5, atol=0.01)
+    np.testing.assert_allclose(values[half + 2 :, 1], 0.1, atol=0.01)
+    np.testing.assert_allclose(values[half + 2 :, 2], 0.1 / np.sqrt(2), atol=0.01)
+
+
+def test_get_peaks_formats(client):
+    peaks = {
+        "audio_id": 1,
+        "level": 0,
+        "fs": 8000,
+        "channels": 1,
+        "block_size": 256,
+        "start_block": 0,
+        "n_blocks": 2,
+        "values": np.array([[[-32767, 32767, 16384]], [[0, 0, 0]]], dtype="<i2"),
+    }
+    url = f"{settings.api_prefix}/audio/1/peaks"
+
+    with patch("app.api.v1.endpoints.api_audio.PeaksService") as MockService:
+        MockService.return_value.get_peaks.side_effect = lambda *a, **k: dict(peaks)
+
+        response = client.get(url)
+        assert response.status_code == 200
+        body = response.json()
+        assert body["min"] == [[-1.0], [0.0]]
+        assert body["max"] == [[1.0], [0.0]]
+
+        response = client.get(url, params={"format": "i16"})
+        assert response.status_code == 200
+        assert response.headers["x-peaks-block-size"] == "256"
+        assert len(response.content) == 2 * 3 * 2
+
+
+def test_build_peaks_is_scheduled(client):
+    with (
+        patch("app.api.v1.endpoints.api_audio.AudioService"),
+        patch("app.api.v1.endpoints.api_audio.JobService") as jobs,
+    ):
+        jobs.return_value.enqueue.return_value.id = 2
+        response = client.post(f"{settings.api_prefix}/audio/1/peaks")
+
+    assert response.status_code == 202
+    assert response.json()["job_id"] == 2
+    assert jobs.return_value.enqueue.call_args.args == (
+        "peaks.build",
+        {"audio_id": 1},
+    )
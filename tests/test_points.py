@@ -4,20 +4,24 @@ from app.core.config import settings
 
 
 def test_get_points(client):
-    with patch("app.api.v1.endpoints.api_points.PointService") as MockService:
+    with patch(
+        "app.api.v1.endpoints.api_points.PointService", autospec=True
+    ) as MockService:
         mock_service = MockService.return_value
-        mock_service.get_points.return_value = []
+        mock_service.get_points_async.return_value = []
 
         response = client.get(f"{settings.api_prefix}/points/?project_id=1")
         assert response.status_code == 200
         assert response.json() == []
-        mock_service.get_points.assert_called_once()
+        mock_service.get_points_async.assert_called_once()
 
 
 def test_get_point(client):
-    with patch("app.api.v1.endpoints.api_points.PointService") as MockService:
+    with patch(
+        "app.api.v1.endpoints.api_points.PointService", autospec=True
+    ) as MockService:
         mock_service = MockService.return_value
-        mock_service.get_point.return_value = PointResponse(
+        mock_service.get_point_async.return_value = PointResponse(
             id=1, project_id=1, name="Point A", gps_lat_plan=23.5, gps_lon_plan=121.5
         )
 
@@ -26,7 +30,7 @@ def test_get_point(client):
         assert response.json()["id"] == 1
         assert response.json()["project_id"] == 1
         assert response.json()["name"] == "Point A"
-        mock_service.get_point.assert_called_once_with(1)
+        mock_service.get_point_async.assert_called_once_with(1)
 
 
 def test_create_point(client):
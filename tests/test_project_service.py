@@ -1,4 +1,4 @@
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
 import pytest
 from fastapi import HTTPException
 
@@ -18,25 +18,18 @@ def test_create_project_autogenerate_name(mock_db):
     # 只提供中文名稱
     project_in = ProjectCreate(name_zh="測試專案")
 
-    # 2. 設定 Mock DB 行為
-    # 模擬資料庫查詢：多次 filter().first() 都回傳 None（無名稱衝突）
-    mock_query = MagicMock()
-    mock_query.filter.return_value = mock_query
-    mock_query.first.return_value = None
-    mock_db.query.return_value = mock_query
-
-    # 3. 執行 Service 方法
-    service.create_project(project_in)
-
-    # 4. 驗證結果
-    # 驗證 db.add 被呼叫
-    mock_db.add.assert_called_once()
+    # 2. 執行 Service 方法 (INSERT 成功新增，名稱不在 outbox 中等待釋放)
+    mock_db.scalar.return_value = False
+    with patch("app.services.project_service.insert_unique") as insert_unique:
+        service.create_project(project_in)
 
-    # 驗證傳入 db.add 的物件中，name 是否已根據 name_zh 自動生成
-    added_project = mock_db.add.call_args[0][0]
-    assert isinstance(added_project, ProjectInfo)
-    assert added_project.name == "ce-shi-zhuan-an"  # "測試專案" 的拼音
-    assert added_project.name_zh == "測試專案"
+    # 3. 驗證結果
+    # 驗證 INSERT 的值中，name 是否已根據 name_zh 自動生成
+    model, values = insert_unique.call_args.args[1:3]
+    assert model is ProjectInfo
+    assert values["name"] == "ce-shi-zhuan-an"  # "測試專案" 的拼音
+    assert values["name_zh"] == "測試專案"
+    mock_db.commit.assert_called_once()
 
 
 def test_create_project_autogenerate_name_collision(mock_db):
@@ -50,11 +43,11 @@ def test_create_project_autogenerate_name_collision(mock_db):
     project_in = ProjectCreate(name_zh="測試專案")
 
     # 2. 設定 Mock DB 行為
-    # 模擬查詢名稱時回傳物件 (代表名稱已存在)
-    mock_query = MagicMock()
-    mock_query.filter.return_value = mock_query
-    mock_query.first.return_value = MagicMock()
-    mock_db.query.return_value = mock_query
+    # 模擬 INSERT 未新增任何列，且衝突的是現有的同名專案
+    mock_db.scalars.return_value.one_or_none.return_value = None
+    existing = MagicMock(is_deleted=False, name_zh="其他專案")
+    existing.name = "ce-shi-zhuan-an"
+    mock_db.execute.return_value.all.return_value = [existing]
 
     # 3. 執行 Service 方法並驗證是否拋出例外
     with pytest.raises(HTTPException) as exc_info:
@@ -4,9 +4,11 @@ from app.core.config import settings
 
 
 def test_get_projects(client):
-    with patch("app.api.v1.endpoints.api_projects.ProjectService") as MockService:
+    with patch(
+        "app.api.v1.endpoints.api_projects.ProjectService", autospec=True
+    ) as MockService:
         mock_service = MockService.return_value
-        mock_service.get_projects.return_value = [
+        mock_service.get_projects_async.return_value = [
             ProjectResponse(id=1, name="Project-A", area="Area A")
         ]
 
@@ -14,20 +16,22 @@ def test_get_projects(client):
         assert response.status_code == 200
         assert len(response.json()) == 1
         assert response.json()[0]["name"] == "project-a"
-        mock_service.get_projects.assert_called_once()
+        mock_service.get_projects_async.assert_called_once()
 
 
 def test_get_project(client):
-    with patch("app.api.v1.endpoints.api_projects.ProjectService") as MockService:
+    with patch(
+        "app.api.v1.endpoints.api_projects.ProjectService", autospec=True
+    ) as MockService:
         mock_service = MockService.return_value
-        mock_service.get_project.return_value = ProjectResponse(
+        mock_service.get_project_async.return_value = ProjectResponse(
             id=1, name="project-a", area="Area A"
         )
 
         response = client.get(f"{settings.api_prefix}/projects/1")
         assert response.status_code == 200
         assert response.json()["id"] == 1
-        mock_service.get_project.assert_called_once_with(1)
+        mock_service.get_project_async.assert_called_once_with(1)
 
 
 def test_create_project(client):
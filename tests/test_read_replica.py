@@ -0,0 +1,267 @@
+"""
+Read replica 路由測試模組。
+
+包含：
+- 複寫延遲檢查的快取與失敗處理
+- read-your-writes (token subject、header、cookie) 與 get_read_db 的主庫 / replica 選擇
+- 寫入後的 middleware 與 heatmap 快取
+
+所有測試使用 mock 的 engine / session，不連接真實資料庫。
+"""
+
+from datetime import date
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pytest
+from fastapi import Response
+from starlette.requests import Request
+
+from app.core.config import settings
+from app.core.security import create_access_token
+from app.db import replica, session
+from app.db.replica import (
+    READ_YOUR_WRITES_COOKIE,
+    READ_YOUR_WRITES_HEADER,
+    ReplicaLagMonitor,
+    mark_write,
+    recently_wrote,
+)
+from app.schemas.recorder import RecorderResponse
+from app.services import detection_service
+from app.services.detection_service import DetectionService
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_monitor(lag, clock=None):
+    engine = MagicMock()
+    connection = engine.connect.return_value.__enter__.return_value
+    if isinstance(lag, Exception):
+        connection.execute.side_effect = lag
+    else:
+        connection.execute.return_value.scalar.return_value = lag
+    monitor = ReplicaLagMonitor(
+        engine, max_lag=5.0, ttl=2.0, clock=clock or FakeClock()
+    )
+    return monitor, engine
+
+
+def make_request(cookies: dict | None = None, headers: dict | None = None) -> Request:
+    header = "; ".join(f"{k}={v}" for k, v in (cookies or {}).items())
+    raw = [(b"cookie", header.encode())] if header else []
+    raw += [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()]
+    return Request({"type": "http", "method": "GET", "headers": raw})
+
+
+def bearer(email: str) -> dict:
+    return {"Authorization": f"Bearer {create_access_token({'sub': email})}"}
+
+
+class TestReplicaLagMonitor:
+    def test_lag_is_cached_for_ttl(self):
+        """
+        測試延遲檢查結果的快取。
+
+        預期行為：
+        - TTL 內重複呼叫只查詢一次
+        - TTL 到期後重新查詢
+        """
+        clock = FakeClock()
+        monitor, engine = make_monitor(1.5, clock)
+
+        assert monitor.healthy()
+        clock.now += 1.9
+        assert monitor.healthy()
+        assert engine.connect.call_count == 1
+
+        clock.now += 0.1
+        assert monitor.due()
+        assert monitor.lag() == 1.5
+        assert engine.connect.call_count == 2
+
+    @pytest.mark.parametrize("lag", [7.5, None, RuntimeError("replica down")])
+    def test_unhealthy_when_lagging_or_unknown(self, lag):
+        """測試延遲超過門檻、無法判斷 (NULL) 或查詢失敗時不使用 replica。"""
+        monitor, engine = make_monitor(lag)
+
+        assert not monitor.healthy()
+        assert not monitor.healthy()
+        # 失敗的結果同樣快取，replica 故障時不會每個請求都重試
+        assert engine.connect.call_count == 1
+
+
+class TestReadYourWrites:
+    @pytest.fixture(autouse=True)
+    def clear_writers(self):
+        replica._recent_writers.clear()
+        yield
+        replica._recent_writers.clear()
+
+    def test_cookie_round_trip(self):
+        """測試寫入後設定的 cookie 在期限內有效。"""
+        response = Response()
+        mark_write(make_request(), response, 5.0)
+
+        cookie = response.headers["set-cookie"]
+        value = cookie.split(";")[0].split("=", 1)[1]
+        assert cookie.startswith(f"{READ_YOUR_WRITES_COOKIE}=")
+        assert "Max-Age=5" in cookie
+        assert recently_wrote(make_request({READ_YOUR_WRITES_COOKIE: value}))
+
+    @pytest.mark.parametrize("value", [None, "1.0", "garbage"])
+    def test_expired_or_invalid_cookie(self, value):
+        """測試沒有 cookie、已過期或格式錯誤時不視為剛寫入。"""
+        cookies = {READ_YOUR_WRITES_COOKIE: value} if value else {}
+
+        assert not recently_wrote(make_request(cookies))
+
+    def test_bearer_principal_is_sticky_without_cookie(self):
+        """
+        測試 bearer token 用戶端不帶 cookie 時仍讀取主庫。
+
+        預期行為：
+        - 同一個 token subject 之後的請求視為剛寫入 (即使換了 token)
+        - 其他使用者與無效的 token 不受影響
+        """
+        mark_write(make_request(headers=bearer("a@example.com")), Response(), 5.0)
+
+        assert recently_wrote(make_request(headers=bearer("a@example.com")))
+        assert not recently_wrote(make_request(headers=bearer("b@example.com")))
+        invalid = {"Authorization": "Bearer not-a-token"}
+        assert not recently_wrote(make_request(headers=invalid))
+
+    def test_header_is_echoed_back(self):
+        """測試回應的 X-Primary-Until header 由用戶端帶回時有效。"""
+        response = Response()
+        mark_write(make_request(), response, 5.0)
+
+        value = response.headers[READ_YOUR_WRITES_HEADER]
+        assert recently_wrote(make_request(headers={READ_YOUR_WRITES_HEADER: value}))
+        expired = {READ_YOUR_WRITES_HEADER: "1.0"}
+        assert not recently_wrote(make_request(headers=expired))
+
+
+class TestGetReadDb:
+    @pytest.fixture
+    def factories(self):
+        primary, replica = MagicMock(), MagicMock()
+        with (
+            patch.object(session, "SessionLocal", primary),
+            patch.object(session, "ReplicaSessionLocal", replica),
+        ):
+            yield primary, replica
+
+    def read_db(self, request):
+        dependency = session.get_read_db(request)
+        db = next(dependency)
+        dependency.close()
+        return db
+
+    def test_uses_healthy_replica(self, factories):
+        """測試 replica 延遲在門檻內時讀取 replica，結束後關閉 session。"""
+        primary, replica = factories
+        monitor = MagicMock(**{"healthy.return_value": True})
+
+        with patch.object(session, "replica_monitor", monitor):
+            db = self.read_db(make_request())
+
+        assert db is replica.return_value
+        db.close.assert_called_once()
+        primary.assert_not_called()
+
+    @pytest.mark.parametrize(
+        ("monitor", "cookies"),
+        [
+            (None, {}),
+            (MagicMock(**{"healthy.return_value": False}), {}),
+            (
+                MagicMock(**{"healthy.return_value": True}),
+                {READ_YOUR_WRITES_COOKIE: "9999999999"},
+            ),
+        ],
+        ids=["not-configured", "lagging", "recent-write"],
+    )
+    def test_falls_back_to_primary(self, factories, monitor, cookies):
+        """
+        測試改走主庫的情況。
+
+        預期行為：
+        - 未設定 replica
+        - replica 延遲超過門檻
+        - 呼叫者剛寫入過 (read-your-writes)
+        """
+        primary, replica = factories
+
+        with patch.object(session, "replica_monitor", monitor):
+            db = self.read_db(make_request(cookies))
+
+        assert db is primary.return_value
+        replica.assert_not_called()
+
+
+def test_successful_write_sets_cookie(client):
+    """測試設定 replica 時，成功的寫入請求回應帶有 read-your-writes cookie。"""
+    payload = {"brand": "Brand", "model": "Model", "sn": "SN1", "sensitivity": -160.0}
+    with (
+        patch.object(session, "replica_engine", MagicMock()),
+        patch("app.api.v1.endpoints.api_recorders.RecorderService") as MockService,
+    ):
+        MockService.return_value.create_recorder.return_value = RecorderResponse(
+            id=1, **payload
+        )
+        MockService.return_value.get_recorders.return_value = []
+
+        written = client.post(f"{settings.api_prefix}/recorders/", json=payload)
+        read = client.get(f"{settings.api_prefix}/recorders/")
+
+    assert READ_YOUR_WRITES_COOKIE in written.cookies
+    assert READ_YOUR_WRITES_HEADER in written.headers
+    assert READ_YOUR_WRITES_COOKIE not in read.headers.get("set-cookie", "")
+    assert READ_YOUR_WRITES_HEADER not in read.headers
+
+
+def test_replica_heatmap_not_cached_right_after_change():
+    """測試剛換代時由 replica 算出的 heatmap 不寫入快取，避免快取落後的結果。"""
+    detection_service._heatmap_cache.clear()
+    db = MagicMock(info={"replica": True})
+    db.execute.return_value.all.return_value = [
+        SimpleNamespace(recorded=0, positive=0) for _ in range(24)
+    ]
+    day = date(2024, 6, 11)
+
+    with patch("app.services.detection_service.PointService"):
+        detection_service.invalidate_heatmaps()
+        DetectionService(db).get_heatmap(1, day, day)
+        DetectionService(db).get_heatmap(1, day, day)
+        assert db.execute.call_count == 2
+
+        with patch.object(settings, "replica_max_lag_seconds", 0):
+            DetectionService(db).get_heatmap(1, day, day)
+            DetectionService(db).get_heatmap(1, day, day)
+        assert db.execute.call_count == 3
+
+
+def test_replica_url_defaults_to_primary_credentials():
+    """測試 replica 連線字串沿用主庫的帳號、資料庫名稱與預設 port。"""
+    with patch.object(settings, "postgres_replica_ip_address", None):
+        assert settings.get_replica_database_url() is None
+        assert settings.get_async_replica_database_url() is None
+
+    with (
+        patch.object(settings, "postgres_replica_ip_address", "replica"),
+        patch.object(settings, "postgres_replica_port", None),
+    ):
+        url = settings.get_replica_database_url()
+        async_url = settings.get_async_replica_database_url()
+
+    assert url == settings.get_database_url().replace(
+        f"@{settings.postgres_ip_address}:", "@replica:"
+    )
+    assert async_url.startswith("postgresql+asyncpg://")
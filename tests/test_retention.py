@@ -0,0 +1,268 @@
+"""
+軟刪除保留期限清除測試模組。
+
+包含：
+- 分批永久刪除音檔 (outbox 與資料列同批提交、限速)
+- dry-run 報告的到期條件與可回收空間
+- 由上而下依根節點清除，沿用 admin 的永久刪除
+- 週期性工作排程與 /retention API
+
+所有測試使用 mock，不連接真實資料庫或 MinIO。
+"""
+
+from datetime import UTC, datetime, timedelta
+from unittest.mock import MagicMock, call, patch
+
+from sqlalchemy.dialects import postgresql
+
+from app.core.config import settings
+from app.services.cascade_service import hard_delete_audios
+from app.services.job_handlers import JOB_RETENTION_PURGE
+from app.services.job_service import (
+    JOB_HANDLERS,
+    PERIODIC_DEDUP_KEY,
+    JobService,
+    job_handler,
+)
+from app.services.retention_service import RetentionService
+
+
+def compiled(statement) -> str:
+    return str(
+        statement.compile(
+            dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}
+        )
+    )
+
+
+class TestHardDeleteAudios:
+    def test_batches_commit_and_throttle(self):
+        """
+        測試音檔分批永久刪除。
+
+        預期行為：
+        - 每批先寫入 outbox 再刪除資料列，之後 commit
+        - limiter 以每批的列數取得額度
+        - 查無資料時結束並回傳總數
+        """
+        db = MagicMock()
+        db.execute.return_value.scalars.return_value.all.side_effect = [
+            [1, 2],
+            [3],
+            [],
+        ]
+        db.execute.return_value.rowcount = 2
+        limiter = MagicMock()
+
+        with patch(
+            "app.services.cascade_service.enqueue_object_deletions", return_value=3
+        ) as enqueue:
+            deleted, queued = hard_delete_audios(
+                db, "bucket", True, batch_size=2, limiter=limiter
+            )
+
+        assert (deleted, queued) == (4, 6)
+        assert [c.args[1] for c in enqueue.call_args_list] == ["bucket", "bucket"]
+        assert db.commit.call_count == 2
+        assert limiter.acquire.call_args_list == [call(2), call(1)]
+        delete = compiled(db.execute.call_args_list[1].args[0])
+        assert delete == "DELETE FROM audio_info WHERE audio_info.id IN (1, 2)"
+
+
+class TestRetentionReport:
+    def test_report_counts_rows_with_expired_ancestors(self):
+        """
+        測試 dry-run 報告。
+
+        預期行為：
+        - 自身或任一上層在 cutoff 前軟刪除的音檔都計入
+        - 熱儲存與冷儲存的大小分開加總
+        """
+        db = MagicMock()
+        db.execute.return_value.one.return_value = (5, 5000, 1200)
+        db.execute.return_value.scalar.side_effect = [3, 2, 1]
+
+        service = RetentionService(db, retention_days=30)
+        report = service.report()
+
+        assert report["audios"] == 5
+        assert report["bytes"] == 5000
+        assert report["cold_bytes"] == 1200
+        assert (report["deployments"], report["points"], report["projects"]) == (
+            3,
+            2,
+            1,
+        )
+        assert service.cutoff < datetime.now(UTC) - timedelta(days=29)
+
+        audio_sql = compiled(db.execute.call_args_list[0].args[0])
+        for table in ("audio_info", "deployment_info", "point_info", "project_info"):
+            assert f"{table}.is_deleted IS true AND {table}.deleted_at <" in audio_sql
+        assert "sum(audio_info.file_size) FILTER" in audio_sql
+        assert "'cold_storage'" in audio_sql
+
+
+class TestRetentionPurge:
+    def test_purges_roots_top_down(self):
+        """
+        測試依層級清除到期的根節點。
+
+        預期行為：
+        - 先分批刪除根節點底下的音檔，再呼叫 admin 的 hard_delete_*
+        - 沒有到期的 Project 時才處理 Point
+        - 統計合計兩個步驟的音檔與 outbox 物件數
+        """
+        db = MagicMock()
+        db.execute.return_value.all.side_effect = [[], [(7, "bucket")], [], [], [], []]
+        progress = MagicMock()
+
+        with (
+            patch(
+                "app.services.retention_service.hard_delete_audios",
+                return_value=(100, 120),
+            ) as batched,
+            patch("app.services.retention_service.PointService") as points,
+        ):
+            points.return_value.hard_delete_point.return_value = {
+                "deleted_audios": 0,
+                "queued_objects": 0,
+            }
+            summary = RetentionService(db).purge(
+                max_roots=10, limiter=MagicMock(), progress=progress
+            )
+
+        assert batched.call_args.args[1] == "bucket"
+        assert "deployment_info.point_id = 7" in compiled(batched.call_args.args[2])
+        points.return_value.hard_delete_point.assert_called_once_with(7)
+        assert summary == {
+            "projects": 0,
+            "points": 1,
+            "deployments": 0,
+            "audios": 100,
+            "queued_objects": 120,
+        }
+        progress.assert_called_once_with(1)
+
+    def test_audio_roots_only_delete_expired_audios(self):
+        """
+        測試 Audio 層以 Deployment 為單位，只刪除本身到期的音檔。
+
+        預期行為：
+        - 不呼叫 hard_delete_deployment
+        - max_roots 用完時停止
+        """
+        db = MagicMock()
+        db.execute.return_value.all.side_effect = [[], [], [], [(4, "bucket")]]
+
+        with (
+            patch(
+                "app.services.retention_service.hard_delete_audios",
+                return_value=(2, 2),
+            ) as batched,
+            patch("app.services.retention_service.DeploymentService") as deployments,
+        ):
+            summary = RetentionService(db).purge(max_roots=1, limiter=MagicMock())
+
+        audio_filter = compiled(batched.call_args.args[2])
+        assert "audio_info.deployment_id = 4" in audio_filter
+        assert "audio_info.is_deleted IS true" in audio_filter
+        deployments.assert_not_called()
+        assert summary["audios"] == 2
+
+
+class TestPeriodicJobs:
+    def test_schedule_periodic_enqueues_when_due(self, mock_db):
+        """
+        測試週期性工作的排程。
+
+        預期行為：
+        - 最近一次早於 interval 時以固定 dedup_key 排入
+        - 尚未到期或未設定 interval 的類型不排入
+        """
+
+        @job_handler("test.periodic", interval=timedelta(hours=1))
+        def periodic(db, payload, progress):
+            return None
+
+        try:
+            service = JobService(mock_db)
+            last = mock_db.query.return_value.filter.return_value.scalar
+            with patch.object(service, "enqueue") as enqueue:
+                enqueue.return_value.id = 3
+                last.return_value = datetime.now(UTC) - timedelta(days=2)
+                due = service.schedule_periodic(["test.periodic", JOB_RETENTION_PURGE])
+                last.return_value = datetime.now(UTC) - timedelta(minutes=5)
+                not_due = service.schedule_periodic(["test.periodic"])
+        finally:
+            JOB_HANDLERS.pop("test.periodic")
+
+        assert JOB_HANDLERS[JOB_RETENTION_PURGE].interval == timedelta(
+            hours=settings.retention_purge_interval_hours
+        )
+        assert due == [3, 3]
+        assert not_due == []
+        enqueue.assert_any_call(
+            JOB_RETENTION_PURGE, dedup_key=PERIODIC_DEDUP_KEY, priority=10
+        )
+
+
+def test_retention_endpoints(client, mock_current_user):
+    url = f"{settings.api_prefix}/retention"
+    report = {
+        "retention_days": 30,
+        "cutoff": "2026-01-01T00:00:00Z",
+        "projects": 1,
+        "points": 2,
+        "deployments": 3,
+        "audios": 40,
+        "bytes": 4000,
+        "cold_bytes": 0,
+    }
+    with (
+        patch("app.api.v1.endpoints.api_retention.RetentionService") as service,
+        patch("app.api.v1.endpoints.api_retention.JobService") as jobs,
+    ):
+        service.return_value.report.return_value = report
+        jobs.return_value.enqueue.return_value.id = 9
+
+        preview = client.post(f"{url}/preview", json={"retention_days": 30})
+        purge = client.post(f"{url}/purge", json={"retention_days": 30})
+        invalid = client.post(f"{url}/preview", json={"retention_days": 0})
+        mock_current_user.role = "user"
+        forbidden = client.post(f"{url}/purge", json={})
+
+    assert preview.status_code == 200
+    assert preview.json()["audios"] == 40
+    assert service.call_args.args[1] == 30
+    assert purge.status_code == 202
+    assert purge.json()["job_id"] == 9
+    assert jobs.return_value.enqueue.call_args.args[:2] == (
+        JOB_RETENTION_PURGE,
+        {"retention_days": 30, "max_roots": None},
+    )
+    assert invalid.status_code == 422
+    assert forbidden.status_code == 403
+
+
+def test_purge_rearms_outbox_and_reports_stuck_rows(mock_db):
+    """
+    定期清除在 outbox 工作放棄後重新排入，並回報已放棄的列。
+    """
+    with (
+        patch("app.services.job_handlers.RetentionService") as retention,
+        patch("app.services.job_handlers.ObjectDeletionService") as outbox,
+        patch("app.services.job_handlers.schedule_object_deletions") as schedule,
+    ):
+        retention.return_value.purge.return_value = {"queued_objects": 0}
+        outbox.return_value.pending.return_value = 5
+        outbox.return_value.stuck.return_value = 2
+        schedule.return_value.id = 7
+
+        result = JOB_HANDLERS[JOB_RETENTION_PURGE].func(mock_db, {}, MagicMock())
+
+    assert result == {
+        "queued_objects": 0,
+        "pending_object_deletions": 5,
+        "stuck_object_deletions": 2,
+        "outbox_job_id": 7,
+    }
@@ -1,7 +1,15 @@
+import threading
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from unittest.mock import MagicMock
+
 import pytest
 from datetime import timedelta
+from fastapi import HTTPException
+from app.core import security
 from app.core.security import (
     hash_password,
+    needs_rehash,
     verify_password,
     create_access_token,
     decode_access_token,
@@ -31,3 +39,63 @@ def test_jwt_token_expired():
     expired_token = create_access_token(data, expires_delta=timedelta(minutes=-1))
     with pytest.raises(JWTError):
         decode_access_token(expired_token)
+
+
+def test_password_hashing_uses_configured_cost(monkeypatch):
+    monkeypatch.setattr(security.settings, "bcrypt_rounds", 4)
+    monkeypatch.setattr(security.settings, "password_hash_workers", 0)
+
+    hashed = hash_password("secret_password")
+
+    assert hashed.startswith("$2b$04$")
+    assert not needs_rehash(hashed)
+    monkeypatch.setattr(security.settings, "bcrypt_rounds", 12)
+    assert needs_rehash(hashed)
+    assert needs_rehash("not-a-bcrypt-hash")
+
+
+def test_password_hashing_rejects_when_queue_full(monkeypatch):
+    """Requests beyond workers + queue size get 429 without being queued."""
+    monkeypatch.setattr(security, "_slots", threading.BoundedSemaphore(1))
+    security._slots.acquire()
+    pool = MagicMock()
+    monkeypatch.setattr(security, "_get_pool", lambda: pool)
+
+    with pytest.raises(HTTPException) as exc_info:
+        verify_password("secret_password", "$2b$04$hash")
+
+    assert exc_info.value.status_code == 429
+    assert exc_info.value.headers == {"Retry-After": "1"}
+    pool.submit.assert_not_called()
+
+
+def test_password_hashing_timeout_returns_503(monkeypatch):
+    monkeypatch.setattr(security, "_slots", threading.BoundedSemaphore(1))
+    monkeypatch.setattr(security.settings, "password_hash_timeout", 0.01)
+    future = Future()
+    pool = MagicMock()
+    pool.submit.return_value = future
+    monkeypatch.setattr(security, "_get_pool", lambda: pool)
+
+    with pytest.raises(HTTPException) as exc_info:
+        verify_password("secret_password", "$2b$04$hash")
+
+    assert exc_info.value.status_code == 503
+    assert future.cancelled()
+    # 取消的工作歸還 slot
+    assert security._slots.acquire(blocking=False)
+
+
+def test_broken_pool_is_replaced(monkeypatch):
+    monkeypatch.setattr(security, "_slots", threading.BoundedSemaphore(1))
+    pool = MagicMock()
+    pool.submit.side_effect = BrokenProcessPool()
+    monkeypatch.setattr(security, "_pool", pool)
+
+    with pytest.raises(HTTPException) as exc_info:
+        verify_password("secret_password", "$2b$04$hash")
+
+    assert exc_info.value.status_code == 503
+    assert security._pool is None
+    pool.shutdown.assert_called_once()
+    assert security._slots.acquire(blocking=False)
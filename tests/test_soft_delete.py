@@ -93,7 +93,7 @@ class TestProjectSoftDelete:
 
         預期行為：
         - API 回傳 200 狀態碼
-        - Service 的 restore_project 方法被呼叫
+        - 檢查可還原後排入還原工作，回傳 X-Job-Id
         """
         with patch(
             "app.api.v1.endpoints.api_projects.ProjectService"
@@ -116,20 +116,28 @@ class TestProjectSoftDelete:
             mock_project.contact_email = None
             mock_project.created_at = datetime.now(timezone.utc)
             mock_project.updated_at = datetime.now(timezone.utc)
-            mock_project.is_deleted = False
-            mock_project.deleted_at = None
+            mock_project.is_deleted = True
+            mock_project.deleted_at = datetime.now(timezone.utc)
             mock_project.deleted_by = 1  # 模擬原刪除者為當前使用者
+            mock_project.deletion_batch_id = "b" * 32
 
             # 模擬 db.query 找到專案
             mock_db.query.return_value.filter.return_value.first.return_value = (
                 mock_project
             )
-            mock_service.restore_project.return_value = mock_project
+            mock_service.validate_restore.return_value = mock_project
 
-            response = client.post(f"{settings.api_prefix}/projects/1/restore")
+            with patch("app.api.v1.endpoints.api_projects.JobService") as jobs:
+                jobs.return_value.enqueue.return_value.id = 9
+                response = client.post(f"{settings.api_prefix}/projects/1/restore")
 
             assert response.status_code == 200
-            mock_service.restore_project.assert_called_once_with(1)
+            assert response.headers["x-job-id"] == "9"
+            mock_service.validate_restore.assert_called_once_with(1)
+            # 還原本身由背景工作執行
+            mock_service.restore_project.assert_not_called()
+            payload = jobs.return_value.enqueue.call_args.args[1]
+            assert payload == {"project_id": 1, "deletion_batch_id": "b" * 32}
 
     def test_restore_project_name_collision(self, client, mock_db):
         """
@@ -149,7 +157,7 @@ class TestProjectSoftDelete:
             mock_db.query.return_value.filter.return_value.first.return_value = (
                 mock_project
             )
-            mock_service.restore_project.side_effect = HTTPException(
+            mock_service.validate_restore.side_effect = HTTPException(
                 status_code=400,
                 detail="Active project with this name already exists. Cannot restore.",
             )
@@ -222,7 +230,7 @@ class TestPointSoftDelete:
 
         預期行為：
         - API 回傳 200 狀態碼
-        - Service 的 restore_point 方法被呼叫
+        - 檢查可還原後排入還原工作，回傳 X-Job-Id
         """
         with patch("app.api.v1.endpoints.api_points.PointService") as MockService:
             mock_service = MockService.return_value
@@ -237,19 +245,27 @@ class TestPointSoftDelete:
             mock_point.description = None
             mock_point.created_at = datetime.now(timezone.utc)
             mock_point.updated_at = datetime.now(timezone.utc)
-            mock_point.is_deleted = False
-            mock_point.deleted_at = None
+            mock_point.is_deleted = True
+            mock_point.deleted_at = datetime.now(timezone.utc)
             mock_point.deleted_by = 1  # 模擬原刪除者為當前使用者
+            mock_point.deletion_batch_id = "b" * 32
 
             mock_db.query.return_value.filter.return_value.first.return_value = (
                 mock_point
             )
-            mock_service.restore_point.return_value = mock_point
+            mock_service.validate_restore.return_value = mock_point
 
-            response = client.post(f"{settings.api_prefix}/points/1/restore")
+            with patch("app.api.v1.endpoints.api_points.JobService") as jobs:
+                jobs.return_value.enqueue.return_value.id = 9
+                response = client.post(f"{settings.api_prefix}/points/1/restore")
 
             assert response.status_code == 200
-            mock_service.restore_point.assert_called_once_with(1)
+            assert response.headers["x-job-id"] == "9"
+            mock_service.validate_restore.assert_called_once_with(1)
+            # 還原本身由背景工作執行
+            mock_service.restore_point.assert_not_called()
+            payload = jobs.return_value.enqueue.call_args.args[1]
+            assert payload == {"point_id": 1, "deletion_batch_id": "b" * 32}
 
     def test_restore_point_name_collision(self, client, mock_db):
         """
@@ -265,7 +281,7 @@ class TestPointSoftDelete:
             mock_db.query.return_value.filter.return_value.first.return_value = (
                 mock_point
             )
-            mock_service.restore_point.side_effect = HTTPException(
+            mock_service.validate_restore.side_effect = HTTPException(
                 status_code=400,
                 detail="Active point with this name already exists in the project. Cannot restore.",
             )
@@ -351,7 +367,7 @@ class TestDeploymentSoftDelete:
 
         預期行為：
         - API 回傳 200 狀態碼
-        - Service 的 restore_deployment 方法被呼叫
+        - 檢查可還原後排入還原工作，回傳 X-Job-Id
         """
         with patch(
             "app.api.v1.endpoints.api_deployments.DeploymentService"
@@ -377,19 +393,27 @@ class TestDeploymentSoftDelete:
             mock_deployment.description = None
             mock_deployment.created_at = datetime.now(timezone.utc)
             mock_deployment.updated_at = datetime.now(timezone.utc)
-            mock_deployment.is_deleted = False
-            mock_deployment.deleted_at = None
+            mock_deployment.is_deleted = True
+            mock_deployment.deleted_at = datetime.now(timezone.utc)
             mock_deployment.deleted_by = 1  # 模擬原刪除者為當前使用者
+            mock_deployment.deletion_batch_id = "b" * 32
 
             mock_db.query.return_value.filter.return_value.first.return_value = (
                 mock_deployment
             )
-            mock_service.restore_deployment.return_value = mock_deployment
+            mock_service.validate_restore.return_value = mock_deployment
 
-            response = client.post(f"{settings.api_prefix}/deployments/1/restore")
+            with patch("app.api.v1.endpoints.api_deployments.JobService") as jobs:
+                jobs.return_value.enqueue.return_value.id = 9
+                response = client.post(f"{settings.api_prefix}/deployments/1/restore")
 
             assert response.status_code == 200
-            mock_service.restore_deployment.assert_called_once_with(1)
+            assert response.headers["x-job-id"] == "9"
+            mock_service.validate_restore.assert_called_once_with(1)
+            # 還原本身由背景工作執行
+            mock_service.restore_deployment.assert_not_called()
+            payload = jobs.return_value.enqueue.call_args.args[1]
+            assert payload == {"deployment_id": 1, "deletion_batch_id": "b" * 32}
 
     def test_restore_deployment_phase_collision(self, client, mock_db):
         """
@@ -407,7 +431,7 @@ class TestDeploymentSoftDelete:
             mock_db.query.return_value.filter.return_value.first.return_value = (
                 mock_deployment
             )
-            mock_service.restore_deployment.side_effect = HTTPException(
+            mock_service.validate_restore.side_effect = HTTPException(
                 status_code=400,
                 detail="Active deployment with this phase already exists for the point. Cannot restore.",
             )
@@ -445,6 +469,8 @@ class TestAudioSoftDelete:
             mock_audio.file_format = "wav"
             mock_audio.file_size = 1024
             mock_audio.checksum = None
+            mock_audio.fingerprint = None
+            mock_audio.duplicate_of_id = None
             mock_audio.record_time = None
             mock_audio.record_duration = None
             mock_audio.fs = None
@@ -501,6 +527,8 @@ class TestAudioSoftDelete:
             mock_audio.file_format = "wav"
             mock_audio.file_size = 1024
             mock_audio.checksum = None
+            mock_audio.fingerprint = None
+            mock_audio.duplicate_of_id = None
             mock_audio.record_time = None
             mock_audio.record_duration = None
             mock_audio.fs = None
@@ -699,7 +727,7 @@ class TestSoftDeleteFiltering:
         - 只回傳活躍的專案
         """
         with patch(
-            "app.api.v1.endpoints.api_projects.ProjectService"
+            "app.api.v1.endpoints.api_projects.ProjectService", autospec=True
         ) as MockService:
             mock_service = MockService.return_value
             # 模擬只回傳活躍的專案
@@ -719,14 +747,14 @@ class TestSoftDeleteFiltering:
             mock_project.contact_email = None
             mock_project.created_at = datetime.now(timezone.utc)
             mock_project.updated_at = datetime.now(timezone.utc)
-            mock_service.get_projects.return_value = [mock_project]
+            mock_service.get_projects_async.return_value = [mock_project]
 
             response = client.get(f"{settings.api_prefix}/projects/")
 
             assert response.status_code == 200
             data = response.json()
             assert len(data) == 1
-            mock_service.get_projects.assert_called_once()
+            mock_service.get_projects_async.assert_called_once()
 
     def test_get_points_excludes_deleted(self, client):
         """
@@ -736,7 +764,9 @@ class TestSoftDeleteFiltering:
         - Service 的 get_points 方法被呼叫
         - 只回傳活躍的測站
         """
-        with patch("app.api.v1.endpoints.api_points.PointService") as MockService:
+        with patch(
+            "app.api.v1.endpoints.api_points.PointService", autospec=True
+        ) as MockService:
             mock_service = MockService.return_value
             mock_point = MagicMock()
             mock_point.id = 1
@@ -748,14 +778,14 @@ class TestSoftDeleteFiltering:
             mock_point.description = None
             mock_point.created_at = datetime.now(timezone.utc)
             mock_point.updated_at = datetime.now(timezone.utc)
-            mock_service.get_points.return_value = [mock_point]
+            mock_service.get_points_async.return_value = [mock_point]
 
             response = client.get(f"{settings.api_prefix}/points/?project_id=1")
 
             assert response.status_code == 200
             data = response.json()
             assert len(data) == 1
-            mock_service.get_points.assert_called_once()
+            mock_service.get_points_async.assert_called_once()
 
     def test_get_deployments_excludes_deleted(self, client):
         """
@@ -766,7 +796,7 @@ class TestSoftDeleteFiltering:
         - 只回傳活躍的佈放紀錄
         """
         with patch(
-            "app.api.v1.endpoints.api_deployments.DeploymentService"
+            "app.api.v1.endpoints.api_deployments.DeploymentService", autospec=True
         ) as MockService:
             mock_service = MockService.return_value
             mock_deployment = MagicMock()
@@ -788,14 +818,14 @@ class TestSoftDeleteFiltering:
             mock_deployment.description = None
             mock_deployment.created_at = datetime.now(timezone.utc)
             mock_deployment.updated_at = datetime.now(timezone.utc)
-            mock_service.get_deployments.return_value = [mock_deployment]
+            mock_service.get_deployments_async.return_value = [mock_deployment]
 
             response = client.get(f"{settings.api_prefix}/deployments/?point_id=1")
 
             assert response.status_code == 200
             data = response.json()
             assert len(data) == 1
-            mock_service.get_deployments.assert_called_once()
+            mock_service.get_deployments_async.assert_called_once()
 
     def test_get_audios_excludes_deleted(self, client):
         """
@@ -805,7 +835,9 @@ class TestSoftDeleteFiltering:
         - Service 的 get_audios 方法被呼叫
         - 只回傳活躍的音檔
         """
-        with patch("app.api.v1.endpoints.api_audio.AudioService") as MockService:
+        with patch(
+            "app.api.v1.endpoints.api_audio.AudioService", autospec=True
+        ) as MockService:
             mock_service = MockService.return_value
             mock_audio = MagicMock()
             mock_audio.id = 1
@@ -815,6 +847,8 @@ class TestSoftDeleteFiltering:
             mock_audio.file_format = "wav"
             mock_audio.file_size = 1024
             mock_audio.checksum = None
+            mock_audio.fingerprint = None
+            mock_audio.duplicate_of_id = None
             mock_audio.record_time = None
             mock_audio.record_duration = None
             mock_audio.fs = None
@@ -825,14 +859,14 @@ class TestSoftDeleteFiltering:
             mock_audio.meta_json = None
             mock_audio.is_cold_storage = False
             mock_audio.updated_at = datetime.now(timezone.utc)
-            mock_service.get_audios.return_value = [mock_audio]
+            mock_service.get_audios_async.return_value = [mock_audio]
 
             response = client.get(f"{settings.api_prefix}/audio/?deployment_id=1")
 
             assert response.status_code == 200
             data = response.json()
             assert len(data) == 1
-            mock_service.get_audios.assert_called_once()
+            mock_service.get_audios_async.assert_called_once()
 
     def test_get_recorders_excludes_deleted(self, client):
         """
@@ -14,11 +14,19 @@ from unittest.mock import MagicMock, patch, call
 
 import pytest
 from fastapi import HTTPException
+from sqlalchemy.dialects import postgresql
 
 from app.services.project_service import ProjectService
 from app.services.point_service import PointService
 from app.services.deployment_service import DeploymentService
 from app.services.audio_service import AudioService
+from app.models.audio import AudioInfo
+from app.models.deployment import DeploymentInfo
+from app.services.cascade_service import (
+    deleted_values,
+    restore_deletion_batch,
+    soft_delete_audios,
+)
 from app.services.recorder_service import RecorderService
 
 
@@ -62,7 +70,9 @@ class TestProjectServiceDelete:
         assert mock_project.is_deleted is True
         assert mock_project.deleted_by == user_id
         assert mock_project.deleted_at is not None
-        mock_db.commit.assert_called()
+        # 由呼叫端與 cascade 工作一起 commit
+        mock_db.flush.assert_called()
+        mock_db.commit.assert_not_called()
 
     def test_delete_project_cascades_to_points(self, mock_db):
         """
@@ -88,7 +98,9 @@ class TestProjectServiceDelete:
         # 驗證有呼叫 update 來更新 Points
         # 注意：實際的 update 呼叫會透過 mock_db.query(...).filter(...).update(...)
         assert mock_db.query.called
-        mock_db.commit.assert_called()
+        # 由呼叫端與 cascade 工作一起 commit
+        mock_db.flush.assert_called()
+        mock_db.commit.assert_not_called()
 
     def test_delete_project_not_found_raises_404(self, mock_db):
         """
@@ -147,6 +159,7 @@ class TestProjectServiceRestore:
         mock_query.first.side_effect = mock_filter_first
         mock_query.update.return_value = 0
         mock_db.query.return_value = mock_query
+        mock_db.execute.return_value.rowcount = 0
 
         result = service.restore_project(1)
 
@@ -154,6 +167,7 @@ class TestProjectServiceRestore:
         assert mock_project.is_deleted is False
         assert mock_project.deleted_at is None
         assert mock_project.deleted_by is None
+        assert mock_project.deletion_batch_id is None
         mock_db.commit.assert_called()
 
     def test_restore_project_name_collision_raises_400(self, mock_db):
@@ -205,15 +219,196 @@ class TestProjectServiceDeleteAudios:
         user_id = 1
         project_id = 1
 
-        # 模擬 update 呼叫
-        mock_db.query.return_value.filter.return_value.update.return_value = 100
+        # 模擬 count 與兩個批次 (第二批為空)
+        mock_db.execute.return_value.scalar.return_value = 3
+        mock_db.execute.return_value.scalars.return_value.all.side_effect = [
+            [1, 2, 3],
+            [],
+        ]
 
-        service.delete_project_audios(project_id, user_id, deleted_at)
+        stats = service.delete_project_audios(project_id, user_id, deleted_at, "b1")
 
+        assert stats["audios"] == 3
+        update_stmt = mock_db.execute.call_args_list[1].args[0]
+        assert update_stmt.compile().params["deleted_at"] == deleted_at
+        assert update_stmt.compile().params["deletion_batch_id"] == "b1"
         # 驗證 commit 被呼叫
         mock_db.commit.assert_called()
 
 
+class TestCascadeSoftDelete:
+    """測試分批 (keyset) 級聯軟刪除。"""
+
+    def run(self, batches, total, batch_size=2, progress=None):
+        db = MagicMock()
+        db.execute.return_value.scalar.return_value = total
+        db.execute.return_value.scalars.return_value.all.side_effect = batches
+        ticks = iter(range(100))
+        stats = soft_delete_audios(
+            db,
+            [10, 11],
+            {"is_deleted": True},
+            batch_size=batch_size,
+            progress=progress,
+            clock=lambda: next(ticks),
+        )
+        return db, stats
+
+    def test_batches_are_keyset_paginated_and_committed(self):
+        """
+        預期行為：
+        - 每批只選出尚未刪除、id 大於上一批最後 id 的列，並限制筆數
+        - 每批各自 commit
+        """
+        db, stats = self.run([[1, 5], [9], []], total=3)
+
+        updates = [
+            str(c.args[0].compile(dialect=postgresql.dialect()))
+            for c in db.execute.call_args_list[1:]
+        ]
+        params = [
+            c.args[0].compile(dialect=postgresql.dialect()).params
+            for c in db.execute.call_args_list[1:]
+        ]
+        assert "audio_info.is_deleted IS false" in updates[0]
+        assert "ORDER BY audio_info.id" in updates[0]
+        assert "LIMIT" in updates[0]
+        assert "RETURNING audio_info.id" in updates[0]
+        assert [p["id_1"] for p in params] == [0, 5, 9]
+        assert db.commit.call_count == 4
+        assert stats["audios"] == 3
+        assert stats["batches"] == 2
+
+    def test_reports_progress_and_lock_times(self):
+        """
+        預期行為：
+        - 進度依批次回報，最後一次等於總數
+        - 回傳吞吐量與每批持鎖時間
+        """
+        progress = MagicMock()
+        _, stats = self.run([[1, 2], [3], []], total=3, progress=progress)
+
+        assert progress.call_args_list == [call(0, 3), call(2, 3), call(3, 3)]
+        # 假時鐘每次呼叫前進 1 秒：每批持鎖 1 秒，三批加上結束共 7 秒
+        assert stats["max_lock_ms"] == 1000.0
+        assert stats["avg_lock_ms"] == 1000.0
+        assert stats["seconds"] == 7
+        assert stats["rows_per_second"] == 0.4
+
+    def test_resume_only_touches_remaining_rows(self):
+        """
+        預期行為：
+        - 已完成的部分不再計入，沒有剩餘列時不做任何更新
+        """
+        db, stats = self.run([[]], total=0)
+
+        assert stats["audios"] == 0
+        assert stats["batches"] == 0
+        assert stats["avg_lock_ms"] == 0.0
+        assert db.execute.call_count == 2
+
+    def test_parent_restore_stops_remaining_batches(self):
+        """
+        預期行為：
+        - 只刪除同一批次刪除的 deployment 底下的音檔 (父層還原後即不再符合)
+        """
+        service = PointService(MagicMock())
+        with patch(
+            "app.services.point_service.soft_delete_audios", return_value={}
+        ) as cascade:
+            service.delete_point_audios(1, 2, datetime.now(timezone.utc), "b1")
+
+        deployment_ids = cascade.call_args.args[1]
+        sql = str(deployment_ids.compile(dialect=postgresql.dialect()))
+        assert "deployment_info.deletion_batch_id = %(deletion_batch_id_1)s" in sql
+
+
+    def test_restore_job_skips_project_deleted_again(self, mock_db):
+        """
+        測試還原工作執行前專案已被還原或再次刪除。
+
+        預期行為：
+        - deletion_batch_id 與排入時不同時不做任何事
+        """
+        service = ProjectService(mock_db)
+        mock_project = MagicMock(is_deleted=True, deletion_batch_id="new" * 8)
+
+        with (
+            patch.object(service, "validate_restore", return_value=mock_project),
+            patch(
+                "app.services.project_service.restore_deletion_batch"
+            ) as restore_batch,
+        ):
+            result = service.restore_project(1, "old" * 8)
+
+        assert result is mock_project
+        assert mock_project.is_deleted is True
+        restore_batch.assert_not_called()
+        mock_db.commit.assert_not_called()
+
+
+class TestDeletionBatchRestore:
+    """測試以 deletion_batch_id 精確還原級聯刪除。"""
+
+    def test_restore_runs_batched_updates_children_first(self):
+        """
+        預期行為：
+        - 依 deletion_batch_id 分批還原，某批不足 batch_size 時換下一張表
+        - 還原時清除 deletion_batch_id
+        """
+        db = MagicMock()
+        results = iter([2, 1, 0])
+        db.execute.side_effect = lambda stmt: MagicMock(rowcount=next(results))
+
+        progress = MagicMock()
+        restored = restore_deletion_batch(
+            db, "b1", (AudioInfo, DeploymentInfo), batch_size=2, progress=progress
+        )
+
+        assert restored == {"audio_info": 3, "deployment_info": 0}
+        assert [c.args for c in progress.call_args_list] == [
+            (2, None),
+            (3, None),
+            (3, None),
+        ]
+        sql = [
+            str(c.args[0].compile(dialect=postgresql.dialect()))
+            for c in db.execute.call_args_list
+        ]
+        assert "UPDATE audio_info" in sql[0]
+        assert "audio_info.deletion_batch_id = %(deletion_batch_id_1)s" in sql[0]
+        assert "deletion_batch_id=%(deletion_batch_id)s" in sql[0]
+        assert "UPDATE deployment_info" in sql[2]
+        assert db.commit.call_count == 3
+
+    def test_restore_without_batch_id_is_noop(self):
+        """
+        預期行為：
+        - 未被刪除 (沒有 batch id) 的資料不會觸發 ``IS NULL`` 的全表更新
+        """
+        db = MagicMock()
+
+        assert restore_deletion_batch(db, None, (AudioInfo,)) == {}
+        db.execute.assert_not_called()
+
+    def test_delete_project_stamps_live_children_with_one_batch(self, mock_db):
+        """
+        預期行為：
+        - 專案與其下尚未刪除的測站、佈放紀錄共用同一個 deletion_batch_id
+        """
+        mock_project = MagicMock()
+        mock_db.query.return_value.filter.return_value.filter.return_value.first.return_value = (
+            mock_project
+        )
+
+        ProjectService(mock_db).delete_project(1, user_id=1)
+
+        update = mock_db.query.return_value.filter.return_value.update
+        batch_ids = {c.args[0]["deletion_batch_id"] for c in update.call_args_list}
+        assert batch_ids == {mock_project.deletion_batch_id}
+        assert len(mock_project.deletion_batch_id) == 32
+
+
 # =============================================================================
 # PointService 軟刪除測試
 # =============================================================================
@@ -238,7 +433,7 @@ class TestPointServiceDelete:
         mock_point.is_deleted = False
 
         # 模擬查詢回傳測站
-        mock_db.query.return_value.filter.return_value.first.return_value = mock_point
+        mock_db.scalars.return_value.first.return_value = mock_point
         # 模擬找到的 deployments
         mock_db.query.return_value.filter.return_value.all.return_value = []
 
@@ -246,7 +441,9 @@ class TestPointServiceDelete:
 
         assert mock_point.is_deleted is True
         assert mock_point.deleted_by == 1
-        mock_db.commit.assert_called()
+        # 由呼叫端與 cascade 工作一起 commit
+        mock_db.flush.assert_called()
+        mock_db.commit.assert_not_called()
 
     def test_delete_point_cascades_to_deployments_and_audios(self, mock_db):
         """
@@ -266,7 +463,7 @@ class TestPointServiceDelete:
         mock_deployment = MagicMock()
         mock_deployment.id = 10
 
-        mock_db.query.return_value.filter.return_value.first.return_value = mock_point
+        mock_db.scalars.return_value.first.return_value = mock_point
         mock_db.query.return_value.filter.return_value.all.return_value = [
             mock_deployment
         ]
@@ -275,7 +472,9 @@ class TestPointServiceDelete:
 
         # 驗證有呼叫 update 來更新子紀錄
         assert mock_db.query.called
-        mock_db.commit.assert_called()
+        # 由呼叫端與 cascade 工作一起 commit
+        mock_db.flush.assert_called()
+        mock_db.commit.assert_not_called()
 
 
 # =============================================================================
@@ -300,38 +499,37 @@ class TestDeploymentServiceDelete:
         mock_deployment.point_id = 1
         mock_deployment.is_deleted = False
 
-        mock_db.query.return_value.filter.return_value.first.return_value = (
-            mock_deployment
-        )
+        mock_db.scalars.return_value.first.return_value = mock_deployment
+        mock_db.execute.return_value.scalars.return_value.all.return_value = []
 
         result = service.delete_deployment(1, user_id=1)
 
         assert mock_deployment.is_deleted is True
         assert mock_deployment.deleted_by == 1
-        mock_db.commit.assert_called()
+        # 音檔由背景工作刪除；由呼叫端與該工作一起 commit
+        mock_db.flush.assert_called()
+        mock_db.commit.assert_not_called()
+        mock_db.execute.assert_not_called()
 
-    def test_delete_deployment_cascades_to_audios(self, mock_db):
+    def test_delete_deployment_audios_cascades_batch(self, mock_db):
         """
-        測試刪除佈放紀錄時級聯刪除音檔。
+        測試背景工作級聯刪除佈放紀錄下的音檔。
 
         預期行為：
-        - 佈放紀錄下所有音檔都被標記為刪除
+        - 只處理仍帶有同一個 deletion batch 的佈放紀錄
+        - 音檔以 deployment 的刪除時間與 batch 標記
         """
         service = DeploymentService(mock_db)
+        deleted_at = datetime(2024, 6, 1, tzinfo=timezone.utc)
 
-        mock_deployment = MagicMock()
-        mock_deployment.id = 1
-        mock_deployment.is_deleted = False
-
-        mock_db.query.return_value.filter.return_value.first.return_value = (
-            mock_deployment
-        )
-
-        service.delete_deployment(1, user_id=1)
+        with patch("app.services.deployment_service.soft_delete_audios") as soft_delete:
+            service.delete_deployment_audios(1, 2, deleted_at, "b" * 32)
 
-        # 驗證有呼叫 update 來更新音檔
-        assert mock_db.query.called
-        mock_db.commit.assert_called()
+        deployment_ids, values = soft_delete.call_args.args[1:3]
+        sql = str(deployment_ids)
+        assert "deployment_info.id = :id_1" in sql
+        assert "deployment_info.deletion_batch_id = :deletion_batch_id_1" in sql
+        assert values == deleted_values(2, deleted_at, "b" * 32)
 
 
 class TestDeploymentServiceRestore:
@@ -393,7 +591,7 @@ class TestAudioServiceDelete:
         mock_audio.deployment_id = 1
         mock_audio.is_deleted = False
 
-        mock_db.query.return_value.filter.return_value.first.return_value = mock_audio
+        mock_db.scalars.return_value.first.return_value = mock_audio
 
         result = service.delete_audio(1, user_id=1)
 
@@ -410,7 +608,7 @@ class TestAudioServiceDelete:
         """
         service = AudioService(mock_db)
 
-        mock_db.query.return_value.filter.return_value.first.return_value = None
+        mock_db.scalars.return_value.first.return_value = None
 
         with pytest.raises(HTTPException) as exc_info:
             service.delete_audio(999, user_id=1)
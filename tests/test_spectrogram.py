@@ -0,0 +1,179 @@
+"""
+頻譜圖 tile 服務測試模組。
+
+包含：
+- SingleFlight 併發請求合併
+- PNG 編碼
+- 記憶體 / MinIO 兩層快取
+- API 回應與 ETag
+"""
+
+import struct
+import threading
+import time
+import zlib
+from unittest.mock import MagicMock, patch
+
+import boto3
+import numpy as np
+import pytest
+from audio_helpers import make_wav, tone
+from fastapi import HTTPException
+from moto import mock_aws
+
+from app.core.config import settings
+from app.services import spectrogram_service
+from app.services.spectrogram_service import SpectrogramService, SpectrogramTile
+from app.utils.cache import SingleFlight
+from app.utils.image_utils import encode_png_gray
+
+
+def test_single_flight_coalesces_concurrent_calls():
+    flight = SingleFlight()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        time.sleep(0.1)
+        return "tile"
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(flight.do("k", slow)))
+        for _ in range(5)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert results == ["tile"] * 5
+    assert len(calls) == 1
+
+
+def test_encode_png_gray():
+    pixels = np.arange(12, dtype=np.uint8).reshape(3, 4)
+
+    png = encode_png_gray(pixels)
+
+    assert png.startswith(b"\x89PNG\r\n\x1a\n")
+    width, height = struct.unpack(">II", png[16:24])
+    assert (width, height) == (4, 3)
+    idat_len = struct.unpack(">I", png[33:37])[0]
+    raw = zlib.decompress(png[41 : 41 + idat_len])
+    assert raw == b"".join(b"\x00" + bytes(row) for row in pixels.tolist())
+
+
+@mock_aws
+def test_tile_is_rendered_once_and_persisted(mock_db, aws_credentials):
+    fs = 8000
+    s3 = boto3.client("s3", region_name="us-east-1")
+    s3.create_bucket(Bucket="proj")
+    s3.put_object(
+        Bucket="proj", Key="P1/spec.wav", Body=make_wav(tone(1000, fs, 5), fs)
+    )
+    audio = MagicMock(
+        object_key="P1/spec.wav", checksum="abc", file_size=None, is_cold_storage=False
+    )
+    audio.deployment.point.project.name = "proj"
+    spectrogram_service._tile_cache.clear()
+
+    with patch("app.services.spectrogram_service.AudioService") as MockService:
+        MockService.return_value.get_audio_details.return_value = audio
+        service = SpectrogramService(mock_db, s3_client=s3)
+
+        tile = service.get_tile(1, 1.0, 2.0, fmax=2000, nfft=256, fmt="f16")
+
+        assert tile.n_freq == 65
+        assert tile.n_time == 61
+        levels = np.frombuffer(tile.content, dtype="<f2").reshape(65, 61)
+        # 低頻在下方：第 0 列是 fmax，1 kHz 落在中間
+        peak_row = int(np.argmax(levels[:, 30].astype(float)))
+        assert 2000 - peak_row * tile.freq_step == 1000
+
+        persisted = s3.list_objects_v2(Bucket="proj", Prefix="_derived/spectrogram")
+        assert persisted["KeyCount"] == 1
+
+        # 清掉記憶體快取後應直接從 MinIO 取回，不再重新計算
+        spectrogram_service._tile_cache.clear()
+        with patch.object(SpectrogramService, "_render") as render:
+            again = service.get_tile(1, 1.0, 2.0, fmax=2000, nfft=256, fmt="f16")
+        render.assert_not_called()
+        assert again.content == tile.content
+        assert again.n_time == tile.n_time
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        {"db_min": -40.0, "db_max": -40.0},
+        {"db_min": -40.0, "db_max": -140.0},
+        {"db_min": float("nan")},
+        {"fmin": 2000.0, "fmax": 2000.0},
+        {"fmin": 3000.0, "fmax": 1000.0},
+    ],
+)
+def test_invalid_ranges_are_rejected_before_rendering(mock_db, params):
+    """dB 或頻率範圍無效時回 400，不查詢音檔也不計算或快取 tile。"""
+    spectrogram_service._tile_cache.clear()
+    with patch("app.services.spectrogram_service.AudioService") as MockService:
+        with pytest.raises(HTTPException) as exc:
+            SpectrogramService(mock_db, s3_client=MagicMock()).get_tile(
+                1, 0.0, 1.0, **params
+            )
+
+    assert exc.value.status_code == 400
+    MockService.assert_not_called()
+    assert len(spectrogram_service._tile_cache) == 0
+
+
+@mock_aws
+def test_range_above_nyquist_is_not_persisted(mock_db, aws_credentials):
+    fs = 8000
+    s3 = boto3.client("s3", region_name="us-east-1")
+    s3.create_bucket(Bucket="proj")
+    s3.put_object(
+        Bucket="proj", Key="P1/spec.wav", Body=make_wav(tone(1000, fs, 2), fs)
+    )
+    audio = MagicMock(
+        object_key="P1/spec.wav", checksum="abc", file_size=None, is_cold_storage=False
+    )
+    audio.deployment.point.project.name = "proj"
+    spectrogram_service._tile_cache.clear()
+
+    with patch("app.services.spectrogram_service.AudioService") as MockService:
+        MockService.return_value.get_audio_details.return_value = audio
+        with pytest.raises(HTTPException) as exc:
+            SpectrogramService(mock_db, s3_client=s3).get_tile(
+                1, 0.0, 1.0, fmin=5000, fmax=6000, nfft=256
+            )
+
+    assert exc.value.status_code == 400
+    assert s3.list_objects_v2(Bucket="proj", Prefix="_derived")["KeyCount"] == 0
+    assert len(spectrogram_service._tile_cache) == 0
+
+
+def test_get_spectrogram_endpoint(client):
+    tile = SpectrogramTile(
+        key="deadbeef",
+        content=b"png-bytes",
+        media_type="image/png",
+        n_time=10,
+        n_freq=20,
+        time_step=0.064,
+        freq_min=0.0,
+        freq_step=31.25,
+    )
+    url = f"{settings.api_prefix}/audio/1/spectrogram"
+
+    with patch("app.api.v1.endpoints.api_audio.SpectrogramService") as MockService:
+        MockService.return_value.get_tile.return_value = tile
+
+        response = client.get(url, params={"start": 0, "end": 5})
+        assert response.status_code == 200
+        assert response.content == b"png-bytes"
+        assert response.headers["content-type"] == "image/png"
+        assert response.headers["etag"] == '"deadbeef"'
+
+        response = client.get(url, headers={"If-None-Match": '"deadbeef"'})
+        assert response.status_code == 304
@@ -0,0 +1,99 @@
+"""
+單一語句唯一新增測試模組。
+
+包含：
+- INSERT ... SELECT ... WHERE NOT EXISTS ... ON CONFLICT DO NOTHING 的 SQL
+- trigger 引發的 unique_violation 視為衝突
+- 區分現有列衝突與軟刪除保留
+
+所有測試使用 mock 的 Session，不連接真實資料庫。
+"""
+
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.exc import IntegrityError
+
+from app.db.unique import find_conflict, insert_unique
+from app.models.audio import AudioInfo
+from app.models.project import ProjectInfo
+
+PROJECT_KEYS = (("name",), ("name_zh",))
+
+
+def test_insert_is_single_statement():
+    """
+    測試新增只送出一個語句。
+
+    預期行為：
+    - 軟刪除保留以 NOT EXISTS 檢查，現有列衝突以 ON CONFLICT DO NOTHING 略過
+    - 值為 NULL 的 key 不參與檢查
+    """
+    db = MagicMock()
+
+    project = insert_unique(
+        db, ProjectInfo, {"name": "p", "name_zh": None}, PROJECT_KEYS
+    )
+
+    assert project is db.scalars.return_value.one_or_none.return_value
+    sql = str(db.scalars.call_args.args[0].compile(dialect=postgresql.dialect()))
+    assert sql.startswith("INSERT INTO project_info (name, name_zh")
+    assert "WHERE NOT (EXISTS (SELECT *" in sql
+    assert "project_info.is_deleted IS true AND project_info.name = " in sql
+    assert "name_zh =" not in sql
+    assert "ON CONFLICT DO NOTHING RETURNING project_info.id" in sql
+    db.query.assert_not_called()
+
+
+def test_trigger_unique_violation_is_conflict():
+    """測試 object_key trigger 引發 unique_violation 時回傳 None 並 rollback。"""
+    db = MagicMock()
+    db.scalars.side_effect = IntegrityError(
+        "INSERT", {}, SimpleNamespace(pgcode="23505")
+    )
+
+    assert (
+        insert_unique(db, AudioInfo, {"object_key": "a.wav"}, [("object_key",)]) is None
+    )
+    db.rollback.assert_called_once()
+
+
+def test_other_integrity_errors_propagate():
+    db = MagicMock()
+    db.scalars.side_effect = IntegrityError(
+        "INSERT", {}, SimpleNamespace(pgcode="23503")
+    )
+
+    with pytest.raises(IntegrityError):
+        insert_unique(db, AudioInfo, {"object_key": "a.wav"}, [("object_key",)])
+    db.rollback.assert_not_called()
+
+
+@pytest.mark.parametrize(
+    ("rows", "expected"),
+    [
+        ([(True, "p", "專案"), (False, "x", "專案")], (("name_zh",), False)),
+        ([(True, "x", "專案"), (True, "p", "y")], (("name",), True)),
+        ([], (("name",), False)),
+    ],
+)
+def test_find_conflict_prefers_active_rows(rows, expected):
+    """
+    測試判斷衝突來源。
+
+    預期行為：
+    - 與現有列的衝突優先於軟刪除保留，同類依 key 順序
+    - 查不到衝突的列時視為第一個 key 與現有列衝突
+    """
+    db = MagicMock()
+    db.execute.return_value.all.return_value = [
+        SimpleNamespace(is_deleted=deleted, name=name, name_zh=name_zh)
+        for deleted, name, name_zh in rows
+    ]
+
+    assert (
+        find_conflict(db, ProjectInfo, {"name": "p", "name_zh": "專案"}, PROJECT_KEYS)
+        == expected
+    )
@@ -61,7 +61,7 @@ class TestUserServiceAuthenticateUser:
         """Should authenticate user with valid credentials."""
         mock_db = MagicMock()
         mock_user = MagicMock()
-        mock_user.password_hash = "hashed_password"
+        mock_user.password_hash = "$2b$12$hashed_password"
         mock_user.is_active = True
         mock_db.query.return_value.filter.return_value.first.return_value = mock_user
 
@@ -72,6 +72,30 @@ class TestUserServiceAuthenticateUser:
             result = service.authenticate_user("test@example.com", "password123")
 
         assert result == mock_user
+        mock_db.commit.assert_not_called()
+
+    def test_authenticate_user_rehashes_outdated_cost(self):
+        """Should re-hash a password stored with a different bcrypt cost."""
+        mock_db = MagicMock()
+        mock_user = MagicMock()
+        mock_user.password_hash = "$2b$04$hashed_password"
+        mock_user.is_active = True
+        mock_db.query.return_value.filter.return_value.first.return_value = mock_user
+
+        service = UserService(mock_db)
+
+        with (
+            patch("app.services.user_service.verify_password", return_value=True),
+            patch(
+                "app.services.user_service.hash_password", return_value="new_hash"
+            ) as mock_hash,
+        ):
+            result = service.authenticate_user("test@example.com", "password123")
+
+        assert result == mock_user
+        mock_hash.assert_called_once_with("password123")
+        assert mock_user.password_hash == "new_hash"
+        mock_db.commit.assert_called_once()
 
     def test_authenticate_user_not_found(self):
         """Should return None when user not found."""
@@ -1,4 +1,7 @@
+from datetime import UTC, datetime
+
 from app.utils.path_utils import parse_filename_and_generate_key
+from app.utils.time_utils import TW_TZ, as_aware
 
 
 def test_parse_filename_and_generate_key_valid():
@@ -23,3 +26,16 @@ def test_parse_filename_and_generate_key_invalid():
     expected = "PointA/unknown_date/Raw_Data/invalid_filename.wav"
 
     assert parse_filename_and_generate_key(point_name, filename) == expected
+
+
+def test_as_aware_assumes_taiwan_time():
+    """
+    Naive datetimes are taken as UTC+8; aware ones and None pass through.
+    """
+    naive = datetime(2024, 6, 11, 13, 0)
+    aware = datetime(2024, 6, 11, 5, 0, tzinfo=UTC)
+
+    assert as_aware(naive) == datetime(2024, 6, 11, 13, 0, tzinfo=TW_TZ)
+    assert as_aware(naive) == aware
+    assert as_aware(aware) is aware
+    assert as_aware(None) is None